@@ -4,7 +4,7 @@ Email backend adapters for workspace EmailConfig.
 Registry maps backend_type to BackendClass; each backend declares backend_type_id,
 label, and config_schema (SchemaConfig) for UI editing and loading.
 """
-from .base import BaseEmailBackend
+from .base import BaseEmailBackend, OutgoingEmail
 from .smtp import SMTPBackend
 from .mailgun import MailgunBackend
 
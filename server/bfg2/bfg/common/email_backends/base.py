@@ -4,7 +4,9 @@ Base email backend interface.
 Backends declare backend_type_id, label, and config_schema for UI editing and loading.
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 
 def schema_field(
@@ -23,11 +25,23 @@ def schema_field(
     return out
 
 
+@dataclass
+class OutgoingEmail:
+    """One message for send_many(); fields as the send() arguments."""
+    to_list: List[str]
+    subject: str
+    body_plain: str
+    body_html: Optional[str] = None
+    from_email: Optional[str] = None
+
+
 class BaseEmailBackend(ABC):
     """
     Abstract base for email backends.
     Subclasses must set backend_type_id, label, config_schema and implement send().
     config_schema is used by the API and UI for editing/loading (SchemaConfig).
+    Backends with a costly transport setup override open()/close(), so bulk senders
+    can reuse one connection across messages (see session() and send_many()).
     """
 
     backend_type_id: str = ''
@@ -43,6 +57,7 @@ class BaseEmailBackend(ABC):
         body_html: Optional[str] = None,
         from_email: Optional[str] = None,
         config: Optional[dict] = None,
+        connection: Any = None,
     ) -> None:
         """
         Send email.
@@ -54,8 +69,70 @@ class BaseEmailBackend(ABC):
             body_html: Optional HTML body.
             from_email: From address (may be overridden by config).
             config: Backend-specific config dict from EmailConfig.config.
+            connection: Optional connection from open(); a new one is used per call if None.
 
         Raises:
             Exception: On send failure.
         """
         pass
+
+    def open(self, config: Optional[dict] = None) -> Any:
+        """Open a reusable connection for send(connection=...); None if the backend has none."""
+        return None
+
+    def close(self, connection: Any) -> None:
+        """Close a connection returned by open()."""
+
+    @contextmanager
+    def session(self, config: Optional[dict] = None) -> Iterator[Any]:
+        """Connection for sending several messages: with backend.session(config) as conn: ..."""
+        connection = self.open(config)
+        try:
+            yield connection
+        finally:
+            if connection is not None:
+                self.close(connection)
+
+    def send_many(
+        self,
+        messages: Sequence[OutgoingEmail],
+        config: Optional[dict] = None,
+        connection: Any = None,
+    ) -> List[Optional[Exception]]:
+        """
+        Send several messages over one connection (a session is opened if connection is None).
+
+        A failing message does not stop the others. Backends with a native batch API
+        override this.
+
+        Returns:
+            One entry per message, in order: None if sent, else the exception raised.
+        """
+        if connection is None:
+            with self.session(config) as connection:
+                return self._send_each(messages, config, connection)
+        return self._send_each(messages, config, connection)
+
+    def _send_each(
+        self,
+        messages: Sequence[OutgoingEmail],
+        config: Optional[dict],
+        connection: Any,
+    ) -> List[Optional[Exception]]:
+        results: List[Optional[Exception]] = []
+        for message in messages:
+            try:
+                self.send(
+                    to_list=message.to_list,
+                    subject=message.subject,
+                    body_plain=message.body_plain,
+                    body_html=message.body_html,
+                    from_email=message.from_email,
+                    config=config,
+                    connection=connection,
+                )
+            except Exception as e:
+                results.append(e)
+            else:
+                results.append(None)
+        return results
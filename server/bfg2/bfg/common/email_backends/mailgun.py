@@ -2,14 +2,37 @@
 """
 Mailgun email backend via HTTP API.
 """
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 import requests
-from typing import List, Optional
+from requests.adapters import HTTPAdapter
+
+from .base import BaseEmailBackend, OutgoingEmail, schema_field
+
+# Mailgun accepts up to 1000 recipients per batch-send request
+MAILGUN_BATCH_SIZE = 1000
 
-from .base import BaseEmailBackend, schema_field
+_sessions = threading.local()
+
+
+def get_http_session() -> requests.Session:
+    """Per-thread pooled HTTP session: keeps TLS connections to the Mailgun API alive."""
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        session.mount('https://', adapter)
+        _sessions.session = session
+    return session
 
 
 class MailgunBackend(BaseEmailBackend):
-    """Send email via Mailgun API. Config: api_key, domain, from_email, optional region (e.g. eu)."""
+    """
+    Send email via Mailgun API. Config: api_key, domain, from_email, optional region (e.g. eu).
+    Requests go through the pooled get_http_session(); send_many() uses batch sending.
+    """
 
     backend_type_id = 'mailgun'
     label = 'Mailgun'
@@ -28,24 +51,9 @@ class MailgunBackend(BaseEmailBackend):
         body_html: Optional[str] = None,
         from_email: Optional[str] = None,
         config: Optional[dict] = None,
+        connection: Any = None,
     ) -> None:
-        if not config:
-            raise ValueError("Mailgun backend requires config")
-        api_key = config.get('api_key')
-        domain = config.get('domain')
-        if not api_key or not domain:
-            raise ValueError("Mailgun config must include api_key and domain")
-        from_addr = from_email or config.get('from_email')
-        if not from_addr:
-            raise ValueError("Mailgun config must include from_email or pass from_email")
-
-        region = config.get('region', '').lower()
-        if region == 'eu':
-            base_url = 'https://api.eu.mailgun.net/v3'
-        else:
-            base_url = 'https://api.mailgun.net/v3'
-        url = f"{base_url}/{domain}/messages"
-
+        url, api_key, from_addr = self._endpoint(config, from_email)
         data = {
             'from': from_addr,
             'to': to_list,
@@ -55,10 +63,89 @@ class MailgunBackend(BaseEmailBackend):
         if body_html:
             data['html'] = body_html
 
-        resp = requests.post(
+        resp = (connection or get_http_session()).post(
             url,
             auth=('api', api_key),
             data=data,
             timeout=30,
         )
         resp.raise_for_status()
+
+    def send_many(
+        self,
+        messages: Sequence[OutgoingEmail],
+        config: Optional[dict] = None,
+        connection: Any = None,
+    ) -> List[Optional[Exception]]:
+        """
+        Single-recipient messages with the same sender, subject and bodies go out as
+        Mailgun batch sends (one request per MAILGUN_BATCH_SIZE recipients; each
+        recipient still gets an individual email). Other messages are sent one by one.
+        """
+        http = connection or get_http_session()
+        results: List[Optional[Exception]] = [None] * len(messages)
+        groups: Dict[Tuple, List[int]] = {}
+        singles: List[int] = []
+        for i, message in enumerate(messages):
+            if len(message.to_list) == 1:
+                key = (message.from_email, message.subject, message.body_plain, message.body_html)
+                groups.setdefault(key, []).append(i)
+            else:
+                singles.append(i)
+
+        for (from_email, subject, body_plain, body_html), indexes in groups.items():
+            if len(indexes) == 1:
+                singles.append(indexes[0])
+                continue
+            for start in range(0, len(indexes), MAILGUN_BATCH_SIZE):
+                batch = indexes[start:start + MAILGUN_BATCH_SIZE]
+                recipients = [messages[i].to_list[0] for i in batch]
+                try:
+                    url, api_key, from_addr = self._endpoint(config, from_email)
+                    data = {
+                        'from': from_addr,
+                        'to': recipients,
+                        'subject': subject,
+                        'text': body_plain,
+                        # Makes Mailgun send each recipient a separate message
+                        'recipient-variables': json.dumps({to: {} for to in recipients}),
+                    }
+                    if body_html:
+                        data['html'] = body_html
+                    resp = http.post(url, auth=('api', api_key), data=data, timeout=30)
+                    resp.raise_for_status()
+                except Exception as e:
+                    for i in batch:
+                        results[i] = e
+
+        singles.sort()
+        for i, result in zip(singles, self._send_each([messages[i] for i in singles], config, http)):
+            results[i] = result
+        return results
+
+    def open(self, config: Optional[dict] = None) -> requests.Session:
+        """The pooled HTTP session, so consecutive sends reuse the keep-alive connection."""
+        return get_http_session()
+
+    def close(self, connection: requests.Session) -> None:
+        """Nothing to do: the session stays pooled for this thread."""
+
+    @staticmethod
+    def _endpoint(config: Optional[dict], from_email: Optional[str]) -> Tuple[str, str, str]:
+        """(messages URL, api_key, from address) from config; raises ValueError if incomplete."""
+        if not config:
+            raise ValueError("Mailgun backend requires config")
+        api_key = config.get('api_key')
+        domain = config.get('domain')
+        if not api_key or not domain:
+            raise ValueError("Mailgun config must include api_key and domain")
+        from_addr = from_email or config.get('from_email')
+        if not from_addr:
+            raise ValueError("Mailgun config must include from_email or pass from_email")
+
+        region = config.get('region', '').lower()
+        if region == 'eu':
+            base_url = 'https://api.eu.mailgun.net/v3'
+        else:
+            base_url = 'https://api.mailgun.net/v3'
+        return f"{base_url}/{domain}/messages", api_key, from_addr
@@ -2,16 +2,25 @@
 """
 SMTP email backend using smtplib.
 """
+import os
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from .base import BaseEmailBackend, schema_field
 
+# Socket timeout (seconds) for SMTP connections
+SMTP_TIMEOUT = 30
+
 
 class SMTPBackend(BaseEmailBackend):
-    """Send email via SMTP using config: host, port, use_tls, use_ssl, user, password, from_email."""
+    """
+    Send email via SMTP using config: host, port, use_tls, use_ssl, user, password, from_email.
+    Connections come from smtp_pool and are kept open between sends.
+    """
 
     backend_type_id = 'smtp'
     label = 'SMTP'
@@ -33,22 +42,14 @@ class SMTPBackend(BaseEmailBackend):
         body_html: Optional[str] = None,
         from_email: Optional[str] = None,
         config: Optional[dict] = None,
+        connection: Any = None,
     ) -> None:
         if not config:
             raise ValueError("SMTP backend requires config")
-        host = config.get('host')
-        port = config.get('port', 25)
-        if host is None:
-            raise ValueError("SMTP config must include host")
         from_addr = from_email or config.get('from_email')
         if not from_addr:
             raise ValueError("SMTP config must include from_email or pass from_email")
 
-        use_ssl = config.get('use_ssl', False)
-        use_tls = config.get('use_tls', False)
-        user = config.get('user')
-        password = config.get('password')
-
         if body_html:
             msg = MIMEMultipart('alternative')
             msg.attach(MIMEText(body_plain, 'plain'))
@@ -60,15 +61,168 @@ class SMTPBackend(BaseEmailBackend):
         msg['From'] = from_addr
         msg['To'] = ', '.join(to_list)
 
-        if use_ssl:
-            server = smtplib.SMTP_SSL(host, int(port))
-        else:
-            server = smtplib.SMTP(host, int(port))
+        if connection is not None:
+            connection.sendmail(from_addr, to_list, msg.as_string())
+            return
+        server = self.open(config)
         try:
-            if use_tls and not use_ssl:
-                server.starttls()
-            if user and password:
-                server.login(user, password)
             server.sendmail(from_addr, to_list, msg.as_string())
         finally:
-            server.quit()
+            self.close(server)
+
+    def open(self, config: Optional[dict] = None) -> 'PooledSMTPConnection':
+        """Logged-in connection from the process-wide pool (connects if none is idle)."""
+        if not config:
+            raise ValueError("SMTP backend requires config")
+        if config.get('host') is None:
+            raise ValueError("SMTP config must include host")
+        return smtp_pool.acquire(config)
+
+    def close(self, connection: 'PooledSMTPConnection') -> None:
+        """Return the connection to the pool for the next send."""
+        smtp_pool.release(connection)
+
+
+def connect_smtp(config: dict) -> smtplib.SMTP:
+    """Connect, STARTTLS and log in as configured."""
+    host = config.get('host')
+    port = config.get('port', 25)
+    use_ssl = config.get('use_ssl', False)
+    use_tls = config.get('use_tls', False)
+    user = config.get('user')
+    password = config.get('password')
+
+    if use_ssl:
+        server = smtplib.SMTP_SSL(host, int(port), timeout=SMTP_TIMEOUT)
+    else:
+        server = smtplib.SMTP(host, int(port), timeout=SMTP_TIMEOUT)
+    try:
+        if use_tls and not use_ssl:
+            server.starttls()
+        if user and password:
+            server.login(user, password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+class PooledSMTPConnection:
+    """
+    Logged-in SMTP connection owned by SMTPConnectionPool.
+
+    sendmail() reconnects and retries once when the server has dropped the
+    connection (idle timeout, restart). That failure almost always comes before
+    the message is sent, but if the connection drops after the server accepted
+    DATA the retry delivers a duplicate: possible, though rare.
+    """
+
+    def __init__(self, key: tuple, config: dict):
+        self.key = key
+        self.config = config
+        self.server: Optional[smtplib.SMTP] = connect_smtp(config)
+        self.last_used = time.monotonic()
+
+    def sendmail(self, from_addr: str, to_addrs: List[str], msg: str) -> Any:
+        if self.server is None:
+            self.server = connect_smtp(self.config)
+        try:
+            result = self.server.sendmail(from_addr, to_addrs, msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.discard()
+            self.server = connect_smtp(self.config)
+            result = self.server.sendmail(from_addr, to_addrs, msg)
+        self.last_used = time.monotonic()
+        return result
+
+    def quit(self) -> None:
+        if self.server is not None:
+            server, self.server = self.server, None
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def discard(self) -> None:
+        """Drop the socket without the QUIT round trip."""
+        if self.server is not None:
+            server, self.server = self.server, None
+            try:
+                server.close()
+            except OSError:
+                pass
+
+
+class SMTPConnectionPool:
+    """
+    Idle logged-in SMTP connections per (server, account), shared by the threads of
+    one process, so consecutive sends skip connect/STARTTLS/login.
+
+    Connections idle longer than idle_timeout are closed instead of reused (servers
+    drop idle clients); at most max_idle are kept per account. The pool resets
+    itself after a fork, so worker processes never share a socket.
+    """
+
+    def __init__(self, max_idle: int = 4, idle_timeout: float = 60):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[tuple, List[PooledSMTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @staticmethod
+    def key_for(config: dict) -> tuple:
+        return (
+            config.get('host'), int(config.get('port', 25)),
+            bool(config.get('use_ssl')), bool(config.get('use_tls')),
+            config.get('user') or '', config.get('password') or '',
+        )
+
+    def acquire(self, config: dict) -> PooledSMTPConnection:
+        key = self.key_for(config)
+        expired: List[PooledSMTPConnection] = []
+        connection = None
+        with self._lock:
+            self._check_pid()
+            deadline = time.monotonic() - self.idle_timeout
+            for pool_key, idle in list(self._idle.items()):
+                expired.extend(conn for conn in idle if conn.last_used < deadline)
+                idle[:] = [conn for conn in idle if conn.last_used >= deadline]
+                if not idle:
+                    del self._idle[pool_key]
+            if self._idle.get(key):
+                connection = self._idle[key].pop()
+        for conn in expired:
+            conn.quit()
+        if connection is None:
+            connection = PooledSMTPConnection(key, dict(config))
+        return connection
+
+    def release(self, connection: PooledSMTPConnection) -> None:
+        if connection.server is None:
+            return
+        with self._lock:
+            self._check_pid()
+            idle = self._idle.setdefault(connection.key, [])
+            if len(idle) < self.max_idle:
+                connection.last_used = time.monotonic()
+                idle.append(connection)
+                return
+        connection.quit()
+
+    def clear(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.quit()
+
+    def _check_pid(self) -> None:
+        # Forked child: the inherited sockets belong to the parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = {}
+
+
+smtp_pool = SMTPConnectionPool()
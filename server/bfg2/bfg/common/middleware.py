@@ -3,18 +3,38 @@
 Middleware for BFG2 multi-tenancy support.
 """
 
+import copy
 import threading
 from django.utils.deprecation import MiddlewareMixin
 from django.http import Http404
-from django.core.cache import cache
+from bfg.core.cache import TwoTierCache
 from .models import Workspace
 
+import logging
+logger = logging.getLogger(__name__)
+
 # Thread-local storage for current workspace
 _thread_locals = threading.local()
 
-# Cache timeout for workspace lookups (10 minutes)
+# Cache timeout for workspace lookups in the shared cache (10 minutes)
 WORKSPACE_CACHE_TIMEOUT = 600
 
+# Per-process tier: resolved workspaces are served from memory for up to 30s;
+# invalidations reach other processes within WORKSPACE_CACHE_CHECK_INTERVAL.
+# Each request gets its own copy, so changes to request.workspace stay with it.
+WORKSPACE_LOCAL_CACHE_TIMEOUT = 30
+WORKSPACE_LOCAL_CACHE_SIZE = 512
+WORKSPACE_CACHE_CHECK_INTERVAL = 1.0
+
+workspace_cache = TwoTierCache(
+    'workspace',
+    maxsize=WORKSPACE_LOCAL_CACHE_SIZE,
+    local_timeout=WORKSPACE_LOCAL_CACHE_TIMEOUT,
+    shared_timeout=WORKSPACE_CACHE_TIMEOUT,
+    version_check_interval=WORKSPACE_CACHE_CHECK_INTERVAL,
+    copy=copy.deepcopy,
+)
+
 
 def get_current_workspace():
     """Get the current workspace from thread-local storage."""
@@ -36,32 +56,17 @@ def _get_workspace_by_domain(hostname):
     Returns:
         Workspace or None
     """
-    cache_key = f'workspace:domain:{hostname}'
-    
-    # Try cache first
-    workspace = cache.get(cache_key)
-    if workspace is not None:
-        return workspace
-    
-    # Query database
-    try:
-        # Use filter().first() instead of get() to handle multiple workspaces gracefully
-        workspace = Workspace.objects.filter(domain=hostname, is_active=True).order_by('id').first()
-        if workspace:
-            # Cache the result
-            cache.set(cache_key, workspace, WORKSPACE_CACHE_TIMEOUT)
-            return workspace
-        else:
-            # Cache None result to avoid repeated DB queries for non-existent domains
-            cache.set(cache_key, None, WORKSPACE_CACHE_TIMEOUT)
+    def load():
+        try:
+            # Use filter().first() instead of get() to handle multiple workspaces gracefully
+            return Workspace.objects.filter(domain=hostname, is_active=True).order_by('id').first()
+        except Exception as e:
+            # Log error but don't crash
+            logger.error(f"Error getting workspace for domain {hostname}: {e}")
             return None
-    except Exception as e:
-        # Log error but don't crash
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Error getting workspace for domain {hostname}: {e}")
-        cache.set(cache_key, None, WORKSPACE_CACHE_TIMEOUT)
-        return None
+
+    # None results are cached too, so unknown domains don't hit the DB on every request
+    return workspace_cache.get_or_set(f'domain:{hostname}', load)
 
 
 def _get_workspace_by_id(workspace_id):
@@ -79,28 +84,10 @@ def _get_workspace_by_id(workspace_id):
     except (ValueError, TypeError):
         return None
     
-    cache_key = f'workspace:id:{workspace_id}'
-    
-    # Try cache first
-    workspace = cache.get(cache_key)
-    if workspace is not None:
-        # Verify workspace is still active
-        if workspace and workspace.is_active:
-            return workspace
-        # If cached workspace is inactive, invalidate cache and return None
-        cache.delete(cache_key)
-        return None
-    
-    # Query database
-    try:
-        workspace = Workspace.objects.get(id=workspace_id, is_active=True)
-        # Cache the result
-        cache.set(cache_key, workspace, WORKSPACE_CACHE_TIMEOUT)
-        return workspace
-    except Workspace.DoesNotExist:
-        # Cache None result
-        cache.set(cache_key, None, WORKSPACE_CACHE_TIMEOUT)
-        return None
+    return workspace_cache.get_or_set(
+        f'id:{workspace_id}',
+        lambda: Workspace.objects.filter(id=workspace_id, is_active=True).first()
+    )
 
 
 def _get_first_active_workspace():
@@ -110,45 +97,55 @@ def _get_first_active_workspace():
     Returns:
         Workspace or None
     """
-    cache_key = 'workspace:first_active'
-    
-    # Try cache first
-    workspace = cache.get(cache_key)
-    if workspace is not None:
-        # Verify workspace is still active
-        if workspace and workspace.is_active:
-            return workspace
-        # If cached workspace is inactive, invalidate cache
-        cache.delete(cache_key)
-    
-    # Query database
-    workspace = Workspace.objects.filter(is_active=True).first()
-    
-    # Cache the result (even if None)
-    cache.set(cache_key, workspace, WORKSPACE_CACHE_TIMEOUT)
-    return workspace
+    return workspace_cache.get_or_set(
+        'first_active',
+        lambda: Workspace.objects.filter(is_active=True).first()
+    )
 
 
-def invalidate_workspace_cache(workspace):
+def get_workspace_by_site_domain(hostname):
     """
-    Invalidate all cache entries for a workspace.
-    Should be called when workspace is updated (domain, is_active, etc.).
+    Get workspace of the active web Site for a domain, with caching.
     
     Args:
-        workspace: Workspace instance
+        hostname: Domain hostname
+        
+    Returns:
+        Workspace or None
     """
-    if not workspace:
-        return
-    
-    # Invalidate domain cache
-    if workspace.domain:
-        cache.delete(f'workspace:domain:{workspace.domain}')
+    def load():
+        try:
+            from bfg.web.models import Site
+        except ImportError:
+            return None
+        site = Site.objects.filter(domain=hostname, is_active=True).select_related('workspace').first()
+        return site.workspace if site else None
+
+    return workspace_cache.get_or_set(f'site_domain:{hostname}', load)
+
+
+def get_workspace_by_id(workspace_id):
+    """Get an active workspace by ID (cached)."""
+    return _get_workspace_by_id(workspace_id)
+
+
+def get_first_active_workspace():
+    """Get the first active workspace (cached; used as last-resort fallback)."""
+    return _get_first_active_workspace()
+
+
+def invalidate_workspace_cache(workspace=None):
+    """
+    Invalidate cached workspace lookups.
+    Should be called when a workspace (domain, is_active, etc.) or web Site changes.
     
-    # Invalidate ID cache
-    cache.delete(f'workspace:id:{workspace.id}')
+    Every lookup (id, domain - including a previous domain -, site domain,
+    first active) is dropped at once, here and in other processes.
     
-    # Invalidate first_active cache (since it might have changed)
-    cache.delete('workspace:first_active')
+    Args:
+        workspace: Workspace instance (optional, kept for backward compatibility)
+    """
+    workspace_cache.invalidate()
 
 
 class WorkspaceMiddleware(MiddlewareMixin):
@@ -1,22 +1,155 @@
 # -*- coding: utf-8 -*-
 """
 Workspace email sending service. Uses active EmailConfig per workspace.
-Supports optional config argument to avoid repeated DB hits during bulk send.
+Supports optional config argument to avoid repeated DB hits during bulk send,
+sessions that reuse one backend connection across many messages, and an outbox
+that sends queued messages in batches.
 """
 import logging
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence
 
 from bfg.common.models import EmailConfig, Workspace
-from bfg.common.email_backends import get_backend
+from bfg.common.email_backends import OutgoingEmail, get_backend
 
 logger = logging.getLogger(__name__)
 
 
+class EmailSession:
+    """
+    Sends several emails over one backend connection (SMTP login, HTTP keep-alive).
+
+    The connection is opened on the first send. A failed send drops it, so a
+    broken connection is replaced on the next send instead of failing the rest.
+    Use as a context manager, or call close().
+    """
+
+    def __init__(self, config: EmailConfig):
+        self.config = config
+        self.backend = get_backend(config.backend_type)()
+        self.connection: Any = None
+
+    def send(
+        self,
+        to_list: List[str],
+        subject: str,
+        body_plain: str,
+        body_html: Optional[str] = None,
+        from_email: Optional[str] = None,
+    ) -> None:
+        """Send one email (same arguments as EmailService.send_email)."""
+        if self.connection is None:
+            self.connection = self.backend.open(self.config.config)
+        try:
+            self.backend.send(
+                to_list=to_list,
+                subject=subject,
+                body_plain=body_plain,
+                body_html=body_html,
+                from_email=from_email,
+                config=self.config.config,
+                connection=self.connection,
+            )
+        except Exception:
+            self._drop_connection()
+            raise
+
+    def send_many(self, messages: Sequence[OutgoingEmail]) -> List[Optional[Exception]]:
+        """Send messages with the backend's batch API; one result per message (None = sent)."""
+        if not messages:
+            return []
+        if self.connection is None:
+            self.connection = self.backend.open(self.config.config)
+        return self.backend.send_many(messages, config=self.config.config, connection=self.connection)
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.backend.close(self.connection)
+            self.connection = None
+
+    def _drop_connection(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            logger.debug("Closing email connection failed", exc_info=True)
+        self.connection = None
+
+    def __enter__(self) -> 'EmailSession':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._drop_connection()
+
+
+class EmailOutbox:
+    """
+    Queues emails and sends them batch_size at a time over one EmailSession, so
+    callers producing many emails get the backend's batch sending.
+
+    Queued emails go out when a batch is full, on flush(), and when the with-block
+    exits. Failures are logged and collected in .failed as (email, exception).
+    """
+
+    def __init__(self, session: EmailSession, batch_size: int = 100):
+        self.session = session
+        self.batch_size = batch_size
+        self.pending: List[OutgoingEmail] = []
+        self.failed: List[tuple] = []
+        self.sent_count = 0
+
+    def add(
+        self,
+        to_list: List[str],
+        subject: str,
+        body_plain: str,
+        body_html: Optional[str] = None,
+        from_email: Optional[str] = None,
+    ) -> None:
+        """Queue one email (same arguments as EmailService.send_email)."""
+        self.add_message(OutgoingEmail(to_list, subject, body_plain, body_html, from_email))
+
+    def add_message(self, message: OutgoingEmail) -> None:
+        self.pending.append(message)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> List[Optional[Exception]]:
+        """Send every queued email; one result per email (None = sent)."""
+        messages, self.pending = self.pending, []
+        if not messages:
+            return []
+        try:
+            results = self.session.send_many(messages)
+        except Exception as e:
+            # Opening the connection failed (e.g. SMTP login): every message failed
+            results = [e] * len(messages)
+        for message, error in zip(messages, results):
+            if error is None:
+                self.sent_count += 1
+            else:
+                logger.error("Email to %s failed: %s", ', '.join(message.to_list), error)
+                self.failed.append((message, error))
+        return results
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.session.close()
+
+    def __enter__(self) -> 'EmailOutbox':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
 class EmailService:
     """
     Send email using workspace's active EmailConfig (is_default + is_active).
     Does not fall back to server-level Django EMAIL_*.
-    Pass config= to use a pre-fetched EmailConfig and avoid DB access (e.g. bulk send).
+    Pass config= to use a pre-fetched EmailConfig and avoid DB access (e.g. bulk send),
+    use open_session() to also reuse the backend connection, or send_many()/outbox()
+    to send many messages in batches.
     """
 
     @staticmethod
@@ -28,6 +161,57 @@ class EmailService:
             is_active=True,
         ).first()
 
+    @staticmethod
+    def open_session(workspace: Workspace, config: Optional[EmailConfig] = None) -> EmailSession:
+        """
+        Session sending through the workspace's active EmailConfig, or the given config.
+
+        Raises:
+            ValueError: If no active config when config is None.
+        """
+        if config is None:
+            config = EmailService.get_active_config(workspace)
+        if not config:
+            raise ValueError(
+                f"No active email config for workspace {workspace.id}. "
+                "Set an EmailConfig as default in Admin > Settings > General > Email."
+            )
+        return EmailSession(config)
+
+    @staticmethod
+    def outbox(
+        workspace: Workspace,
+        config: Optional[EmailConfig] = None,
+        batch_size: int = 100,
+    ) -> EmailOutbox:
+        """
+        Outbox that batches emails through the workspace's active EmailConfig:
+        with EmailService.outbox(workspace) as outbox: outbox.add(...)
+
+        Raises:
+            ValueError: If no active config when config is None.
+        """
+        return EmailOutbox(EmailService.open_session(workspace, config), batch_size=batch_size)
+
+    @staticmethod
+    def send_many(
+        workspace: Workspace,
+        messages: Sequence[OutgoingEmail],
+        config: Optional[EmailConfig] = None,
+    ) -> List[Optional[Exception]]:
+        """
+        Send messages over one connection, using the backend's batch API.
+        A failing message does not stop the others.
+
+        Returns:
+            One entry per message, in order: None if sent, else the exception.
+
+        Raises:
+            ValueError: If no active config when config is None.
+        """
+        with EmailService.open_session(workspace, config) as session:
+            return session.send_many(messages)
+
     @staticmethod
     def send_email(
         workspace: Workspace,
@@ -36,18 +36,7 @@ from bfg.common.serializers import (
 )
 from bfg.common.services import WorkspaceService, CustomerService, AddressService
 from bfg.common.utils import get_required_workspace
-from bfg.common.constants import get_default_currency_for_workspace, DEFAULT_CURRENCY_CODE
-
-# Strip known footer menu name prefixes (e.g. "footer-", localized equivalents)
-FOOTER_MENU_NAME_PREFIXES = ('footer-')
-
-
-def _strip_footer_menu_name_prefix(name: str) -> str:
-    for prefix in FOOTER_MENU_NAME_PREFIXES:
-        if name.startswith(prefix):
-            name = name[len(prefix):]
-            break
-    return name.title()
+from bfg.common.constants import get_default_currency_for_workspace
 
 
 class WorkspaceViewSet(viewsets.ModelViewSet):
@@ -576,8 +565,8 @@ class SettingsViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         """Update settings using service; invalidate storefront config cache."""
-        from django.core.cache import cache
         from bfg.common.services import SettingsService
+        from bfg.common.services.settings_service import invalidate_storefront_config_cache
 
         service = SettingsService(
             workspace=self.request.workspace,
@@ -592,8 +581,7 @@ class SettingsViewSet(viewsets.ModelViewSet):
         # Invalidate storefront config cache so footer/header reflect new settings
         wid = getattr(settings.workspace, 'id', None) or getattr(settings, 'workspace_id', None)
         if wid is not None:
-            for lang in ('en', 'zh-hans', 'zh-hant'):
-                cache.delete(f"storefront_config:{wid}:{lang}")
+            invalidate_storefront_config_cache(wid)
     
     @action(detail=False, methods=['post'])
     def enable_feature(self, request):
@@ -656,11 +644,9 @@ class SettingsViewSet(viewsets.ModelViewSet):
         """
         Public read-only storefront config: sanitized Settings + header/footer menus.
         GET /api/v1/settings/storefront/?lang=en
-        Cached by workspace (and optional lang).
+        Cached by workspace (and optional lang); served stale while it is rebuilt.
         """
-        from django.core.cache import cache
-        from bfg.common.models import Settings
-        from bfg.common.services import SettingsService
+        from bfg.common.services.settings_service import get_cached_storefront_config
 
         workspace = getattr(request, 'workspace', None)
         if not workspace:
@@ -670,144 +656,7 @@ class SettingsViewSet(viewsets.ModelViewSet):
             )
 
         lang = request.query_params.get('lang', 'en')
-        cache_key = f"storefront_config:{workspace.id}:{lang}"
-        STOREFRONT_CONFIG_TTL = 60 * 60  # 1 hour
-
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return Response(cached)
-
-        service = SettingsService(workspace=workspace, user=request.user)
-        settings_obj = service.get_or_create_settings(workspace)
-
-        general_custom = (settings_obj.custom_settings or {}).get('general') or {}
-        storefront_ui = (settings_obj.custom_settings or {}).get('storefront_ui') or {}
-        shop_custom = (settings_obj.custom_settings or {}).get('shop') or {}
-        default_header_options = {
-            'show_search': True,
-            'show_cart': True,
-            'show_language_switcher': True,
-            'show_style_selector': True,
-            'show_login': True,
-        }
-        header_options = storefront_ui.get('header_options')
-        if isinstance(header_options, dict):
-            default_header_options = {**default_header_options, **header_options}
-        payload = {
-            'site_name': settings_obj.site_name or general_custom.get('site_name', '') or '',
-            'site_description': settings_obj.site_description or general_custom.get('site_description', '') or '',
-            'contact_email': settings_obj.contact_email or general_custom.get('contact_email', '') or '',
-            'support_email': settings_obj.support_email or '',
-            'contact_phone': settings_obj.contact_phone or general_custom.get('contact_phone', '') or '',
-            'facebook_url': settings_obj.facebook_url or '',
-            'twitter_url': settings_obj.twitter_url or '',
-            'instagram_url': settings_obj.instagram_url or '',
-            'default_currency': settings_obj.default_currency or DEFAULT_CURRENCY_CODE,
-            'top_bar_announcement': general_custom.get('top_bar_announcement', ''),
-            'footer_copyright': general_custom.get('footer_copyright', ''),
-            'site_announcement': general_custom.get('site_announcement', ''),
-            'footer_contact': general_custom.get('footer_contact', ''),
-            'header_menus': [],
-            'footer_menus': [],
-            'footer_menu_groups': [],
-            'theme': storefront_ui.get('theme') or 'store',
-            'header': storefront_ui.get('header'),
-            'footer': storefront_ui.get('footer'),
-            'header_options': default_header_options,
-            'review_moderation_required': bool(shop_custom.get('review_moderation_required', False)),
-        }
-
-        try:
-            from bfg.web.models import Menu
-
-            def add_menu_items(queryset, only_if_empty_header=False, only_if_empty_footer=False, add_footer_groups=True):
-                for menu in queryset.prefetch_related('items').order_by('name'):
-                    items = [
-                        {
-                            'title': item.title,
-                            'url': item.url,
-                            'order': item.order,
-                            'open_in_new_tab': item.open_in_new_tab,
-                        }
-                        for item in menu.items.filter(is_active=True).order_by('order')
-                    ]
-                    if menu.location == 'header' and (not only_if_empty_header or not payload['header_menus']):
-                        payload['header_menus'].extend(items)
-                    elif menu.location == 'footer':
-                        if not only_if_empty_footer or not payload['footer_menus']:
-                            payload['footer_menus'].extend(items)
-                        if add_footer_groups:
-                            payload['footer_menu_groups'].append({
-                                'slug': menu.slug,
-                                'name': _strip_footer_menu_name_prefix(menu.name),
-                                'items': items,
-                            })
-
-            # Prefer menus for requested language
-            qs = Menu.objects.filter(
-                workspace=workspace,
-                location__in=['header', 'footer'],
-                is_active=True,
-                language=lang,
-            )
-            add_menu_items(qs)
-            # Fallback when requested lang has no menus: try other languages (en, zh-hans)
-            if not payload['header_menus'] and not payload['footer_menu_groups']:
-                for fallback_lang in ('en', 'zh-hans'):
-                    if fallback_lang == lang:
-                        continue
-                    fallback_qs = Menu.objects.filter(
-                        workspace=workspace,
-                        location__in=['header', 'footer'],
-                        is_active=True,
-                        language=fallback_lang,
-                    )
-                    if fallback_qs.exists():
-                        add_menu_items(fallback_qs)
-                        break
-            if lang != 'en':
-                fallback_qs = Menu.objects.filter(
-                    workspace=workspace,
-                    location__in=['header', 'footer'],
-                    is_active=True,
-                    language='en',
-                )
-                add_menu_items(fallback_qs, only_if_empty_header=True, only_if_empty_footer=True, add_footer_groups=False)
-
-            payload['header_menus'].sort(key=lambda x: x['order'])
-            payload['footer_menus'].sort(key=lambda x: x['order'])
-            # Stable order for footer groups: product, resources, company, legal
-            _footer_slug_order = ('footer-product', 'footer-resources', 'footer-company', 'footer-legal')
-            payload['footer_menu_groups'].sort(
-                key=lambda g: (_footer_slug_order.index(g['slug']) if g.get('slug') in _footer_slug_order else 999, g.get('slug') or ''),
-            )
-        except (ImportError, AttributeError):
-            pass
-
-        # Prefer bfg.web Site for site_name (Site title), then Settings
-        try:
-            from bfg.web.models import Site
-            site = Site.objects.filter(workspace=workspace, is_active=True).order_by('-is_default').select_related('theme').first()
-            if site:
-                site_display_name = (getattr(site, 'name', None) or getattr(site, 'site_title', None) or '').strip()
-                if site_display_name:
-                    payload['site_name'] = site_display_name
-                if not payload.get('site_description') and getattr(site, 'site_description', None):
-                    payload['site_description'] = site.site_description
-                if not storefront_ui.get('theme') and site.theme_id and site.theme:
-                    tp = (site.theme.template_path or '').strip()
-                    if tp == 'themes/website':
-                        payload['theme'] = 'website'
-                    elif tp == 'themes/default' or not tp:
-                        payload['theme'] = 'store'
-                payload['default_language'] = getattr(site, 'default_language', None) or 'zh-hans'
-        except (ImportError, AttributeError):
-            pass
-        if 'default_language' not in payload:
-            payload['default_language'] = 'zh-hans'
-
-        cache.set(cache_key, payload, STOREFRONT_CONFIG_TTL)
-        return Response(payload)
+        return Response(get_cached_storefront_config(workspace, lang))
 
     @action(detail=False, methods=['get'])
     def options(self, request):
@@ -7,7 +7,19 @@ Export all core utilities
 from .exceptions import *
 from .services import BaseService
 from .managers import WorkspaceManager, BaseManager
-from .cache import CacheMixin, CacheService
+from .cache import (
+    CacheMixin,
+    CacheService,
+    TwoTierCache,
+    workspace_tag,
+    get_tagged,
+    set_tagged,
+    get_or_set_tagged,
+    get_many_tagged,
+    set_many_tagged,
+    get_or_refresh_tagged,
+    invalidate_tags,
+)
 from .events import global_dispatcher, EventDispatcher
 from .permissions import (
     IsWorkspaceAdmin,
@@ -37,6 +49,15 @@ __all__ = [
     # Cache
     'CacheMixin',
     'CacheService',
+    'TwoTierCache',
+    'workspace_tag',
+    'get_tagged',
+    'set_tagged',
+    'get_or_set_tagged',
+    'get_many_tagged',
+    'set_many_tagged',
+    'get_or_refresh_tagged',
+    'invalidate_tags',
     # Events
     'global_dispatcher',
     'EventDispatcher',
@@ -14,25 +14,18 @@ from rest_framework.views import APIView
 from django.http import StreamingHttpResponse
 
 from bfg.core.agent import AgentCapabilityRegistry, AgentCapability, _FakeView
-from bfg.core.api_tool_catalog import get_api_tools, execute_api_tool
+from bfg.core.api_tool_catalog import (
+    TOOL_CATEGORY_KEYWORDS,
+    ApiToolDispatcher,
+    filter_tools_by_categories,
+    get_api_tool_catalog,
+)
 
 logger = logging.getLogger(__name__)
 
 # OpenAI API allows max 128 tools per request
 OPENAI_MAX_TOOLS = 128
 
-# Category keywords for filtering API tools by name/description (lowercase)
-TOOL_CATEGORY_KEYWORDS = {
-    "order": ["order", "orders"],
-    "customer": ["customer", "customers", "address", "addresses"],
-    "product": ["product", "products", "variant", "variants", "categor", "category"],
-    "ticket": ["ticket", "tickets", "support"],
-    "invoice": ["invoice", "invoices"],
-    "payment": ["payment", "payments", "wallet", "wallets", "refund"],
-    "delivery": ["delivery", "consignment", "consignments", "carrier", "carriers", "ship", "manifest", "warehouse", "freight", "tracking"],
-    "settings": ["settings", "workspace", "options", "countries"],
-}
-
 ALLOWED_CATEGORIES = list(TOOL_CATEGORY_KEYWORDS.keys())
 
 
@@ -80,34 +73,12 @@ def _infer_tool_categories_with_llm(messages, client, selector_model: str):
         return []
 
 
-def _filter_tools_by_categories(tools, tool_name_to_capability_id, categories, max_tools=OPENAI_MAX_TOOLS):
+def _filter_tools_by_categories(tools, tool_name_to_capability_id, categories, max_tools=OPENAI_MAX_TOOLS, catalog=None):
     """
     Keep all manual (capability) tools; keep API tools whose name/description matches any of the
     given categories. Cap total at max_tools. If categories is empty, keep manual + first N API tools.
     """
-    manual = [t for t in tools if t["function"]["name"] in tool_name_to_capability_id]
-    api_tools = [t for t in tools if t["function"]["name"] not in tool_name_to_capability_id]
-    budget = max_tools - len(manual)
-    if budget <= 0 or not api_tools:
-        return manual[:max_tools] if len(manual) > max_tools else manual
-
-    if not categories:
-        return manual + api_tools[:budget]
-
-    keywords = set()
-    for c in categories:
-        keywords.update(TOOL_CATEGORY_KEYWORDS.get(c, []))
-
-    def matches(t):
-        name = (t.get("function") or {}).get("name") or ""
-        desc = (t.get("function") or {}).get("description") or ""
-        combined = f"{name} {desc}".lower()
-        return any(kw in combined for kw in keywords)
-
-    selected_api = [t for t in api_tools if matches(t)]
-    if len(selected_api) > budget:
-        selected_api = selected_api[:budget]
-    return manual + selected_api
+    return filter_tools_by_categories(tools, tool_name_to_capability_id, categories, max_tools, catalog)
 
 
 def _tool_name_from_capability_id(capability_id: str) -> str:
@@ -160,12 +131,46 @@ def _merged_tools_and_mappings(request):
     API tools first, then manual capability tools. Only capability tools have tool_name_to_capability_id;
     API tools are executed via api_tool_specs.
     """
-    api_tools, api_tool_specs = get_api_tools(request)
+    catalog = get_api_tool_catalog()
     capabilities = AgentCapabilityRegistry.list_all(request)
     manual_tools, tool_name_to_capability_id = _openai_tools_from_capabilities(capabilities)
     # API tool names must not clash with manual tool names (operationId vs capability id).
-    combined_tools = api_tools + manual_tools
-    return combined_tools, tool_name_to_capability_id, api_tool_specs
+    combined_tools = catalog.tools + manual_tools
+    return combined_tools, tool_name_to_capability_id, catalog.tool_specs
+
+
+def _parse_tool_arguments(args_str):
+    try:
+        args = json.loads(args_str or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return args if isinstance(args, dict) else {}
+
+
+def _run_tool_calls(request, dispatcher, calls, tool_name_to_capability_id, cap_by_id):
+    """
+    Execute one model response's tool calls [(tool_name, args)] in order; returns ApiToolCall list.
+    API tools go through the turn's dispatcher (independent reads run concurrently),
+    capability tools through their handler after a permission check.
+    """
+
+    def execute_capability(tool_name, args):
+        capability_id = tool_name_to_capability_id.get(tool_name, "")
+        cap = cap_by_id.get(capability_id)
+        if not cap:
+            return {"success": False, "error": f"Unknown capability for tool: {tool_name}"}
+        if not _user_has_permission_for_capability(request, cap):
+            return {"success": False, "error": "Permission denied"}
+        try:
+            result = cap.handler(request, **args)
+            if not isinstance(result, dict):
+                result = {"result": result}
+            return result
+        except Exception as e:
+            logger.exception("Agent chat tool %s failed", tool_name)
+            return {"success": False, "error": str(e)}
+
+    return dispatcher.dispatch_many(calls, execute_capability)
 
 
 class AgentCapabilitiesView(APIView):
@@ -323,7 +328,7 @@ class AgentChatView(APIView):
         tools, tool_name_to_capability_id, api_tool_specs = _merged_tools_and_mappings(request)
         categories = _infer_tool_categories_with_llm(messages, client, selector_model)
         tools = _filter_tools_by_categories(
-            tools, tool_name_to_capability_id, categories, OPENAI_MAX_TOOLS
+            tools, tool_name_to_capability_id, categories, OPENAI_MAX_TOOLS, catalog=get_api_tool_catalog()
         )
         capabilities = AgentCapabilityRegistry.list_all(request)
         cap_by_id = {c.id: c for c in capabilities}
@@ -365,6 +370,7 @@ class AgentChatView(APIView):
         tool_calls_made = []
         round_count = 0
         reply = ""
+        dispatcher = ApiToolDispatcher(request, api_tool_specs)
 
         while round_count < self.max_tool_rounds:
             kwargs = {"model": model, "messages": openai_messages}
@@ -388,46 +394,27 @@ class AgentChatView(APIView):
             tool_calls = getattr(msg, "tool_calls", None) or []
             if not tool_calls:
                 break
-            for tc in tool_calls:
-                tool_name = getattr(tc, "function", None) and getattr(tc.function, "name", None) or ""
-                args_str = getattr(tc.function, "arguments", None) or "{}"
-                try:
-                    args = json.loads(args_str)
-                except json.JSONDecodeError:
-                    args = {}
-                if tool_name in api_tool_specs:
-                    result = execute_api_tool(request, tool_name, api_tool_specs, args)
-                    tool_calls_made.append({
-                        "capability_id": None,
-                        "tool_name": tool_name,
-                        "arguments": args,
-                        "result": result,
-                    })
-                else:
-                    capability_id = tool_name_to_capability_id.get(tool_name, "")
-                    cap = cap_by_id.get(capability_id)
-                    if not cap:
-                        result = {"success": False, "error": f"Unknown capability for tool: {tool_name}"}
-                    elif not _user_has_permission_for_capability(request, cap):
-                        result = {"success": False, "error": "Permission denied"}
-                    else:
-                        try:
-                            result = cap.handler(request, **args)
-                            if not isinstance(result, dict):
-                                result = {"result": result}
-                        except Exception as e:
-                            logger.exception("Agent chat tool %s failed", tool_name)
-                            result = {"success": False, "error": str(e)}
-                    tool_calls_made.append({
-                        "capability_id": cap.id if cap else capability_id,
-                        "tool_name": tool_name,
-                        "arguments": args,
-                        "result": result,
-                    })
+            calls = [
+                (
+                    getattr(tc, "function", None) and getattr(tc.function, "name", None) or "",
+                    _parse_tool_arguments(getattr(tc.function, "arguments", None)),
+                )
+                for tc in tool_calls
+            ]
+            executed = _run_tool_calls(request, dispatcher, calls, tool_name_to_capability_id, cap_by_id)
+            for tc, call in zip(tool_calls, executed):
+                tool_calls_made.append({
+                    "capability_id": None if call.tool_name in api_tool_specs
+                    else tool_name_to_capability_id.get(call.tool_name, ""),
+                    "tool_name": call.tool_name,
+                    "arguments": call.arguments,
+                    "result": call.result,
+                    "elapsed_ms": call.elapsed_ms,
+                })
                 openai_messages.append({
                     "role": "tool",
                     "tool_call_id": getattr(tc, "id", ""),
-                    "content": json.dumps(result, default=str),
+                    "content": json.dumps(call.result, default=str),
                 })
             round_count += 1
 
@@ -448,8 +435,9 @@ class AgentChatView(APIView):
         def gen():
             nonlocal openai_messages
             tool_names_all = []
-            tool_results_all = []  # list of {"name", "success", "error"} for frontend to show errors
+            tool_results_all = []  # list of {"name", "success", "error", "elapsed_ms"} for frontend to show errors
             round_count = 0
+            dispatcher = ApiToolDispatcher(request, api_tool_specs)
             while round_count < self.max_tool_rounds:
                 kwargs = {"model": model, "messages": openai_messages, "stream": True}
                 if tools:
@@ -495,34 +483,18 @@ class AgentChatView(APIView):
                 names_this_round = [t.get("name") or "" for t in tool_calls_list]
                 tool_names_all.extend(names_this_round)
                 yield sse({"type": "tool_names", "names": names_this_round})
-                for tc in tool_calls_list:
-                    tool_name = tc.get("name") or ""
-                    args_str = tc.get("arguments") or "{}"
-                    try:
-                        args = json.loads(args_str)
-                    except json.JSONDecodeError:
-                        args = {}
-                    if tool_name in api_tool_specs:
-                        result = execute_api_tool(request, tool_name, api_tool_specs, args)
-                    else:
-                        capability_id = tool_name_to_capability_id.get(tool_name, "")
-                        cap = cap_by_id.get(capability_id)
-                        if not cap:
-                            result = {"success": False, "error": f"Unknown capability for tool: {tool_name}"}
-                        elif not _user_has_permission_for_capability(request, cap):
-                            result = {"success": False, "error": "Permission denied"}
-                        else:
-                            try:
-                                result = cap.handler(request, **args)
-                                if not isinstance(result, dict):
-                                    result = {"result": result}
-                            except Exception as e:
-                                logger.exception("Agent chat tool %s failed", tool_name)
-                                result = {"success": False, "error": str(e)}
+                calls = [
+                    (tc.get("name") or "", _parse_tool_arguments(tc.get("arguments")))
+                    for tc in tool_calls_list
+                ]
+                executed = _run_tool_calls(request, dispatcher, calls, tool_name_to_capability_id, cap_by_id)
+                for tc, call in zip(tool_calls_list, executed):
+                    result = call.result
                     success = result.get("success", True) if isinstance(result, dict) else True
                     err_msg = result.get("error") if isinstance(result, dict) else None
-                    tool_results_all.append({"name": tool_name, "success": success, "error": err_msg})
-                    yield sse({"type": "tool_result", "name": tool_name, "success": success, "error": err_msg})
+                    tool_result = {"name": call.tool_name, "success": success, "error": err_msg, "elapsed_ms": call.elapsed_ms}
+                    tool_results_all.append(tool_result)
+                    yield sse({"type": "tool_result", **tool_result})
                     openai_messages.append({
                         "role": "tool",
                         "tool_call_id": tc.get("id", ""),
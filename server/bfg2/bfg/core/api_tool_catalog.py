@@ -2,17 +2,38 @@
 """
 API tool catalog for Agent: build OpenAI tools from OpenAPI schema with an allowlist,
 and execute allowed operations via internal request (workspace + auth preserved).
+ApiToolDispatcher runs a chat turn's tool calls directly against the resolved views.
+
+Generating the OpenAPI schema walks every URL pattern and serializer, so the catalog
+is built once per version (URLconf routes + BFG2_SETTINGS['AGENT_TOOL_CATALOG_VERSION'])
+and kept in the process and the shared cache. `build_agent_tool_catalog` precomputes it.
 """
 from __future__ import annotations
 
 import copy
+import hashlib
 import json
 import logging
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpRequest, QueryDict
+from django.utils import translation
+from rest_framework.test import APIRequestFactory, force_authenticate
 
 logger = logging.getLogger(__name__)
 
+# Shared cache key prefix; the version makes each deploy build its own catalog
+API_TOOL_CATALOG_CACHE_PREFIX = "api_tool_catalog"
+
 # Path prefixes allowed for agent (common, shop, delivery, support, finance).
 # Paths under api/v1/ without a prefix are flat (orders, customers, etc.).
 ALLOWED_PATH_PREFIXES = (
@@ -52,6 +73,18 @@ EXCLUDED_PATH_PREFIXES = (
 # Methods to expose as tools.
 ALLOWED_METHODS = ("get", "post", "patch", "put", "delete")
 
+# Category keywords for filtering API tools by name/description (lowercase)
+TOOL_CATEGORY_KEYWORDS = {
+    "order": ["order", "orders"],
+    "customer": ["customer", "customers", "address", "addresses"],
+    "product": ["product", "products", "variant", "variants", "categor", "category"],
+    "ticket": ["ticket", "tickets", "support"],
+    "invoice": ["invoice", "invoices"],
+    "payment": ["payment", "payments", "wallet", "wallets", "refund"],
+    "delivery": ["delivery", "consignment", "consignments", "carrier", "carriers", "ship", "manifest", "warehouse", "freight", "tracking"],
+    "settings": ["settings", "workspace", "options", "countries"],
+}
+
 
 def _sanitize_tool_name(name: str) -> str:
     """OpenAI function names: letters, numbers, underscores, hyphens only."""
@@ -188,96 +221,416 @@ def build_api_tools_from_schema(schema: Dict[str, Any]) -> Tuple[List[Dict], Dic
     return tools, tool_specs
 
 
+def tool_categories(tool: Dict) -> List[str]:
+    """Categories whose keywords appear in the tool name or description."""
+    function = tool.get("function") or {}
+    combined = f"{function.get('name') or ''} {function.get('description') or ''}".lower()
+    return [
+        category for category, keywords in TOOL_CATEGORY_KEYWORDS.items()
+        if any(kw in combined for kw in keywords)
+    ]
+
+
+@dataclass
+class ApiToolCatalog:
+    """
+    OpenAI tools for the allowed API operations, with a per-category index.
+    Shared between requests: treat tools and tool_specs as read-only.
+    """
+    version: str
+    tools: List[Dict]
+    tool_specs: Dict[str, Dict]
+    # category -> indexes into tools, in catalog order
+    category_index: Dict[str, List[int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_tools(cls, tools: List[Dict], tool_specs: Dict[str, Dict], version: str = "") -> "ApiToolCatalog":
+        category_index: Dict[str, List[int]] = {category: [] for category in TOOL_CATEGORY_KEYWORDS}
+        for position, tool in enumerate(tools):
+            for category in tool_categories(tool):
+                category_index[category].append(position)
+        return cls(version=version, tools=tools, tool_specs=tool_specs, category_index=category_index)
+
+    def tools_for_categories(self, categories: Iterable[str], limit: Optional[int] = None) -> List[Dict]:
+        """Tools in any of the categories, in catalog order, at most limit."""
+        positions = sorted({
+            position
+            for category in categories
+            for position in self.category_index.get(category, ())
+        })
+        if limit is not None:
+            positions = positions[:max(limit, 0)]
+        return [self.tools[position] for position in positions]
+
+
+def filter_tools_by_categories(
+    tools: List[Dict],
+    manual_tool_names: Iterable[str],
+    categories: Iterable[str],
+    max_tools: int,
+    catalog: Optional[ApiToolCatalog] = None,
+) -> List[Dict]:
+    """
+    Keep all manual tools (named in manual_tool_names); keep API tools in any of the categories,
+    looked up in the catalog's category index (built from tools when not given). Cap total at
+    max_tools. If categories is empty, keep manual + first N API tools.
+    """
+    manual_tool_names = set(manual_tool_names)
+    manual = [t for t in tools if t["function"]["name"] in manual_tool_names]
+    api_tools = [t for t in tools if t["function"]["name"] not in manual_tool_names]
+    budget = max_tools - len(manual)
+    if budget <= 0 or not api_tools:
+        return manual[:max_tools] if len(manual) > max_tools else manual
+
+    categories = list(categories)
+    if not categories:
+        return manual + api_tools[:budget]
+
+    if catalog is None:
+        catalog = ApiToolCatalog.from_tools(api_tools, {})
+    return manual + catalog.tools_for_categories(categories, budget)
+
+
+def get_api_tool_catalog_version() -> str:
+    """
+    Catalog version: BFG version, BFG2_SETTINGS['AGENT_TOOL_CATALOG_VERSION'] (set it
+    per deploy, e.g. to the release id) and a fingerprint of the URLconf routes.
+    """
+    from django.urls import get_resolver
+
+    import bfg
+
+    digest = hashlib.md5()
+    digest.update(f"{bfg.__version__}:{_configured_version()}:{settings.ROOT_URLCONF}".encode())
+
+    def walk(patterns, prefix=""):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if hasattr(pattern, "url_patterns"):
+                walk(pattern.url_patterns, route)
+            else:
+                callback = pattern.callback
+                digest.update(f"{route}={callback.__module__}.{callback.__qualname__}\n".encode())
+
+    walk(get_resolver().url_patterns)
+    return digest.hexdigest()
+
+
+def _configured_version() -> str:
+    return str(getattr(settings, "BFG2_SETTINGS", {}).get("AGENT_TOOL_CATALOG_VERSION", ""))
+
+
+def get_api_tool_catalog_cache_key(version: str) -> str:
+    return f"{API_TOOL_CATALOG_CACHE_PREFIX}:{version}"
+
+
+def build_api_tool_catalog(version: Optional[str] = None) -> ApiToolCatalog:
+    """Generate the OpenAPI schema and build the catalog from it (slow; no caching)."""
+    tools, tool_specs = build_api_tools_from_schema(_get_schema())
+    return ApiToolCatalog.from_tools(tools, tool_specs, version or get_api_tool_catalog_version())
+
+
+# Catalogs built or loaded by this process, by (ROOT_URLCONF, configured version)
+_catalogs: Dict[Tuple[str, str], ApiToolCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_api_tool_catalog(refresh: bool = False) -> ApiToolCatalog:
+    """
+    The API tool catalog: from this process, else the shared cache, else built and
+    stored in both. A failed (empty) build is not cached, so the next call retries.
+
+    Args:
+        refresh: Rebuild even if a cached catalog exists
+    """
+    local_key = (settings.ROOT_URLCONF, _configured_version())
+    catalog = None if refresh else _catalogs.get(local_key)
+    if catalog is not None:
+        return catalog
+    with _catalogs_lock:
+        catalog = None if refresh else _catalogs.get(local_key)
+        if catalog is not None:
+            return catalog
+        version = get_api_tool_catalog_version()
+        cache_key = get_api_tool_catalog_cache_key(version)
+        catalog = None if refresh else cache.get(cache_key)
+        if not isinstance(catalog, ApiToolCatalog):
+            catalog = build_api_tool_catalog(version)
+            if catalog.tools:
+                cache.set(cache_key, catalog, None)
+        if catalog.tools:
+            _catalogs[local_key] = catalog
+        return catalog
+
+
+def clear_api_tool_catalog() -> None:
+    """Forget catalogs held by this process (the shared cache keeps its copy)."""
+    with _catalogs_lock:
+        _catalogs.clear()
+
+
 def get_api_tools(request: Optional[Any] = None) -> Tuple[List[Dict], Dict[str, Dict]]:
-    """Get OpenAI tools and tool_specs for allowed API operations (schema loaded once per call)."""
-    schema = _get_schema(request)
-    return build_api_tools_from_schema(schema)
+    """
+    Get OpenAI tools and tool_specs for allowed API operations (from the cached catalog).
+    The schema is generated as public, so it does not depend on the request.
+    """
+    catalog = get_api_tool_catalog()
+    return catalog.tools, catalog.tool_specs
 
 
-def execute_api_tool(
-    request: Any,
-    tool_name: str,
-    tool_specs: Dict[str, Dict],
-    arguments: Dict[str, Any],
-) -> Dict[str, Any]:
+@dataclass(frozen=True)
+class ApiToolRoute:
+    """
+    View behind an API tool's path template, resolved once per URLconf.
+    url_kwargs maps each OpenAPI path parameter to (view kwarg, converter type).
     """
-    Execute an API tool by dispatching an internal request to the same API.
-    request must have user, auth, and workspace (X-Workspace-ID). Returns { "success", "data" } or { "success": False, "error" }.
+    callback: Any
+    url_kwargs: Dict[str, Tuple[str, type]]
+    static_kwargs: Dict[str, Any]
+
+    def view_kwargs(self, path_values: Dict[str, Any]) -> Dict[str, Any]:
+        """View kwargs for the given path parameter values (ValueError if one does not convert)."""
+        kwargs = dict(self.static_kwargs)
+        for param, (kwarg, kind) in self.url_kwargs.items():
+            kwargs[kwarg] = kind(str(path_values[param]))
+        return kwargs
+
+
+# Sample values tried per path parameter when resolving a template: ints, then UUIDs
+_ROUTE_SAMPLES = (
+    lambda position: str(position + 1),
+    lambda position: str(uuid.UUID(int=position + 1)),
+)
+
+# Resolved routes by (ROOT_URLCONF, path template); None when the template does not resolve
+_routes: Dict[Tuple[str, str], Optional[ApiToolRoute]] = {}
+
+
+def resolve_api_tool_route(path_template: str, path_params: List[str]) -> Optional[ApiToolRoute]:
+    """Resolve a tool's path template to its view (cached); None if no sample path resolves."""
+    key = (settings.ROOT_URLCONF, path_template)
+    if key in _routes:
+        return _routes[key]
+
+    from django.urls import Resolver404, resolve
+
+    route = None
+    for sample in _ROUTE_SAMPLES:
+        samples = {param: sample(position) for position, param in enumerate(path_params)}
+        path = path_template
+        for param, value in samples.items():
+            path = path.replace("{" + param + "}", value)
+        try:
+            match = resolve(path)
+        except Resolver404:
+            continue
+        by_sample = {value: param for param, value in samples.items()}
+        url_kwargs: Dict[str, Tuple[str, type]] = {}
+        static_kwargs: Dict[str, Any] = {}
+        for kwarg, value in match.kwargs.items():
+            param = by_sample.get(str(value))
+            if param is None:
+                static_kwargs[kwarg] = value
+            else:
+                url_kwargs[param] = (kwarg, type(value))
+        if len(url_kwargs) == len(path_params):
+            route = ApiToolRoute(callback=match.func, url_kwargs=url_kwargs, static_kwargs=static_kwargs)
+            break
+    _routes[key] = route
+    return route
+
+
+@dataclass
+class ApiToolCall:
+    """One tool call of a chat turn, with its result and how long it took."""
+    tool_name: str
+    arguments: Dict[str, Any]
+    result: Dict[str, Any] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+
+class ApiToolDispatcher:
+    """
+    Executes API tools for one agent chat turn without going through the URL/middleware stack.
+
+    The chat request's user, auth, workspace and staff membership are captured once and
+    set on every internal request (built with DRF's APIRequestFactory; force_authenticate
+    lets DRF skip authentication), so the staff permission classes reuse the same
+    StaffMember (see core.permissions.get_staff_member). Views are resolved once per path
+    template and called directly. Read-only (GET) calls from one model response run
+    concurrently.
     """
-    spec = tool_specs.get(tool_name)
-    if not spec:
-        return {"success": False, "error": f"Unknown API tool: {tool_name}"}
-    path_template = spec["path"]
-    method = spec["method"]
-    path_params = spec.get("path_params") or []
-    query_params = spec.get("query_params") or []
-    body_keys = spec.get("body_keys") or []
-
-    # Build path: substitute {pk}, {id}, etc.
-    path = path_template
-    for param in path_params:
-        value = arguments.get(param)
-        if value is None:
-            return {"success": False, "error": f"Missing path parameter: {param}"}
-        path = path.replace("{" + param + "}", str(value))
-    if "{" in path:
-        return {"success": False, "error": f"Missing path parameters for {path}"}
-
-    # Build query string
-    query_dict: Dict[str, str] = {}
-    for q in query_params:
-        if q in arguments and arguments[q] is not None:
-            query_dict[q] = str(arguments[q])
-    query_string = "&".join(f"{k}={v}" for k, v in sorted(query_dict.items())) if query_dict else ""
-
-    # Build body for POST/PATCH/PUT
-    body = None
-    if method in ("POST", "PUT", "PATCH") and body_keys:
-        if "body" in arguments and arguments["body"] is not None:
-            body = arguments["body"] if isinstance(arguments["body"], dict) else {}
+
+    # Default worker threads for concurrent read-only calls; BFG2_SETTINGS['AGENT_TOOL_WORKERS']
+    DEFAULT_MAX_WORKERS = 4
+
+    def __init__(self, request: Any, tool_specs: Dict[str, Dict], max_workers: Optional[int] = None):
+        from bfg.core.permissions import get_staff_member
+
+        self.tool_specs = tool_specs
+        if max_workers is None:
+            max_workers = getattr(settings, "BFG2_SETTINGS", {}).get("AGENT_TOOL_WORKERS", self.DEFAULT_MAX_WORKERS)
+        self.max_workers = max_workers
+        self.factory = APIRequestFactory()
+        self.user = getattr(request, "user", None)
+        self.auth = getattr(request, "auth", None)
+        self.workspace = getattr(request, "workspace", None)
+        self.scheme = getattr(request, "scheme", "http")
+        self.language = translation.get_language()
+
+        # Load staff membership once for the whole turn
+        get_staff_member(request)
+        self.request_attributes = {
+            name: getattr(request, name)
+            for name in ("session", "is_staff_member", "is_customer", "LANGUAGE_CODE", "_staff_member_cache")
+            if hasattr(request, name)
+        }
+        meta = getattr(request, "META", {})
+        self.meta = {
+            key: value for key, value in meta.items()
+            if key in ("SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR") or (
+                key.startswith("HTTP_") and key not in ("HTTP_CONTENT_LENGTH", "HTTP_CONTENT_TYPE")
+            )
+        }
+        self.meta["HTTP_ACCEPT"] = "application/json"
+        if self.workspace:
+            self.meta["HTTP_X_WORKSPACE_ID"] = str(self.workspace.id)
+
+    def is_read_only(self, tool_name: str) -> bool:
+        spec = self.tool_specs.get(tool_name)
+        return bool(spec) and spec["method"] == "GET"
+
+    def dispatch(self, tool_name: str, arguments: Dict[str, Any]) -> ApiToolCall:
+        """Execute one API tool; the result is { "success", "data" } or { "success": False, "error" }."""
+        call = ApiToolCall(tool_name=tool_name, arguments=arguments)
+        started = time.perf_counter()
+        try:
+            call.result = self._execute(tool_name, arguments)
+        except Exception as e:
+            logger.exception("API tool %s failed", tool_name)
+            call.result = {"success": False, "error": str(e)}
+        call.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.debug("API tool %s took %.1fms", tool_name, call.elapsed_ms)
+        return call
+
+    def dispatch_many(
+        self,
+        calls: List[Tuple[str, Dict[str, Any]]],
+        execute_other: Optional[Any] = None,
+    ) -> List[ApiToolCall]:
+        """
+        Execute the tool calls of one model response, returning results in call order.
+
+        Consecutive read-only API calls run concurrently; any other call (writes, and
+        non-API tools handled by execute_other(tool_name, arguments) -> result) runs on
+        its own, so it still sees the effects of the calls before it.
+        """
+        results: List[ApiToolCall] = []
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        for tool_name, arguments in calls:
+            if self.is_read_only(tool_name):
+                pending.append((tool_name, arguments))
+                continue
+            results.extend(self._dispatch_reads(pending))
+            pending = []
+            if tool_name in self.tool_specs or execute_other is None:
+                results.append(self.dispatch(tool_name, arguments))
+            else:
+                call = ApiToolCall(tool_name=tool_name, arguments=arguments)
+                started = time.perf_counter()
+                call.result = execute_other(tool_name, arguments)
+                call.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                results.append(call)
+        results.extend(self._dispatch_reads(pending))
+        return results
+
+    def _dispatch_reads(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[ApiToolCall]:
+        # Worker threads use their own DB connections, which cannot see uncommitted
+        # writes of this one, so stay sequential inside a transaction.
+        if len(calls) < 2 or self.max_workers < 2 or connection.in_atomic_block:
+            return [self.dispatch(tool_name, arguments) for tool_name, arguments in calls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as executor:
+            return list(executor.map(lambda call: self._dispatch_in_thread(*call), calls))
+
+    def _dispatch_in_thread(self, tool_name: str, arguments: Dict[str, Any]) -> ApiToolCall:
+        try:
+            with translation.override(self.language):
+                return self.dispatch(tool_name, arguments)
+        finally:
+            connections.close_all()
+
+    def _execute(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        spec = self.tool_specs.get(tool_name)
+        if not spec:
+            return {"success": False, "error": f"Unknown API tool: {tool_name}"}
+        path_template = spec["path"]
+        method = spec["method"]
+        path_params = spec.get("path_params") or []
+        query_params = spec.get("query_params") or []
+        body_keys = spec.get("body_keys") or []
+        if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            return {"success": False, "error": f"Unsupported method: {method}"}
+
+        # Build path: substitute {pk}, {id}, etc.
+        path = path_template
+        for param in path_params:
+            value = arguments.get(param)
+            if value is None:
+                return {"success": False, "error": f"Missing path parameter: {param}"}
+            path = path.replace("{" + param + "}", str(value))
+        if "{" in path:
+            return {"success": False, "error": f"Missing path parameters for {path}"}
+
+        query_dict = QueryDict(mutable=True)
+        for q in query_params:
+            if q in arguments and arguments[q] is not None:
+                query_dict[q] = str(arguments[q])
+        query_string = query_dict.urlencode()
+
+        # Body for POST/PATCH/PUT
+        body = None
+        if method in ("POST", "PUT", "PATCH"):
+            body = {}
+            if "body" in arguments and arguments["body"] is not None:
+                body = arguments["body"] if isinstance(arguments["body"], dict) else {}
+            elif body_keys:
+                body = {k: arguments[k] for k in body_keys if k in arguments and arguments[k] is not None}
+
+        route = resolve_api_tool_route(path_template, path_params)
+        if route is None:
+            from django.urls import resolve
+
+            match = resolve(path)
+            callback, view_kwargs = match.func, copy.copy(match.kwargs)
         else:
-            body = {k: arguments[k] for k in body_keys if k in arguments and arguments[k] is not None}
-
-    from django.test import RequestFactory
-    from django.urls import resolve
-
-    factory = RequestFactory()
-    full_path = path + ("?" + query_string if query_string else "")
-    if method == "GET":
-        req = factory.get(full_path)
-    elif method == "POST":
-        req = factory.post(
-            path, data=json.dumps(body or {}), content_type="application/json"
-        )
-    elif method == "PATCH":
-        req = factory.patch(
-            path, data=json.dumps(body or {}), content_type="application/json"
-        )
-    elif method == "PUT":
-        req = factory.put(
-            path, data=json.dumps(body or {}), content_type="application/json"
-        )
-    elif method == "DELETE":
-        req = factory.delete(full_path)
-    else:
-        return {"success": False, "error": f"Unsupported method: {method}"}
-
-    req.user = getattr(request, "user", None)
-    req.workspace = getattr(request, "workspace", None)
-    if hasattr(request, "auth") and request.auth is not None:
-        req.auth = request.auth
-    if req.workspace:
-        req.META["HTTP_X_WORKSPACE_ID"] = str(req.workspace.id)
+            callback = route.callback
+            try:
+                view_kwargs = route.view_kwargs(arguments)
+            except ValueError:
+                return {"success": False, "error": f"Invalid path parameters for {path_template}"}
 
-    try:
-        match = resolve(path)
-        view_func = match.func
-        view_kwargs = copy.copy(match.kwargs)
-        response = view_func(req, **view_kwargs)
-    except Exception as e:
-        logger.exception("API tool %s failed", tool_name)
-        return {"success": False, "error": str(e)}
+        req = self._build_request(method, path, query_string, body)
+        return _tool_result(callback(req, **view_kwargs))
 
+    def _build_request(self, method: str, path: str, query_string: str, body: Optional[Dict]) -> HttpRequest:
+        url = f"{path}?{query_string}" if query_string else path
+        if method in ("POST", "PUT", "PATCH"):
+            req = self.factory.generic(
+                method, url, json.dumps(body or {}), content_type="application/json",
+                secure=self.scheme == "https", **self.meta,
+            )
+        else:
+            req = self.factory.generic(method, url, secure=self.scheme == "https", **self.meta)
+        for name, value in self.request_attributes.items():
+            setattr(req, name, value)
+        req.user = self.user
+        req.workspace = self.workspace
+        # DRF authenticates internal requests as the chat request's user
+        force_authenticate(req, user=self.user, token=self.auth)
+        return req
+
+
+def _tool_result(response: Any) -> Dict[str, Any]:
     try:
         if hasattr(response, "data"):
             data = response.data
@@ -296,6 +649,20 @@ def execute_api_tool(
         return {"success": True, "data": data}
     return {
         "success": False,
-        "error": data.get("detail", data.get("error", str(data))),
+        "error": data.get("detail", data.get("error", str(data))) if isinstance(data, dict) else str(data),
         "data": data,
     }
+
+
+def execute_api_tool(
+    request: Any,
+    tool_name: str,
+    tool_specs: Dict[str, Dict],
+    arguments: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Execute an API tool as an internal request to the same API (user, auth and workspace preserved).
+    Returns { "success", "data" } or { "success": False, "error" }. For several calls in one chat
+    turn, use one ApiToolDispatcher instead.
+    """
+    return ApiToolDispatcher(request, tool_specs, max_workers=1).dispatch(tool_name, arguments).result
@@ -4,32 +4,495 @@ BFG Cache Utilities
 Cache management utilities
 """
 
+from django.conf import settings
 from django.core.cache import cache
 from django.utils.encoding import force_str
+from django.utils.module_loading import import_string
 import hashlib
-from typing import Optional, Any
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Tag generation keys live under this prefix and never expire
+CACHE_TAG_PREFIX = 'cache_tag'
+
+
+def workspace_tag(workspace_id: Any, name: str) -> str:
+    """Tag for workspace-scoped data, e.g. workspace_tag(1, 'products') -> 'workspace:1:products'"""
+    return f'workspace:{workspace_id}:{name}'
+
+
+def _tag_key(tag: str) -> str:
+    return f'{CACHE_TAG_PREFIX}:{tag}'
+
+
+def _new_generation() -> int:
+    # Time-based so a tag key lost to eviction never comes back at an old generation
+    return time.time_ns()
+
+
+class TaggedValue(NamedTuple):
+    """Cached value stored together with the generations of its tags at write time"""
+    generations: Tuple[Tuple[str, int], ...]
+    value: Any
+
+
+def get_tag_generations(tags: Iterable[str]) -> Dict[str, int]:
+    """
+    Current generation of each tag, initializing tags that have none yet
+
+    Args:
+        tags: Tag names
+
+    Returns:
+        Dict[str, int]: Tag -> generation
+    """
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return {}
+    found = cache.get_many([_tag_key(tag) for tag in tags])
+    generations = {}
+    for tag in tags:
+        generation = found.get(_tag_key(tag))
+        if generation is None:
+            generation = _new_generation()
+            if not cache.add(_tag_key(tag), generation, None):
+                # Another process initialized it first
+                generation = cache.get(_tag_key(tag), generation)
+        generations[tag] = generation
+    return generations
+
+
+def invalidate_tags(*tags: str) -> None:
+    """
+    Invalidate every entry stored under any of the tags
+
+    Bumps the tag generation: O(1) per tag on any cache backend, no key scan.
+
+    Args:
+        *tags: Tag names
+    """
+    for tag in dict.fromkeys(tags):
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            # Unknown (or evicted) tag: nothing stored under the old generation can validate
+            cache.set(_tag_key(tag), _new_generation(), None)
+
+
+def _lookup_tagged(key: str, tags: Iterable[str] = ()) -> Tuple[bool, Any]:
+    tags = list(tags)
+    found = cache.get_many([key] + [_tag_key(tag) for tag in tags])
+    entry = found.get(key)
+    if not isinstance(entry, TaggedValue):
+        return False, None
+
+    # Tags supplied by the caller come back in the same round trip; fetch any others
+    missing = [_tag_key(tag) for tag, _ in entry.generations if _tag_key(tag) not in found]
+    if missing:
+        found.update(cache.get_many(missing))
+
+    for tag, generation in entry.generations:
+        if found.get(_tag_key(tag)) != generation:
+            return False, None
+    return True, entry.value
+
+
+def get_tagged(key: str, tags: Iterable[str] = (), default: Any = None) -> Any:
+    """
+    Get a tagged entry; entries whose tags were invalidated since they were set are misses
+
+    Args:
+        key: Cache key
+        tags: Tags expected on the entry (fetched in the same round trip as the value)
+        default: Returned on miss
+
+    Returns:
+        Cached value or default
+    """
+    hit, value = _lookup_tagged(key, tags)
+    return value if hit else default
+
+
+def set_tagged(
+    key: str,
+    value: Any,
+    tags: Iterable[str],
+    timeout: Optional[int] = 300,
+    generations: Optional[Dict[str, int]] = None
+) -> None:
+    """
+    Set an entry under tags
+
+    Args:
+        key: Cache key
+        value: Value to cache
+        tags: Tag names
+        timeout: Expiration time (seconds)
+        generations: Tag generations read before the value was computed (optional);
+            an invalidation that happens meanwhile then makes the entry stale right away
+    """
+    tags = list(tags)
+    if generations is None:
+        generations = get_tag_generations(tags)
+    cache.set(key, TaggedValue(tuple((tag, generations[tag]) for tag in tags), value), timeout)
+
+
+def get_or_set_tagged(
+    key: str,
+    default_func: Callable[[], Any],
+    tags: Iterable[str],
+    timeout: Optional[int] = 300
+) -> Any:
+    """
+    Get a tagged entry, or compute, store and return it
+
+    Args:
+        key: Cache key
+        default_func: Computes the value on miss
+        tags: Tag names
+        timeout: Expiration time (seconds)
+
+    Returns:
+        Cached or computed value
+    """
+    tags = list(tags)
+    hit, value = _lookup_tagged(key, tags)
+    if hit:
+        return value
+    generations = get_tag_generations(tags)
+    value = default_func()
+    set_tagged(key, value, tags, timeout, generations=generations)
+    return value
+
+
+def get_many_tagged(keys: Iterable[str]) -> Dict[str, TaggedValue]:
+    """
+    Look up several tagged entries in two round trips
+
+    Args:
+        keys: Cache keys
+
+    Returns:
+        Dict[str, TaggedValue]: Still valid entries (value plus the tag generations
+        they were stored under) by key; missing and stale keys are left out
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    entries = {key: entry for key, entry in cache.get_many(keys).items() if isinstance(entry, TaggedValue)}
+    tag_keys = list({_tag_key(tag) for entry in entries.values() for tag, _ in entry.generations})
+    current = cache.get_many(tag_keys) if tag_keys else {}
+    return {
+        key: entry
+        for key, entry in entries.items()
+        if all(current.get(_tag_key(tag)) == generation for tag, generation in entry.generations)
+    }
+
+
+def set_many_tagged(
+    entries: Dict[str, Tuple[Any, Iterable[str]]],
+    timeout: Optional[int] = 300,
+    generations: Optional[Dict[str, int]] = None
+) -> Dict[str, TaggedValue]:
+    """
+    Set several entries, each under its own tags, in one write
+
+    Args:
+        entries: Key -> (value, tags)
+        timeout: Expiration time (seconds)
+        generations: Tag generations read before the values were computed (optional);
+            tags not listed are read now
+
+    Returns:
+        Dict[str, TaggedValue]: The stored entries by key
+    """
+    entries = {key: (value, list(tags)) for key, (value, tags) in entries.items()}
+    generations = dict(generations or {})
+    missing = {tag for _value, tags in entries.values() for tag in tags if tag not in generations}
+    generations.update(get_tag_generations(missing))
+    stored = {
+        key: TaggedValue(tuple((tag, generations[tag]) for tag in tags), value)
+        for key, (value, tags) in entries.items()
+    }
+    if stored:
+        cache.set_many(stored, timeout)
+    return stored
+
+
+# Stale-while-revalidate: how long past its TTL an entry may still be served
+# (override with BFG2_SETTINGS['CACHE_STALE_TTL'])
+DEFAULT_CACHE_STALE_TTL = 60 * 60 * 24
+# Single-flight rebuild lock; expires in case its holder dies
+REFRESH_LOCK_TIMEOUT = 60
+# How long a request missing the cache waits for another worker's rebuild
+REFRESH_WAIT_TIMEOUT = 5.0
+REFRESH_WAIT_INTERVAL = 0.05
+
+
+class FreshValue(NamedTuple):
+    """Value of a get_or_refresh_tagged entry and when it turns stale (epoch seconds)"""
+    fresh_until: float
+    value: Any
+
+
+def get_cache_stale_ttl() -> int:
+    return int(getattr(settings, 'BFG2_SETTINGS', {}).get('CACHE_STALE_TTL', DEFAULT_CACHE_STALE_TTL))
+
+
+def _refresh_lock_key(key: str) -> str:
+    return f'{key}:refresh_lock'
+
+
+def get_or_refresh_tagged(
+    key: str,
+    builder: str,
+    args: Sequence[Any],
+    tags: Iterable[str],
+    timeout: int,
+    stale_timeout: Optional[int] = None
+) -> Any:
+    """
+    Tagged cache-aside with stale-while-revalidate and single-flight rebuilds
+
+    - Fresh entry (younger than timeout): returned.
+    - Stale entry (up to stale_timeout past that): returned; the first caller to
+      see it enqueues a background rebuild, the others keep serving it.
+    - Missing or tag-invalidated entry: one caller rebuilds it; concurrent callers
+      wait up to REFRESH_WAIT_TIMEOUT for that rebuild, then build it themselves.
+      If the rebuild fails (its lock is released without an entry), one waiter
+      takes it over at once instead of everyone waiting out the timeout.
+
+    Args:
+        key: Cache key
+        builder: Dotted path of the function computing the value, called as
+            builder(*args) (by path, so the refresh task can call it too); it may
+            return TaggedValue(generations, value) to add tags found while building
+        args: Builder arguments; JSON serializable
+        tags: Tag names
+        timeout: Seconds the value stays fresh
+        stale_timeout: Seconds a stale value may be served (default: CACHE_STALE_TTL)
+
+    Returns:
+        Cached or computed value
+    """
+    tags = list(tags)
+    args = list(args)
+    hit, entry = _lookup_tagged(key, tags)
+    if hit and isinstance(entry, FreshValue):
+        if entry.fresh_until <= time.time() and cache.add(_refresh_lock_key(key), 1, REFRESH_LOCK_TIMEOUT):
+            _schedule_refresh(key, builder, args, tags, timeout, stale_timeout)
+        return entry.value
+
+    lock_key = _refresh_lock_key(key)
+    if cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+        return refresh_tagged(key, builder, args, tags, timeout, stale_timeout)
+
+    deadline = time.monotonic() + REFRESH_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REFRESH_WAIT_INTERVAL)
+        # Lock before entry: a rebuild finishing in between has stored the entry by then
+        building = cache.get(lock_key) is not None
+        hit, entry = _lookup_tagged(key, tags)
+        if hit and isinstance(entry, FreshValue):
+            return entry.value
+        if not building and cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+            return refresh_tagged(key, builder, args, tags, timeout, stale_timeout)
+    # The rebuild is slow or its worker died: build without taking the lock over
+    return _build_fresh(key, builder, args, tags, timeout, stale_timeout)
+
+
+def refresh_tagged(
+    key: str,
+    builder: str,
+    args: Sequence[Any],
+    tags: Iterable[str],
+    timeout: int,
+    stale_timeout: Optional[int] = None
+) -> Any:
+    """Rebuild a get_or_refresh_tagged entry and release its refresh lock"""
+    try:
+        return _build_fresh(key, builder, args, list(tags), timeout, stale_timeout)
+    finally:
+        cache.delete(_refresh_lock_key(key))
+
+
+def _build_fresh(key, builder, args, tags, timeout, stale_timeout) -> Any:
+    # Read before building: an invalidation meanwhile leaves the entry stale
+    generations = get_tag_generations(tags)
+    value = import_string(builder)(*args)
+    stored = tuple((tag, generations[tag]) for tag in tags)
+    if isinstance(value, TaggedValue):
+        # Tags the builder found it depends on, with the generations it read
+        stored += value.generations
+        value = value.value
+    if stale_timeout is None:
+        stale_timeout = get_cache_stale_ttl()
+    cache.set(key, TaggedValue(stored, FreshValue(time.time() + timeout, value)), timeout + stale_timeout)
+    return value
+
+
+def _schedule_refresh(key, builder, args, tags, timeout, stale_timeout) -> None:
+    from bfg.core.tasks import refresh_cache_entry
+    try:
+        refresh_cache_entry.delay(key, builder, args, tags, timeout, stale_timeout)
+    except Exception:
+        # Keep serving the stale value; the next request retries the refresh
+        logger.exception("Could not refresh cache entry %s", key)
+        cache.delete(_refresh_lock_key(key))
+
+
+# Stored in place of None so "no such object" results are cached too
+_NONE = '__cache_none__'
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of the shared Django cache
+
+    For small, hot, rarely changing lookups (e.g. workspace resolution).
+    Local hits cost no network round trip. Consistency across processes
+    comes from a namespace tag: invalidate() bumps its generation, and
+    each process compares its local generation with the shared one at
+    most every ``version_check_interval`` seconds, dropping its LRU when
+    they differ. Shared entries are stored under the same tag, so one
+    invalidation covers keys the caller no longer knows (e.g. an old domain).
+
+    Local entries are shared by every thread of the process; pass ``copy``
+    for mutable values (e.g. model instances) so each caller gets its own.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1024,
+        local_timeout: float = 30,
+        shared_timeout: Optional[int] = 600,
+        version_check_interval: float = 1.0,
+        copy: Optional[Callable[[Any], Any]] = None
+    ):
+        self.namespace = namespace
+        self.tag = f'two_tier:{namespace}'
+        self.maxsize = maxsize
+        self.local_timeout = local_timeout
+        self.shared_timeout = shared_timeout
+        self.version_check_interval = version_check_interval
+        self.copy = copy
+        self._local: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0.0
+
+    def _shared_key(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+
+    def _sync_generation(self, now: float) -> None:
+        if now - self._checked_at < self.version_check_interval:
+            return
+        generation = get_tag_generations([self.tag])[self.tag]
+        with self._lock:
+            if generation != self._generation:
+                self._local.clear()
+                self._generation = generation
+            self._checked_at = now
+
+    def _get_local(self, key: str, now: float) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._local[key]
+                return False, None
+            self._local.move_to_end(key)
+            return True, value
+
+    def _set_local(self, key: str, value: Any, now: float) -> None:
+        with self._lock:
+            self._local[key] = (now + self.local_timeout, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def get_or_set(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Get a value from the local tier, then the shared tier, then the loader
+
+        None results are cached as well.
+
+        Args:
+            key: Key within the namespace
+            loader: Loads the value on miss in both tiers
+
+        Returns:
+            Cached or loaded value
+        """
+        now = time.monotonic()
+        self._sync_generation(now)
+
+        hit, value = self._get_local(key, now)
+        if not hit:
+            generations = get_tag_generations([self.tag])
+            value = get_tagged(self._shared_key(key), [self.tag], default=None)
+            if value is None:
+                value = loader()
+                set_tagged(
+                    self._shared_key(key),
+                    _NONE if value is None else value,
+                    [self.tag],
+                    self.shared_timeout,
+                    generations=generations
+                )
+            elif value == _NONE:
+                value = None
+            self._set_local(key, value, now)
+        if value is not None and self.copy is not None:
+            value = self.copy(value)
+        return value
+
+    def invalidate(self) -> None:
+        """Invalidate every entry of the namespace, in this and (within the check interval) other processes"""
+        invalidate_tags(self.tag)
+        self.clear_local()
+
+    def clear_local(self) -> None:
+        """Drop this process' local tier (e.g. between tests)"""
+        with self._lock:
+            self._local.clear()
+            self._generation = None
+            self._checked_at = 0.0
 
 
 class CacheMixin:
     """
     Common cache Mixin
     
-    Provides unified cache interface
+    Provides unified cache interface. Methods are classmethods so the mixin
+    works for stateless cache services as well as service instances.
     """
     cache_timeout = 300  # Default 5 minutes
     cache_key_prefix = ''
     
-    def get_cache_key(self, **kwargs) -> str:
+    @classmethod
+    def get_cache_key(cls, *parts, **kwargs) -> str:
         """
         Generate cache key
         
         Args:
+            *parts: Positional key parts (e.g. 'featured', workspace_id)
             **kwargs: Key-value parameters
             
         Returns:
             str: Cache key
         """
-        key_parts = [self.cache_key_prefix]
+        key_parts = [cls.cache_key_prefix]
+        key_parts.extend(force_str(p) for p in parts if p is not None)
         
         # Sort to ensure key consistency
         for k in sorted(kwargs.keys()):
@@ -41,23 +504,34 @@ class CacheMixin:
         
         # Use hash if key is too long
         if len(key) > 200:
-            key = f"{self.cache_key_prefix}:{hashlib.md5(key.encode()).hexdigest()}"
+            key = f"{cls.cache_key_prefix}:{hashlib.md5(key.encode()).hexdigest()}"
         
         return key
     
-    def get_cached_data(self, key: str) -> Optional[Any]:
+    @classmethod
+    def get_cached_data(cls, key: str, tags: Iterable[str] = ()) -> Optional[Any]:
         """
         Get cached data
         
         Args:
             key: Cache key
+            tags: Tags the entry was stored under (for tagged entries)
             
         Returns:
             Cached data or None
         """
+        if tags:
+            return get_tagged(key, tags)
         return cache.get(key)
     
-    def set_cached_data(self, key: str, data: Any, timeout: Optional[int] = None):
+    @classmethod
+    def set_cached_data(
+        cls,
+        key: str,
+        data: Any,
+        timeout: Optional[int] = None,
+        tags: Iterable[str] = ()
+    ):
         """
         Set cached data
         
@@ -65,12 +539,38 @@ class CacheMixin:
             key: Cache key
             data: Data to cache
             timeout: Expiration time (seconds), None uses default
+            tags: Tags for group invalidation (see invalidate_tags)
+        """
+        if timeout is None:
+            timeout = cls.cache_timeout
+        if tags:
+            set_tagged(key, data, tags, timeout)
+        else:
+            cache.set(key, data, timeout)
+    
+    @classmethod
+    def get_or_set_cached_data(
+        cls,
+        key: str,
+        default_func: Callable[[], Any],
+        tags: Iterable[str],
+        timeout: Optional[int] = None
+    ) -> Any:
+        """
+        Get tagged cached data, computing and storing it on miss
+        
+        Args:
+            key: Cache key
+            default_func: Computes the value on miss
+            tags: Tags for group invalidation
+            timeout: Expiration time (seconds), None uses default
         """
         if timeout is None:
-            timeout = self.cache_timeout
-        cache.set(key, data, timeout)
+            timeout = cls.cache_timeout
+        return get_or_set_tagged(key, default_func, tags, timeout)
     
-    def invalidate_cache(self, key: str):
+    @classmethod
+    def invalidate_cache(cls, key: str):
         """
         Invalidate cache
         
@@ -79,11 +579,23 @@ class CacheMixin:
         """
         cache.delete(key)
     
-    def invalidate_pattern(self, pattern: str):
+    @classmethod
+    def invalidate_tags(cls, *tags: str):
+        """
+        Invalidate every entry stored under the tags (any cache backend)
+        
+        Args:
+            *tags: Tag names
+        """
+        invalidate_tags(*tags)
+    
+    @classmethod
+    def invalidate_pattern(cls, pattern: str):
         """
         Delete all caches matching pattern
         
-        Requires Redis support
+        Requires Redis support; prefer tags (invalidate_tags) which work on
+        every backend without scanning the keyspace
         
         Args:
             pattern: Match pattern (e.g., 'products:workspace:1:*')
@@ -128,7 +640,12 @@ class CacheService:
         cache.clear()
     
     @staticmethod
-    def get_or_set(key: str, default_func, timeout: int = 300) -> Any:
+    def invalidate_tags(*tags: str):
+        """Invalidate every entry stored under the tags"""
+        invalidate_tags(*tags)
+    
+    @staticmethod
+    def get_or_set(key: str, default_func, timeout: int = 300, tags: Iterable[str] = ()) -> Any:
         """
         Get cache, if doesn't exist call function and cache result
         
@@ -136,10 +653,13 @@ class CacheService:
             key: Cache key
             default_func: Default value function
             timeout: Expiration time
+            tags: Tags for group invalidation (optional)
             
         Returns:
             Cached value or function return value
         """
+        if tags:
+            return get_or_set_tagged(key, default_func, tags, timeout)
         cached = cache.get(key)
         if cached is not None:
             return cached
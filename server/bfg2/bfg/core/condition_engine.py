@@ -4,10 +4,56 @@ Condition Engine for BFG
 Provides extensible condition evaluation with AND/OR logic and pluggable field providers.
 """
 
-from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import operator as _operator
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from decimal import Decimal
 
 
+# Maximum number of compiled conditions kept per engine
+COMPILED_CACHE_SIZE = 1024
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '==': _operator.eq,
+    '!=': _operator.ne,
+    '>': _operator.gt,
+    '>=': _operator.ge,
+    '<': _operator.lt,
+    '<=': _operator.le,
+    'in': lambda actual, expected: actual in expected,
+    'not_in': lambda actual, expected: actual not in expected,
+    'contains': lambda actual, expected: expected in actual,
+}
+
+
+def _fingerprint_default(value: Any) -> str:
+    # Keep the type in the hash: Decimal('10') and '10' compile differently
+    return f'{type(value).__name__}:{value}'
+
+
+def condition_fingerprint(config: Any) -> str:
+    """
+    Content hash of a condition configuration (or any JSON-like structure).
+    
+    Equal configurations give equal fingerprints regardless of dict key order.
+    """
+    payload = json.dumps(config, sort_keys=True, default=_fingerprint_default, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _always_true(context: Dict[str, Any]) -> bool:
+    return True
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
 class FieldProvider:
     """
     Base class for field providers.
@@ -48,14 +94,46 @@ class FieldProvider:
         raise NotImplementedError("Subclasses must implement get_field_value()")
 
 
+class CompiledCondition:
+    """
+    Condition configuration compiled to a closure-based predicate.
+    
+    Field paths are pre-parsed, providers pre-resolved and numeric constants
+    pre-converted, so evaluation does no interpretation work.
+    """
+    
+    __slots__ = ('fingerprint', '_predicate')
+    
+    def __init__(self, fingerprint: str, predicate: Predicate):
+        self.fingerprint = fingerprint
+        self._predicate = predicate
+    
+    def __call__(self, context: Dict[str, Any]) -> bool:
+        return self._predicate(context)
+    
+    def evaluate(self, context: Dict[str, Any]) -> bool:
+        """Evaluate against one context."""
+        return self._predicate(context)
+    
+    def evaluate_many(self, contexts: Iterable[Dict[str, Any]]) -> List[bool]:
+        """Evaluate against many contexts (e.g. one result per cart)."""
+        predicate = self._predicate
+        return [predicate(context) for context in contexts]
+
+
 class ConditionEngine:
     """
     Condition evaluation engine.
     Supports AND/OR logic, nested conditions, and extensible fields via FieldProvider.
+    
+    Configurations are compiled once into predicates (see compile()) and cached
+    by content hash, so repeated evaluation of the same rules is cheap.
     """
     
     def __init__(self):
         self._field_providers: Dict[str, FieldProvider] = {}
+        self._compiled: 'OrderedDict[str, CompiledCondition]' = OrderedDict()
+        self._lock = threading.Lock()
     
     def register_provider(self, prefix: str, provider: FieldProvider):
         """
@@ -73,6 +151,44 @@ class ConditionEngine:
             raise TypeError(f"Provider must be instance of FieldProvider, got {type(provider)}")
         
         self._field_providers[prefix] = provider
+        # Compiled predicates captured the previous providers
+        self.clear_cache()
+    
+    def clear_cache(self):
+        """Drop all compiled conditions."""
+        with self._lock:
+            self._compiled.clear()
+    
+    def compile(self, condition_config: Optional[Dict]) -> CompiledCondition:
+        """
+        Compile a condition configuration into a cached predicate.
+        
+        Args:
+            condition_config: Condition configuration dict or None (see evaluate())
+        
+        Returns:
+            CompiledCondition: Callable predicate, shared by equal configurations
+        
+        Raises:
+            ValueError: Unknown operator or malformed rule (raised at compile time,
+                even for rules an evaluation would short-circuit past)
+        """
+        if condition_config is None:
+            return CompiledCondition('', _always_true)
+        
+        fingerprint = condition_fingerprint(condition_config)
+        with self._lock:
+            compiled = self._compiled.get(fingerprint)
+            if compiled is not None:
+                self._compiled.move_to_end(fingerprint)
+                return compiled
+        
+        compiled = CompiledCondition(fingerprint, self._compile_group(condition_config))
+        with self._lock:
+            self._compiled[fingerprint] = compiled
+            while len(self._compiled) > COMPILED_CACHE_SIZE:
+                self._compiled.popitem(last=False)
+        return compiled
     
     def evaluate(self, condition_config: Optional[Dict], context: Dict[str, Any]) -> bool:
         """
@@ -92,55 +208,95 @@ class ConditionEngine:
         Returns:
             bool: Whether condition is satisfied
         """
-        if condition_config is None:
-            return True  # No condition always matches
+        return self.compile(condition_config)(context)
+    
+    def evaluate_many(
+        self, condition_config: Optional[Dict], contexts: Iterable[Dict[str, Any]]
+    ) -> List[bool]:
+        """
+        Evaluate one condition configuration against many contexts.
         
-        operator = condition_config.get('operator', 'AND')
-        rules = condition_config.get('rules', [])
+        Args:
+            condition_config: Condition configuration dict or None
+            contexts: Evaluation contexts
+        
+        Returns:
+            list: One bool per context, in order
+        """
+        return self.compile(condition_config).evaluate_many(contexts)
+    
+    def _compile_group(self, config: Dict) -> Predicate:
+        """Compile an AND/OR group (top level or nested)."""
+        operator = config.get('operator', 'AND')
+        rules = config.get('rules', [])
         
         if not rules:
-            return True  # Empty rules always match
+            return _always_true  # Empty rules always match
         
-        if operator == 'AND':
-            return all(self._evaluate_rule(rule, context) for rule in rules)
-        elif operator == 'OR':
-            return any(self._evaluate_rule(rule, context) for rule in rules)
-        else:
+        predicates = tuple(self._compile_rule(rule) for rule in rules)
+        if operator not in ('AND', 'OR'):
             raise ValueError(f"Unknown operator: {operator}. Must be 'AND' or 'OR'")
+        if len(predicates) == 1:
+            return predicates[0]
+        if operator == 'AND':
+            return lambda context: all(predicate(context) for predicate in predicates)
+        return lambda context: any(predicate(context) for predicate in predicates)
     
-    def _evaluate_rule(self, rule: Dict, context: Dict[str, Any]) -> bool:
+    def _compile_rule(self, rule: Dict) -> Predicate:
         """
-        Evaluate a single rule.
-        Supports nested conditions.
+        Compile a single rule.
+        Rules without a 'field' are nested conditions.
         """
-        # Nested condition (has 'operator' key)
-        if 'operator' in rule:
-            return self.evaluate(rule, context)
+        if 'field' not in rule:
+            return self._compile_group(rule)
         
         # Leaf condition
         field = rule.get('field')
         op = rule.get('operator')
-        expected_value = rule.get('value')
+        expected = rule.get('value')
         
         if not field or not op:
             raise ValueError(f"Rule must have 'field' and 'operator': {rule}")
+        compare = _COMPARATORS.get(op)
+        if compare is None:
+            raise ValueError(f"Unknown operator: {op}")
         
-        # Get actual value from context
-        actual_value = self._get_field_value(field, context)
+        get_value = self._compile_field(field)
         
-        # Perform comparison
-        return self._compare(actual_value, op, expected_value)
+        # Type conversion: ensure Decimal comparison works correctly
+        if _is_number(expected):
+            expected_decimal = Decimal(str(expected))
+            
+            def predicate(context):
+                actual = get_value(context)
+                if actual is None:
+                    return False
+                if isinstance(actual, Decimal):
+                    return compare(actual, expected_decimal)
+                return compare(actual, expected)
+        elif isinstance(expected, Decimal):
+            def predicate(context):
+                actual = get_value(context)
+                if actual is None:
+                    return False
+                if _is_number(actual):
+                    actual = Decimal(str(actual))
+                return compare(actual, expected)
+        else:
+            def predicate(context):
+                actual = get_value(context)
+                return actual is not None and compare(actual, expected)
+        return predicate
     
-    def _get_field_value(self, field_path: str, context: Dict[str, Any]) -> Any:
+    def _compile_field(self, field_path: str) -> Callable[[Dict[str, Any]], Any]:
         """
-        Get field value from context, supporting field providers.
+        Build a value getter for a field path, supporting field providers.
         
         Args:
             field_path: Field path like 'customer.is_new' or 'volume'
-            context: Context dict
         
         Returns:
-            Field value
+            Callable taking the context and returning the field value
         """
         # Check if field has prefix (e.g., customer.is_new)
         if '.' in field_path:
@@ -149,63 +305,24 @@ class ConditionEngine:
             # Find corresponding field provider
             provider = self._field_providers.get(prefix)
             if provider:
-                return provider.get_field_value(field_name, context)
+                get_field_value = provider.get_field_value
+                return lambda context: get_field_value(field_name, context)
+            
+            # No provider, use nested dict access
+            parts = tuple(field_path.split('.'))
             
-            # No provider, try nested dict access
-            parts = field_path.split('.')
-            value = context
-            for part in parts:
-                if isinstance(value, dict):
-                    value = value.get(part)
-                else:
-                    return None
-            return value
+            def get_nested(context):
+                value = context
+                for part in parts:
+                    if isinstance(value, dict):
+                        value = value.get(part)
+                    else:
+                        return None
+                return value
+            return get_nested
         
         # Direct access from context top level
-        return context.get(field_path)
-    
-    def _compare(self, actual: Any, operator: str, expected: Any) -> bool:
-        """
-        Perform comparison operation.
-        
-        Args:
-            actual: Actual value from context
-            operator: Comparison operator
-            expected: Expected value from condition
-        
-        Returns:
-            bool: Comparison result
-        """
-        if actual is None:
-            return False
-        
-        # Type conversion: ensure Decimal comparison works correctly
-        if isinstance(expected, (int, float)) and isinstance(actual, Decimal):
-            expected = Decimal(str(expected))
-        elif isinstance(actual, (int, float)) and isinstance(expected, Decimal):
-            actual = Decimal(str(actual))
-        
-        # Perform comparison
-        if operator == '==':
-            return actual == expected
-        elif operator == '!=':
-            return actual != expected
-        elif operator == '>':
-            return actual > expected
-        elif operator == '>=':
-            return actual >= expected
-        elif operator == '<':
-            return actual < expected
-        elif operator == '<=':
-            return actual <= expected
-        elif operator == 'in':
-            return actual in expected
-        elif operator == 'not_in':
-            return actual not in expected
-        elif operator == 'contains':
-            return expected in actual
-        else:
-            raise ValueError(f"Unknown operator: {operator}")
+        return lambda context: context.get(field_path)
     
     def get_all_available_fields(self) -> Dict[str, Dict[str, str]]:
         """
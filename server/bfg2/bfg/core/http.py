@@ -0,0 +1,343 @@
+"""
+BFG HTTP Client Utilities
+
+Pooled HTTP sessions, retries and circuit breaking for plugins calling external APIs
+(carriers, payment gateways)
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections kept per host (override with BFG2_SETTINGS['HTTP_POOL_MAXSIZE'])
+HTTP_POOL_MAXSIZE = 10
+# (connect, read) seconds when the caller passes no timeout
+HTTP_DEFAULT_TIMEOUT = (5, 30)
+# Latency samples kept per client for percentiles
+LATENCY_SAMPLES = 512
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, 'BFG2_SETTINGS', {}).get(name, default)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+
+# ============================================================================
+# Pooled sessions
+# ============================================================================
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_sessions_pid = os.getpid()
+
+
+def _host_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def get_http_session(url: str) -> requests.Session:
+    """
+    Process-wide keep-alive session for the host of url
+
+    One session (and connection pool of at most HTTP_POOL_MAXSIZE connections) per
+    scheme+host, shared by all threads; reset after a fork so worker processes
+    never share sockets.
+
+    Args:
+        url: Any URL on the host
+    """
+    global _sessions_pid
+    host = _host_of(url)
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            # Retries are done by PluginHTTPClient, which knows which calls are safe to repeat
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=int(_setting('HTTP_POOL_MAXSIZE', HTTP_POOL_MAXSIZE)),
+                max_retries=0,
+            )
+            session.mount(host, adapter)
+            _sessions[host] = session
+        return session
+
+
+def close_http_sessions() -> None:
+    """Close every pooled session (their idle connections)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+# ============================================================================
+# Retry policy and circuit breaker
+# ============================================================================
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    When and how long to wait before repeating a failed request
+
+    Connection failures (nothing reached the server) are retried for every method;
+    timeouts and retry_statuses only for idempotent calls.
+    """
+    attempts: int = 3
+    backoff: float = 0.2
+    max_backoff: float = 2.0
+    retry_statuses: Tuple[int, ...] = (429, 502, 503, 504)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number `attempt` (1-based), with jitter."""
+        return min(self.max_backoff, self.backoff * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a host after failure_threshold consecutive failures
+
+    closed -> open (calls fail fast with CircuitOpenError) -> after reset_timeout,
+    half-open: one trial call; its success closes the circuit, its failure opens
+    it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the half-open trial call)."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self._state == self.OPEN or self.failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# ============================================================================
+# Latency counters
+# ============================================================================
+
+class LatencyStats:
+    """Request counters and recent latencies of one client."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._samples = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms: float, error: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self._samples.append(elapsed_ms)
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            result = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'rejected': self.rejected,
+                'avg_ms': round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+                'max_ms': round(self.max_ms, 1),
+            }
+        for pct in (50, 95, 99):
+            result[f'p{pct}_ms'] = round(samples[min(len(samples) - 1, len(samples) * pct // 100)], 1) if samples else 0.0
+        return result
+
+
+# ============================================================================
+# Client
+# ============================================================================
+
+def _request_not_sent(exc: Exception) -> bool:
+    """Whether the request failed before reaching the server (no connection made)."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class PluginHTTPClient:
+    """
+    HTTP client of one plugin (e.g. 'carrier:parcelport')
+
+    Requests go through the pooled per-host sessions, are retried per the retry
+    policy and stop for a while when a host keeps failing (one circuit breaker per
+    host). Every attempt is recorded in the client's LatencyStats.
+    """
+
+    def __init__(self, name: str, retry_policy: Optional[RetryPolicy] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.stats = LatencyStats()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = _host_of(url)
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs: Any) -> requests.Response:
+        """
+        Send a request (arguments as for requests.request)
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            idempotent: Whether repeating the call is safe after it may have reached
+                the server (default: by method; pass True e.g. for quote POSTs)
+
+        Returns:
+            requests.Response (error statuses are returned, not raised)
+
+        Raises:
+            CircuitOpenError: The host's circuit is open
+            requests.exceptions.RequestException: Final attempt failed
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', HTTP_DEFAULT_TIMEOUT)
+        policy = self.retry_policy
+        breaker = self.breaker(url)
+        session = get_http_session(url)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                self.stats.count('rejected')
+                raise CircuitOpenError(f"{self.name}: circuit open for {_host_of(url)}")
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.stats.record((time.perf_counter() - started) * 1000, error=True)
+                breaker.record_failure()
+                if not (idempotent or _request_not_sent(e)) or attempt >= policy.attempts:
+                    raise
+            else:
+                server_error = response.status_code >= 500 or response.status_code == 429
+                self.stats.record((time.perf_counter() - started) * 1000, error=server_error)
+                if server_error:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if not (idempotent and response.status_code in policy.retry_statuses) or attempt >= policy.attempts:
+                    return response
+                response.close()
+            self.stats.count('retries')
+            time.sleep(policy.delay(attempt))
+
+
+_clients: Dict[str, PluginHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name: str) -> PluginHTTPClient:
+    """Process-wide client for a plugin name, e.g. 'carrier:parcelport'."""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = PluginHTTPClient(name)
+        return client
+
+
+def http_client_stats() -> Dict[str, Dict[str, Any]]:
+    """Latency counters and circuit states of every client in this process."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    result = {}
+    for client in clients:
+        stats = client.stats.snapshot()
+        with client._lock:
+            breakers = dict(client._breakers)
+        stats['circuits'] = {host: breaker.state for host, breaker in breakers.items()}
+        result[client.name] = stats
+    return result
+
+
+def reset_http_clients() -> None:
+    """Forget every client (counters and circuit states) and close pooled sessions."""
+    with _clients_lock:
+        _clients.clear()
+    close_http_sessions()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Build the Agent API tool catalog and store it in the shared cache, so the first
+agent request after a deploy does not pay for OpenAPI schema generation.
+Usage: python manage.py build_agent_tool_catalog [--force]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bfg.core.api_tool_catalog import get_api_tool_catalog
+
+
+class Command(BaseCommand):
+    help = 'Build and cache the Agent API tool catalog (run once per deploy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild even if this version is cached')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        catalog = get_api_tool_catalog(refresh=options['force'])
+        if not catalog.tools:
+            raise CommandError('No API tools built (OpenAPI schema generation failed, see log)')
+
+        self.stdout.write(
+            f"Catalog {catalog.version}: {len(catalog.tools)} tools in {time.perf_counter() - started:.2f}s"
+        )
+        for category, positions in catalog.category_index.items():
+            self.stdout.write(f"  {category}: {len(positions)}")
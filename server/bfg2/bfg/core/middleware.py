@@ -17,26 +17,23 @@ class WorkspaceMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
         from django.conf import settings
-        from bfg.common.models import Workspace
+        from bfg.common.middleware import get_first_active_workspace, get_workspace_by_id
         
         # Get workspace ID from request header
         workspace_id = request.headers.get('X-Workspace-ID')
         
         if workspace_id:
-            try:
-                workspace = Workspace.objects.get(id=workspace_id, is_active=True)
-                request.workspace = workspace
-                
-                # Validate user belongs to this workspace
-                if request.user.is_authenticated:
-                    self._validate_user_workspace_access(request, workspace)
-                
-            except Workspace.DoesNotExist:
-                request.workspace = None
+            # Cached lookup (in-process tier first, see bfg.common.middleware)
+            workspace = get_workspace_by_id(workspace_id)
+            request.workspace = workspace
+            
+            # Validate user belongs to this workspace
+            if workspace and request.user.is_authenticated:
+                self._validate_user_workspace_access(request, workspace)
         else:
             # In development mode, use default workspace if available
             if getattr(settings, 'DEBUG', False):
-                request.workspace = Workspace.objects.filter(is_active=True).first()
+                request.workspace = get_first_active_workspace()
             else:
                 request.workspace = None
     
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.PositiveBigIntegerField(default=0, verbose_name='Scope')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('next_value', models.PositiveBigIntegerField(default=1, verbose_name='Next Value')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Number Sequence',
+                'verbose_name_plural': 'Number Sequences',
+                'unique_together': {('scope', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+BFG Core Models
+
+Framework-level tables shared by every module
+"""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class NumberSequence(models.Model):
+    """
+    Counter behind generated document numbers (orders, invoices, payments...)
+
+    One row per (scope, name); scope is the workspace id, or 0 for numbers that
+    must be unique across workspaces. next_value is the first value not yet
+    handed out; processes reserve blocks of values by advancing it.
+    """
+    scope = models.PositiveBigIntegerField(_("Scope"), default=0)
+    name = models.CharField(_("Name"), max_length=100)
+    next_value = models.PositiveBigIntegerField(_("Next Value"), default=1)
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Number Sequence")
+        verbose_name_plural = _("Number Sequences")
+        unique_together = ('scope', 'name')
+
+    def __str__(self):
+        return f"{self.scope}:{self.name} -> {self.next_value}"
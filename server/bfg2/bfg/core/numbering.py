@@ -0,0 +1,205 @@
+"""
+BFG Number Allocation
+
+Sequential document numbers (orders, invoices, payments, consignments, manifests)
+handed out from NumberSequence rows. Each process reserves a block of values with a
+single UPDATE and serves the rest of the block from memory, so most numbers cost no
+query. The UPDATE commits on its own connection, not in the caller's transaction, so
+the sequence row is not locked until e.g. a checkout commits. Values are never handed
+out twice; numbers of a transaction that rolls back (or left in a block when a process
+exits) become gaps.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+
+from bfg.core.models import NumberSequence
+
+DEFAULT_BLOCK_SIZE = 20
+
+# (scope, name) -> unused [start, end) ranges reserved by this process
+Pool = Dict[Tuple[int, str], List[Tuple[int, int]]]
+
+
+def get_block_size() -> int:
+    return int(getattr(settings, 'BFG2_SETTINGS', {}).get('NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE))
+
+
+def get_number_db_alias() -> Optional[str]:
+    """Database alias dedicated to reservations (a second connection to the same database), if configured"""
+    return getattr(settings, 'BFG2_SETTINGS', {}).get('NUMBER_DB_ALIAS')
+
+
+def _shares_writer_lock(db) -> bool:
+    """
+    True when a second connection could not write while the caller's transaction is
+    open: SQLite has one writer lock per database, so reserving elsewhere would wait
+    on (or deadlock with) the caller itself
+    """
+    return db.vendor == 'sqlite'
+
+
+_reserver: Optional[ThreadPoolExecutor] = None
+_reserver_lock = threading.Lock()
+
+
+def _run_on_own_connection(func, *args):
+    """Run func in the numbering worker thread, which has database connections of its own (autocommit)"""
+    global _reserver
+    with _reserver_lock:
+        if _reserver is None:
+            _reserver = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bfg-numbering')
+    return _reserver.submit(func, *args).result()
+
+
+def next_number_after(queryset, field: str, prefix: str) -> int:
+    """
+    First sequence value above the existing "<prefix><digits>" numbers
+
+    Used to seed a new sequence row so it continues after numbers issued before
+    the sequence existed (or typed in by hand).
+    """
+    last = (
+        queryset.filter(**{f'{field}__regex': rf'^{re.escape(prefix)}[0-9]+$'})
+        .order_by(Length(field).desc(), f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    return int(last[len(prefix):]) + 1 if last else 1
+
+
+class NumberAllocator:
+    """
+    Hands out increasing integers per (scope, name) sequence
+
+    scope is a workspace id, or 0 for numbers unique across workspaces. Blocks are
+    reserved outside the caller's transaction: on BFG2_SETTINGS['NUMBER_DB_ALIAS']
+    if set, directly when no transaction is open, otherwise from a worker thread
+    with its own connection. Only where that is impossible (SQLite) the reservation
+    joins the caller's transaction, and its block becomes visible to other threads
+    once that commits: on rollback the sequence row would be rewound and the cached
+    remainder could be handed out again by another process.
+    """
+
+    def __init__(self, block_size: Optional[int] = None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pool: Pool = {}
+
+    def allocate(self, name: str, workspace_id: Optional[int] = None,
+                 seed: Optional[Callable[[], int]] = None) -> int:
+        """
+        Next value of a sequence
+
+        Args:
+            name: Sequence name, usually the number prefix (e.g. "ORD-20260101-")
+            workspace_id: Workspace scope; None for a global sequence
+            seed: Called once, when the sequence row is created, for its first value
+
+        Returns:
+            int: Sequence value
+        """
+        return self.allocate_many(name, 1, workspace_id=workspace_id, seed=seed)[0]
+
+    def allocate_many(self, name: str, count: int, workspace_id: Optional[int] = None,
+                      seed: Optional[Callable[[], int]] = None) -> List[int]:
+        """Next count values of a sequence (ascending, not necessarily contiguous)"""
+        key = (workspace_id or 0, name)
+        values = self._take(key, count)
+        missing = count - len(values)
+        if missing:
+            size = max(missing, self.block_size or get_block_size())
+            start, committed = self._reserve_block(key, size, seed)
+            values.extend(range(start, start + missing))
+            if missing < size:
+                remainder = (start + missing, start + size)
+                if committed:
+                    self._release(key, remainder)
+                else:
+                    transaction.on_commit(lambda: self._release(key, remainder))
+        return values
+
+    def clear(self) -> None:
+        """Forget cached blocks (their values become gaps)"""
+        with self._lock:
+            self._pool.clear()
+
+    def _take(self, key, count: int) -> List[int]:
+        values: List[int] = []
+        with self._lock:
+            ranges = self._pool.get(key)
+            while ranges and len(values) < count:
+                start, end = ranges[0]
+                stop = min(end, start + count - len(values))
+                values.extend(range(start, stop))
+                if stop < end:
+                    ranges[0] = (stop, end)
+                else:
+                    ranges.pop(0)
+            if key in self._pool and not ranges:
+                del self._pool[key]
+        return values
+
+    def _release(self, key, block: Tuple[int, int]) -> None:
+        with self._lock:
+            ranges = self._pool.setdefault(key, [])
+            ranges.append(block)
+            ranges.sort()
+
+    def _reserve_block(self, key, size: int, seed: Optional[Callable[[], int]]) -> Tuple[int, bool]:
+        """
+        Advance the sequence row by size
+
+        Returns:
+            (first reserved value, whether the reservation is already committed)
+        """
+        alias = get_number_db_alias()
+        if alias:
+            return self._advance(alias, key, size, seed), True
+        alias = router.db_for_write(NumberSequence)
+        db = connections[alias]
+        if not db.in_atomic_block:
+            return self._advance(alias, key, size, seed), True
+        if _shares_writer_lock(db):
+            return self._advance(alias, key, size, seed), False
+        return _run_on_own_connection(self._advance_on_thread_connection, alias, key, size, seed), True
+
+    def _advance_on_thread_connection(self, alias: str, key, size: int, seed: Optional[Callable[[], int]]) -> int:
+        db = connections[alias]
+        db.close_if_unusable_or_obsolete()
+        try:
+            return self._advance(alias, key, size, seed)
+        finally:
+            # Honour CONN_MAX_AGE like a request would
+            db.close_if_unusable_or_obsolete()
+
+    def _advance(self, alias: str, key, size: int, seed: Optional[Callable[[], int]]) -> int:
+        """Advance the sequence row by size on alias and return the first reserved value"""
+        scope, name = key
+        sequences = NumberSequence.objects.using(alias).filter(scope=scope, name=name)
+        for _ in range(2):
+            with transaction.atomic(using=alias):
+                if sequences.update(next_value=F('next_value') + size):
+                    # The row stays locked by our UPDATE until this (or the caller's) commit
+                    return sequences.values_list('next_value', flat=True).get() - size
+
+            start = max(seed(), 1) if seed else 1
+            try:
+                with transaction.atomic(using=alias):
+                    NumberSequence.objects.using(alias).create(scope=scope, name=name, next_value=start + size)
+                return start
+            except IntegrityError:
+                # Created concurrently: advance the existing row instead
+                continue
+        raise RuntimeError(f'Could not reserve numbers from sequence {name!r}')
+
+
+# Shared allocator used by the document number generators
+number_allocator = NumberAllocator()
@@ -7,6 +7,33 @@ Permission control classes
 from rest_framework import permissions
 
 
+def get_staff_member(request):
+    """
+    Active StaffMember (role loaded) of request.user in request.workspace, or None.
+
+    Memoized on the request, so several permission checks on one request (or on
+    the internal requests of an agent chat turn, see api_tool_catalog) share one query.
+    """
+    user = getattr(request, 'user', None)
+    workspace = getattr(request, 'workspace', None)
+    if not workspace or not user or not user.is_authenticated:
+        return None
+
+    key = (workspace.pk, user.pk)
+    cached = getattr(request, '_staff_member_cache', None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    from bfg.common.models import StaffMember
+    staff = StaffMember.objects.select_related('role').filter(
+        workspace=workspace,
+        user=user,
+        is_active=True
+    ).first()
+    request._staff_member_cache = (key, staff)
+    return staff
+
+
 class IsWorkspaceAdmin(permissions.BasePermission):
     """
     Only workspace admin role can access
@@ -26,16 +53,8 @@ class IsWorkspaceAdmin(permissions.BasePermission):
             return True
         
         # Check if user is admin of this workspace
-        from bfg.common.models import StaffMember
-        try:
-            staff = StaffMember.objects.get(
-                workspace=workspace,
-                user=request.user,
-                is_active=True
-            )
-            return staff.role.code == 'admin'
-        except StaffMember.DoesNotExist:
-            return False
+        staff = get_staff_member(request)
+        return staff is not None and staff.role.code == 'admin'
 
 
 class IsWorkspaceStaff(permissions.BasePermission):
@@ -56,12 +75,7 @@ class IsWorkspaceStaff(permissions.BasePermission):
         if request.user.is_superuser:
             return True
         
-        from bfg.common.models import StaffMember
-        return StaffMember.objects.filter(
-            workspace=workspace,
-            user=request.user,
-            is_active=True
-        ).exists()
+        return get_staff_member(request) is not None
 
 
 class HasPermission(permissions.BasePermission):
@@ -87,40 +101,33 @@ class HasPermission(permissions.BasePermission):
             return True
         
         # Check permission
-        from bfg.common.models import StaffMember
-        try:
-            staff = StaffMember.objects.select_related('role').get(
-                workspace=workspace,
-                user=request.user,
-                is_active=True
-            )
-            
-            # Admin has all permissions
-            if staff.role.code == 'admin':
-                return True
-            
-            # Parse permission 'shop.product.create' -> module: 'shop.product', action: 'create'
-            parts = required_perm.split('.')
-            if len(parts) < 3:
-                return False
-            
-            module = '.'.join(parts[:-1])
-            action = parts[-1]
-            
-            # Check role permissions JSON
-            role_perms = staff.role.permissions
-            
-            if module in role_perms:
-                return action in role_perms[module]
-            
-            # Check wildcard
-            if '*' in role_perms:
-                return action in role_perms['*']
-            
+        staff = get_staff_member(request)
+        if staff is None:
             return False
-            
-        except StaffMember.DoesNotExist:
+        
+        # Admin has all permissions
+        if staff.role.code == 'admin':
+            return True
+        
+        # Parse permission 'shop.product.create' -> module: 'shop.product', action: 'create'
+        parts = required_perm.split('.')
+        if len(parts) < 3:
             return False
+        
+        module = '.'.join(parts[:-1])
+        action = parts[-1]
+        
+        # Check role permissions JSON
+        role_perms = staff.role.permissions
+        
+        if module in role_perms:
+            return action in role_perms[module]
+        
+        # Check wildcard
+        if '*' in role_perms:
+            return action in role_perms['*']
+        
+        return False
 
 
 class IsOwnerOrStaff(permissions.BasePermission):
@@ -133,12 +140,7 @@ class IsOwnerOrStaff(permissions.BasePermission):
         workspace = getattr(request, 'workspace', None)
         
         # Staff can access
-        from bfg.common.models import StaffMember
-        if StaffMember.objects.filter(
-            workspace=workspace,
-            user=request.user,
-            is_active=True
-        ).exists():
+        if get_staff_member(request) is not None:
             return True
         
         # Check if is owner
@@ -189,45 +191,38 @@ class CanManagePayments(permissions.BasePermission):
         required_perm = self.ACTION_PERMISSIONS.get(action, 'finance.payment.view')
         
         # Check staff member and their role permissions
-        from bfg.common.models import StaffMember
-        try:
-            staff = StaffMember.objects.select_related('role').get(
-                workspace=workspace,
-                user=request.user,
-                is_active=True
-            )
-            
-            # Admin role has all permissions
-            if staff.role.code == 'admin':
-                return True
-            
-            # Check role permissions JSON
-            # Format: {"finance.payment": ["create", "view", "update", "delete"]}
-            role_perms = staff.role.permissions or {}
-            
-            # Parse permission 'finance.payment.create' -> module: 'finance.payment', action: 'create'
-            parts = required_perm.rsplit('.', 1)
-            if len(parts) != 2:
-                return False
-            
-            module, action_name = parts
-            
-            # Check if module exists and action is allowed
-            if module in role_perms:
-                module_actions = role_perms[module]
-                if isinstance(module_actions, list):
-                    return action_name in module_actions
-                elif isinstance(module_actions, bool):
-                    return module_actions
-            
-            # Check wildcard permission
-            if '*' in role_perms:
-                return True
-            
+        staff = get_staff_member(request)
+        if staff is None:
             return False
-            
-        except StaffMember.DoesNotExist:
+        
+        # Admin role has all permissions
+        if staff.role.code == 'admin':
+            return True
+        
+        # Check role permissions JSON
+        # Format: {"finance.payment": ["create", "view", "update", "delete"]}
+        role_perms = staff.role.permissions or {}
+        
+        # Parse permission 'finance.payment.create' -> module: 'finance.payment', action: 'create'
+        parts = required_perm.rsplit('.', 1)
+        if len(parts) != 2:
             return False
+        
+        module, action_name = parts
+        
+        # Check if module exists and action is allowed
+        if module in role_perms:
+            module_actions = role_perms[module]
+            if isinstance(module_actions, list):
+                return action_name in module_actions
+            elif isinstance(module_actions, bool):
+                return module_actions
+        
+        # Check wildcard permission
+        if '*' in role_perms:
+            return True
+        
+        return False
 
 
 class CanManageInvoices(permissions.BasePermission):
@@ -265,37 +260,30 @@ class CanManageInvoices(permissions.BasePermission):
         action = getattr(view, 'action', None)
         required_perm = self.ACTION_PERMISSIONS.get(action, 'finance.invoice.view')
         
-        from bfg.common.models import StaffMember
-        try:
-            staff = StaffMember.objects.select_related('role').get(
-                workspace=workspace,
-                user=request.user,
-                is_active=True
-            )
-            
-            # Admin role has all permissions
-            if staff.role.code == 'admin':
-                return True
-            
-            role_perms = staff.role.permissions or {}
-            
-            parts = required_perm.rsplit('.', 1)
-            if len(parts) != 2:
-                return False
-            
-            module, action_name = parts
-            
-            if module in role_perms:
-                module_actions = role_perms[module]
-                if isinstance(module_actions, list):
-                    return action_name in module_actions
-                elif isinstance(module_actions, bool):
-                    return module_actions
-            
-            if '*' in role_perms:
-                return True
-            
+        staff = get_staff_member(request)
+        if staff is None:
             return False
-            
-        except StaffMember.DoesNotExist:
+        
+        # Admin role has all permissions
+        if staff.role.code == 'admin':
+            return True
+        
+        role_perms = staff.role.permissions or {}
+        
+        parts = required_perm.rsplit('.', 1)
+        if len(parts) != 2:
             return False
+        
+        module, action_name = parts
+        
+        if module in role_perms:
+            module_actions = role_perms[module]
+            if isinstance(module_actions, list):
+                return action_name in module_actions
+            elif isinstance(module_actions, bool):
+                return module_actions
+        
+        if '*' in role_perms:
+            return True
+        
+        return False
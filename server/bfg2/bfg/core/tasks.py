@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Celery tasks for core module.
+Rebuilds stale cache entries in the background (see bfg.core.cache.get_or_refresh_tagged).
+"""
+
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def refresh_cache_entry(key, builder, args, tags, timeout, stale_timeout=None):
+    """
+    Rebuild a stale get_or_refresh_tagged entry.
+    Requests keep serving the stale value until this stores the new one.
+    """
+    from bfg.core.cache import refresh_tagged
+
+    refresh_tagged(key, builder, args, tags, timeout, stale_timeout)
@@ -0,0 +1,50 @@
+"""
+BFG Transaction Utilities
+
+Helpers for deferring work until the surrounding transaction commits
+"""
+
+import threading
+from typing import Callable, Iterable, List
+
+
+class OnCommitBatch:
+    """
+    Collect keys during a transaction and process them once, after commit
+
+    Many writes touching the same object inside one transaction (e.g. an order with
+    many lines) collapse into a single callback invocation with de-duplicated keys.
+    Outside a transaction the callback runs immediately, as with transaction.on_commit.
+    """
+
+    def __init__(self, callback: Callable[[List], None], using: str = None):
+        self.callback = callback
+        self.using = using
+        self._local = threading.local()
+
+    def _pending(self) -> set:
+        if not hasattr(self._local, 'keys'):
+            self._local.keys = set()
+        return self._local.keys
+
+    def add(self, keys: Iterable) -> None:
+        """Queue keys (falsy keys are ignored) for processing after commit"""
+        from django.db import transaction
+
+        keys = {key for key in keys if key}
+        if not keys:
+            return
+        self._pending().update(keys)
+        # Registered on every call: if an earlier transaction rolled back, its keys are
+        # still pending and get flushed by the next successful commit. Robust: a failing
+        # callback is logged and never turns the committed write into an error.
+        transaction.on_commit(self.flush, using=self.using, robust=True)
+
+    def flush(self) -> None:
+        """Process and clear pending keys"""
+        pending = self._pending()
+        if not pending:
+            return
+        keys = list(pending)
+        pending.clear()
+        self.callback(keys)
@@ -5,11 +5,14 @@ All carrier plugins must inherit from this base class
 and implement the required methods.
 """
 
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
 from dataclasses import dataclass
 from django.utils import timezone
+from bfg.core.http import PluginHTTPClient, get_http_client
 
 
 @dataclass
@@ -93,6 +96,11 @@ class BaseCarrierPlugin(ABC):
     display_name: str = None  # e.g., 'ParcelPort', 'NZ Post'
     supported_countries: List[str] = ['NZ']  # ISO country codes
     
+    # Tracking numbers per get_tracking_many call, and parallel get_tracking calls
+    # of the default get_tracking_many
+    tracking_batch_size: int = 50
+    TRACKING_CONCURRENCY = 4
+    
     def __init__(self, carrier):
         """
         Initialize carrier plugin.
@@ -113,14 +121,30 @@ class BaseCarrierPlugin(ABC):
                 f"got '{carrier.carrier_type}' (normalized: '{actual_type}' vs '{expected_type}')"
             )
         
-        # If carrier has no type set, set it to match this plugin
+        # If carrier has no type set, match this plugin (in memory only: building a
+        # plugin never writes to the database)
         if not carrier.carrier_type:
             carrier.carrier_type = self.carrier_type
-            carrier.save(update_fields=['carrier_type'])
         
         self.carrier = carrier
         self.config = carrier.get_active_config() or {}
         self._validate_config()
+
+    @property
+    def carrier(self):
+        """
+        Carrier model instance of this thread's lookup
+
+        Plugins are cached and shared across requests and threads (see the loader),
+        so each lookup binds its own carrier; threads the plugin starts itself see the
+        most recently bound one.
+        """
+        return getattr(self.__dict__['_bound'], 'carrier', self._carrier)
+
+    @carrier.setter
+    def carrier(self, carrier):
+        self.__dict__.setdefault('_bound', threading.local()).carrier = carrier
+        self._carrier = carrier
     
     def _validate_config(self):
         """
@@ -281,6 +305,39 @@ class BaseCarrierPlugin(ABC):
             error='Tracking API not supported by this carrier'
         )
     
+    def get_tracking_many(
+        self,
+        tracking_numbers: List[str]
+    ) -> Dict[str, TrackingResult]:
+        """
+        Get tracking information for several consignments.
+        
+        Default: get_tracking per number, TRACKING_CONCURRENCY at a time. Plugins
+        whose API has a bulk tracking endpoint override this (and may raise
+        tracking_batch_size to what the endpoint accepts).
+        
+        Args:
+            tracking_numbers: At most tracking_batch_size tracking numbers
+        
+        Returns:
+            dict: {tracking_number: TrackingResult}
+        """
+        if not tracking_numbers:
+            return {}
+        workers = min(self.TRACKING_CONCURRENCY, len(tracking_numbers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(self.get_tracking, tracking_numbers)
+            return dict(zip(tracking_numbers, results))
+    
+    @property
+    def supports_tracking(self) -> bool:
+        """Whether this plugin implements tracking (get_tracking or get_tracking_many)."""
+        cls = type(self)
+        return (
+            cls.get_tracking is not BaseCarrierPlugin.get_tracking
+            or cls.get_tracking_many is not BaseCarrierPlugin.get_tracking_many
+        )
+    
     # ========================================================================
     # Webhook Handling
     # ========================================================================
@@ -327,6 +384,18 @@ class BaseCarrierPlugin(ABC):
     # Utility Methods
     # ========================================================================
     
+    @property
+    def http(self) -> PluginHTTPClient:
+        """
+        HTTP client for carrier API calls: pooled keep-alive sessions, retries
+        and a circuit breaker, shared by all instances of this plugin type.
+        """
+        return get_http_client(f'carrier:{self.carrier_type}')
+    
+    def http_stats(self) -> Dict[str, Any]:
+        """Request counts and latencies of this plugin type's API calls (this process)."""
+        return self.http.stats.snapshot()
+    
     def get_config_schema(self) -> Dict[str, Any]:
         """
         Get configuration schema for this carrier.
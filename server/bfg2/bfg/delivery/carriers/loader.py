@@ -5,14 +5,36 @@ Discovers and loads carrier plugins from carriers/ directory.
 """
 
 import os
+import hashlib
 import importlib
+import json
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, Type, Optional, Any
 
 from .base import BaseCarrierPlugin
 
 logger = logging.getLogger(__name__)
 
+# Plugin instances kept per process (least recently used are evicted)
+PLUGIN_CACHE_SIZE = 128
+
+_instances: "OrderedDict[tuple, BaseCarrierPlugin]" = OrderedDict()
+_instances_lock = threading.Lock()
+
+
+def plugin_cache_key(carrier, plugin_class) -> tuple:
+    """(carrier, plugin type, config version): editing the carrier gives a new key."""
+    config = json.dumps(carrier.get_active_config() or {}, sort_keys=True, default=str)
+    return (
+        carrier.pk,
+        plugin_class.carrier_type,
+        carrier.is_test_mode,
+        carrier.updated_at,
+        hashlib.sha1(config.encode()).hexdigest(),
+    )
+
 
 class CarrierLoader:
     """
@@ -97,6 +119,10 @@ class CarrierLoader:
         """
         Get plugin instance for carrier.
         
+        Instances are cached per carrier and config version (see plugin_cache_key),
+        so consecutive calls share one plugin and its state, e.g. auth tokens. The
+        given carrier is bound to the plugin for the calling thread.
+        
         Args:
             carrier: Carrier model instance
         
@@ -130,8 +156,20 @@ class CarrierLoader:
             )
             return None
         
+        # Reuse the instance built for this carrier version (keeps e.g. auth tokens)
+        key = plugin_cache_key(carrier, plugin_class) if carrier.pk else None
+        if key is not None:
+            with _instances_lock:
+                plugin = _instances.get(key)
+                if plugin is not None:
+                    _instances.move_to_end(key)
+            if plugin is not None:
+                # Reuse the transport state, not another request's model instance
+                plugin.carrier = carrier
+                return plugin
+        
         try:
-            return plugin_class(carrier)
+            plugin = plugin_class(carrier)
         except ValueError as e:
             # Configuration or type mismatch errors
             error_msg = str(e)
@@ -154,6 +192,22 @@ class CarrierLoader:
                 exc_info=True
             )
             return None
+        
+        if key is not None:
+            with _instances_lock:
+                _instances[key] = plugin
+                _instances.move_to_end(key)
+                while len(_instances) > PLUGIN_CACHE_SIZE:
+                    _instances.popitem(last=False)
+        return plugin
+    
+    @classmethod
+    def clear_plugin_cache(cls):
+        """
+        Drop cached plugin instances.
+        """
+        with _instances_lock:
+            _instances.clear()
     
     @classmethod
     def list_available_plugins(cls) -> Dict[str, str]:
@@ -222,6 +276,7 @@ class CarrierLoader:
         """
         cls._plugins = {}
         cls._initialized = False
+        cls.clear_plugin_cache()
         cls.discover_plugins()
 
 
@@ -115,7 +115,7 @@ class ParcelPortCarrier(BaseCarrierPlugin):
         }
         
         try:
-            response = requests.post(url, data=data, headers=headers, timeout=30)
+            response = self.http.request('POST', url, data=data, headers=headers, timeout=(5, 30), idempotent=True)
             response.raise_for_status()
             
             result = response.json()
@@ -155,9 +155,15 @@ class ParcelPortCarrier(BaseCarrierPlugin):
         method: str,
         endpoint: str,
         data: Optional[Dict] = None,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        idempotent: Optional[bool] = None
     ) -> Dict[str, Any]:
-        """Make authenticated API request."""
+        """
+        Make authenticated API request.
+        
+        idempotent: whether the call may be retried after a timeout or 5xx
+        (default: by method, see PluginHTTPClient.request)
+        """
         token = self._get_token()
         
         url = f"{self.base_url}{endpoint}"
@@ -167,13 +173,14 @@ class ParcelPortCarrier(BaseCarrierPlugin):
         }
         
         try:
-            response = requests.request(
-                method=method,
-                url=url,
+            response = self.http.request(
+                method,
+                url,
                 json=data,
                 params=params,
                 headers=headers,
-                timeout=60
+                timeout=(5, 60),
+                idempotent=idempotent
             )
             response.raise_for_status()
             return response.json()
@@ -297,7 +304,8 @@ class ParcelPortCarrier(BaseCarrierPlugin):
             endpoint = f'/api/1.0/shippingoptions?client_id={client_id}'
             
             logger.info(f"ParcelPort: Calling {self.base_url}{endpoint}")
-            result = self._make_request('POST', endpoint, data=data)
+            # Quotes have no side effects: safe to retry
+            result = self._make_request('POST', endpoint, data=data, idempotent=True)
             
             logger.debug(f"ParcelPort response: {result}")
             
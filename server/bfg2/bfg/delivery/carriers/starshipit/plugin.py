@@ -92,20 +92,27 @@ class StarshipitCarrier(BaseCarrierPlugin):
         method: str,
         endpoint: str,
         params: Optional[Dict] = None,
-        json_data: Optional[Dict] = None
+        json_data: Optional[Dict] = None,
+        idempotent: Optional[bool] = None
     ) -> Dict[str, Any]:
-        """Make authenticated API request."""
+        """
+        Make authenticated API request.
+        
+        idempotent: whether the call may be retried after a timeout or 5xx
+        (default: by method, see PluginHTTPClient.request)
+        """
         url = f"{self.API_BASE_URL}{endpoint}"
         headers = self._get_headers()
         
         try:
-            response = requests.request(
-                method=method,
-                url=url,
+            response = self.http.request(
+                method,
+                url,
                 params=params,
                 json=json_data,
                 headers=headers,
-                timeout=60
+                timeout=(5, 60),
+                idempotent=idempotent
             )
             response.raise_for_status()
             return response.json()
@@ -212,7 +219,8 @@ class StarshipitCarrier(BaseCarrierPlugin):
                     package_data['height'] = float(pkg.get('height', 10)) / 100.0
                 request_body['packages'].append(package_data)
             
-            result = self._make_request('POST', '/api/rates', json_data=request_body)
+            # Rates have no side effects: safe to retry
+            result = self._make_request('POST', '/api/rates', json_data=request_body, idempotent=True)
             
             options = []
             # Starshipit API may return rates directly or in a nested structure
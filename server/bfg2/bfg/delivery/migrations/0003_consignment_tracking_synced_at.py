@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consignment',
+            name='tracking_synced_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Tracking Synced At'),
+        ),
+        migrations.AddIndex(
+            model_name='consignment',
+            index=models.Index(fields=['state', 'tracking_synced_at'], name='delivery_co_state_c770e1_idx'),
+        ),
+    ]
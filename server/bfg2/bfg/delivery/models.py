@@ -408,6 +408,9 @@ class Consignment(models.Model):
     actual_delivery = models.DateTimeField(_("Actual Delivery"), null=True, blank=True)
     notes = models.TextField(_("Notes"), blank=True)
     
+    # Last time tracking was fetched from the carrier (see services.tracking_sync)
+    tracking_synced_at = models.DateTimeField(_("Tracking Synced At"), null=True, blank=True)
+    
     tracking_events = GenericRelation('delivery.TrackingEvent', related_query_name='consignment')
     
     created_at = models.DateTimeField(_("Created At"), default=timezone.now)
@@ -422,6 +425,7 @@ class Consignment(models.Model):
             models.Index(fields=['consignment_number']),
             models.Index(fields=['tracking_number']),
             models.Index(fields=['status']),
+            models.Index(fields=['state', 'tracking_synced_at']),
         ]
     
     def __str__(self):
@@ -91,6 +91,13 @@ class FreightServiceConfigModel(BaseModel):
         description='Divisor used to convert volume to weight (e.g. 5000)',
         json_schema_extra={'placeholder': '5000'},
     )
+    cartonize: bool = Field(
+        default=False,
+        description=(
+            'Pack cart items into package templates and charge their volumetric weight '
+            '(needs volumetric_weight_factor; not used with unit=cbm)'
+        ),
+    )
     rules: Dict[str, Any] = Field(
         default_factory=dict,
         description='Pricing rules JSON (structure depends on mode)',
@@ -7,19 +7,36 @@ Service exports
 from .delivery_service import DeliveryService, ManifestService
 from .freight_calculator import (
     calculate_billing_weight,
+    calculate_packages_billing_weight,
     calculate_base_shipping_cost,
     calculate_shipping_cost,
     find_matching_rule,
+    find_matching_rules,
     normalize_conditions,
     resolve_conditional_config,
 )
+from .quote_aggregator import CarrierQuotes, QuoteAggregator, quote_fingerprint
+from .tracking_sync import TrackingSyncService, due_for_tracking
+from .cartonization import BoxSpec, CartonizationService, PackItem, PackedBox, pack_items
 __all__ = [
     'DeliveryService',
     'ManifestService',
     'calculate_billing_weight',
+    'calculate_packages_billing_weight',
     'calculate_base_shipping_cost',
     'calculate_shipping_cost',
     'find_matching_rule',
+    'find_matching_rules',
     'normalize_conditions',
     'resolve_conditional_config',
+    'CarrierQuotes',
+    'QuoteAggregator',
+    'quote_fingerprint',
+    'TrackingSyncService',
+    'due_for_tracking',
+    'BoxSpec',
+    'CartonizationService',
+    'PackItem',
+    'PackedBox',
+    'pack_items',
 ]
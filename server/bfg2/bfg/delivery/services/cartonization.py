@@ -0,0 +1,398 @@
+"""
+BFG Delivery Cartonization
+
+3D bin packing of item dimensions into the workspace's PackageTemplate boxes:
+fewest boxes first, then the smallest templates that still hold each box's
+contents (least volumetric weight). Packings are cached per cart fingerprint.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import permutations
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bfg.core.services import BaseService
+from bfg.delivery.models import PackageTemplate
+from bfg.delivery.services.freight_calculator import calculate_packages_billing_weight
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the fit pass falls back to pure Python
+    np = None
+
+# Packings kept per process, keyed by cart fingerprint
+PACKING_CACHE_SIZE = 512
+_packings: "OrderedDict[str, Tuple[PackedBox, ...]]" = OrderedDict()
+_packings_lock = threading.Lock()
+
+# Tolerance for dimension and weight comparisons (cm / kg)
+EPSILON = 1e-6
+
+
+@dataclass(frozen=True)
+class BoxSpec:
+    """A box size items are packed into (a PackageTemplate); max_weight None is unlimited"""
+    length: float
+    width: float
+    height: float
+    tare_weight: float = 0.0
+    max_weight: Optional[float] = None
+    template_id: Optional[int] = None
+    code: str = ''
+    name: str = ''
+
+    @classmethod
+    def from_template(cls, template: PackageTemplate) -> 'BoxSpec':
+        return cls(
+            length=float(template.length),
+            width=float(template.width),
+            height=float(template.height),
+            tare_weight=float(template.tare_weight or 0),
+            max_weight=float(template.max_weight) if template.max_weight else None,
+            template_id=template.id,
+            code=template.code,
+            name=template.name,
+        )
+
+    @property
+    def dims(self) -> Tuple[float, float, float]:
+        return tuple(sorted((self.length, self.width, self.height), reverse=True))
+
+    @property
+    def volume(self) -> float:
+        return self.length * self.width * self.height
+
+
+@dataclass(frozen=True)
+class PackItem:
+    """quantity units of one item kind; ref (e.g. a variant or product id) is reported per packed unit"""
+    length: float
+    width: float
+    height: float
+    weight: float = 0.0
+    quantity: int = 1
+    ref: Any = None
+
+    @property
+    def dims(self) -> Tuple[float, float, float]:
+        return tuple(sorted((float(self.length), float(self.width), float(self.height)), reverse=True))
+
+
+@dataclass(frozen=True)
+class PackedBox:
+    """
+    One package: a template box with its contents, or (box None) a unit that fits
+    no template and ships in its own packaging
+    """
+    box: Optional[BoxSpec]
+    length: float
+    width: float
+    height: float
+    weight: float
+    items: Tuple[Any, ...] = ()
+
+    def to_package_dict(self) -> Dict[str, Any]:
+        """Package dict as carrier plugins and the quote aggregator take them"""
+        return {
+            'weight': round(self.weight, 3),
+            'length': self.length,
+            'width': self.width,
+            'height': self.height,
+            'description': self.box.name if self.box and self.box.name else 'Package',
+        }
+
+
+def packing_fingerprint(items: Iterable[PackItem], boxes: Sequence[BoxSpec]) -> str:
+    """Content hash of the item kinds (in any order and orientation) and the box list"""
+    item_keys = sorted(
+        [[round(d, 2) for d in item.dims], round(float(item.weight), 3), item.quantity, str(item.ref)]
+        for item in items
+    )
+    box_keys = [
+        [[round(d, 2) for d in box.dims], box.tare_weight, box.max_weight, box.template_id]
+        for box in boxes
+    ]
+    raw = json.dumps([item_keys, box_keys], separators=(',', ':'))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def candidate_fits(kinds: Sequence[PackItem], boxes: Sequence[BoxSpec]) -> List[List[bool]]:
+    """
+    fits[i][j]: one unit of kinds[i] fits boxes[j] in some orientation, within its
+    weight limit. A cuboid fits a box in some axis-aligned orientation exactly when
+    its sorted dimensions are each no larger than the box's sorted dimensions.
+    """
+    if not kinds or not boxes:
+        return [[False] * len(boxes) for _ in kinds]
+    capacities = [
+        (box.max_weight - box.tare_weight) if box.max_weight is not None else float('inf')
+        for box in boxes
+    ]
+    if np is not None:
+        item_dims = np.array([kind.dims for kind in kinds], dtype=float)
+        box_dims = np.array([box.dims for box in boxes], dtype=float)
+        fits = (item_dims[:, None, :] <= box_dims[None, :, :] + EPSILON).all(axis=2)
+        weights = np.array([float(kind.weight) for kind in kinds], dtype=float)
+        fits &= weights[:, None] <= np.array(capacities)[None, :] + EPSILON
+        return fits.tolist()
+    return [
+        [
+            all(d <= b + EPSILON for d, b in zip(kind.dims, box.dims))
+            and float(kind.weight) <= capacity + EPSILON
+            for box, capacity in zip(boxes, capacities)
+        ]
+        for kind in kinds
+    ]
+
+
+class _Bin:
+    """A box being filled: guillotine free spaces, best (smallest) fitting space first"""
+
+    def __init__(self, box: BoxSpec):
+        self.box = box
+        self.spaces: List[Tuple[float, float, float]] = [(box.length, box.width, box.height)]
+        self.free_volume = box.volume
+        self.weight = box.tare_weight
+        self.units: List[int] = []
+
+    def place(self, dims: Tuple[float, float, float], weight: float, unit: int) -> bool:
+        if self.box.max_weight is not None and self.weight + weight > self.box.max_weight + EPSILON:
+            return False
+        volume = dims[0] * dims[1] * dims[2]
+        if volume > self.free_volume + EPSILON:
+            return False
+        best = None
+        best_volume = None
+        for index, space in enumerate(self.spaces):
+            space_volume = space[0] * space[1] * space[2]
+            if space_volume + EPSILON < volume or (best_volume is not None and space_volume >= best_volume):
+                continue
+            if all(d <= s + EPSILON for d, s in zip(dims, sorted(space, reverse=True))):
+                best, best_volume = index, space_volume
+        if best is None:
+            return False
+
+        length, width, height = self.spaces.pop(best)
+        # Lowest orientation first: keeps the remaining space above the unit tall
+        for a, b, c in sorted(set(permutations(dims)), key=lambda o: (o[2], o)):
+            if a <= length + EPSILON and b <= width + EPSILON and c <= height + EPSILON:
+                break
+        for space in ((length - a, width, height), (a, width - b, height), (a, b, height - c)):
+            if min(space) > EPSILON:
+                self.spaces.append(space)
+        self.free_volume -= volume
+        self.weight += weight
+        self.units.append(unit)
+        return True
+
+
+def _pack_units(
+    units: List[Tuple[Tuple[float, float, float], float, int]],
+    boxes: Sequence[BoxSpec],
+    fits: List[List[bool]],
+    kind_of: List[int],
+    opener: int,
+) -> List[_Bin]:
+    """
+    First fit decreasing: each unit goes into the first open box it fits, else opens
+    the `opener` box (or the largest box that fits it when the opener does not)
+    """
+    by_volume = sorted(range(len(boxes)), key=lambda j: boxes[j].volume, reverse=True)
+    bins: List[_Bin] = []
+    for dims, weight, unit in units:
+        if any(b.place(dims, weight, unit) for b in bins):
+            continue
+        row = fits[kind_of[unit]]
+        order = ([opener] if row[opener] else []) + [j for j in by_volume if row[j]]
+        for j in order:
+            new_bin = _Bin(boxes[j])
+            if new_bin.place(dims, weight, unit):
+                bins.append(new_bin)
+                break
+    return bins
+
+
+def _downsize(
+    bin_: _Bin,
+    units: Dict[int, Tuple[Tuple[float, float, float], float, int]],
+    boxes: Sequence[BoxSpec],
+    fits: List[List[bool]],
+    kind_of: List[int],
+) -> _Bin:
+    """Repack a box's contents into the smallest box that holds them all"""
+    contents = sorted((units[unit] for unit in bin_.units), key=lambda u: u[0][0] * u[0][1] * u[0][2], reverse=True)
+    volume = sum(d[0] * d[1] * d[2] for d, _, _ in contents)
+    weight = sum(w for _, w, _ in contents)
+    kinds = {kind_of[u] for u in bin_.units}
+    candidates = sorted(
+        (
+            j for j, box in enumerate(boxes)
+            if box.volume < bin_.box.volume
+            and box.volume + EPSILON >= volume
+            and (box.max_weight is None or box.tare_weight + weight <= box.max_weight + EPSILON)
+            and all(fits[k][j] for k in kinds)
+        ),
+        key=lambda j: boxes[j].volume,
+    )
+    for j in candidates:
+        smaller = _Bin(boxes[j])
+        if all(smaller.place(dims, w, unit) for dims, w, unit in contents):
+            return smaller
+    return bin_
+
+
+def pack_items(items: Iterable[PackItem], boxes: Sequence[BoxSpec]) -> List[PackedBox]:
+    """
+    Pack items into the fewest boxes, then downsize each box to the smallest one
+    that holds its contents. Every box is tried as the preferred size for new boxes
+    and the packing with the fewest boxes, then the least total box volume, wins.
+
+    Units that fit no box are returned as their own packages (box None). Results
+    are cached per packing_fingerprint.
+
+    Args:
+        items: Item kinds with dimensions (cm), unit weight (kg) and quantity
+        boxes: Available box sizes
+
+    Returns:
+        list: PackedBox per package
+    """
+    items = [item for item in items if item.quantity > 0]
+    if not items:
+        return []
+    fingerprint = packing_fingerprint(items, boxes)
+    with _packings_lock:
+        cached = _packings.get(fingerprint)
+        if cached is not None:
+            _packings.move_to_end(fingerprint)
+            return list(cached)
+
+    packed = tuple(_pack(items, list(boxes)))
+    with _packings_lock:
+        _packings[fingerprint] = packed
+        while len(_packings) > PACKING_CACHE_SIZE:
+            _packings.popitem(last=False)
+    return list(packed)
+
+
+def _pack(items: List[PackItem], boxes: List[BoxSpec]) -> List[PackedBox]:
+    fits = candidate_fits(items, boxes)
+    refs: List[Any] = []
+    kind_of: List[int] = []
+    units = []
+    oversize = []
+    for k, item in enumerate(items):
+        dims = item.dims
+        for _ in range(item.quantity):
+            unit = len(refs)
+            refs.append(item.ref)
+            kind_of.append(k)
+            if any(fits[k]):
+                units.append((dims, float(item.weight), unit))
+            else:
+                oversize.append(PackedBox(None, *dims, weight=float(item.weight), items=(item.ref,)))
+    # Largest units first, longest side breaking ties
+    units.sort(key=lambda u: (u[0][0] * u[0][1] * u[0][2], u[0][0]), reverse=True)
+
+    best: List[_Bin] = []
+    best_key = None
+    by_unit = {u[2]: u for u in units}
+    packed_kinds = {kind_of[u[2]] for u in units}
+    for opener in (j for j in range(len(boxes)) if any(fits[k][j] for k in packed_kinds)):
+        bins = _pack_units(units, boxes, fits, kind_of, opener)
+        bins = [_downsize(b, by_unit, boxes, fits, kind_of) for b in bins]
+        key = (len(bins), sum(b.box.volume for b in bins))
+        if best_key is None or key < best_key:
+            best, best_key = bins, key
+
+    packages = [
+        PackedBox(
+            b.box, b.box.length, b.box.width, b.box.height,
+            weight=b.weight, items=tuple(refs[u] for u in sorted(b.units)),
+        )
+        for b in best
+    ]
+    return packages + oversize
+
+
+def clear_packing_cache() -> None:
+    with _packings_lock:
+        _packings.clear()
+
+
+class CartonizationService(BaseService):
+    """
+    Packs cart and order items into the workspace's active PackageTemplates
+    """
+
+    def get_boxes(self) -> List[BoxSpec]:
+        return [
+            BoxSpec.from_template(template)
+            for template in PackageTemplate.objects.filter(workspace=self.workspace, is_active=True)
+        ]
+
+    def pack_lines(self, lines: Iterable[Any], boxes: Optional[Sequence[BoxSpec]] = None) -> List[PackedBox]:
+        """
+        Pack cart or order items (with product and variant loaded)
+
+        Lines of products that do not require shipping are left out. Units without
+        dimensions cannot be placed by volume; each one's weight goes into the first
+        box with weight to spare, otherwise into a package without dimensions.
+
+        Args:
+            lines: CartItem / OrderItem instances
+            boxes: Box sizes (default: the workspace's active templates)
+        """
+        from bfg.shop.services.checkout_pricing import get_item_unit_dimensions, get_item_unit_weight
+
+        items = []
+        loose = []
+        for line in lines:
+            if line.product is None or not line.product.requires_shipping or line.quantity <= 0:
+                continue
+            weight = float(get_item_unit_weight(line))
+            dims = get_item_unit_dimensions(line)
+            if dims is None:
+                loose.extend([weight] * line.quantity)
+                continue
+            items.append(PackItem(
+                *(float(d) for d in dims), weight=weight, quantity=line.quantity,
+                ref=line.variant_id or line.product_id,
+            ))
+
+        packages = pack_items(items, self.get_boxes() if boxes is None else boxes)
+        if loose:
+            packages = self._add_loose_weight(list(packages), loose)
+        return packages
+
+    @staticmethod
+    def _add_loose_weight(packages: List[PackedBox], weights: List[float]) -> List[PackedBox]:
+        """Add unit weights to packed boxes within their max_weight, the rest to one package without dimensions"""
+        overflow = 0.0
+        for weight in weights:
+            for index, package in enumerate(packages):
+                box = package.box
+                if box is None or (box.max_weight is not None and package.weight + weight > box.max_weight + EPSILON):
+                    continue
+                packages[index] = PackedBox(
+                    box, package.length, package.width, package.height,
+                    weight=package.weight + weight, items=package.items,
+                )
+                break
+            else:
+                overflow += weight
+        if overflow:
+            packages.append(PackedBox(None, 0.0, 0.0, 0.0, weight=overflow))
+        return packages
+
+    def packages_for_lines(self, lines: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Package dicts of pack_lines, for carrier quoting"""
+        return [package.to_package_dict() for package in self.pack_lines(lines)]
+
+    def billing_weight(self, lines: Iterable[Any], volumetric_factor: Optional[int]) -> Decimal:
+        """Sum of the packed packages' billing weights (actual vs volumetric)"""
+        return calculate_packages_billing_weight(self.packages_for_lines(lines), volumetric_factor)
@@ -9,9 +9,13 @@ from datetime import datetime, date
 from django.db import models, transaction
 from django.db.models import QuerySet
 from django.conf import settings
+from django.utils import timezone
 from bfg.core.services import BaseService
+from bfg.core.numbering import next_number_after, number_allocator
 from bfg.core.exceptions import ValidationError
 from bfg.delivery.exceptions import DeliveryUnavailable
+from bfg.delivery.services.quote_aggregator import QuoteAggregator, shipping_option_to_dict
+from bfg.delivery.services.tracking_sync import TrackingSyncService
 from bfg.delivery.models import (
     Warehouse, Carrier, FreightService, Manifest, Consignment,
     Package, TrackingEvent, FreightStatus, FreightState
@@ -124,25 +128,17 @@ class DeliveryService(BaseService):
         """
         Generate unique consignment number
         
+        Format: CON-YYYYMMDD-XXXXX, numbered per day from a sequence shared by
+        all workspaces (consignment_number is globally unique)
+        
         Returns:
             str: Consignment number
         """
-        import random
-        import string
-        from django.utils import timezone
-        
-        # Format: CON-YYYYMMDD-XXXXX
-        date_str = timezone.now().strftime('%Y%m%d')
-        random_str = ''.join(random.choices(string.digits, k=5))
-        
-        consignment_number = f"CON-{date_str}-{random_str}"
-        
-        # Ensure uniqueness
-        while Consignment.objects.filter(consignment_number=consignment_number).exists():
-            random_str = ''.join(random.choices(string.digits, k=5))
-            consignment_number = f"CON-{date_str}-{random_str}"
-        
-        return consignment_number
+        prefix = f"CON-{timezone.now().strftime('%Y%m%d')}-"
+        number = number_allocator.allocate(
+            prefix, seed=lambda: next_number_after(Consignment.objects.all(), 'consignment_number', prefix)
+        )
+        return f"{prefix}{number:05d}"
     
     @transaction.atomic
     def create_package(
@@ -524,44 +520,61 @@ class DeliveryService(BaseService):
             
             logger.info(f"Carrier {carrier.name} returned {len(options)} shipping options")
             
-            # Convert ShippingOption objects to dicts, extracting carrier info from extra_data
-            result_options = []
-            for opt in options:
-                option_dict = {
-                    'service_code': opt.service_code,
-                    'service_name': opt.service_name,
-                    'price': str(opt.price),
-                    'currency': opt.currency,
-                    'estimated_days_min': opt.estimated_days_min,
-                    'estimated_days_max': opt.estimated_days_max,
-                }
-                
-                # Extract carrier information from extra_data if available
-                if opt.extra_data:
-                    quote_info = opt.extra_data.get('quote', {})
-                    if quote_info:
-                        # Extract carrier_name from quote info
-                        carrier_name = quote_info.get('carrier_name')
-                        if carrier_name:
-                            option_dict['carrier_name'] = carrier_name
-                        
-                        # Extract carrier_id if available
-                        carrier_id = quote_info.get('carrier_id')
-                        if carrier_id:
-                            option_dict['carrier_id'] = carrier_id
-                        
-                        # Extract carrier_method_desc for additional description
-                        carrier_method_desc = quote_info.get('carrier_method_desc')
-                        if carrier_method_desc:
-                            option_dict['carrier_method_desc'] = carrier_method_desc
-                
-                result_options.append(option_dict)
-            
-            return result_options
+            return [shipping_option_to_dict(opt) for opt in options]
         except Exception as e:
             logger.error(f"Error getting shipping options from carrier {carrier.name}: {e}", exc_info=True)
             raise
     
+    def get_quote_carriers(self, destination_country: str = '') -> QuerySet:
+        """
+        Active carriers with a plugin that ships to destination_country
+        (any country when empty).
+        """
+        from bfg.delivery.carriers.loader import CarrierLoader
+
+        carriers = Carrier.objects.filter(workspace=self.workspace, is_active=True).exclude(carrier_type='')
+        eligible = []
+        for carrier in carriers:
+            plugin_class = CarrierLoader.get_plugin_class(carrier.carrier_type)
+            if plugin_class is None:
+                continue
+            if destination_country and destination_country.upper() not in plugin_class.supported_countries:
+                continue
+            eligible.append(carrier.id)
+        return carriers.filter(id__in=eligible)
+
+    def get_shipping_quotes(
+        self,
+        sender_address: Address,
+        recipient_address: Address,
+        packages: List[Dict[str, Any]],
+        carriers: Optional[List[Carrier]] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get shipping options from several carriers at once (see QuoteAggregator).
+        
+        Carriers are asked in parallel, each with its own deadline; a carrier that
+        fails or times out is reported with an error instead of failing the call.
+        
+        Args:
+            sender_address: Sender address
+            recipient_address: Recipient address
+            packages: List of package dicts
+            carriers: Carriers to ask (default: every eligible carrier)
+            timeout: Seconds to wait for each carrier (default: CARRIER_QUOTE_TIMEOUT)
+            
+        Returns:
+            One dict per carrier: carrier_id, carrier_name, options, error, timed_out, cached
+        """
+        recipient_dict = self._address_to_dict(recipient_address)
+        if carriers is None:
+            carriers = list(self.get_quote_carriers(recipient_dict['country']))
+        results = QuoteAggregator(timeout=timeout).get_quotes(
+            carriers, self._address_to_dict(sender_address), recipient_dict, packages
+        )
+        return [quotes.to_dict() for quotes in results]
+    
     @transaction.atomic
     def ship_consignment(
         self,
@@ -795,43 +808,11 @@ class DeliveryService(BaseService):
                 'error': result.error
             }
         
-        # Add new tracking events
-        for event_data in result.events:
-            # Check if event already exists (by timestamp)
-            from django.utils.dateparse import parse_datetime
-            event_time = parse_datetime(event_data.event_time)
-            
-            existing = TrackingEvent.objects.filter(
-                content_type__model='consignment',
-                object_id=consignment.id,
-                event_time=event_time,
-            ).exists()
-            
-            if not existing and event_time:
-                self.add_tracking_event(
-                    consignment,
-                    event_data.event_type,
-                    event_data.description,
-                    location=event_data.location,
-                    event_time=event_time,
-                    is_public=True
-                )
-        
-        # Update delivered status if applicable
-        if result.is_delivered and consignment.state != FreightState.DELIVERED.value:
-            delivered_status = FreightStatus.objects.filter(
-                workspace=self.workspace,
-                type='consignment',
-                state=FreightState.DELIVERED.value
-            ).first()
-            
-            if delivered_status:
-                from django.utils import timezone
-                consignment.status = delivered_status
-                consignment.state = FreightState.DELIVERED.value
-                consignment.actual_delivery = timezone.now()
-                consignment.save()
-                self.emit_event('consignment.delivered', {'consignment': consignment})
+        # Store new events (deduplicated by event time) and the delivered state
+        TrackingSyncService(workspace=self.workspace, user=self.user).apply_tracking_results(
+            [(consignment, result)]
+        )
+        Consignment.objects.filter(id=consignment.id).update(tracking_synced_at=timezone.now())
         
         return {
             'success': True,
@@ -924,25 +905,17 @@ class ManifestService(BaseService):
         """
         Generate unique manifest number
         
+        Format: MAN-YYYYMMDD-XXXXX, numbered per day from a sequence shared by
+        all workspaces (manifest_number is globally unique)
+        
         Returns:
             str: Manifest number
         """
-        import random
-        import string
-        from django.utils import timezone
-        
-        # Format: MAN-YYYYMMDD-XXXXX
-        date_str = timezone.now().strftime('%Y%m%d')
-        random_str = ''.join(random.choices(string.digits, k=5))
-        
-        manifest_number = f"MAN-{date_str}-{random_str}"
-        
-        # Ensure uniqueness
-        while Manifest.objects.filter(manifest_number=manifest_number).exists():
-            random_str = ''.join(random.choices(string.digits, k=5))
-            manifest_number = f"MAN-{date_str}-{random_str}"
-        
-        return manifest_number
+        prefix = f"MAN-{timezone.now().strftime('%Y%m%d')}-"
+        number = number_allocator.allocate(
+            prefix, seed=lambda: next_number_after(Manifest.objects.all(), 'manifest_number', prefix)
+        )
+        return f"{prefix}{number:05d}"
     
     @transaction.atomic
     def add_consignment_to_manifest(
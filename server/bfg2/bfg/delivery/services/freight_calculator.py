@@ -4,11 +4,18 @@ Freight config-based calculator (billing weight, base shipping cost, conditional
 Belongs to bfg.delivery; no dependency on apps.wms.
 """
 
+from collections import OrderedDict
 from decimal import Decimal
 import math
-from typing import Any, Callable, Dict, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from bfg.core.condition_engine import get_condition_engine
+from bfg.core.condition_engine import CompiledCondition, condition_fingerprint, get_condition_engine
+
+# Compiled pricing rule plans, keyed by content hash of pricing_rules
+RULE_PLAN_CACHE_SIZE = 256
+_rule_plans: "OrderedDict[str, Tuple[Tuple[int, Optional[CompiledCondition]], ...]]" = OrderedDict()
+_rule_plans_lock = threading.Lock()
 
 
 def calculate_billing_weight(
@@ -30,6 +37,26 @@ def calculate_billing_weight(
     return max(actual_weight, volumetric_weight.quantize(Decimal("0.01")))
 
 
+def calculate_packages_billing_weight(
+    packages: List[Dict[str, Any]],
+    volumetric_factor: Optional[int] = None,
+) -> Decimal:
+    """
+    Sum of calculate_billing_weight over package dicts (weight, length, width, height),
+    e.g. the packages of cartonization.
+    """
+    total = Decimal("0")
+    for package in packages:
+        total += calculate_billing_weight(
+            Decimal(str(package.get("weight") or 0)),
+            package.get("length"),
+            package.get("width"),
+            package.get("height"),
+            volumetric_factor,
+        )
+    return total
+
+
 def normalize_conditions(conditions: Any) -> Optional[Dict[str, Any]]:
     """
     Convert template-style conditions (list of {type, value}) to engine format
@@ -60,6 +87,41 @@ def normalize_conditions(conditions: Any) -> Optional[Dict[str, Any]]:
     return {"operator": "AND", "rules": rules_out}
 
 
+def _get_rule_plan(
+    pricing_rules: List[Dict[str, Any]]
+) -> Tuple[Tuple[int, Optional[CompiledCondition]], ...]:
+    """
+    Pricing rules sorted by priority with compiled conditions, cached by content.
+    Each entry is (index in pricing_rules, predicate or None when the rule always matches);
+    rules whose conditions normalize to nothing are left out.
+    """
+    fingerprint = condition_fingerprint(pricing_rules)
+    with _rule_plans_lock:
+        plan = _rule_plans.get(fingerprint)
+        if plan is not None:
+            _rule_plans.move_to_end(fingerprint)
+            return plan
+
+    engine = get_condition_engine()
+    entries = []
+    order = sorted(range(len(pricing_rules)), key=lambda i: pricing_rules[i].get("priority", 999))
+    for index in order:
+        raw_conditions = pricing_rules[index].get("conditions")
+        conditions = normalize_conditions(raw_conditions)
+        if conditions is None:
+            if not raw_conditions:
+                entries.append((index, None))
+            continue
+        entries.append((index, engine.compile(conditions)))
+    plan = tuple(entries)
+
+    with _rule_plans_lock:
+        _rule_plans[fingerprint] = plan
+        while len(_rule_plans) > RULE_PLAN_CACHE_SIZE:
+            _rule_plans.popitem(last=False)
+    return plan
+
+
 def find_matching_rule(
     config: Dict[str, Any], context: Dict[str, Any]
 ) -> Optional[Dict[str, Any]]:
@@ -70,20 +132,33 @@ def find_matching_rule(
     pricing_rules = config.get("pricing_rules", [])
     if not pricing_rules:
         return None
-    sorted_rules = sorted(pricing_rules, key=lambda r: r.get("priority", 999))
-    engine = get_condition_engine()
-    for rule in sorted_rules:
-        raw_conditions = rule.get("conditions")
-        conditions = normalize_conditions(raw_conditions)
-        if conditions is None:
-            if not raw_conditions:
-                return rule
-            continue
-        if engine.evaluate(conditions, context):
-            return rule
+    for index, predicate in _get_rule_plan(pricing_rules):
+        if predicate is None or predicate(context):
+            return pricing_rules[index]
     return None
 
 
+def find_matching_rules(
+    config: Dict[str, Any], contexts: List[Dict[str, Any]]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    find_matching_rule for many contexts (e.g. quoting several carts) with one rule plan.
+    """
+    pricing_rules = config.get("pricing_rules", [])
+    if not pricing_rules:
+        return [None] * len(contexts)
+    plan = _get_rule_plan(pricing_rules)
+    matches = []
+    for context in contexts:
+        matched = None
+        for index, predicate in plan:
+            if predicate is None or predicate(context):
+                matched = pricing_rules[index]
+                break
+        matches.append(matched)
+    return matches
+
+
 def resolve_conditional_config(
     config: Dict[str, Any], context: Dict[str, Any]
 ) -> Dict[str, Any]:
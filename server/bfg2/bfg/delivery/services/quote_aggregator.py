@@ -0,0 +1,255 @@
+"""
+BFG Delivery Quote Aggregator
+
+Shipping quotes from several carriers at once: one worker thread per carrier,
+a deadline per carrier, partial results, a short-lived quote cache keyed by a
+shipment fingerprint, and coalescing of identical in-flight requests
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds a carrier's quotes are reused for the same shipment
+# (override with BFG2_SETTINGS['CARRIER_QUOTE_CACHE_TTL'])
+CARRIER_QUOTE_CACHE_TTL = 120
+# Seconds to wait for each carrier before returning without its quotes
+# (override with BFG2_SETTINGS['CARRIER_QUOTE_TIMEOUT'])
+CARRIER_QUOTE_TIMEOUT = 8.0
+# Worker threads shared by all quote requests in a process
+# (override with BFG2_SETTINGS['CARRIER_QUOTE_WORKERS'])
+CARRIER_QUOTE_WORKERS = 16
+
+QUOTE_CACHE_PREFIX = 'delivery:carrier_quotes'
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, 'BFG2_SETTINGS', {}).get(name, default)
+
+
+def shipping_option_to_dict(option) -> Dict[str, Any]:
+    """
+    ShippingOption -> JSON-serializable dict, with the carrier details of
+    aggregator plugins (e.g. ParcelPort) taken from extra_data['quote']
+    """
+    result = {
+        'service_code': option.service_code,
+        'service_name': option.service_name,
+        'price': str(option.price),
+        'currency': option.currency,
+        'estimated_days_min': option.estimated_days_min,
+        'estimated_days_max': option.estimated_days_max,
+    }
+    quote_info = (option.extra_data or {}).get('quote') or {}
+    for key in ('carrier_name', 'carrier_id', 'carrier_method_desc'):
+        if quote_info.get(key):
+            result[key] = quote_info[key]
+    return result
+
+
+def _round(value: Any, places: str) -> str:
+    return str(Decimal(str(value or 0)).quantize(Decimal(places), rounding=ROUND_HALF_UP))
+
+
+def quote_fingerprint(
+    sender_address: Dict[str, Any],
+    recipient_address: Dict[str, Any],
+    packages: List[Dict[str, Any]]
+) -> str:
+    """
+    Fingerprint of a shipment for quote caching
+
+    Uses the origin (country, postcode, city), the destination (country, postcode)
+    and each package's weight (to 10 g) and dimensions (to 1 mm, largest first);
+    names, street lines and package order do not change it.
+
+    Args:
+        sender_address: Plugin address dict (see DeliveryService._address_to_dict)
+        recipient_address: Plugin address dict
+        packages: Plugin package dicts
+    """
+    def place(address):
+        return [
+            (address.get('country') or '').strip().upper(),
+            (address.get('postal_code') or '').replace(' ', '').upper(),
+        ]
+
+    parcels = sorted(
+        [
+            _round(pkg.get('weight', 1), '0.01'),
+            sorted((_round(pkg.get(dim, 10), '0.1') for dim in ('length', 'width', 'height')),
+                   key=Decimal, reverse=True),
+            pkg.get('kind') or 0,
+            pkg.get('group_id') or '',
+        ]
+        for pkg in packages
+    )
+    payload = {
+        'origin': place(sender_address) + [(sender_address.get('city') or '').strip().lower()],
+        'destination': place(recipient_address),
+        'packages': parcels,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def quote_cache_key(carrier, fingerprint: str) -> str:
+    """Editing a carrier (credentials, test mode) gives its quotes a new key."""
+    version = carrier.updated_at.timestamp() if carrier.updated_at else 0
+    return f'{QUOTE_CACHE_PREFIX}:{carrier.id}:{version}:{fingerprint}'
+
+
+@dataclass
+class CarrierQuotes:
+    """Quotes of one carrier; error or timed_out when it had none to give."""
+    carrier: Any
+    options: List[Dict[str, Any]] = field(default_factory=list)
+    error: str = ''
+    timed_out: bool = False
+    cached: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'carrier_id': self.carrier.id,
+            'carrier_name': self.carrier.name,
+            'options': self.options,
+            'error': self.error,
+            'timed_out': self.timed_out,
+            'cached': self.cached,
+        }
+
+
+# Quote requests running now, by cache key: identical requests share one Future
+_in_flight: Dict[str, Future] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _lock:
+        # A forked worker inherits the parent's pool object but not its threads
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=int(_setting('CARRIER_QUOTE_WORKERS', CARRIER_QUOTE_WORKERS)),
+                thread_name_prefix='carrier-quote',
+            )
+            _executor_pid = os.getpid()
+            _in_flight.clear()
+        return _executor
+
+
+def _fetch_quotes(key: str, plugin, sender: Dict, recipient: Dict, packages: List[Dict], future: Future) -> None:
+    # Runs in a worker thread: HTTP only, no database access
+    try:
+        options = [
+            shipping_option_to_dict(option)
+            for option in plugin.get_shipping_options(sender, recipient, packages)
+        ]
+        if options:
+            # Empty answers are often swallowed errors: ask again next time
+            cache.set(key, options, int(_setting('CARRIER_QUOTE_CACHE_TTL', CARRIER_QUOTE_CACHE_TTL)))
+        future.set_result(options)
+    except Exception as e:
+        logger.warning(f"Carrier {plugin.carrier.name} quote request failed: {e}")
+        future.set_exception(e)
+    finally:
+        with _lock:
+            if _in_flight.get(key) is future:
+                del _in_flight[key]
+
+
+class QuoteAggregator:
+    """
+    Shipping quotes from several carriers for one shipment
+
+    Each carrier is asked in its own worker thread and gets `timeout` seconds;
+    slower carriers are reported as timed out while the others' quotes are
+    returned. A carrier answering after its deadline still fills the cache, so
+    the next request for the same shipment gets its quotes.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        if timeout is None:
+            timeout = _setting('CARRIER_QUOTE_TIMEOUT', CARRIER_QUOTE_TIMEOUT)
+        self.timeout = float(timeout)
+
+    def get_quotes(
+        self,
+        carriers: Iterable[Any],
+        sender_address: Dict[str, Any],
+        recipient_address: Dict[str, Any],
+        packages: List[Dict[str, Any]]
+    ) -> List[CarrierQuotes]:
+        """
+        Quotes from each carrier, in carrier order
+
+        Args:
+            carriers: Carrier instances
+            sender_address: Plugin address dict
+            recipient_address: Plugin address dict
+            packages: Plugin package dicts
+
+        Returns:
+            List[CarrierQuotes]: One entry per carrier
+        """
+        from bfg.delivery.carriers import get_carrier_plugin
+
+        fingerprint = quote_fingerprint(sender_address, recipient_address, packages)
+        started = time.monotonic()
+        results = []
+        pending = []
+        for carrier in carriers:
+            quotes = CarrierQuotes(carrier=carrier)
+            results.append(quotes)
+            key = quote_cache_key(carrier, fingerprint)
+            options = cache.get(key)
+            if options is not None:
+                quotes.options = options
+                quotes.cached = True
+                continue
+            with _lock:
+                future = _in_flight.get(key)
+            if future is None:
+                # Plugins are built here: their constructors may read or save the carrier
+                plugin = get_carrier_plugin(carrier)
+                if plugin is None:
+                    quotes.error = f'No plugin available for carrier type {carrier.carrier_type!r}'
+                    continue
+                future = self._submit(key, plugin, sender_address, recipient_address, packages)
+            pending.append((quotes, future))
+
+        deadline = started + self.timeout
+        for quotes, future in pending:
+            try:
+                quotes.options = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                quotes.timed_out = True
+                quotes.error = f'No response within {self.timeout:g}s'
+            except Exception as e:
+                quotes.error = str(e)
+        return results
+
+    def _submit(self, key: str, plugin, sender: Dict, recipient: Dict, packages: List[Dict]) -> Future:
+        executor = _get_executor()
+        with _lock:
+            # Another request may have started the same one meanwhile
+            future = _in_flight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            _in_flight[key] = future
+        executor.submit(_fetch_quotes, key, plugin, sender, recipient, packages, future)
+        return future
@@ -0,0 +1,256 @@
+"""
+BFG Delivery Tracking Sync
+
+Batch tracking refresh of in-flight consignments: picks consignments due for a
+refresh, asks each carrier for their tracking in batches and writes new events
+and delivered states in bulk
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from bfg.core.services import BaseService
+from bfg.delivery.models import Consignment, FreightService, FreightState, FreightStatus, TrackingEvent
+
+logger = logging.getLogger(__name__)
+
+# Seconds between tracking refreshes of a consignment, by state
+# (override with BFG2_SETTINGS['TRACKING_SYNC_INTERVALS'])
+DEFAULT_TRACKING_SYNC_INTERVALS = {
+    FreightState.SHIPPED.value: 60 * 60,
+    FreightState.READY.value: 6 * 60 * 60,
+}
+# Consignments created longer ago than this are no longer polled
+# (override with BFG2_SETTINGS['TRACKING_SYNC_MAX_AGE_DAYS'])
+TRACKING_SYNC_MAX_AGE_DAYS = 60
+# Consignments loaded and written per round
+TRACKING_SYNC_BATCH_SIZE = 500
+
+
+def get_tracking_sync_intervals() -> Dict[str, int]:
+    return {
+        **DEFAULT_TRACKING_SYNC_INTERVALS,
+        **getattr(settings, 'BFG2_SETTINGS', {}).get('TRACKING_SYNC_INTERVALS', {}),
+    }
+
+
+def due_for_tracking(now: Optional[datetime] = None, workspace=None) -> QuerySet:
+    """
+    Consignments whose tracking should be refreshed now, never-synced first
+
+    A consignment is due when it has a tracking number, is in a state listed in the
+    sync intervals, is younger than TRACKING_SYNC_MAX_AGE_DAYS and was last synced
+    longer ago than its state's interval.
+
+    Args:
+        now: Reference time (default: now)
+        workspace: Limit to one workspace (default: all)
+    """
+    now = now or timezone.now()
+    max_age = getattr(settings, 'BFG2_SETTINGS', {}).get('TRACKING_SYNC_MAX_AGE_DAYS', TRACKING_SYNC_MAX_AGE_DAYS)
+    due = Q()
+    for state, interval in get_tracking_sync_intervals().items():
+        due |= Q(state=state) & (
+            Q(tracking_synced_at__isnull=True) | Q(tracking_synced_at__lte=now - timedelta(seconds=interval))
+        )
+    queryset = Consignment.objects.filter(due, created_at__gte=now - timedelta(days=max_age)).exclude(tracking_number='')
+    if workspace is not None:
+        queryset = queryset.filter(workspace=workspace)
+    return queryset.order_by(F('tracking_synced_at').asc(nulls_first=True), 'id')
+
+
+def _event_time(value: str) -> Optional[datetime]:
+    # Carriers send local times without offset: read them in the default timezone,
+    # as saving them would, so they compare equal to the stored events
+    event_time = parse_datetime(value) if value else None
+    if event_time is not None and timezone.is_naive(event_time):
+        event_time = timezone.make_aware(event_time)
+    return event_time
+
+
+class TrackingSyncService(BaseService):
+    """
+    Batch tracking sync for consignments
+
+    Without a workspace, works across all workspaces (the scheduled poller);
+    consignment.delivered is emitted with each consignment's own workspace.
+    """
+
+    def sync_due(self, limit: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Sync every consignment due for a refresh, TRACKING_SYNC_BATCH_SIZE at a time
+
+        Args:
+            limit: Stop after this many consignments (default: all due)
+            now: Reference time (default: now)
+
+        Returns:
+            dict: Totals of sync_consignments
+        """
+        now = now or timezone.now()
+        totals = defaultdict(int)
+        while limit is None or totals['consignments'] < limit:
+            size = TRACKING_SYNC_BATCH_SIZE if limit is None else min(TRACKING_SYNC_BATCH_SIZE, limit - totals['consignments'])
+            # Synced consignments get a new tracking_synced_at and drop out of the due set
+            batch = list(due_for_tracking(now, self.workspace).select_related('workspace')[:size])
+            if not batch:
+                break
+            for key, value in self.sync_consignments(batch, now=now).items():
+                totals[key] += value
+        return dict(totals)
+
+    def sync_consignments(self, consignments: Iterable[Consignment], now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Fetch tracking for consignments (grouped by carrier, in plugin batches) and
+        store the results
+
+        Every consignment gets tracking_synced_at = now, also when its carrier has no
+        tracking API or the lookup failed, so it is retried only after its interval.
+
+        Args:
+            consignments: Consignments
+
+        Returns:
+            dict: consignments, failed, events (created), delivered
+        """
+        from bfg.delivery.carriers import get_carrier_plugin
+
+        now = now or timezone.now()
+        consignments = [c for c in consignments if c.tracking_number]
+        # One query for the services and carriers of all consignments
+        services = FreightService.objects.select_related('carrier').in_bulk({c.service_id for c in consignments})
+        by_carrier = defaultdict(list)
+        carriers = {}
+        for consignment in consignments:
+            carrier = services[consignment.service_id].carrier
+            carriers[carrier.id] = carrier
+            by_carrier[carrier.id].append(consignment)
+
+        results = []
+        failed = 0
+        for carrier_id, group in by_carrier.items():
+            carrier = carriers[carrier_id]
+            plugin = get_carrier_plugin(carrier)
+            if plugin is None or not plugin.supports_tracking:
+                continue
+            batch_size = max(1, plugin.tracking_batch_size)
+            for start in range(0, len(group), batch_size):
+                batch = group[start:start + batch_size]
+                try:
+                    found = plugin.get_tracking_many([c.tracking_number for c in batch])
+                except Exception as e:
+                    logger.error(f"Tracking sync for carrier {carrier.name} failed: {e}", exc_info=True)
+                    failed += len(batch)
+                    continue
+                for consignment in batch:
+                    result = found.get(consignment.tracking_number)
+                    if result is not None and result.success:
+                        results.append((consignment, result))
+                    else:
+                        failed += 1
+
+        stats = self.apply_tracking_results(results, now=now)
+        Consignment.objects.filter(id__in=[c.id for c in consignments]).update(tracking_synced_at=now)
+        stats.update(consignments=len(consignments), failed=failed)
+        return stats
+
+    @transaction.atomic
+    def apply_tracking_results(self, results: List[Tuple[Consignment, Any]], now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Store carrier tracking results: new events in one bulk insert, delivered
+        consignments in one update per delivered status
+
+        Events are deduplicated by (consignment, event time) against one query of
+        the events already stored for all the consignments.
+
+        Args:
+            results: (consignment, TrackingResult) pairs
+
+        Returns:
+            dict: events (created), delivered
+        """
+        now = now or timezone.now()
+        if not results:
+            return {'events': 0, 'delivered': 0}
+        content_type = ContentType.objects.get_for_model(Consignment)
+        ids = [consignment.id for consignment, _ in results]
+        seen: Set[Tuple[int, datetime]] = set(
+            TrackingEvent.objects.filter(content_type=content_type, object_id__in=ids)
+            .values_list('object_id', 'event_time')
+        )
+
+        events = []
+        delivered = []
+        for consignment, result in results:
+            for event_data in result.events:
+                event_time = _event_time(event_data.event_time)
+                if event_time is None or (consignment.id, event_time) in seen:
+                    continue
+                seen.add((consignment.id, event_time))
+                events.append(TrackingEvent(
+                    workspace_id=consignment.workspace_id,
+                    content_type=content_type,
+                    object_id=consignment.id,
+                    event_type=event_data.event_type,
+                    description=event_data.description,
+                    location=event_data.location,
+                    event_time=event_time,
+                    is_public=True,
+                    created_by=self.user,
+                ))
+            if result.is_delivered and consignment.state != FreightState.DELIVERED.value:
+                delivered.append(consignment)
+        TrackingEvent.objects.bulk_create(events, batch_size=1000)
+
+        delivered = self._mark_delivered(delivered, now)
+        return {'events': len(events), 'delivered': len(delivered)}
+
+    def _mark_delivered(self, consignments: List[Consignment], now: datetime) -> List[Consignment]:
+        if not consignments:
+            return []
+        statuses = {}
+        for status in FreightStatus.objects.filter(
+            workspace_id__in={c.workspace_id for c in consignments},
+            type='consignment',
+            state=FreightState.DELIVERED.value,
+        ):
+            # Default ordering: the first one per workspace, as sync_tracking picks
+            statuses.setdefault(status.workspace_id, status)
+
+        by_status = defaultdict(list)
+        for consignment in consignments:
+            status = statuses.get(consignment.workspace_id)
+            if status is None:
+                continue
+            consignment.status = status
+            consignment.state = FreightState.DELIVERED.value
+            consignment.actual_delivery = now
+            by_status[status.id].append(consignment)
+        for status_id, group in by_status.items():
+            Consignment.objects.filter(id__in=[c.id for c in group]).update(
+                status_id=status_id, state=FreightState.DELIVERED.value, actual_delivery=now, updated_at=now,
+            )
+
+        updated = [c for group in by_status.values() for c in group]
+        transaction.on_commit(lambda: self._emit_delivered(updated))
+        return updated
+
+    def _emit_delivered(self, consignments: List[Consignment]) -> None:
+        for consignment in consignments:
+            try:
+                self.events.dispatch('consignment.delivered', {
+                    'workspace': self.workspace or consignment.workspace,
+                    'user': self.user,
+                    'data': {'consignment': consignment},
+                })
+            except Exception as e:
+                logger.error(f"consignment.delivered handlers failed for {consignment.id}: {e}", exc_info=True)
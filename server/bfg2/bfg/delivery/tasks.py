@@ -0,0 +1,50 @@
+"""
+BFG Delivery Module
+
+Celery tasks for scheduled delivery work (carrier tracking sync)
+"""
+
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Most consignments one sync_consignment_tracking run handles; the rest stay due
+# for the next run (override with BFG2_SETTINGS['TRACKING_SYNC_MAX_PER_RUN'])
+TRACKING_SYNC_MAX_PER_RUN = 50000
+# Only one run at a time: a run still going when the next is due makes that one skip
+TRACKING_SYNC_LOCK_KEY = 'delivery:tracking_sync:lock'
+TRACKING_SYNC_LOCK_TIMEOUT = 60 * 60
+
+
+@shared_task
+def sync_consignment_tracking():
+    """
+    Refresh carrier tracking of every in-flight consignment that is due
+    (see delivery.services.tracking_sync.due_for_tracking), grouped by carrier,
+    storing new events and delivered states in bulk.
+    Register in Celery beat, e.g. every 10 minutes (each consignment is still only
+    polled once per interval of its state):
+        'sync_consignment_tracking': {
+            'task': 'bfg.delivery.tasks.sync_consignment_tracking',
+            'schedule': crontab(minute='*/10'),
+        }
+    """
+    from bfg.delivery.services import TrackingSyncService
+
+    if not cache.add(TRACKING_SYNC_LOCK_KEY, 1, TRACKING_SYNC_LOCK_TIMEOUT):
+        logger.info("Tracking sync already running, skipped")
+        return None
+    try:
+        limit = getattr(settings, 'BFG2_SETTINGS', {}).get('TRACKING_SYNC_MAX_PER_RUN', TRACKING_SYNC_MAX_PER_RUN)
+        stats = TrackingSyncService(workspace=None, user=None).sync_due(limit=limit)
+    finally:
+        cache.delete(TRACKING_SYNC_LOCK_KEY)
+    logger.info(
+        "Tracking sync: %s consignments, %s failed, %s new events, %s delivered",
+        stats.get('consignments', 0), stats.get('failed', 0), stats.get('events', 0), stats.get('delivered', 0),
+    )
+    return stats
@@ -24,7 +24,7 @@ from bfg.delivery.serializers import (
     PackageSerializer, TrackingEventSerializer, FreightStatusSerializer,
     DeliveryZoneSerializer, PackagingTypeSerializer, PackageTemplateSerializer
 )
-from bfg.delivery.services import DeliveryService, ManifestService
+from bfg.delivery.services import CartonizationService, DeliveryService, ManifestService
 from bfg.delivery.schemas import (
     get_carrier_config_schema,
     get_carrier_form_schema,
@@ -125,6 +125,20 @@ class CarrierViewSet(viewsets.ModelViewSet):
         
         return Response(plugins)
 
+    @action(detail=False, methods=['get'])
+    def http_stats(self, request):
+        """
+        Carrier API call counters of the serving process: requests, errors,
+        retries, calls rejected by an open circuit, latency percentiles and
+        circuit state per host, keyed by 'carrier:<carrier_type>'.
+        """
+        from bfg.core.http import http_client_stats
+
+        return Response({
+            name: stats for name, stats in http_client_stats().items()
+            if name.startswith('carrier:')
+        })
+
     @action(detail=False, methods=['get'])
     def config_schema(self, request):
         """
@@ -135,182 +149,208 @@ class CarrierViewSet(viewsets.ModelViewSet):
             'form_schema': get_carrier_form_schema(),
         })
     
-    @action(detail=True, methods=['post'])
-    def get_shipping_options(self, request, pk=None):
+    def _get_quote_sender(self, request, pickup_address):
         """
-        Get shipping options from carrier plugin for an order.
+        Sender Address for quotes: pickup_address when given, else the default
+        (or any active) warehouse; None when neither is available.
+        """
+        from bfg.common.models import Address
         
-        POST /api/v1/carriers/{id}/get_shipping_options/
-        Body: {
-            "order_id": 123,
-            "pickup_address": {  // optional, uses default warehouse if not provided
-                "name": "Warehouse Name",
-                "address_line1": "123 Main St",
-                "address_line2": "",
-                "city": "Auckland",
-                "state": "",
-                "postal_code": "1010",
-                "country": "NZ",
-                "phone": ""
-            }
-        }
+        if pickup_address:
+            return Address(
+                workspace=request.workspace,
+                full_name=pickup_address.get('name', ''),
+                address_line1=pickup_address.get('address_line1', ''),
+                address_line2=pickup_address.get('address_line2', ''),
+                city=pickup_address.get('city', ''),
+                state=pickup_address.get('state', ''),
+                postal_code=pickup_address.get('postal_code', ''),
+                country=pickup_address.get('country', 'NZ'),
+                phone=pickup_address.get('phone', ''),
+                email='',
+                company='',
+            )
         
-        Returns list of shipping options with service_code, name, price
+        # Fallback to default warehouse
+        warehouse = Warehouse.objects.filter(
+            workspace=request.workspace,
+            is_default=True,
+            is_active=True
+        ).first()
+        if not warehouse:
+            warehouse = Warehouse.objects.filter(
+                workspace=request.workspace,
+                is_active=True
+            ).first()
+        if not warehouse:
+            return None
+        
+        sender = Address(
+            workspace=request.workspace,
+            full_name=warehouse.name,
+            address_line1=warehouse.address_line1,
+            address_line2=warehouse.address_line2 or '',
+            city=warehouse.city,
+            state=warehouse.state or '',
+            postal_code=warehouse.postal_code,
+            country=warehouse.country or 'NZ',
+            phone=warehouse.phone or '',
+            email=warehouse.email or '',
+            company='',
+        )
+        # Coordinates are passed on to plugins (see DeliveryService._address_to_dict)
+        if warehouse.latitude:
+            sender.latitude = warehouse.latitude
+        if warehouse.longitude:
+            sender.longitude = warehouse.longitude
+        return sender
+    
+    def _get_quote_request(self, request):
+        """
+        Order, sender Address and package dicts of a quote request, or an error Response.
+        
+        Returns:
+            (order, sender, packages, None) or (None, None, None, Response)
         """
         from bfg.shop.models import Order
-        from bfg.common.models import Address
-        from bfg.delivery.services import DeliveryService
         
-        carrier = self.get_object()
         order_id = request.data.get('order_id')
-        pickup_address = request.data.get('pickup_address')
-        
         if not order_id:
-            return Response(
+            return None, None, None, Response(
                 {'detail': 'order_id is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get order
         try:
             order = Order.objects.get(id=order_id, workspace=request.workspace)
         except Order.DoesNotExist:
-            return Response(
+            return None, None, None, Response(
                 {'detail': 'Order not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Build sender address dict
-        if pickup_address:
-            # Use provided pickup address
-            sender_address_dict = {
-                'full_name': pickup_address.get('name', ''),
-                'address_line1': pickup_address.get('address_line1', ''),
-                'address_line2': pickup_address.get('address_line2', ''),
-                'city': pickup_address.get('city', ''),
-                'state': pickup_address.get('state', ''),
-                'postal_code': pickup_address.get('postal_code', ''),
-                'country': pickup_address.get('country', 'NZ'),
-                'phone': pickup_address.get('phone', ''),
-                'email': '',
-                'company': '',
-            }
-        else:
-            # Fallback to default warehouse
-            warehouse = Warehouse.objects.filter(
-                workspace=request.workspace,
-                is_default=True,
-                is_active=True
-            ).first()
-            
-            if not warehouse:
-                warehouse = Warehouse.objects.filter(
-                    workspace=request.workspace,
-                    is_active=True
-                ).first()
-            
-            if not warehouse:
-                return Response(
-                    {'detail': 'No warehouse configured and no pickup_address provided'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Create sender address dict from warehouse
-            sender_address_dict = {
-                'full_name': warehouse.name,
-                'address_line1': warehouse.address_line1,
-                'address_line2': warehouse.address_line2 or '',
-                'city': warehouse.city,
-                'state': warehouse.state or '',
-                'postal_code': warehouse.postal_code,
-                'country': warehouse.country or 'NZ',
-                'phone': warehouse.phone or '',
-                'email': warehouse.email or '',
-                'company': '',
-            }
-            
-            # Add coordinates if available
-            if warehouse.latitude:
-                sender_address_dict['latitude'] = float(warehouse.latitude)
-            if warehouse.longitude:
-                sender_address_dict['longitude'] = float(warehouse.longitude)
+        sender = self._get_quote_sender(request, request.data.get('pickup_address'))
+        if sender is None:
+            return None, None, None, Response(
+                {'detail': 'No warehouse configured and no pickup_address provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get recipient address from order
-        recipient_address = order.shipping_address
-        if not recipient_address:
-            return Response(
+        if not order.shipping_address:
+            return None, None, None, Response(
                 {'detail': 'Order has no shipping address'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get packages from order
-        order_packages = order.packages.all()
-        if not order_packages.exists():
-            return Response(
+        order_packages = list(order.packages.all())
+        if order_packages:
+            service = DeliveryService(workspace=request.workspace, user=request.user)
+            return order, sender, service._packages_to_list(order_packages), None
+        
+        # No packages yet: pack the order items into the workspace's package templates
+        packages = CartonizationService(workspace=request.workspace, user=request.user).packages_for_lines(
+            order.items.select_related('product', 'variant')
+        )
+        if not packages or not all(package['length'] for package in packages):
+            return None, None, None, Response(
                 {'detail': 'Order has no packages'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return order, sender, packages, None
+    
+    @action(detail=True, methods=['post'])
+    def get_shipping_options(self, request, pk=None):
+        """
+        Get shipping options from carrier plugin for an order.
         
-        # Convert packages to dict format
-        packages_list = [
-            {
-                'weight': float(pkg.weight or 1),
-                'length': float(pkg.length or 10),
-                'width': float(pkg.width or 10),
-                'height': float(pkg.height or 10),
-                'description': pkg.description or 'Package',
+        POST /api/v1/carriers/{id}/get_shipping_options/
+        Body: {
+            "order_id": 123,
+            "pickup_address": {  // optional, uses default warehouse if not provided
+                "name": "Warehouse Name",
+                "address_line1": "123 Main St",
+                "address_line2": "",
+                "city": "Auckland",
+                "state": "",
+                "postal_code": "1010",
+                "country": "NZ",
+                "phone": ""
             }
-            for pkg in order_packages
-        ]
+        }
         
-        # Get shipping options from carrier plugin
-        # Convert addresses to dict format expected by plugin
+        Returns list of shipping options with service_code, name, price
+        """
         import logging
         logger = logging.getLogger(__name__)
         
-        service = DeliveryService(workspace=request.workspace, user=request.user)
-        
-        # Create temporary Address objects for conversion
-        from bfg.common.models import Address
-        temp_sender = Address(
-            workspace=request.workspace,
-            full_name=sender_address_dict['full_name'],
-            address_line1=sender_address_dict['address_line1'],
-            address_line2=sender_address_dict['address_line2'],
-            city=sender_address_dict['city'],
-            state=sender_address_dict['state'],
-            postal_code=sender_address_dict['postal_code'],
-            country=sender_address_dict['country'],
-            phone=sender_address_dict['phone'],
-            email=sender_address_dict['email'],
-            company=sender_address_dict['company'],
-        )
+        carrier = self.get_object()
+        order, sender, packages, error = self._get_quote_request(request)
+        if error is not None:
+            return error
         
-        try:
-            options = service.get_shipping_options(
-                carrier=carrier,
-                sender_address=temp_sender,
-                recipient_address=recipient_address,
-                packages=packages_list
-            )
-            
-            logger.info(f"Carrier {carrier.name} returned {len(options)} shipping options for order {order.id}")
-            
-            return Response({
-                'carrier_id': carrier.id,
-                'carrier_name': carrier.name,
-                'order_id': order.id,
-                'options': options
-            })
-        except Exception as e:
-            logger.error(f"Error getting shipping options from carrier {carrier.name}: {e}", exc_info=True)
+        service = DeliveryService(workspace=request.workspace, user=request.user)
+        quotes = service.get_shipping_quotes(
+            sender_address=sender,
+            recipient_address=order.shipping_address,
+            packages=packages,
+            carriers=[carrier],
+        )[0]
+        
+        if quotes['error']:
+            logger.error(f"Error getting shipping options from carrier {carrier.name}: {quotes['error']}")
             return Response({
                 'carrier_id': carrier.id,
                 'carrier_name': carrier.name,
                 'order_id': order.id,
                 'options': [],
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': quotes['error']
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT if quotes['timed_out'] else status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        logger.info(f"Carrier {carrier.name} returned {len(quotes['options'])} shipping options for order {order.id}")
+        return Response({
+            'carrier_id': carrier.id,
+            'carrier_name': carrier.name,
+            'order_id': order.id,
+            'options': quotes['options']
+        })
+    
+    @action(detail=False, methods=['post'])
+    def quote_shipping_options(self, request):
+        """
+        Get shipping options for an order from every eligible carrier at once.
+        
+        POST /api/v1/carriers/quote_shipping_options/
+        Body: {
+            "order_id": 123,
+            "carrier_ids": [1, 2],  // optional, defaults to every active carrier
+                                    // with a plugin shipping to the order's country
+            "pickup_address": {...}  // optional, as for get_shipping_options
+        }
+        
+        Carriers are asked in parallel; one that fails or does not answer in time
+        is listed with an error (and timed_out) while the others' options are
+        returned.
+        
+        Returns {"order_id", "carriers": [{carrier_id, carrier_name, options,
+        error, timed_out, cached}]}
+        """
+        order, sender, packages, error = self._get_quote_request(request)
+        if error is not None:
+            return error
+        
+        carriers = None
+        carrier_ids = request.data.get('carrier_ids')
+        if carrier_ids:
+            carriers = list(self.get_queryset().filter(id__in=carrier_ids))
+        
+        service = DeliveryService(workspace=request.workspace, user=request.user)
+        results = service.get_shipping_quotes(
+            sender_address=sender,
+            recipient_address=order.shipping_address,
+            packages=packages,
+            carriers=carriers,
+        )
+        return Response({'order_id': order.id, 'carriers': results})
     
     @action(detail=True, methods=['post'])
     def ship_order(self, request, pk=None):
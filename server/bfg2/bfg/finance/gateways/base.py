@@ -5,10 +5,12 @@ All payment gateway plugins must inherit from this base class
 and implement the required methods.
 """
 
+import threading
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 from decimal import Decimal
 from django.utils import timezone
+from bfg.core.http import PluginHTTPClient, get_http_client
 from bfg.finance.models import PaymentGateway, PaymentMethod, Payment, Currency
 from bfg.common.models import Customer
 
@@ -31,6 +33,10 @@ class BasePaymentGateway(ABC):
     supported_methods: list = []  # e.g., ['card', 'bank']
     # Clients that can use this gateway: 'web', 'android', 'ios', 'mp'. Empty = all.
     supported_clients: list = []
+    # Whether GatewayLoader may reuse one instance per gateway and config version.
+    # Set False when __init__ has side effects every use depends on (e.g. setting a
+    # global SDK API key).
+    cache_instances: bool = True
     
     def __init__(self, gateway: PaymentGateway):
         """
@@ -51,6 +57,22 @@ class BasePaymentGateway(ABC):
         self.gateway = gateway
         self.config = gateway.get_active_config() or {}
         self._validate_config()
+
+    @property
+    def gateway(self):
+        """
+        PaymentGateway model instance of this thread's lookup
+
+        Plugins are cached and shared across requests and threads (see the loader),
+        so each lookup binds its own gateway; threads the plugin starts itself see the
+        most recently bound one.
+        """
+        return getattr(self.__dict__['_bound'], 'gateway', self._gateway)
+
+    @gateway.setter
+    def gateway(self, gateway):
+        self.__dict__.setdefault('_bound', threading.local()).gateway = gateway
+        self._gateway = gateway
     
     def _validate_config(self):
         """
@@ -59,6 +81,18 @@ class BasePaymentGateway(ABC):
         """
         pass
     
+    @property
+    def http(self) -> PluginHTTPClient:
+        """
+        HTTP client for gateway API calls: pooled keep-alive sessions, retries
+        and a circuit breaker, shared by all instances of this gateway type
+        """
+        return get_http_client(f'gateway:{self.gateway_type}')
+    
+    def http_stats(self) -> Dict[str, Any]:
+        """Request counts and latencies of this gateway type's API calls (this process)"""
+        return self.http.stats.snapshot()
+    
     # ========================================================================
     # Payment Method Management
     # ========================================================================
@@ -5,12 +5,34 @@ Discovers and loads payment gateway plugins from gateways/ directory
 """
 
 import os
+import hashlib
 import importlib
+import json
+import threading
+from collections import OrderedDict
 from typing import Dict, Type, Optional, Any
 from django.conf import settings
 from bfg.finance.models import PaymentGateway
 from .base import BasePaymentGateway
 
+# Plugin instances kept per process (least recently used are evicted)
+PLUGIN_CACHE_SIZE = 128
+
+_instances: "OrderedDict[tuple, BasePaymentGateway]" = OrderedDict()
+_instances_lock = threading.Lock()
+
+
+def plugin_cache_key(gateway: PaymentGateway) -> tuple:
+    """(gateway, type, config version): editing the gateway gives a new key"""
+    config = json.dumps(gateway.get_active_config() or {}, sort_keys=True, default=str)
+    return (
+        gateway.pk,
+        gateway.gateway_type,
+        gateway.is_test_mode,
+        gateway.updated_at,
+        hashlib.sha1(config.encode()).hexdigest(),
+    )
+
 
 class GatewayLoader:
     """
@@ -96,6 +118,10 @@ class GatewayLoader:
         """
         Get plugin instance for gateway
         
+        Instances are cached per gateway and config version (see plugin_cache_key)
+        unless the plugin class sets cache_instances = False. The given gateway is
+        bound to the plugin for the calling thread.
+        
         Args:
             gateway: PaymentGateway model instance
         
@@ -106,13 +132,41 @@ class GatewayLoader:
         if not plugin_class:
             return None
         
+        key = None
+        if plugin_class.cache_instances and gateway.pk:
+            key = plugin_cache_key(gateway)
+            with _instances_lock:
+                plugin = _instances.get(key)
+                if plugin is not None:
+                    _instances.move_to_end(key)
+            if plugin is not None:
+                # Reuse the transport state, not another request's model instance
+                plugin.gateway = gateway
+                return plugin
+        
         try:
-            return plugin_class(gateway)
+            plugin = plugin_class(gateway)
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Failed to initialize gateway plugin {gateway.gateway_type}: {e}")
             return None
+        
+        if key is not None:
+            with _instances_lock:
+                _instances[key] = plugin
+                _instances.move_to_end(key)
+                while len(_instances) > PLUGIN_CACHE_SIZE:
+                    _instances.popitem(last=False)
+        return plugin
+    
+    @classmethod
+    def clear_plugin_cache(cls):
+        """
+        Drop cached plugin instances
+        """
+        with _instances_lock:
+            _instances.clear()
     
     @classmethod
     def list_available_plugins(cls) -> Dict[str, str]:
@@ -29,6 +29,8 @@ class StripeGateway(BasePaymentGateway):
     supported_methods = ['card']
     # Stripe Elements/card not typically used in WeChat mini-program; use wechat gateway for mp
     supported_clients = ['web', 'android', 'ios']
+    # _validate_config sets the global stripe.api_key: build a fresh instance per use
+    cache_instances = False
     
     # Class-level flag to track if SSL config has been applied
     _ssl_configured = False
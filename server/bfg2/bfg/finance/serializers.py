@@ -397,11 +397,8 @@ class InvoiceCreateSerializer(serializers.ModelSerializer):
         
         # Try to get from TaxRate model first
         try:
-            from bfg.finance.models import TaxRate
-            tax_rate_obj = TaxRate.objects.filter(
-                workspace=workspace,
-                is_active=True
-            ).first()
+            from bfg.finance.services.tax_rate_resolver import get_tax_rate_table
+            tax_rate_obj = get_tax_rate_table(workspace.id).first
             if tax_rate_obj:
                 # Rate is stored as percentage (e.g., 10 for 10%), convert to decimal
                 tax_rate = tax_rate_obj.rate / Decimal('100')
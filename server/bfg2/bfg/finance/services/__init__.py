@@ -7,10 +7,14 @@ Service exports
 from .payment_service import PaymentService
 from .invoice_service import InvoiceService, TaxService
 from .wallet_service import WalletService
+from .tax_rate_resolver import TaxRateTable, get_tax_rate_table, invalidate_tax_rate_cache
 
 __all__ = [
     'PaymentService',
     'InvoiceService',
     'TaxService',
     'WalletService',
+    'TaxRateTable',
+    'get_tax_rate_table',
+    'invalidate_tax_rate_cache',
 ]
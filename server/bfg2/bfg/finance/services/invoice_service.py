@@ -10,11 +10,13 @@ from datetime import date, timedelta
 from django.db import transaction
 from django.utils import timezone
 from bfg.core.services import BaseService
+from bfg.core.numbering import next_number_after, number_allocator
 from bfg.finance.models import (
     Invoice, InvoiceItem, TaxRate, Currency
 )
 from bfg.common.models import Customer
 from bfg.shop.models import Order
+from bfg.finance.services.tax_rate_resolver import get_tax_rate_table
 
 
 class InvoiceService(BaseService):
@@ -103,41 +105,21 @@ class InvoiceService(BaseService):
         Generate unique invoice number for workspace
         
         Format: INV-XXXX (e.g., INV-0001, INV-0002, INV-0003...)
-        Auto-incrementing 4-digit number.
+        Taken from the workspace's invoice sequence (minimum 4 digits), which
+        starts after the highest existing invoice number when it is created.
         Users can manually change the number later if needed.
         
         Returns:
             str: Invoice number (e.g., "INV-0001")
         """
-        # Get the latest invoice for this workspace
-        last_invoice = Invoice.objects.filter(
-            workspace=self.workspace
-        ).order_by('-id').first()
-        
-        next_number = 1
-        if last_invoice and last_invoice.invoice_number:
-            # Try to extract number from last invoice_number (e.g., "INV-0001" -> 1)
-            try:
-                # Handle both "INV-0001" and "0001" formats
-                number_part = last_invoice.invoice_number.replace('INV-', '').strip()
-                if number_part.isdigit():
-                    next_number = int(number_part) + 1
-            except (ValueError, AttributeError):
-                # If parsing fails, start from 1
-                next_number = 1
+        invoices = Invoice.objects.filter(workspace=self.workspace)
+        next_number = number_allocator.allocate(
+            'INV-', workspace_id=self.workspace.id,
+            seed=lambda: next_number_after(invoices, 'invoice_number', 'INV-'),
+        )
         
         # Format as INV-XXXX (minimum 4 digits), e.g., INV-0001, INV-0002, ..., INV-9999, INV-10000
-        invoice_number = f"INV-{str(next_number).zfill(4)}"
-        
-        # Ensure uniqueness (in case user manually changed a number)
-        while Invoice.objects.filter(
-            workspace=self.workspace,
-            invoice_number=invoice_number
-        ).exists():
-            next_number += 1
-            invoice_number = f"INV-{str(next_number).zfill(4)}"
-        
-        return invoice_number
+        return f"INV-{str(next_number).zfill(4)}"
     
     def _calculate_tax(
         self,
@@ -157,12 +139,10 @@ class InvoiceService(BaseService):
         if not address:
             return Decimal('0')
         
-        # Find applicable tax rate
-        tax_rate = TaxRate.objects.filter(
-            workspace=self.workspace,
-            country=address.country,
-            is_active=True
-        ).first()
+        # Find applicable tax rate; any active rate of the country if none matches the state
+        tax_rate = get_tax_rate_table(self.workspace.id).get(
+            address.country, getattr(address, 'state', ''), default=False, any_state=True
+        )
         
         if not tax_rate:
             return Decimal('0')
@@ -301,22 +281,8 @@ class TaxService(BaseService):
         Returns:
             Decimal: Tax amount
         """
-        # Find most specific tax rate
-        tax_rate = TaxRate.objects.filter(
-            workspace=self.workspace,
-            country=country,
-            state=state,
-            is_active=True
-        ).first()
-        
-        if not tax_rate:
-            # Try country-level rate
-            tax_rate = TaxRate.objects.filter(
-                workspace=self.workspace,
-                country=country,
-                state='',
-                is_active=True
-            ).first()
+        # Find most specific tax rate (state, then country level)
+        tax_rate = self.get_applicable_tax_rate(country, state)
         
         if not tax_rate:
             return Decimal('0')
@@ -339,22 +305,5 @@ class TaxService(BaseService):
         Returns:
             TaxRate or None: Applicable tax rate
         """
-        # Try state-specific first
-        if state:
-            tax_rate = TaxRate.objects.filter(
-                workspace=self.workspace,
-                country=country,
-                state=state,
-                is_active=True
-            ).first()
-            
-            if tax_rate:
-                return tax_rate
-        
-        # Fall back to country-level
-        return TaxRate.objects.filter(
-            workspace=self.workspace,
-            country=country,
-            state='',
-            is_active=True
-        ).first()
+        # State-specific first, then country-level
+        return get_tax_rate_table(self.workspace.id).get(country, state, default=False)
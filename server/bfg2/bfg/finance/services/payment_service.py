@@ -10,6 +10,7 @@ from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from bfg.core.services import BaseService
+from bfg.core.numbering import next_number_after, number_allocator
 from bfg.finance.exceptions import PaymentFailed, InsufficientFunds
 from bfg.finance.models import (
     Payment, PaymentGateway, PaymentMethod, Refund, Transaction, Currency
@@ -75,24 +76,17 @@ class PaymentService(BaseService):
         """
         Generate unique payment number
         
+        Format: PAY-YYYYMMDD-XXXXX, numbered per day from a sequence shared by
+        all workspaces (payment_number is globally unique)
+        
         Returns:
             str: Payment number
         """
-        import random
-        import string
-        
-        # Format: PAY-YYYYMMDD-XXXXX
-        date_str = timezone.now().strftime('%Y%m%d')
-        random_str = ''.join(random.choices(string.digits, k=5))
-        
-        payment_number = f"PAY-{date_str}-{random_str}"
-        
-        # Ensure uniqueness
-        while Payment.objects.filter(payment_number=payment_number).exists():
-            random_str = ''.join(random.choices(string.digits, k=5))
-            payment_number = f"PAY-{date_str}-{random_str}"
-        
-        return payment_number
+        prefix = f"PAY-{timezone.now().strftime('%Y%m%d')}-"
+        number = number_allocator.allocate(
+            prefix, seed=lambda: next_number_after(Payment.objects.all(), 'payment_number', prefix)
+        )
+        return f"{prefix}{number:05d}"
     
     @transaction.atomic
     def process_payment(
@@ -0,0 +1,97 @@
+"""
+BFG Finance Module Services
+
+Per-workspace tax rate table: active TaxRates loaded once, keyed by
+(country, state) with the fallback chain resolved up front
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+from bfg.core.cache import TwoTierCache
+from bfg.finance.models import TaxRate
+
+
+# Process-local tier in front of the shared cache; TaxRate signals invalidate it
+tax_rate_cache = TwoTierCache(
+    'tax_rates',
+    maxsize=256,
+    local_timeout=300,
+    shared_timeout=3600,
+)
+
+
+class TaxRateTable:
+    """
+    Active tax rates of one workspace
+
+    Lookups are dict hits. Precedence matches the original query chain:
+    country + state, then country, then the default rate (no country),
+    then the first active rate. Ties go to the first rate by name.
+    """
+
+    def __init__(self, rates: Iterable[TaxRate]):
+        rates = list(rates)
+        self.rates: Dict[Tuple[str, str], TaxRate] = {}
+        # First rate of each country, whatever its state
+        self.country_rates: Dict[str, TaxRate] = {}
+        for rate in rates:
+            self.rates.setdefault((rate.country or '', rate.state or ''), rate)
+            if rate.country:
+                self.country_rates.setdefault(rate.country, rate)
+
+        self.first: Optional[TaxRate] = rates[0] if rates else None
+        self.default: Optional[TaxRate] = self.rates.get(('', '')) or self.first
+
+        # Exact entry for every known key, or its country-level fallback
+        self.location_rates: Dict[Tuple[str, str], TaxRate] = {}
+        for (country, state), rate in self.rates.items():
+            if country:
+                self.location_rates[(country, state)] = rate
+                country_rate = self.rates.get((country, ''))
+                if country_rate:
+                    self.location_rates.setdefault((country, ''), country_rate)
+
+    def get(
+        self,
+        country: Optional[str],
+        state: Optional[str] = '',
+        default: bool = True,
+        any_state: bool = False,
+    ) -> Optional[TaxRate]:
+        """
+        Most specific active rate for a location
+
+        Args:
+            country: Country code
+            state: State/province code
+            default: Fall back to the workspace default rate when no
+                country rate exists
+            any_state: Fall back to the first rate of the country (e.g. a
+                state rate) when it has no rate for the state or country level
+
+        Returns:
+            TaxRate or None
+        """
+        rate = None
+        if country:
+            if state:
+                rate = self.location_rates.get((country, state))
+            if rate is None:
+                rate = self.location_rates.get((country, ''))
+            if rate is None and any_state:
+                rate = self.country_rates.get(country)
+        if rate is None and default:
+            rate = self.default
+        return rate
+
+
+def get_tax_rate_table(workspace_id: int) -> TaxRateTable:
+    """Cached tax rate table of a workspace"""
+    return tax_rate_cache.get_or_set(
+        f'workspace:{workspace_id}',
+        lambda: TaxRateTable(TaxRate.objects.filter(workspace_id=workspace_id, is_active=True))
+    )
+
+
+def invalidate_tax_rate_cache() -> None:
+    """Drop cached tax rate tables (all workspaces; tax rates change rarely)"""
+    tax_rate_cache.invalidate()
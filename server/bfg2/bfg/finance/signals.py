@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Signals for finance app. Drop cached tax rate tables when a TaxRate changes.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from bfg.finance.models import TaxRate
+from bfg.finance.services.tax_rate_resolver import invalidate_tax_rate_cache
+
+
+@receiver(post_save, sender=TaxRate)
+@receiver(post_delete, sender=TaxRate)
+def invalidate_tax_rates_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(invalidate_tax_rate_cache)
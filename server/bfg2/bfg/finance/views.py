@@ -393,12 +393,9 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             total_tax = Decimal('0.00')
             
             # Get workspace tax rate
-            from bfg.finance.models import TaxRate
+            from bfg.finance.services.tax_rate_resolver import get_tax_rate_table
             try:
-                tax_rate_obj = TaxRate.objects.filter(
-                    workspace=invoice.workspace,
-                    is_active=True
-                ).first()
+                tax_rate_obj = get_tax_rate_table(invoice.workspace_id).first
                 # Rate is stored as percentage (e.g., 10 for 10%), convert to decimal
                 workspace_tax_rate = (tax_rate_obj.rate / Decimal('100')) if tax_rate_obj else Decimal('0')
             except:
@@ -10,6 +10,8 @@ from django.utils import timezone
 from django.template import Template, Context
 from bfg.core.services import BaseService
 from bfg.inbox.models import Message, MessageRecipient, MessageTemplate, SMSMessage
+from bfg.inbox.services.template_cache import CompiledMessageTemplate, get_compiled_template
+from bfg.common.email_backends import OutgoingEmail
 from bfg.common.models import Customer
 from typing import Optional
 
@@ -96,17 +98,8 @@ class MessageService(BaseService):
         Returns:
             Message: Created message instance
         """
-        # Get template
-        template = MessageTemplate.objects.filter(
-            workspace=self.workspace,
-            code=template_code,
-            language=language,
-            is_active=True
-        ).first()
-        
-        if not template:
-            from bfg.core.exceptions import ValidationError
-            raise ValidationError(f"Template '{template_code}' not found")
+        template = self._get_template(template_code, language)
+        compiled = get_compiled_template(template)
         
         # Log template status for debugging
         import logging
@@ -118,37 +111,19 @@ class MessageService(BaseService):
         
         # Determine which channels to use based on template and customer preferences
         # For simplicity, we'll use the first recipient's preferences
-        # In production, you might want to send separate messages per recipient
-        send_email = template.email_enabled
-        send_sms = template.sms_enabled
-        send_push = template.push_enabled
-        
-        # Apply customer preferences if provided
-        if recipients:
-            customer = recipients[0]
-            # Get customer preferences via user
-            if hasattr(customer, 'user') and hasattr(customer.user, 'preferences'):
-                prefs = customer.user.preferences
-                # Only send if customer has enabled this channel
-                if force_email is None:
-                    send_email = send_email and prefs.email_notifications
-                if force_sms is None:
-                    send_sms = send_sms and prefs.sms_notifications
-                if force_push is None:
-                    send_push = send_push and prefs.push_notifications
-        
-        # Apply force overrides
-        if force_email is not None:
-            send_email = force_email and template.email_enabled
-        if force_sms is not None:
-            send_sms = force_sms and template.sms_enabled
-        if force_push is not None:
-            send_push = force_push and template.push_enabled
+        # (send_from_template_many applies each recipient's own)
+        send_email, send_sms, send_push = self._resolve_channels(
+            template,
+            recipients[0] if recipients else None,
+            force_email,
+            force_sms,
+            force_push,
+        )
         
         # Render template
         if template.app_message_enabled:
-            subject = self._render_template(template.app_message_title, context_data)
-            message = self._render_template(template.app_message_body, context_data)
+            subject = compiled.render('app_message_title', context_data)
+            message = compiled.render('app_message_body', context_data)
             
             # Create message
             msg = self.send_message(
@@ -162,130 +137,283 @@ class MessageService(BaseService):
             )
             
             # Log message creation for debugging
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(
                 f"Created Inbox Message ID {msg.id} for template '{template_code}' "
                 f"with {len(recipients)} recipient(s)"
             )
             
-            # Send Email if enabled
-            if send_email and template.email_enabled:
-                for recipient in recipients:
-                    # Check customer email preference again and get email address
-                    if hasattr(recipient, 'user') and hasattr(recipient.user, 'preferences'):
-                        prefs = recipient.user.preferences
-                        if prefs.email_notifications and recipient.user.email:
-                            try:
-                                self._send_email(
-                                    recipient,
-                                    template,
-                                    context_data,
-                                    subject
-                                )
-                            except Exception as e:
-                                import logging
-                                logger = logging.getLogger(__name__)
-                                logger.error(f"Failed to send email to {recipient.id}: {e}")
-            
-            # Send SMS if enabled
-            if send_sms and template.sms_enabled and template.sms_body:
-                for recipient in recipients:
-                    # Check customer SMS preference again
-                    if hasattr(recipient, 'user') and hasattr(recipient.user, 'preferences'):
-                        prefs = recipient.user.preferences
-                        if prefs.sms_notifications:
-                            try:
-                                sms_service = SMSService(workspace=self.workspace, user=self.user)
-                                sms_body = self._render_template(template.sms_body, context_data)
-                                sms_service.send_sms(recipient, sms_body[:160])
-                            except Exception as e:
-                                import logging
-                                logger = logging.getLogger(__name__)
-                                logger.error(f"Failed to send SMS to {recipient.id}: {e}")
-            
-            # Send Push notification if enabled
-            if send_push and template.push_enabled:
-                for recipient in recipients:
-                    # Check customer push preference again
-                    if hasattr(recipient, 'user') and hasattr(recipient.user, 'preferences'):
-                        prefs = recipient.user.preferences
-                        if prefs.push_notifications:
-                            try:
-                                # Render push notification content
-                                push_title = self._render_template(template.push_title, context_data) if template.push_title else subject
-                                push_body = self._render_template(template.push_body, context_data) if template.push_body else message[:255]
-                                
-                                # Send push notification (implement based on your push provider)
-                                # This is a placeholder - implement actual push sending
-                                self._send_push_notification(
-                                    recipient,
-                                    push_title,
-                                    push_body,
-                                    action_url=msg.action_url
-                                )
-                            except Exception as e:
-                                import logging
-                                logger = logging.getLogger(__name__)
-                                logger.error(f"Failed to send push to {recipient.id}: {e}")
+            # Email goes out in one batch over one connection for all recipients
+            emails = []
+            for recipient in recipients:
+                self._deliver_channels(
+                    recipient, template, compiled, context_data, msg,
+                    (send_email, send_sms, send_push), emails,
+                )
+            self._send_emails(emails)
             
             return msg
         
         from bfg.core.exceptions import ValidationError
         raise ValidationError("Template does not have app message enabled")
     
-    def _send_email(
+    @transaction.atomic
+    def send_from_template_many(
+        self,
+        recipients: List[Customer],
+        template_code: str,
+        per_recipient_context: List[Dict[str, Any]],
+        language: str = 'en',
+        force_email: Optional[bool] = None,
+        force_sms: Optional[bool] = None,
+        force_push: Optional[bool] = None
+    ) -> List[Message]:
+        """
+        Send a template to many recipients, each with their own context
+        
+        The template is loaded and compiled once, one Message per recipient is
+        created in bulk, and all emails go out in one batch. Channels follow each
+        recipient's own preferences.
+        
+        Args:
+            recipients: List of Customer instances
+            template_code: Template code
+            per_recipient_context: Context variables for each recipient, in order
+            language: Language code
+            force_email: Override email sending (None = use template + customer preference)
+            force_sms: Override SMS sending (None = use template + customer preference)
+            force_push: Override push sending (None = use template + customer preference)
+            
+        Returns:
+            List[Message]: Created messages, in recipient order
+        """
+        from bfg.core.exceptions import ValidationError
+        if len(per_recipient_context) != len(recipients):
+            raise ValidationError("per_recipient_context must have one entry per recipient")
+        template = self._get_template(template_code, language)
+        if not template.app_message_enabled:
+            raise ValidationError("Template does not have app message enabled")
+        compiled = get_compiled_template(template)
+        
+        now = timezone.now()
+        channels = []
+        messages = []
+        for recipient, context_data in zip(recipients, per_recipient_context):
+            flags = self._resolve_channels(template, recipient, force_email, force_sms, force_push)
+            channels.append(flags)
+            messages.append(Message(
+                workspace=self.workspace,
+                subject=compiled.render('app_message_title', context_data),
+                message=compiled.render('app_message_body', context_data),
+                message_type='notification',
+                sender=self.user,
+                send_email=flags[0],
+                send_sms=flags[1],
+                send_push=flags[2],
+                created_at=now,
+            ))
+        messages = self._bulk_create_messages(messages)
+        MessageRecipient.objects.bulk_create([
+            MessageRecipient(message=msg, recipient=recipient, delivered_at=now)
+            for msg, recipient in zip(messages, recipients)
+        ])
+        for msg in messages:
+            self.emit_event('message.sent', {
+                'message': msg,
+                'recipient_count': 1
+            })
+        
+        emails = []
+        for recipient, context_data, msg, flags in zip(recipients, per_recipient_context, messages, channels):
+            self._deliver_channels(recipient, template, compiled, context_data, msg, flags, emails)
+        self._send_emails(emails)
+        return messages
+    
+    def _get_template(self, template_code: str, language: str) -> MessageTemplate:
+        """Active workspace template; raises ValidationError when missing."""
+        template = MessageTemplate.objects.filter(
+            workspace=self.workspace,
+            code=template_code,
+            language=language,
+            is_active=True
+        ).first()
+        
+        if not template:
+            from bfg.core.exceptions import ValidationError
+            raise ValidationError(f"Template '{template_code}' not found")
+        return template
+    
+    def _bulk_create_messages(self, messages: List[Message]) -> List[Message]:
+        """Insert messages, in bulk where the database returns the new primary keys."""
+        from django.db import connection
+        if connection.features.can_return_rows_from_bulk_insert:
+            return Message.objects.bulk_create(messages)
+        # e.g. MySQL: MessageRecipient rows need the ids
+        for msg in messages:
+            msg.save(force_insert=True)
+        return messages
+    
+    def _resolve_channels(
+        self,
+        template: MessageTemplate,
+        customer: Optional[Customer],
+        force_email: Optional[bool],
+        force_sms: Optional[bool],
+        force_push: Optional[bool]
+    ) -> tuple:
+        """
+        (send_email, send_sms, send_push) from the template, the customer's
+        preferences and the force overrides.
+        """
+        send_email = template.email_enabled
+        send_sms = template.sms_enabled
+        send_push = template.push_enabled
+        
+        # Apply customer preferences if provided
+        if customer is not None:
+            # Get customer preferences via user
+            if hasattr(customer, 'user') and hasattr(customer.user, 'preferences'):
+                prefs = customer.user.preferences
+                # Only send if customer has enabled this channel
+                if force_email is None:
+                    send_email = send_email and prefs.email_notifications
+                if force_sms is None:
+                    send_sms = send_sms and prefs.sms_notifications
+                if force_push is None:
+                    send_push = send_push and prefs.push_notifications
+        
+        # Apply force overrides
+        if force_email is not None:
+            send_email = force_email and template.email_enabled
+        if force_sms is not None:
+            send_sms = force_sms and template.sms_enabled
+        if force_push is not None:
+            send_push = force_push and template.push_enabled
+        return send_email, send_sms, send_push
+    
+    def _deliver_channels(
+        self,
+        recipient: Customer,
+        template: MessageTemplate,
+        compiled: CompiledMessageTemplate,
+        context_data: Dict[str, Any],
+        msg: Message,
+        channels: tuple,
+        emails: List[OutgoingEmail]
+    ) -> None:
+        """
+        Send SMS and push for one recipient of msg, and queue their email on emails
+        (sent by the caller in one batch).
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        send_email, send_sms, send_push = channels
+        if not (hasattr(recipient, 'user') and hasattr(recipient.user, 'preferences')):
+            return
+        prefs = recipient.user.preferences
+        
+        # Check customer email preference again and get email address
+        if send_email and template.email_enabled and prefs.email_notifications and recipient.user.email:
+            try:
+                email = self._build_email(recipient, template, context_data, msg.subject, compiled=compiled)
+            except Exception as e:
+                logger.error(f"Failed to render email to {recipient.id}: {e}")
+            else:
+                if email is not None:
+                    emails.append(email)
+        
+        # Check customer SMS preference again
+        if send_sms and template.sms_enabled and template.sms_body and prefs.sms_notifications:
+            try:
+                sms_service = SMSService(workspace=self.workspace, user=self.user)
+                sms_body = compiled.render('sms_body', context_data)
+                sms_service.send_sms(recipient, sms_body[:160])
+            except Exception as e:
+                logger.error(f"Failed to send SMS to {recipient.id}: {e}")
+        
+        # Check customer push preference again
+        if send_push and template.push_enabled and prefs.push_notifications:
+            try:
+                # Render push notification content
+                push_title = compiled.render('push_title', context_data) if template.push_title else msg.subject
+                push_body = compiled.render('push_body', context_data) if template.push_body else msg.message[:255]
+                
+                # Send push notification (implement based on your push provider)
+                # This is a placeholder - implement actual push sending
+                self._send_push_notification(
+                    recipient,
+                    push_title,
+                    push_body,
+                    action_url=msg.action_url
+                )
+            except Exception as e:
+                logger.error(f"Failed to send push to {recipient.id}: {e}")
+    
+    def _build_email(
         self,
         customer: Customer,
         template: 'MessageTemplate',
         context_data: Dict[str, Any],
-        fallback_subject: str
-    ) -> None:
+        fallback_subject: str,
+        compiled: Optional[CompiledMessageTemplate] = None
+    ) -> Optional[OutgoingEmail]:
         """
-        Send email to customer using template (workspace EmailConfig).
+        Render the template email for customer, or None if there is nothing to send.
+        fallback_subject (already rendered) is used when the template has no email subject.
         """
         import logging
         logger = logging.getLogger(__name__)
         recipient_email = customer.user.email
         if not recipient_email:
             logger.warning("Customer %s has no email address", customer.id)
+            return None
+        compiled = compiled or get_compiled_template(template)
+        if template.email_subject:
+            email_subject = compiled.render('email_subject', context_data)
+        else:
+            email_subject = fallback_subject
+        if template.email_body and not template.email_html_body:
+            body_plain = compiled.render('email_body', context_data)
+            return OutgoingEmail([recipient_email], email_subject, body_plain)
+        elif template.email_html_body:
+            text_content = compiled.render('email_body', context_data)
+            html_content = compiled.render('email_html_body', context_data)
+            return OutgoingEmail([recipient_email], email_subject, text_content, html_content)
+        elif template.app_message_body:
+            body_plain = compiled.render('app_message_body', context_data)
+            return OutgoingEmail([recipient_email], email_subject, body_plain)
+        return None
+
+    def _send_emails(self, emails: List[OutgoingEmail]) -> None:
+        """
+        Send emails through the workspace EmailConfig in one batch (failures are logged).
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        if not emails:
             return
-        email_subject = self._render_template(
-            template.email_subject or fallback_subject,
-            context_data
-        )
         try:
             from bfg.common.services import EmailService
-            if template.email_body and not template.email_html_body:
-                body_plain = self._render_template(template.email_body, context_data)
-                EmailService.send_email(
-                    self.workspace,
-                    to_list=[recipient_email],
-                    subject=email_subject,
-                    body_plain=body_plain,
-                )
-            elif template.email_html_body:
-                text_content = self._render_template(template.email_body, context_data) if template.email_body else ''
-                html_content = self._render_template(template.email_html_body, context_data)
-                EmailService.send_email(
-                    self.workspace,
-                    to_list=[recipient_email],
-                    subject=email_subject,
-                    body_plain=text_content,
-                    body_html=html_content,
-                )
-            elif template.app_message_body:
-                body_plain = self._render_template(template.app_message_body, context_data)
-                EmailService.send_email(
-                    self.workspace,
-                    to_list=[recipient_email],
-                    subject=email_subject,
-                    body_plain=body_plain,
-                )
+            with EmailService.outbox(self.workspace, batch_size=len(emails)) as outbox:
+                for email in emails:
+                    outbox.add_message(email)
         except ValueError as e:
             logger.warning("Inbox email skip (no workspace email config): %s", e)
         except Exception as e:
-            logger.exception("Inbox email send failed to %s: %s", recipient_email, e)
+            logger.exception("Inbox email send failed: %s", e)
+
+    def _send_email(
+        self,
+        customer: Customer,
+        template: 'MessageTemplate',
+        context_data: Dict[str, Any],
+        fallback_subject: str
+    ) -> None:
+        """
+        Send email to customer using template (workspace EmailConfig).
+        """
+        email = self._build_email(customer, template, context_data, fallback_subject)
+        if email is not None:
+            self._send_emails([email])
     
     def _send_push_notification(
         self,
@@ -0,0 +1,89 @@
+"""
+BFG Inbox Template Cache
+
+Compiled MessageTemplate fields, cached per process
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+from django.template import Context, Template
+
+# Compiled templates kept per process (least recently used are evicted)
+TEMPLATE_CACHE_SIZE = 256
+
+# MessageTemplate fields that hold template text
+TEMPLATE_FIELDS = (
+    'email_subject',
+    'email_body',
+    'email_html_body',
+    'app_message_title',
+    'app_message_body',
+    'sms_body',
+    'push_title',
+    'push_body',
+)
+
+_compiled: "OrderedDict[tuple, CompiledMessageTemplate]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class CompiledMessageTemplate:
+    """
+    A MessageTemplate with its text fields compiled once, to render for any
+    number of recipients without parsing the template again.
+    """
+
+    def __init__(self, template):
+        self._fields: Dict[str, Template] = {
+            field: Template(getattr(template, field))
+            for field in TEMPLATE_FIELDS
+            if getattr(template, field)
+        }
+
+    def render(self, field: str, context_data: Dict[str, Any]) -> str:
+        """
+        Render one template field ('' when the field is empty)
+
+        Args:
+            field: Field name from TEMPLATE_FIELDS
+            context_data: Context variables
+        """
+        compiled = self._fields.get(field)
+        if compiled is None:
+            return ''
+        return compiled.render(Context(context_data))
+
+
+def template_cache_key(template) -> tuple:
+    """(workspace, code, language, updated_at): an edited template gets a new key."""
+    return (template.workspace_id, template.code, template.language, template.updated_at)
+
+
+def get_compiled_template(template) -> CompiledMessageTemplate:
+    """
+    Compiled version of a MessageTemplate, from the cache when it is unchanged
+
+    Args:
+        template: MessageTemplate instance
+    """
+    key = template_cache_key(template)
+    with _lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+    compiled = CompiledMessageTemplate(template)
+    with _lock:
+        _compiled[key] = compiled
+        _compiled.move_to_end(key)
+        while len(_compiled) > TEMPLATE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def clear_template_cache() -> None:
+    """Drop all compiled templates."""
+    with _lock:
+        _compiled.clear()
@@ -15,11 +15,13 @@ from bfg.shop.models import Product, ProductCategory
 from bfg.shop.schemas import apply_rules_to_product_queryset
 
 
-def get_promo_available(workspace, request):
+def get_promo_available(workspace, request, include=None):
     """
     Build promo 'available' dict (slides, featured_categories, flash_sales, group_buys).
     Used by PromoView and by web page_service when rendering home page blocks with source='promo'.
+    include limits the sections built (e.g. ('slides', 'featured_categories')); default all.
     """
+    include = set(include or ('slides', 'featured_categories', 'flash_sales', 'group_buys'))
     now = timezone.now()
     campaigns_qs = Campaign.objects.filter(
         workspace=workspace,
@@ -71,32 +73,34 @@ def get_promo_available(workspace, request):
                 })
 
     flash_sales = []
-    for dr in DiscountRule.objects.filter(
-        workspace=workspace,
-        is_active=True,
-        valid_until__isnull=False,
-        valid_until__gte=now,
-    ).filter(Q(valid_from__isnull=True) | Q(valid_from__lte=now)).prefetch_related('coupons'):
-        coupon = dr.coupons.filter(campaign_id__in=campaign_ids).first()
-        if not coupon:
-            coupon = dr.coupons.filter(campaign__workspace=workspace).first()
-        if coupon and (coupon.campaign_id in campaign_ids):
-            flash_sales.append({
-                'campaign_id': coupon.campaign_id,
-                'discount_rule_id': dr.id,
-                'display_label': dr.display_label or dr.name,
-                'valid_until': dr.valid_until.isoformat() if dr.valid_until else None,
-            })
+    if 'flash_sales' in include:
+        for dr in DiscountRule.objects.filter(
+            workspace=workspace,
+            is_active=True,
+            valid_until__isnull=False,
+            valid_until__gte=now,
+        ).filter(Q(valid_from__isnull=True) | Q(valid_from__lte=now)).prefetch_related('coupons'):
+            coupon = dr.coupons.filter(campaign_id__in=campaign_ids).first()
+            if not coupon:
+                coupon = dr.coupons.filter(campaign__workspace=workspace).first()
+            if coupon and (coupon.campaign_id in campaign_ids):
+                flash_sales.append({
+                    'campaign_id': coupon.campaign_id,
+                    'discount_rule_id': dr.id,
+                    'display_label': dr.display_label or dr.name,
+                    'valid_until': dr.valid_until.isoformat() if dr.valid_until else None,
+                })
 
     group_buys = []
-    for c in campaigns_qs.filter(requires_participation=True, min_participants__isnull=False):
-        current = CampaignParticipation.objects.filter(campaign=c).count()
-        group_buys.append({
-            'campaign_id': c.id,
-            'min_participants': c.min_participants,
-            'current_participants': current,
-            'valid_until': c.end_date.isoformat() if c.end_date else None,
-        })
+    if 'group_buys' in include:
+        for c in campaigns_qs.filter(requires_participation=True, min_participants__isnull=False):
+            current = CampaignParticipation.objects.filter(campaign=c).count()
+            group_buys.append({
+                'campaign_id': c.id,
+                'min_participants': c.min_participants,
+                'current_participants': current,
+                'valid_until': c.end_date.isoformat() if c.end_date else None,
+            })
 
     available = {}
     if slides:
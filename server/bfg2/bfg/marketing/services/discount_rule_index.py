@@ -0,0 +1,117 @@
+"""
+BFG Marketing Module - Discount Rule Index
+
+Per-workspace snapshot of active discount rules, flattened to plain id sets so
+auto-discount matching at checkout runs in memory without per-rule queries.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import FrozenSet, Optional, Tuple
+
+from bfg.core.cache import get_or_set_tagged, invalidate_tags, workspace_tag
+from bfg.marketing.models import DiscountRule
+
+
+# Index lifetime; rule changes invalidate it through the workspace tag
+DISCOUNT_RULE_INDEX_TIMEOUT = 60 * 60
+
+
+@dataclass(frozen=True)
+class IndexedDiscountRule:
+    """Active discount rule with its product/category scope resolved to id sets"""
+    id: int
+    discount_type: str
+    discount_value: Decimal
+    apply_to: str = 'order'
+    minimum_purchase: Optional[Decimal] = None
+    maximum_discount: Optional[Decimal] = None
+    valid_from: Optional[datetime] = None
+    valid_until: Optional[datetime] = None
+    product_ids: FrozenSet[int] = frozenset()
+    category_ids: FrozenSet[int] = frozenset()
+
+    def is_valid_at(self, now: datetime) -> bool:
+        if self.valid_from and self.valid_from > now:
+            return False
+        if self.valid_until and self.valid_until < now:
+            return False
+        return True
+
+
+def discount_rules_tag(workspace_id: int) -> str:
+    """Tag covering the cached discount rule index of a workspace"""
+    return workspace_tag(workspace_id, 'discount_rules')
+
+
+def get_discount_rule_index_cache_key(workspace_id: int) -> str:
+    return f'discount_rule_index:{workspace_id}'
+
+
+def build_discount_rule_index(workspace_id: int) -> Tuple[IndexedDiscountRule, ...]:
+    """
+    Load active discount rules of a workspace (3 queries, independent of rule count)
+
+    Args:
+        workspace_id: Workspace ID
+
+    Returns:
+        Tuple[IndexedDiscountRule, ...]: Rules, most recently created first
+    """
+    rows = list(
+        DiscountRule.objects.filter(workspace_id=workspace_id, is_active=True)
+        .order_by('-created_at', '-id')
+        .values_list(
+            'id', 'discount_type', 'discount_value', 'apply_to', 'minimum_purchase',
+            'maximum_discount', 'valid_from', 'valid_until'
+        )
+    )
+    if not rows:
+        return ()
+
+    rule_ids = [row[0] for row in rows]
+    product_ids, category_ids = {}, {}
+    if any(row[3] == 'products' for row in rows):
+        for rule_id, product_id in DiscountRule.products.through.objects.filter(
+            discountrule_id__in=rule_ids
+        ).values_list('discountrule_id', 'product_id'):
+            product_ids.setdefault(rule_id, set()).add(product_id)
+    if any(row[3] == 'categories' for row in rows):
+        for rule_id, category_id in DiscountRule.categories.through.objects.filter(
+            discountrule_id__in=rule_ids
+        ).values_list('discountrule_id', 'productcategory_id'):
+            category_ids.setdefault(rule_id, set()).add(category_id)
+
+    return tuple(
+        IndexedDiscountRule(
+            id=rule_id,
+            discount_type=discount_type,
+            discount_value=discount_value,
+            apply_to=apply_to,
+            minimum_purchase=minimum_purchase,
+            maximum_discount=maximum_discount,
+            valid_from=valid_from,
+            valid_until=valid_until,
+            product_ids=frozenset(product_ids.get(rule_id, ())),
+            category_ids=frozenset(category_ids.get(rule_id, ())),
+        )
+        for (rule_id, discount_type, discount_value, apply_to, minimum_purchase,
+             maximum_discount, valid_from, valid_until) in rows
+    )
+
+
+def get_discount_rule_index(workspace_id: int) -> Tuple[IndexedDiscountRule, ...]:
+    """Cached discount rule index of a workspace"""
+    return get_or_set_tagged(
+        get_discount_rule_index_cache_key(workspace_id),
+        lambda: build_discount_rule_index(workspace_id),
+        [discount_rules_tag(workspace_id)],
+        DISCOUNT_RULE_INDEX_TIMEOUT,
+    )
+
+
+def invalidate_discount_rule_index(workspace_id: int) -> None:
+    """Drop the cached discount rule index of a workspace"""
+    if workspace_id:
+        invalidate_tags(discount_rules_tag(workspace_id))
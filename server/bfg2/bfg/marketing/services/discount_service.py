@@ -8,7 +8,7 @@ Handles discount calculation for orders including:
 - Product/category-specific discounts
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from decimal import Decimal
 from django.utils import timezone
 from django.db.models import Q
@@ -16,6 +16,7 @@ from django.db.models import Q
 from bfg.core.services import BaseService
 from bfg.marketing.models import DiscountRule, Coupon
 from bfg.marketing.models import GiftCard
+from bfg.marketing.services.discount_rule_index import get_discount_rule_index
 from bfg.shop.models import Order, OrderItem, Product, ProductCategory
 from bfg.common.models import Customer
 
@@ -421,79 +422,68 @@ class DiscountCalculationService(BaseService):
         Automatically find and apply matching discount rules
         
         This applies discount rules that match the order items without requiring a coupon code.
+        Rules come from the cached per-workspace index (see discount_rule_index); rules outside
+        their valid_from/valid_until window are skipped.
         Priority: order-level discounts > category discounts > product discounts
         
         Returns:
             Dict with 'discount' and optionally 'shipping_discount'
         """
-        # Find active discount rules that match the order
-        matching_rules = DiscountRule.objects.filter(
-            workspace=self.workspace,
-            is_active=True
-        ).order_by('-created_at')  # Apply most recently created rule first
+        now = timezone.now()
+        rules = [
+            rule for rule in get_discount_rule_index(self.workspace.id)
+            if rule.is_valid_at(now)
+        ]
         
         best_discount = Decimal('0.00')
         shipping_discount = Decimal('0.00')
-        best_rule = None
-        
-        # Try to find the best matching discount rule
-        for rule in matching_rules:
+        if not rules:
+            return {
+                'discount': best_discount,
+                'shipping_discount': shipping_discount
+            }
+        
+        # Resolve the cart once; every rule is then matched with set operations
+        item_product_ids = [self._get_item_product_ids(item) for item in order_items]
+        item_category_ids = None
+        if any(rule.apply_to == 'categories' for rule in rules):
+            item_category_ids = self._get_item_category_ids(order_items)
+        
+        # Rules come most recently created first
+        for rule in rules:
             # Check minimum purchase requirement
             if rule.minimum_purchase and subtotal < rule.minimum_purchase:
                 continue
             
+            if rule.apply_to == 'products':
+                applicable_subtotal = sum(
+                    (item.subtotal for item, product_ids in zip(order_items, item_product_ids)
+                     if product_ids & rule.product_ids),
+                    Decimal('0.00')
+                )
+            elif rule.apply_to == 'categories':
+                applicable_subtotal = sum(
+                    (item.subtotal for item, category_ids in zip(order_items, item_category_ids)
+                     if category_ids & rule.category_ids),
+                    Decimal('0.00')
+                )
+            else:
+                applicable_subtotal = subtotal
+            
             # Calculate discount for this rule
             rule_discount = Decimal('0.00')
             rule_shipping_discount = Decimal('0.00')
             
             if rule.discount_type == 'free_shipping':
-                # Free shipping - check if it applies
-                if rule.apply_to == 'order':
-                    # Applies to entire order
+                if rule.apply_to == 'order' or applicable_subtotal > 0:
                     rule_shipping_discount = Decimal('999999.99')
-                    rule_discount = Decimal('0.00')
-                elif rule.apply_to == 'products':
-                    # Check if any products match
-                    applicable_product_ids = set(rule.products.values_list('id', flat=True))
-                    has_matching_product = any(
-                        item.product.id in applicable_product_ids or
-                        (item.variant and item.variant.product.id in applicable_product_ids)
-                        for item in order_items
-                    )
-                    if has_matching_product:
-                        rule_shipping_discount = Decimal('999999.99')
-                elif rule.apply_to == 'categories':
-                    # Check if any categories match
-                    applicable_category_ids = set(rule.categories.values_list('id', flat=True))
-                    has_matching_category = any(
-                        any(cat_id in applicable_category_ids 
-                            for cat_id in item.product.categories.values_list('id', flat=True))
-                        for item in order_items
-                    )
-                    if has_matching_category:
-                        rule_shipping_discount = Decimal('999999.99')
+            elif rule.apply_to != 'order' and applicable_subtotal == 0:
+                # Product/category rule with nothing in scope
+                pass
             elif rule.discount_type == 'percentage':
-                if rule.apply_to == 'order':
-                    rule_discount = (subtotal * rule.discount_value) / Decimal('100')
-                elif rule.apply_to == 'products':
-                    rule_discount = self._calculate_product_discount(
-                        rule, order_items, 'percentage'
-                    )
-                elif rule.apply_to == 'categories':
-                    rule_discount = self._calculate_category_discount(
-                        rule, order_items, 'percentage'
-                    )
+                rule_discount = (applicable_subtotal * rule.discount_value) / Decimal('100')
             elif rule.discount_type == 'fixed_amount':
-                if rule.apply_to == 'order':
-                    rule_discount = rule.discount_value
-                elif rule.apply_to == 'products':
-                    rule_discount = self._calculate_product_discount(
-                        rule, order_items, 'fixed_amount'
-                    )
-                elif rule.apply_to == 'categories':
-                    rule_discount = self._calculate_category_discount(
-                        rule, order_items, 'fixed_amount'
-                    )
+                rule_discount = rule.discount_value
             
             # Apply maximum discount cap
             if rule.maximum_discount:
@@ -508,9 +498,31 @@ class DiscountCalculationService(BaseService):
                 shipping_discount = rule_shipping_discount
             if rule_discount > best_discount:
                 best_discount = rule_discount
-                best_rule = rule
         
         return {
             'discount': best_discount,
             'shipping_discount': shipping_discount
         }
+    
+    @staticmethod
+    def _get_item_product_ids(item) -> Set[int]:
+        """Product ids an order item counts as (its product and its variant's product)"""
+        product_ids = {getattr(item, 'product_id', None) or item.product.id}
+        variant = getattr(item, 'variant', None)
+        if variant is not None:
+            product_ids.add(getattr(variant, 'product_id', None) or variant.product.id)
+        return product_ids
+    
+    @staticmethod
+    def _get_item_category_ids(order_items: List[OrderItem]) -> List[Set[int]]:
+        """Category ids per order item, loaded in a single query"""
+        product_ids = {getattr(item, 'product_id', None) or item.product.id for item in order_items}
+        categories_by_product = {}
+        for product_id, category_id in Product.categories.through.objects.filter(
+            product_id__in=product_ids
+        ).values_list('product_id', 'productcategory_id'):
+            categories_by_product.setdefault(product_id, set()).add(category_id)
+        return [
+            categories_by_product.get(getattr(item, 'product_id', None) or item.product.id, set())
+            for item in order_items
+        ]
@@ -2,12 +2,15 @@
 """
 Signals for marketing app. Invalidate home page rendered cache when CampaignDisplay
 or Campaign changes so storefront shows up-to-date promo (slides, category_entry, featured) data.
+Drop the per-workspace discount rule index when a DiscountRule or its scope changes.
 """
 
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
-from bfg.marketing.models import Campaign, CampaignDisplay
+from bfg.marketing.models import Campaign, CampaignDisplay, DiscountRule
+from bfg.marketing.services.discount_rule_index import invalidate_discount_rule_index
 
 
 def _get_workspace_id_from_display(instance):
@@ -42,3 +45,24 @@ def invalidate_home_cache_on_display_delete(sender, instance, **kwargs):
 def invalidate_home_cache_on_campaign_save(sender, instance, **kwargs):
     """Campaign start/end/active changes affect get_promo_available; invalidate home cache."""
     _invalidate_home_cache(instance.workspace_id)
+
+
+def _invalidate_discount_rules(workspace_id):
+    if workspace_id:
+        transaction.on_commit(lambda: invalidate_discount_rule_index(workspace_id))
+
+
+@receiver(post_save, sender=DiscountRule)
+@receiver(post_delete, sender=DiscountRule)
+def invalidate_discount_rule_index_on_rule_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_discount_rules(instance.workspace_id)
+
+
+@receiver(m2m_changed, sender=DiscountRule.products.through)
+@receiver(m2m_changed, sender=DiscountRule.categories.through)
+def invalidate_discount_rule_index_on_scope_change(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # Forward: instance is the rule; reverse: a product/category (same workspace)
+    _invalidate_discount_rules(instance.workspace_id)
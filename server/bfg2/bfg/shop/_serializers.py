@@ -91,7 +91,8 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         model = ProductVariant
         fields = [
             'id', 'product', 'sku', 'name', 'options', 'price', 'compare_price',
-            'stock_quantity', 'available', 'weight', 'is_active', 'order'
+            'stock_quantity', 'available', 'weight', 'length', 'width', 'height',
+            'is_active', 'order'
         ]
         read_only_fields = ['id']
     
@@ -231,7 +232,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'is_subscription', 'subscription_plan', 'categories', 'category_ids',
             'tags', 'tag_ids', 'tag_names', 'finance_code', 'finance_code_id',
             'track_inventory', 'stock_quantity', 'low_stock_threshold',
-            'requires_shipping', 'weight', 'meta_title', 'meta_description',
+            'requires_shipping', 'weight', 'length', 'width', 'height', 'meta_title', 'meta_description',
             'is_active', 'is_featured', 'language', 'media', 'variants',
             'created_at', 'updated_at'
         ]
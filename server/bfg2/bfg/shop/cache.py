@@ -7,10 +7,32 @@ Cache services for shop module performance optimization
 from typing import Any, Optional, List
 from decimal import Decimal
 from django.core.cache import cache
-from bfg.core.cache import CacheMixin
+from bfg.core.cache import CacheMixin, get_tagged, set_tagged, invalidate_tags, workspace_tag
 from bfg.shop.models import Product, Cart
 
 
+def _with_related(queryset):
+    """Related data needed by cached product consumers (see ProductManager.with_related)"""
+    return queryset.select_related('subscription_plan').prefetch_related(
+        'categories', 'tags', 'media_links__media', 'variants'
+    )
+
+
+def products_tag(workspace_id: int) -> str:
+    """Tag covering every product and product list cached for a workspace"""
+    return workspace_tag(workspace_id, 'products')
+
+
+def product_tag(workspace_id: int, product_id: int) -> str:
+    """Tag covering every cached copy of one product (by id and by slug)"""
+    return workspace_tag(workspace_id, f'product:{product_id}')
+
+
+def product_lists_tag(workspace_id: int) -> str:
+    """Tag covering cached product lists (featured, category pages) of a workspace"""
+    return workspace_tag(workspace_id, 'product_lists')
+
+
 class ProductCacheService(CacheMixin):
     """
     Cache service for individual products
@@ -18,9 +40,13 @@ class ProductCacheService(CacheMixin):
     Reduces database queries for frequently accessed products
     """
     
-    cache_prefix = 'product'
+    cache_key_prefix = 'product'
     cache_timeout = 3600  # 1 hour
     
+    @classmethod
+    def get_product_tags(cls, workspace_id: int, product_id: int) -> List[str]:
+        return [products_tag(workspace_id), product_tag(workspace_id, product_id)]
+    
     @classmethod
     def get_product(cls, product_id: int, workspace_id: int) -> Optional[Product]:
         """
@@ -33,22 +59,23 @@ class ProductCacheService(CacheMixin):
         Returns:
             Product or None: Product instance
         """
-        cache_key = cls.get_cache_key(f'{workspace_id}:{product_id}')
+        cache_key = cls.get_cache_key(workspace_id, 'id', product_id)
+        tags = cls.get_product_tags(workspace_id, product_id)
         
         # Try cache first
-        product = cache.get(cache_key)
+        product = get_tagged(cache_key, tags)
         if product is not None:
             return product
         
         # Query database
         try:
-            product = Product.objects.with_related().get(
+            product = _with_related(Product.objects.all()).get(
                 id=product_id,
                 workspace_id=workspace_id
             )
             
             # Cache the result
-            cache.set(cache_key, product, cls.cache_timeout)
+            set_tagged(cache_key, product, tags, cls.cache_timeout)
             return product
         except Product.DoesNotExist:
             return None
@@ -62,8 +89,17 @@ class ProductCacheService(CacheMixin):
             product_id: Product ID
             workspace_id: Workspace ID
         """
-        cache_key = cls.get_cache_key(f'{workspace_id}:{product_id}')
-        cache.delete(cache_key)
+        invalidate_tags(product_tag(workspace_id, product_id))
+    
+    @classmethod
+    def invalidate_workspace(cls, workspace_id: int) -> None:
+        """
+        Invalidate every cached product and product list of a workspace
+        
+        Args:
+            workspace_id: Workspace ID
+        """
+        invalidate_tags(products_tag(workspace_id))
     
     @classmethod
     def get_product_by_slug(cls, slug: str, workspace_id: int, language: str = 'en') -> Optional[Product]:
@@ -78,23 +114,23 @@ class ProductCacheService(CacheMixin):
         Returns:
             Product or None: Product instance
         """
-        cache_key = cls.get_cache_key(f'{workspace_id}:{language}:{slug}')
+        cache_key = cls.get_cache_key(workspace_id, 'slug', language, slug)
         
-        # Try cache first
-        product = cache.get(cache_key)
+        # Try cache first (the entry also carries its product tag)
+        product = get_tagged(cache_key, [products_tag(workspace_id)])
         if product is not None:
             return product
         
         # Query database
         try:
-            product = Product.objects.with_related().get(
+            product = _with_related(Product.objects.all()).get(
                 slug=slug,
                 workspace_id=workspace_id,
                 language=language
             )
             
             # Cache the result
-            cache.set(cache_key, product, cls.cache_timeout)
+            set_tagged(cache_key, product, cls.get_product_tags(workspace_id, product.id), cls.cache_timeout)
             return product
         except Product.DoesNotExist:
             return None
@@ -107,9 +143,13 @@ class ProductListCacheService(CacheMixin):
     Caches filtered product listings
     """
     
-    cache_prefix = 'product_list'
+    cache_key_prefix = 'product_list'
     cache_timeout = 1800  # 30 minutes
     
+    @classmethod
+    def get_list_tags(cls, workspace_id: int) -> List[str]:
+        return [products_tag(workspace_id), product_lists_tag(workspace_id)]
+    
     @classmethod
     def get_featured_products(
         cls,
@@ -128,23 +168,24 @@ class ProductListCacheService(CacheMixin):
         Returns:
             List of products or None
         """
-        cache_key = cls.get_cache_key(f'featured:{workspace_id}:{language}:{limit}')
+        cache_key = cls.get_cache_key('featured', workspace_id, language, limit)
+        tags = cls.get_list_tags(workspace_id)
         
         # Try cache first
-        products = cache.get(cache_key)
+        products = get_tagged(cache_key, tags)
         if products is not None:
             return products
         
         # Query database
-        products = list(Product.objects.filter(
+        products = list(_with_related(Product.objects.filter(
             workspace_id=workspace_id,
             language=language,
             is_active=True,
             is_featured=True
-        ).with_related()[:limit])
+        ))[:limit])
         
         # Cache the result
-        cache.set(cache_key, products, cls.cache_timeout)
+        set_tagged(cache_key, products, tags, cls.cache_timeout)
         return products
     
     @classmethod
@@ -169,26 +210,25 @@ class ProductListCacheService(CacheMixin):
         Returns:
             List of products or None
         """
-        cache_key = cls.get_cache_key(
-            f'category:{workspace_id}:{category_id}:{language}:{page}:{page_size}'
-        )
+        cache_key = cls.get_cache_key('category', workspace_id, category_id, language, page, page_size)
+        tags = cls.get_list_tags(workspace_id)
         
         # Try cache first
-        products = cache.get(cache_key)
+        products = get_tagged(cache_key, tags)
         if products is not None:
             return products
         
         # Query database
         offset = (page - 1) * page_size
-        products = list(Product.objects.filter(
+        products = list(_with_related(Product.objects.filter(
             workspace_id=workspace_id,
             categories__id=category_id,
             language=language,
             is_active=True
-        ).with_related()[offset:offset + page_size])
+        ))[offset:offset + page_size])
         
         # Cache the result
-        cache.set(cache_key, products, cls.cache_timeout)
+        set_tagged(cache_key, products, tags, cls.cache_timeout)
         return products
     
     @classmethod
@@ -199,9 +239,7 @@ class ProductListCacheService(CacheMixin):
         Args:
             workspace_id: Workspace ID
         """
-        # Clear all caches with this workspace prefix
-        pattern = cls.get_cache_key(f'*:{workspace_id}:*')
-        cls.delete_pattern(pattern)
+        invalidate_tags(product_lists_tag(workspace_id))
 
 
 class CartCacheService(CacheMixin):
@@ -211,7 +249,7 @@ class CartCacheService(CacheMixin):
     Caches cart state for quick access
     """
     
-    cache_prefix = 'cart'
+    cache_key_prefix = 'cart'
     cache_timeout = 3600  # 1 hour
     
     @classmethod
@@ -225,7 +263,7 @@ class CartCacheService(CacheMixin):
         Returns:
             Dict with cart summary or None
         """
-        cache_key = cls.get_cache_key(f'summary:{cart_id}')
+        cache_key = cls.get_cache_key('summary', cart_id)
         
         summary = cache.get(cache_key)
         return summary
@@ -239,7 +277,7 @@ class CartCacheService(CacheMixin):
             cart_id: Cart ID
             summary: Cart summary dict
         """
-        cache_key = cls.get_cache_key(f'summary:{cart_id}')
+        cache_key = cls.get_cache_key('summary', cart_id)
         cache.set(cache_key, summary, cls.cache_timeout)
     
     @classmethod
@@ -250,7 +288,7 @@ class CartCacheService(CacheMixin):
         Args:
             cart_id: Cart ID
         """
-        cache_key = cls.get_cache_key(f'summary:{cart_id}')
+        cache_key = cls.get_cache_key('summary', cart_id)
         cache.delete(cache_key)
     
     @classmethod
@@ -264,7 +302,7 @@ class CartCacheService(CacheMixin):
         Returns:
             Item count or None
         """
-        cache_key = cls.get_cache_key(f'count:{cart_id}')
+        cache_key = cls.get_cache_key('count', cart_id)
         return cache.get(cache_key)
     
     @classmethod
@@ -276,5 +314,5 @@ class CartCacheService(CacheMixin):
             cart_id: Cart ID
             count: Item count
         """
-        cache_key = cls.get_cache_key(f'count:{cart_id}')
+        cache_key = cls.get_cache_key('count', cart_id)
         cache.set(cache_key, count, cls.cache_timeout)
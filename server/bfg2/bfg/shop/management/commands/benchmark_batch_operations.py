@@ -0,0 +1,135 @@
+"""
+Benchmark Batch Operations
+
+Django management command: Time BatchService reservations, status updates and
+expiry warnings over a large number of batches (uses a throwaway workspace)
+"""
+
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from bfg.common.models import Address, Customer, StaffMember, StaffRole, User, Workspace
+from bfg.delivery.models import Warehouse
+from bfg.shop.models import BatchMovement, Order, Product, ProductBatch, ProductVariant, Store
+from bfg.shop.services.batch_service import BULK_CHUNK_SIZE, BatchService, ExpiryNotificationService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk batch reservations, status updates and expiry warnings (uses a throwaway workspace)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=100000, help='Batches to create')
+        parser.add_argument('--variants', type=int, default=200, help='Variants the batches belong to')
+        parser.add_argument('--warehouses', type=int, default=5, help='Warehouses the batches are spread over')
+        parser.add_argument('--reservations', type=int, default=2000, help='Batch allocations per reservation run')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark workspace')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        suffix = uuid.uuid4().hex[:8]
+        workspace = Workspace.objects.create(
+            name=f'Batch benchmark {suffix}', slug=f'batch-bench-{suffix}',
+            settings={'features': {'batch_management': True}},
+        )
+        try:
+            started = time.perf_counter()
+            order, batch_ids = self._create_fixture(workspace, suffix, rng, options)
+            self.stdout.write(f"Created {len(batch_ids)} batches in {time.perf_counter() - started:.2f}s")
+
+            service = BatchService(workspace=workspace)
+            sample = rng.sample(batch_ids, min(2 * options['reservations'], len(batch_ids)))
+            half = len(sample) // 2
+            row_by_row = self._allocations(sample[:half])
+            bulk = self._allocations(sample[half:])
+
+            self._time('reserve_batches, row by row', lambda: self._reserve_row_by_row(row_by_row, order))
+            self._time('reserve_batches, bulk', lambda: service.reserve_batches(bulk, order))
+            self._time('update_batch_status', service.update_batch_status)
+            self._time(
+                'send_expiry_warnings',
+                lambda: ExpiryNotificationService(workspace=workspace).send_expiry_warnings(30),
+            )
+        finally:
+            if not options['keep']:
+                # Orders and staff protect the rows the workspace cascade would delete
+                Order.objects.filter(workspace=workspace).delete()
+                StaffMember.objects.filter(workspace=workspace).delete()
+                workspace.delete()
+                User.objects.filter(username=f'batch-bench-{suffix}').delete()
+
+    def _create_fixture(self, workspace, suffix, rng, options):
+        warehouses = [
+            Warehouse.objects.create(
+                workspace=workspace, name=f'Benchmark {i}', code=f'BENCH-{i}', address_line1='-',
+                city='-', postal_code='-', country='NZ',
+            )
+            for i in range(options['warehouses'])
+        ]
+        product = Product.objects.create(
+            workspace=workspace, name='Benchmark product', slug='benchmark-product',
+            sku=f'BATCH-{workspace.id}', price=Decimal('1.00'),
+        )
+        ProductVariant.objects.bulk_create([
+            ProductVariant(product=product, sku=f'BATCH-{workspace.id}-{i}', name=f'V{i}')
+            for i in range(options['variants'])
+        ])
+        variants = list(ProductVariant.objects.filter(product=product))
+
+        today = date.today()
+        ProductBatch.objects.bulk_create(
+            (
+                ProductBatch(
+                    workspace=workspace, variant=rng.choice(variants), warehouse=rng.choice(warehouses),
+                    batch_number=f'LOT-{i}', quantity=rng.randint(10, 500),
+                    manufactured_date=today - timedelta(days=rng.randint(30, 400)),
+                    expiry_date=today + timedelta(days=rng.randint(-30, 720)),
+                )
+                for i in range(options['batches'])
+            ),
+            batch_size=BULK_CHUNK_SIZE
+        )
+        batch_ids = list(ProductBatch.objects.filter(workspace=workspace).values_list('id', flat=True))
+
+        user = User.objects.create_user(username=f'batch-bench-{suffix}', password=uuid.uuid4().hex)
+        role = StaffRole.objects.create(workspace=workspace, name='Benchmark', code='benchmark')
+        StaffMember.objects.create(workspace=workspace, user=user, role=role)
+        customer = Customer.objects.create(workspace=workspace, user=user)
+        address = Address.objects.create(
+            workspace=workspace, full_name='Benchmark', phone='-', address_line1='-',
+            city='-', postal_code='-', country='NZ',
+        )
+        order = Order.objects.create(
+            workspace=workspace, customer=customer, order_number=f'BENCH-{suffix}',
+            store=Store.objects.create(workspace=workspace, name='Benchmark', code='bench'),
+            subtotal=Decimal('0'), total=Decimal('0'), shipping_address=address, billing_address=address,
+        )
+        return order, batch_ids
+
+    def _allocations(self, batch_ids):
+        return [(batch, 1) for batch in ProductBatch.objects.filter(pk__in=batch_ids)]
+
+    def _reserve_row_by_row(self, allocations, order):
+        # The reservation loop BatchService.reserve_batches used to run
+        with transaction.atomic():
+            for batch, quantity in allocations:
+                batch.reserved += quantity
+                batch.save()
+                BatchMovement.objects.create(
+                    batch=batch, movement_type='out', quantity=-quantity, order=order,
+                    reason=f'Reserved for order {order.order_number}',
+                )
+
+    def _time(self, label, func):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label}: {elapsed:.3f}s, {len(ctx.captured_queries)} queries")
+        return elapsed
@@ -0,0 +1,131 @@
+"""
+Benchmark Checkout
+
+Django management command: Time OrderService.create_order_from_cart for carts of
+several sizes and report p50/p99 latency (uses a throwaway workspace)
+"""
+
+import math
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from celery import current_app
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from bfg.common.models import Address, Customer, User, Workspace
+from bfg.delivery.models import Warehouse
+from bfg.finance.models import Invoice, Payment
+from bfg.shop.models import Cart, CartItem, Order, Product, ProductVariant, Store, VariantInventory
+from bfg.shop.services.order_service import OrderService
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (pct in 0..100)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark checkout latency for several cart sizes (uses a throwaway workspace)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 20, 100], help='Cart sizes (lines)')
+        parser.add_argument('--orders', type=int, default=50, help='Checkouts per cart size')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark workspace')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        workspace = Workspace.objects.create(name=f'Checkout benchmark {suffix}', slug=f'checkout-bench-{suffix}')
+        user = None
+        # order.created listeners queue notification tasks: run them in-process
+        always_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        try:
+            user = User.objects.create_user(username=f'checkout-bench-{suffix}', password=uuid.uuid4().hex)
+            fixture = self._create_fixture(workspace, user, max(options['lines']), options['orders'])
+            service = OrderService(workspace=workspace, user=user)
+            for lines in options['lines']:
+                self._run(service, fixture, lines, options['orders'])
+        finally:
+            current_app.conf.task_always_eager = always_eager
+            if not options['keep']:
+                # Orders, invoices and payments protect the workspace rows they reference
+                Payment.objects.filter(workspace=workspace).delete()
+                Invoice.objects.filter(workspace=workspace).delete()
+                Order.objects.filter(workspace=workspace).delete()
+                workspace.delete()
+                if user is not None:
+                    user.delete()
+
+    def _create_fixture(self, workspace, user, max_lines, orders):
+        warehouse = Warehouse.objects.create(
+            workspace=workspace, name='Benchmark', code='BENCH', address_line1='-',
+            city='-', postal_code='-', country='NZ', is_default=True,
+        )
+        store = Store.objects.create(workspace=workspace, name='Benchmark', code='BENCH')
+        customer = Customer.objects.create(workspace=workspace, user=user)
+        address = Address.objects.create(
+            workspace=workspace, full_name='Bench', phone='0', address_line1='-',
+            city='-', postal_code='-', country='NZ',
+        )
+        product = Product.objects.create(
+            workspace=workspace, name='Benchmark product', slug='benchmark-product',
+            sku=f'BENCH-{workspace.id}', price=Decimal('1.00'),
+        )
+        ProductVariant.objects.bulk_create([
+            ProductVariant(
+                product=product, sku=f'BENCH-{workspace.id}-{i}', name=f'V{i}',
+                price=Decimal('1.00'), stock_quantity=10 * orders,
+            )
+            for i in range(max_lines)
+        ])
+        variants = list(ProductVariant.objects.filter(product=product).order_by('id'))
+        VariantInventory.objects.bulk_create([
+            VariantInventory(variant=variant, warehouse=warehouse, quantity=10 * orders) for variant in variants
+        ])
+        return {
+            'workspace': workspace, 'store': store, 'customer': customer,
+            'address': address, 'product': product, 'variants': variants,
+        }
+
+    def _run(self, service, fixture, lines, orders):
+        workspace = fixture['workspace']
+        cart = Cart.objects.create(workspace=workspace, customer=fixture['customer'])
+        # Time spent in the post-commit work (invoice, payment, audit, order.created)
+        post_commit = []
+        complete = service._complete_created_order
+
+        def timed_complete(order):
+            started = time.perf_counter()
+            complete(order)
+            post_commit.append(time.perf_counter() - started)
+
+        service._complete_created_order = timed_complete
+        totals, queries = [], []
+        try:
+            for _ in range(orders):
+                CartItem.objects.bulk_create([
+                    CartItem(cart=cart, product=fixture['product'], variant=variant, quantity=1, price=Decimal('1.00'))
+                    for variant in fixture['variants'][:lines]
+                ])
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    service.create_order_from_cart(
+                        cart=cart, store=fixture['store'], shipping_address=fixture['address'],
+                        shipping_cost=Decimal('0.00'), tax=Decimal('0.00'),
+                    )
+                    totals.append(time.perf_counter() - started)
+                queries.append(len(ctx.captured_queries))
+        finally:
+            del service._complete_created_order
+
+        committed = [total - after for total, after in zip(totals, post_commit)]
+        self.stdout.write(
+            f"{lines:>3}-line cart, {orders} checkouts: "
+            f"transaction p50={percentile(committed, 50) * 1000:.1f}ms p99={percentile(committed, 99) * 1000:.1f}ms, "
+            f"with post-commit work p50={percentile(totals, 50) * 1000:.1f}ms p99={percentile(totals, 99) * 1000:.1f}ms, "
+            f"{statistics.mean(queries):.0f} queries/checkout"
+        )
@@ -0,0 +1,139 @@
+"""
+Benchmark Stock Reservation
+
+Django management command: Run parallel checkouts against InventoryService and
+verify that no inventory row ends up oversold
+"""
+
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from bfg.common.models import Workspace
+from bfg.delivery.models import Warehouse
+from bfg.shop.exceptions import InsufficientStock
+from bfg.shop.models import Product, ProductVariant, VariantInventory
+from bfg.shop.services.inventory_service import InventoryService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent stock reservations and check for oversells (uses a throwaway workspace)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Parallel checkout threads')
+        parser.add_argument('--orders', type=int, default=50, help='Orders per worker')
+        parser.add_argument('--variants', type=int, default=5, help='Variants competing for stock')
+        parser.add_argument('--stock', type=int, default=100, help='Units per variant')
+        parser.add_argument('--lines', type=int, default=3, help='Maximum lines per order')
+        parser.add_argument('--retries', type=int, default=5, help='Retries per checkout on database errors')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark workspace')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        suffix = uuid.uuid4().hex[:8]
+        workspace = Workspace.objects.create(name=f'Stock benchmark {suffix}', slug=f'stock-bench-{suffix}')
+        try:
+            warehouse, variants = self._create_fixture(workspace, options['variants'], options['stock'])
+            results, elapsed = self._run(workspace, warehouse, variants, rng, options)
+            self._report(warehouse, variants, results, elapsed, options)
+        finally:
+            if not options['keep']:
+                workspace.delete()
+
+    def _create_fixture(self, workspace, variant_count, stock):
+        warehouse = Warehouse.objects.create(
+            workspace=workspace, name='Benchmark', code='BENCH', address_line1='-',
+            city='-', postal_code='-', country='NZ', is_default=True,
+        )
+        product = Product.objects.create(
+            workspace=workspace, name='Benchmark product', slug='benchmark-product',
+            sku=f'BENCH-{workspace.id}', price=Decimal('1.00'),
+        )
+        ProductVariant.objects.bulk_create([
+            ProductVariant(product=product, sku=f'BENCH-{workspace.id}-{i}', name=f'V{i}', stock_quantity=stock)
+            for i in range(variant_count)
+        ])
+        variants = list(ProductVariant.objects.filter(product=product).order_by('id'))
+        VariantInventory.objects.bulk_create([
+            VariantInventory(variant=variant, warehouse=warehouse, quantity=stock) for variant in variants
+        ])
+        return warehouse, variants
+
+    def _run(self, workspace, warehouse, variants, rng, options):
+        results = Counter()
+        reserved_units = Counter()
+        lock = threading.Lock()
+        plans = [
+            [
+                [
+                    (rng.choice(variants), rng.randint(1, 3))
+                    for _ in range(rng.randint(1, options['lines']))
+                ]
+                for _ in range(options['orders'])
+            ]
+            for _ in range(options['workers'])
+        ]
+
+        def worker(orders):
+            service = InventoryService(workspace=workspace)
+            try:
+                for order in orders:
+                    outcome = self._checkout(service, warehouse, order, options['retries'], rng)
+                    with lock:
+                        results[outcome] += 1
+                        if outcome == 'reserved':
+                            for variant, quantity in order:
+                                reserved_units[variant.id] += quantity
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(orders,)) for orders in plans]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['units'] = reserved_units
+        return results, time.perf_counter() - started
+
+    def _checkout(self, service, warehouse, order, retries, rng):
+        for attempt in range(retries + 1):
+            try:
+                service.reserve_stock_many(
+                    [(variant, warehouse, quantity) for variant, quantity in order]
+                )
+            except InsufficientStock:
+                return 'rejected'
+            except DatabaseError:
+                # Lock timeout / busy database: the transaction rolled back, retry with backoff
+                time.sleep(rng.uniform(0, 0.005 * (2 ** attempt)))
+            else:
+                return 'reserved'
+        return 'errors'
+
+    def _report(self, warehouse, variants, results, elapsed, options):
+        total_orders = options['workers'] * options['orders']
+        self.stdout.write(
+            f"{total_orders} checkouts on {options['workers']} workers in {elapsed:.2f}s "
+            f"({total_orders / elapsed if elapsed else 0:.0f}/s): {results['reserved']} reserved, "
+            f"{results['rejected']} rejected (insufficient stock), {results['errors']} database errors"
+        )
+
+        oversold = []
+        inventories = VariantInventory.objects.filter(warehouse=warehouse, variant__in=variants)
+        for inventory in inventories:
+            expected = results['units'][inventory.variant_id]
+            if inventory.reserved > inventory.quantity or inventory.reserved != expected:
+                oversold.append(
+                    f'variant {inventory.variant_id}: quantity={inventory.quantity} '
+                    f'reserved={inventory.reserved} confirmed={expected}'
+                )
+        if oversold:
+            raise CommandError('Oversold inventory:\n' + '\n'.join(oversold))
+        self.stdout.write(self.style.SUCCESS('No oversells'))
@@ -0,0 +1,28 @@
+"""
+Rebuild Product Listings
+
+Django management command: Rebuild the storefront ProductListing read model
+"""
+
+from django.core.management.base import BaseCommand
+from bfg.common.models import Workspace
+from bfg.shop.services.product_listing_service import ProductListingService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild storefront product listing rows (all workspaces or one); storefront browsing uses them once rebuilt'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workspace', type=int, help='Workspace ID (default: all workspaces)')
+
+    def handle(self, *args, **options):
+        workspaces = Workspace.objects.all()
+        if options.get('workspace'):
+            workspaces = workspaces.filter(id=options['workspace'])
+
+        service = ProductListingService()
+        for workspace in workspaces:
+            written = service.rebuild_workspace(workspace)
+            self.stdout.write(f'{workspace.slug}: {written} listing(s) rebuilt')
+
+        self.stdout.write(self.style.SUCCESS('Product listings rebuilt'))
@@ -0,0 +1,29 @@
+"""
+Rebuild Product Search
+
+Django management command: Rebuild product search documents and the full-text index
+"""
+
+from django.core.management.base import BaseCommand
+from bfg.common.models import Workspace
+from bfg.shop.services.product_search_service import ProductSearchService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild product search documents and full-text index (all workspaces or one); storefront ?q= uses it once rebuilt'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workspace', type=int, help='Workspace ID (default: all workspaces)')
+
+    def handle(self, *args, **options):
+        workspaces = Workspace.objects.all()
+        if options.get('workspace'):
+            workspaces = workspaces.filter(id=options['workspace'])
+
+        service = ProductSearchService()
+        self.stdout.write(f'Search backend: {service.backend.name}')
+        for workspace in workspaces:
+            written = service.rebuild_workspace(workspace)
+            self.stdout.write(f'{workspace.slug}: {written} document(s) indexed')
+
+        self.stdout.write(self.style.SUCCESS('Product search index rebuilt'))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_user_platform_user_id'),
+        ('shop', '0003_wishlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=10, verbose_name='Language')),
+                ('name', models.CharField(max_length=255, verbose_name='Name')),
+                ('slug', models.SlugField(max_length=255, verbose_name='Slug')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Price')),
+                ('compare_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Compare Price')),
+                ('condition', models.CharField(blank=True, default='', max_length=20, verbose_name='Condition')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('is_featured', models.BooleanField(default=False, verbose_name='Featured')),
+                ('product_created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Product Created At')),
+                ('sold_count', models.PositiveIntegerField(default=0, verbose_name='Sold Count')),
+                ('rating', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True, verbose_name='Rating')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Reviews Count')),
+                ('stock_available', models.IntegerField(default=0, verbose_name='Stock Available')),
+                ('primary_image_url', models.CharField(blank=True, max_length=500, verbose_name='Primary Image URL')),
+                ('category_ids', models.JSONField(blank=True, default=list, verbose_name='Category IDs')),
+                ('tag_ids', models.JSONField(blank=True, default=list, verbose_name='Tag IDs')),
+                ('category_slugs', models.TextField(blank=True, default='', verbose_name='Category Slugs')),
+                ('tag_slugs', models.TextField(blank=True, default='', verbose_name='Tag Slugs')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='storefront_listing', to='shop.product')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_listings', to='common.workspace')),
+            ],
+            options={
+                'verbose_name': 'Product Listing',
+                'verbose_name_plural': 'Product Listings',
+                'ordering': ['-product_created_at'],
+                'indexes': [models.Index(fields=['workspace', 'language', 'is_active', '-product_created_at'], name='shop_produc_workspa_d76a0b_idx'), models.Index(fields=['workspace', 'is_active', 'price'], name='shop_produc_workspa_1548af_idx'), models.Index(fields=['workspace', 'is_active', '-sold_count'], name='shop_produc_workspa_1dfea7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+FTS_TABLE = 'shop_productsearch_fts'
+FULLTEXT_INDEX = 'shop_productsearch_ft'
+
+
+def create_fulltext_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE shop_productsearchdocument '
+            f'ADD FULLTEXT INDEX {FULLTEXT_INDEX} (title, body, keywords)'
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            if not any('ENABLE_FTS5' in row[0] for row in cursor.fetchall()):
+                return
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            'title, body, keywords, '
+            'product_id UNINDEXED, workspace_id UNINDEXED, language UNINDEXED, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE shop_productsearchdocument DROP INDEX {FULLTEXT_INDEX}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_user_platform_user_id'),
+        ('shop', '0004_product_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=10, verbose_name='Language')),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('body', models.TextField(blank=True, help_text='Short and long description', verbose_name='Body')),
+                ('keywords', models.TextField(blank=True, help_text='SKU, barcode, variant SKUs, tags and categories', verbose_name='Keywords')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='shop.product')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_search_documents', to='common.workspace')),
+            ],
+            options={
+                'verbose_name': 'Product Search Document',
+                'verbose_name_plural': 'Product Search Documents',
+                'indexes': [models.Index(fields=['workspace', 'language'], name='shop_produc_workspa_947b05_idx')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
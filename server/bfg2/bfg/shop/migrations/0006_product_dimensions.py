@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='height',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Height (cm)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='length',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Length (cm)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='width',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Width (cm)'),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='height',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Height (cm)'),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='length',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Length (cm)'),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='width',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Width (cm)'),
+        ),
+    ]
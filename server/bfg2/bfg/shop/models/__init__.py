@@ -11,3 +11,5 @@ from .sales_channel import SalesChannel, ProductChannelListing, ChannelCollectio
 from .returns import Return, ReturnLineItem
 from .batch import ProductBatch, BatchMovement
 from .wishlist import Wishlist
+from .listing import ProductListing
+from .search import ProductSearchDocument
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
+
+
+class ProductListing(models.Model):
+    """
+    Denormalized storefront read model: one row per product.
+
+    Maintained incrementally by shop signals (see ProductListingService) so storefront
+    listing, filtering and sorting run against this single table instead of joining
+    categories, tags, order items and reviews.
+    """
+    workspace = models.ForeignKey('common.Workspace', on_delete=models.CASCADE, related_name='product_listings')
+    product = models.OneToOneField('shop.Product', on_delete=models.CASCADE, related_name='storefront_listing')
+    language = models.CharField(_("Language"), max_length=10)
+
+    # Product snapshot
+    name = models.CharField(_("Name"), max_length=255)
+    slug = models.SlugField(_("Slug"), max_length=255)
+    price = models.DecimalField(_("Price"), max_digits=10, decimal_places=2)
+    compare_price = models.DecimalField(_("Compare Price"), max_digits=10, decimal_places=2, null=True, blank=True)
+    condition = models.CharField(_("Condition"), max_length=20, blank=True, default='')
+    is_active = models.BooleanField(_("Active"), default=True)
+    is_featured = models.BooleanField(_("Featured"), default=False)
+    product_created_at = models.DateTimeField(_("Product Created At"), default=timezone.now)
+
+    # Aggregates
+    sold_count = models.PositiveIntegerField(_("Sold Count"), default=0)
+    rating = models.DecimalField(_("Rating"), max_digits=3, decimal_places=2, null=True, blank=True)
+    reviews_count = models.PositiveIntegerField(_("Reviews Count"), default=0)
+    stock_available = models.IntegerField(_("Stock Available"), default=0)
+    primary_image_url = models.CharField(_("Primary Image URL"), max_length=500, blank=True)
+
+    # Organization: ids for clients, delimited slugs ("|a|b|") for single-table filtering
+    category_ids = models.JSONField(_("Category IDs"), default=list, blank=True)
+    tag_ids = models.JSONField(_("Tag IDs"), default=list, blank=True)
+    category_slugs = models.TextField(_("Category Slugs"), blank=True, default='')
+    tag_slugs = models.TextField(_("Tag Slugs"), blank=True, default='')
+
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Product Listing")
+        verbose_name_plural = _("Product Listings")
+        ordering = ['-product_created_at']
+        indexes = [
+            models.Index(fields=['workspace', 'language', 'is_active', '-product_created_at']),
+            models.Index(fields=['workspace', 'is_active', 'price']),
+            models.Index(fields=['workspace', 'is_active', '-sold_count']),
+        ]
+
+    def __str__(self):
+        return f"Listing: {self.name}"
+
+    @staticmethod
+    def slug_key(slug):
+        """Delimited token used to match one slug inside category_slugs / tag_slugs."""
+        return f"|{slug}|"
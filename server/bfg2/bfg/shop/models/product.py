@@ -98,6 +98,9 @@ class Product(models.Model):
     # Shipping
     requires_shipping = models.BooleanField(_("Requires Shipping"), default=True)
     weight = models.DecimalField(_("Weight (kg)"), max_digits=10, decimal_places=2, null=True, blank=True)
+    length = models.DecimalField(_("Length (cm)"), max_digits=10, decimal_places=2, null=True, blank=True)
+    width = models.DecimalField(_("Width (cm)"), max_digits=10, decimal_places=2, null=True, blank=True)
+    height = models.DecimalField(_("Height (cm)"), max_digits=10, decimal_places=2, null=True, blank=True)
     
     # SEO
     meta_title = models.CharField(_("Meta Title"), max_length=255, blank=True)
@@ -159,6 +162,9 @@ class ProductVariant(models.Model):
     
     # Physical
     weight = models.DecimalField(_("Weight (kg)"), max_digits=10, decimal_places=2, null=True, blank=True)
+    length = models.DecimalField(_("Length (cm)"), max_digits=10, decimal_places=2, null=True, blank=True)
+    width = models.DecimalField(_("Width (cm)"), max_digits=10, decimal_places=2, null=True, blank=True)
+    height = models.DecimalField(_("Height (cm)"), max_digits=10, decimal_places=2, null=True, blank=True)
     
     is_active = models.BooleanField(_("Active"), default=True)
     order = models.PositiveSmallIntegerField(_("Order"), default=100)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ProductSearchDocument(models.Model):
+    """
+    Flattened, searchable text for a product.
+
+    Source rows for the product search backends (bfg.shop.search): MySQL indexes
+    title/body/keywords with a FULLTEXT index, SQLite mirrors them into an FTS5 table.
+    """
+    workspace = models.ForeignKey('common.Workspace', on_delete=models.CASCADE, related_name='product_search_documents')
+    product = models.OneToOneField('shop.Product', on_delete=models.CASCADE, related_name='search_document')
+    language = models.CharField(_("Language"), max_length=10)
+
+    title = models.CharField(_("Title"), max_length=255)
+    body = models.TextField(_("Body"), blank=True, help_text=_("Short and long description"))
+    keywords = models.TextField(_("Keywords"), blank=True, help_text=_("SKU, barcode, variant SKUs, tags and categories"))
+
+    updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Product Search Document")
+        verbose_name_plural = _("Product Search Documents")
+        indexes = [
+            models.Index(fields=['workspace', 'language']),
+        ]
+
+    def __str__(self):
+        return f"Search: {self.title}"
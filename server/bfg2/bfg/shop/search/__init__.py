@@ -0,0 +1,20 @@
+"""
+BFG Shop Product Search
+
+Pluggable full-text product search. Backends (MySQL FULLTEXT, SQLite FTS5,
+portable LIKE fallback) index ProductSearchDocument rows; ProductSearchService
+combines their ranked hits with ProductListing filters and facet counts.
+"""
+
+from .base import BaseSearchBackend, SearchHit, SearchResult, tokenize
+from .loader import get_search_backend, get_search_backend_class, reset_search_backends
+
+__all__ = [
+    'BaseSearchBackend',
+    'SearchHit',
+    'SearchResult',
+    'tokenize',
+    'get_search_backend',
+    'get_search_backend_class',
+    'reset_search_backends',
+]
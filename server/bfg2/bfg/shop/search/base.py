@@ -0,0 +1,104 @@
+"""
+Base Product Search Backend Interface
+
+Search backends own the full-text side of product search: keeping an inverted
+index of ProductSearchDocument rows and returning relevance-ranked product ids.
+Filtering and facet counting happen in ProductSearchService on top of the
+ProductListing read model.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# Word tokens used to build backend-specific match expressions
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query: str, max_tokens: int = 10) -> List[str]:
+    """Split a raw user query into lower-cased word tokens (punctuation/operators dropped)"""
+    return [t.lower() for t in TOKEN_RE.findall(query or '')][:max_tokens]
+
+
+@dataclass
+class SearchHit:
+    """A product matched by the full-text index."""
+    product_id: int
+    score: float
+
+
+@dataclass
+class SearchResult:
+    """Ranked, filtered search result with facet counts."""
+    query: str
+    product_ids: List[int] = field(default_factory=list)
+    scores: Dict[int, float] = field(default_factory=dict)
+    total: int = 0
+    facets: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+
+class BaseSearchBackend(ABC):
+    """
+    Base class for product search backends.
+
+    Backends receive ProductSearchDocument instances to index and answer
+    match queries with hits ordered by descending relevance.
+    """
+
+    # Backend identifier (e.g. 'sqlite_fts5', 'mysql_fulltext', 'simple')
+    name: str = None
+
+    def __init__(self, using: str = 'default'):
+        self.using = using
+
+    @classmethod
+    def is_available(cls, connection) -> bool:
+        """Whether this backend can run on the given database connection"""
+        return True
+
+    def ensure_schema(self) -> None:
+        """Create backend-specific index structures if they are missing"""
+
+    @abstractmethod
+    def index_documents(self, documents: Iterable) -> None:
+        """
+        Add or replace index entries.
+
+        Args:
+            documents: Saved ProductSearchDocument instances
+        """
+        pass
+
+    @abstractmethod
+    def delete_documents(self, document_ids: Iterable[int]) -> None:
+        """
+        Remove index entries.
+
+        Args:
+            document_ids: ProductSearchDocument IDs
+        """
+        pass
+
+    @abstractmethod
+    def match(
+        self,
+        workspace_id: int,
+        query: str,
+        language: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[SearchHit]:
+        """
+        Run a full-text query.
+
+        Args:
+            workspace_id: Workspace ID
+            query: Raw user query
+            language: Restrict to documents in this language (optional)
+            limit: Maximum number of hits
+
+        Returns:
+            List[SearchHit]: Hits ordered by descending score
+        """
+        pass
@@ -0,0 +1,57 @@
+"""
+Product Search Backend Loader
+
+Picks the search backend for a database connection:
+BFG2_SETTINGS['PRODUCT_SEARCH_BACKEND'] (backend name or dotted class path) when set,
+otherwise the first built-in backend available on the database vendor.
+"""
+
+from typing import Dict, List, Type
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from .base import BaseSearchBackend
+from .mysql_fulltext import MySQLFullTextBackend
+from .simple import SimpleSearchBackend
+from .sqlite_fts import SQLiteFTS5Backend
+
+
+# Built-in backends in order of preference
+BUILTIN_BACKENDS: List[Type[BaseSearchBackend]] = [
+    MySQLFullTextBackend,
+    SQLiteFTS5Backend,
+    SimpleSearchBackend,
+]
+
+_backends: Dict[str, BaseSearchBackend] = {}
+
+
+def get_search_backend_class(using: str = 'default') -> Type[BaseSearchBackend]:
+    """Resolve the backend class for a database alias"""
+    configured = getattr(settings, 'BFG2_SETTINGS', {}).get('PRODUCT_SEARCH_BACKEND')
+    if configured:
+        for backend_class in BUILTIN_BACKENDS:
+            if backend_class.name == configured:
+                return backend_class
+        return import_string(configured)
+
+    connection = connections[using]
+    for backend_class in BUILTIN_BACKENDS:
+        if backend_class.is_available(connection):
+            return backend_class
+    return SimpleSearchBackend
+
+
+def get_search_backend(using: str = 'default') -> BaseSearchBackend:
+    """Get the (per-process cached) search backend for a database alias"""
+    backend = _backends.get(using)
+    if backend is None:
+        backend = get_search_backend_class(using)(using=using)
+        _backends[using] = backend
+    return backend
+
+
+def reset_search_backends() -> None:
+    """Drop cached backends (settings changes, tests)"""
+    _backends.clear()
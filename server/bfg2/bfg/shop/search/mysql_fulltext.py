@@ -0,0 +1,106 @@
+"""
+MySQL FULLTEXT search backend
+
+Queries the FULLTEXT index on ProductSearchDocument(title, body, keywords)
+created by shop migration 0005. The index is maintained by InnoDB itself, so
+indexing only needs the document rows to be saved.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db import connections
+
+from bfg.shop.models import ProductSearchDocument
+from .base import BaseSearchBackend, SearchHit, tokenize
+from .simple import SimpleSearchBackend
+
+
+FULLTEXT_INDEX = 'shop_productsearch_ft'
+
+# innodb_ft_min_token_size (server default 3); override with BFG2_SETTINGS['MYSQL_FT_MIN_TOKEN_SIZE']
+DEFAULT_MIN_TOKEN_SIZE = 3
+
+# InnoDB default stopword list (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD)
+INNODB_STOPWORDS = frozenset((
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www',
+))
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """Full-text search using MySQL InnoDB FULLTEXT indexes"""
+
+    name = 'mysql_fulltext'
+
+    @classmethod
+    def is_available(cls, connection) -> bool:
+        return connection.vendor == 'mysql'
+
+    @staticmethod
+    def create_index_sql() -> str:
+        return (
+            f'ALTER TABLE {ProductSearchDocument._meta.db_table} '
+            f'ADD FULLTEXT INDEX {FULLTEXT_INDEX} (title, body, keywords)'
+        )
+
+    def index_documents(self, documents: Iterable) -> None:
+        # InnoDB keeps the FULLTEXT index in sync with the table
+        pass
+
+    def delete_documents(self, document_ids: Iterable[int]) -> None:
+        pass
+
+    @staticmethod
+    def match_expressions(tokens: List[str]) -> Optional[Tuple[str, str]]:
+        """
+        (boolean mode, natural language mode) expressions for query tokens
+
+        Boolean mode filters: every indexed token is required, with a prefix match on
+        the last query token when it is kept; natural language mode supplies the
+        relevance score. Tokens the index never holds (shorter than the minimum token
+        size, stopwords) would make a required term unmatchable, so they are left out.
+
+        Returns:
+            None when no token is indexable (callers fall back to LIKE matching)
+        """
+        min_size = getattr(settings, 'BFG2_SETTINGS', {}).get('MYSQL_FT_MIN_TOKEN_SIZE', DEFAULT_MIN_TOKEN_SIZE)
+        indexed = [t for t in tokens if len(t) >= min_size and t not in INNODB_STOPWORDS]
+        if not indexed:
+            return None
+        terms = [f'+{t}' for t in indexed]
+        if indexed[-1] == tokens[-1]:
+            terms[-1] += '*'
+        return ' '.join(terms), ' '.join(indexed)
+
+    def match(
+        self,
+        workspace_id: int,
+        query: str,
+        language: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        expressions = self.match_expressions(tokens)
+        if expressions is None:
+            return SimpleSearchBackend(self.using).match(workspace_id, query, language=language, limit=limit)
+        boolean_expr, natural_expr = expressions
+
+        table = ProductSearchDocument._meta.db_table
+        sql = (
+            f'SELECT product_id, MATCH(title, body, keywords) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score '
+            f'FROM {table} '
+            f'WHERE workspace_id = %s AND MATCH(title, body, keywords) AGAINST (%s IN BOOLEAN MODE)'
+        )
+        params = [natural_expr, workspace_id, boolean_expr]
+        if language:
+            sql += ' AND language = %s'
+            params.append(language)
+        sql += ' ORDER BY score DESC LIMIT %s'
+        params.append(limit)
+
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchHit(product_id=int(pid), score=float(score or 0)) for pid, score in cursor.fetchall()]
@@ -0,0 +1,61 @@
+"""
+Simple search backend
+
+Portable fallback for databases without a supported full-text index: matches
+tokens with LIKE against ProductSearchDocument and scores by weighted field hits.
+"""
+
+from typing import Iterable, List, Optional
+from django.db.models import Q
+
+from bfg.shop.models import ProductSearchDocument
+from .base import BaseSearchBackend, SearchHit, tokenize
+
+
+# Field weights used to score a token hit
+FIELD_WEIGHTS = {'title': 10.0, 'keywords': 5.0, 'body': 1.0}
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """LIKE-based search over ProductSearchDocument (no inverted index)"""
+
+    name = 'simple'
+
+    def index_documents(self, documents: Iterable) -> None:
+        pass
+
+    def delete_documents(self, document_ids: Iterable[int]) -> None:
+        pass
+
+    def match(
+        self,
+        workspace_id: int,
+        query: str,
+        language: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        documents = ProductSearchDocument.objects.using(self.using).filter(workspace_id=workspace_id)
+        if language:
+            documents = documents.filter(language=language)
+        for token in tokens:
+            documents = documents.filter(
+                Q(title__icontains=token) | Q(body__icontains=token) | Q(keywords__icontains=token)
+            )
+
+        hits = []
+        for product_id, title, body, keywords in documents.values_list('product_id', 'title', 'body', 'keywords'):
+            fields = {'title': title.lower(), 'body': body.lower(), 'keywords': keywords.lower()}
+            score = sum(
+                weight
+                for token in tokens
+                for name, weight in FIELD_WEIGHTS.items()
+                if token in fields[name]
+            )
+            hits.append(SearchHit(product_id=product_id, score=score))
+
+        hits.sort(key=lambda hit: (-hit.score, hit.product_id))
+        return hits[:limit]
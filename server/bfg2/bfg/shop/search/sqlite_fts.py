@@ -0,0 +1,99 @@
+"""
+SQLite FTS5 search backend
+
+Mirrors ProductSearchDocument rows into an FTS5 virtual table (rowid = document id)
+and ranks matches with bm25. Used for local development and tests.
+"""
+
+from typing import Iterable, List, Optional
+from django.db import connections
+
+from .base import BaseSearchBackend, SearchHit, tokenize
+
+
+FTS_TABLE = 'shop_productsearch_fts'
+
+# bm25 column weights: title, body, keywords
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """Full-text search over an SQLite FTS5 virtual table"""
+
+    name = 'sqlite_fts5'
+
+    @classmethod
+    def is_available(cls, connection) -> bool:
+        if connection.vendor != 'sqlite':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            return any('ENABLE_FTS5' in row[0] for row in cursor.fetchall())
+
+    @staticmethod
+    def create_table_sql() -> str:
+        return (
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            'title, body, keywords, '
+            'product_id UNINDEXED, workspace_id UNINDEXED, language UNINDEXED, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def ensure_schema(self) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(self.create_table_sql())
+
+    def index_documents(self, documents: Iterable) -> None:
+        documents = list(documents)
+        if not documents:
+            return
+        self.delete_documents([doc.id for doc in documents])
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                '(rowid, title, body, keywords, product_id, workspace_id, language) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                [
+                    (doc.id, doc.title, doc.body, doc.keywords, doc.product_id, doc.workspace_id, doc.language)
+                    for doc in documents
+                ]
+            )
+
+    def delete_documents(self, document_ids: Iterable[int]) -> None:
+        document_ids = list(document_ids)
+        if not document_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(document_ids))
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', document_ids)
+
+    def match(
+        self,
+        workspace_id: int,
+        query: str,
+        language: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Every token must match, last token as a prefix (search-as-you-type)
+        expression = ' '.join(f'"{t}"' for t in tokens[:-1])
+        expression = f'{expression} "{tokens[-1]}"*'.strip()
+
+        sql = (
+            f'SELECT product_id, bm25({FTS_TABLE}, %s, %s, %s) AS rank '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND workspace_id = %s'
+        )
+        params = [*BM25_WEIGHTS, expression, workspace_id]
+        if language:
+            sql += ' AND language = %s'
+            params.append(language)
+        sql += ' ORDER BY rank LIMIT %s'
+        params.append(limit)
+
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25 is "lower is better"; flip sign so higher score = more relevant
+            return [SearchHit(product_id=int(pid), score=-float(rank)) for pid, rank in cursor.fetchall()]
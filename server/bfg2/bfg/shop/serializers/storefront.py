@@ -6,15 +6,75 @@ Only exposes necessary fields, hides sensitive information
 """
 from rest_framework import serializers
 from decimal import Decimal
-from bfg.common.models import Address
+from django.db.models import Avg, Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+from bfg.common.models import Address, MediaLink
 from bfg.shop.models import (
     Product, ProductVariant, ProductCategory, ProductTag,
-    Cart, CartItem, Order, OrderItem, ProductReview
+    Cart, CartItem, Order, OrderItem, ProductReview, VariantInventory
 )
 from bfg.common.serializers import MediaLinkSerializer, media_file_url_for_serializer
 from bfg.finance.models import Payment, PaymentGateway
 
 
+def with_storefront_data(queryset):
+    """
+    Preload everything StorefrontProductSerializer reads, in a fixed number of queries.
+
+    Annotates approved review stats (storefront_rating / storefront_reviews_count) and
+    prefetches media, categories, tags and variants with their warehouse inventory rows.
+    The serializers detect this data and skip their per-object fallback queries.
+    """
+    approved_reviews = ProductReview.objects.filter(
+        product=OuterRef('pk'),
+        is_approved=True
+    ).order_by().values('product')
+    return queryset.annotate(
+        storefront_rating=Subquery(
+            approved_reviews.annotate(avg=Avg('rating')).values('avg')[:1]
+        ),
+        storefront_reviews_count=Coalesce(
+            Subquery(approved_reviews.annotate(cnt=Count('id')).values('cnt')[:1]),
+            Value(0),
+            output_field=IntegerField()
+        ),
+    ).prefetch_related(
+        Prefetch(
+            'media_links',
+            queryset=MediaLink.objects.select_related('media', 'content_type')
+        ),
+        'categories',
+        'tags',
+        Prefetch(
+            'variants',
+            queryset=ProductVariant.objects.prefetch_related(
+                Prefetch('inventory', queryset=VariantInventory.objects.select_related('warehouse'))
+            )
+        ),
+    )
+
+
+def _prefetched(obj, related_name):
+    """Return prefetched related rows as a list, or None when the relation was not prefetched."""
+    cache = getattr(obj, '_prefetched_objects_cache', None) or {}
+    if related_name in cache:
+        return list(cache[related_name])
+    return None
+
+
+def _image_links(obj):
+    """Image media links ordered by position, read from the prefetch cache when available."""
+    links = _prefetched(obj, 'media_links')
+    if links is None:
+        return list(
+            obj.media_links.filter(media__media_type='image').select_related('media').order_by('position')
+        )
+    return sorted(
+        (ml for ml in links if ml.media and ml.media.media_type == 'image'),
+        key=lambda ml: ml.position
+    )
+
+
 class StorefrontProductVariantSerializer(serializers.ModelSerializer):
     """Storefront product variant serializer - simplified"""
     stock_available = serializers.SerializerMethodField()
@@ -30,9 +90,14 @@ class StorefrontProductVariantSerializer(serializers.ModelSerializer):
     
     def get_stock_available(self, obj):
         """Get available stock quantity (total - reserved)"""
+        inventories = _prefetched(obj, 'inventory')
+        if inventories is not None:
+            if inventories:
+                return max(0, sum(inv.quantity - inv.reserved for inv in inventories))
+            return max(0, obj.stock_quantity)
+
         # Calculate from VariantInventory if available
         from django.db.models import Sum, F
-        from bfg.shop.models import VariantInventory
         
         total_available = VariantInventory.objects.filter(
             variant=obj
@@ -48,8 +113,11 @@ class StorefrontProductVariantSerializer(serializers.ModelSerializer):
     
     def get_stock_reserved(self, obj):
         """Get total reserved stock quantity"""
+        inventories = _prefetched(obj, 'inventory')
+        if inventories is not None:
+            return sum(inv.reserved for inv in inventories)
+
         from django.db.models import Sum
-        from bfg.shop.models import VariantInventory
         
         total_reserved = VariantInventory.objects.filter(
             variant=obj
@@ -61,11 +129,11 @@ class StorefrontProductVariantSerializer(serializers.ModelSerializer):
     
     def get_stock_by_warehouse(self, obj):
         """Get stock breakdown by warehouse"""
-        from bfg.shop.models import VariantInventory
-        
-        inventories = VariantInventory.objects.filter(
-            variant=obj
-        ).select_related('warehouse')
+        inventories = _prefetched(obj, 'inventory')
+        if inventories is None:
+            inventories = VariantInventory.objects.filter(
+                variant=obj
+            ).select_related('warehouse')
         
         return [
             {
@@ -111,7 +179,7 @@ class StorefrontProductSerializer(serializers.ModelSerializer):
     def get_categories(self, obj):
         """Get category names"""
         return [{'id': cat.id, 'name': cat.name, 'slug': cat.slug} 
-                for cat in obj.categories.filter(is_active=True)]
+                for cat in obj.categories.all() if cat.is_active]
     
     def get_tags(self, obj):
         """Get tag names"""
@@ -120,7 +188,8 @@ class StorefrontProductSerializer(serializers.ModelSerializer):
     
     def get_primary_image(self, obj):
         """Get primary product image URL (from stored path so seed_images/store/... is correct)."""
-        primary_media = obj.primary_image
+        links = _image_links(obj)
+        primary_media = links[0] if links else None
         if primary_media and primary_media.media:
             request = self.context.get('request')
             if primary_media.media.external_url:
@@ -132,7 +201,7 @@ class StorefrontProductSerializer(serializers.ModelSerializer):
         """Get all product image URLs"""
         request = self.context.get('request')
         images = []
-        for ml in obj.media_links.filter(media__media_type='image').select_related('media').order_by('position'):
+        for ml in _image_links(obj):
             if ml.media:
                 if ml.media.external_url:
                     images.append(ml.media.external_url)
@@ -158,13 +227,13 @@ class StorefrontProductSerializer(serializers.ModelSerializer):
     
     def get_rating(self, obj):
         """Get average rating from approved reviews"""
-        from django.db.models import Avg
-        from bfg.shop.models import ProductReview
-        
-        avg_rating = ProductReview.objects.filter(
-            product=obj,
-            is_approved=True
-        ).aggregate(avg_rating=Avg('rating'))['avg_rating']
+        if hasattr(obj, 'storefront_rating'):
+            avg_rating = obj.storefront_rating
+        else:
+            avg_rating = ProductReview.objects.filter(
+                product=obj,
+                is_approved=True
+            ).aggregate(avg_rating=Avg('rating'))['avg_rating']
         
         if avg_rating:
             return round(float(avg_rating), 1)
@@ -172,7 +241,8 @@ class StorefrontProductSerializer(serializers.ModelSerializer):
     
     def get_reviews_count(self, obj):
         """Get count of approved reviews"""
-        from bfg.shop.models import ProductReview
+        if hasattr(obj, 'storefront_reviews_count'):
+            return obj.storefront_reviews_count
 
         return ProductReview.objects.filter(
             product=obj,
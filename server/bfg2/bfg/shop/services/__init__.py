@@ -16,6 +16,7 @@ from .cart_service import CartService
 from .order_service import OrderService
 from .inventory_service import InventoryService
 from .store_service import StoreService
+from .stock_allocation_service import AllocationPlan, ShipmentPlan, StockAllocationService
 
 __all__ = [
     'ProductService',
@@ -28,4 +29,7 @@ __all__ = [
     'OrderService',
     'InventoryService',
     'StoreService',
+    'AllocationPlan',
+    'ShipmentPlan',
+    'StockAllocationService',
 ]
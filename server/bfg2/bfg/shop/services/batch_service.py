@@ -10,17 +10,26 @@ Or in Django settings:
     }
 """
 
+from collections import defaultdict
+from itertools import groupby
 from typing import Any, Optional, List, Tuple
 from datetime import date, timedelta
 from decimal import Decimal
 from django.db import transaction
-from django.db.models import QuerySet
+from django.db.models import Count, F, QuerySet, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from django.conf import settings
 
 from bfg.core.services import BaseService
 from bfg.shop.exceptions import InsufficientStock
 
+# Rows per bulk UPDATE / INSERT statement
+BULK_CHUNK_SIZE = 500
+
+# Batches listed per warehouse in an expiry warning
+EXPIRY_WARNING_LIST_LIMIT = 10
+
 
 # Feature flag check
 def is_batch_management_enabled(workspace=None) -> bool:
@@ -56,7 +65,7 @@ class BatchService(BaseService):
             )
         
         # Import models dynamically
-        from bfg.shop.batch_models import ProductBatch, BatchMovement
+        from bfg.shop.models import ProductBatch, BatchMovement
         self.ProductBatch = ProductBatch
         self.BatchMovement = BatchMovement
     
@@ -178,23 +187,64 @@ class BatchService(BaseService):
         """
         Reserve batch stock for an order
         
+        Reservations are applied with guarded set-based UPDATEs (reserved may not
+        exceed quantity) and movements are written with bulk inserts, instead of a
+        save() and an insert per allocation.
+        
         Args:
             allocations: List of (batch, quantity) tuples
             order: Order instance
+            
+        Raises:
+            InsufficientStock: If a batch no longer has the quantity available
         """
+        requested = defaultdict(int)
         for batch, quantity in allocations:
-            batch.reserved += quantity
-            batch.save()
-            
-            # Record reservation
-            self.BatchMovement.objects.create(
-                batch=batch,
-                movement_type='out',
-                quantity=-quantity,
-                order=order,
-                reason=f'Reserved for order {order.order_number}',
-                performed_by=self.user,
-            )
+            requested[batch.pk] += quantity
+        requested = {pk: quantity for pk, quantity in requested.items() if quantity > 0}
+        if not requested:
+            return
+        
+        # One guarded UPDATE per distinct quantity (and chunk of ids): allocations
+        # mostly share a handful of quantities, and plain IN lists stay cheap to build
+        by_quantity = defaultdict(list)
+        for pk, quantity in requested.items():
+            by_quantity[quantity].append(pk)
+        now = timezone.now()
+        for quantity, pks in by_quantity.items():
+            for offset in range(0, len(pks), BULK_CHUNK_SIZE):
+                chunk = pks[offset:offset + BULK_CHUNK_SIZE]
+                updated = self.ProductBatch.objects.filter(
+                    pk__in=chunk,
+                    quantity__gte=F('reserved') + quantity
+                ).update(reserved=F('reserved') + quantity, updated_at=now)
+                if updated != len(chunk):
+                    # The atomic block rolls back the updates already applied
+                    raise InsufficientStock("Batch stock changed during reservation, please retry")
+        
+        reserved = set()
+        for batch, quantity in allocations:
+            if batch.pk in requested and batch.pk not in reserved:
+                batch.reserved += requested[batch.pk]
+                reserved.add(batch.pk)
+        
+        # Record reservations
+        self.BatchMovement.objects.bulk_create(
+            [
+                self.BatchMovement(
+                    batch=batch,
+                    movement_type='out',
+                    quantity=-quantity,
+                    order=order,
+                    reason=f'Reserved for order {order.order_number}',
+                    performed_by=self.user,
+                    created_at=now,
+                )
+                for batch, quantity in allocations
+                if quantity > 0
+            ],
+            batch_size=BULK_CHUNK_SIZE
+        )
     
     def get_expiring_batches(
         self,
@@ -272,64 +322,60 @@ class ExpiryNotificationService(BaseService):
         if not is_batch_management_enabled(self.workspace):
             return 0
         
-        batch_service = BatchService(workspace=self.workspace, user=self.user)
-        expiring_batches = batch_service.get_expiring_batches(days_threshold)
-        
-        if not expiring_batches.exists():
+        # Recipients: customer accounts of the workspace's active staff (one query).
+        # Without any there is nothing to send, so skip loading batches.
+        from bfg.common.models import Customer
+        recipients = list(Customer.objects.filter(
+            workspace=self.workspace,
+            user__staff_memberships__workspace=self.workspace,
+            user__staff_memberships__is_active=True,
+        ).distinct())
+        if not recipients:
             return 0
         
-        # Group by warehouse
-        from collections import defaultdict
-        warehouse_batches = defaultdict(list)
-        
-        for batch in expiring_batches:
-            warehouse_batches[batch.warehouse].append(batch)
+        # The first batches of every warehouse plus the warehouse total, in one
+        # query: window functions keep thousands of expiring batches in the database
+        batch_service = BatchService(workspace=self.workspace, user=self.user)
+        fifo = [F('expiry_date').asc(), F('manufactured_date').asc(), F('id').asc()]
+        expiring_batches = batch_service.get_expiring_batches(days_threshold).annotate(
+            position=Window(RowNumber(), partition_by=[F('warehouse_id')], order_by=fifo),
+            warehouse_total=Window(Count('id'), partition_by=[F('warehouse_id')]),
+        ).filter(position__lte=EXPIRY_WARNING_LIST_LIMIT).order_by('warehouse_id', 'position')
         
-        # Send notifications
         from bfg.inbox.services import MessageService
         message_service = MessageService(workspace=self.workspace, user=self.user)
         
         notifications_sent = 0
         
-        for warehouse, batches in warehouse_batches.items():
-            # Get warehouse managers (simplified - adjust based on your permission model)
-            from bfg.common.models import StaffMember
-            managers = StaffMember.objects.filter(
-                workspace=self.workspace,
-                # Add warehouse-specific filtering
-            )
-            
-            if not managers:
-                continue
+        for _warehouse_id, rows in groupby(expiring_batches, key=lambda b: b.warehouse_id):
+            batches = list(rows)
+            warehouse = batches[0].warehouse
             
             # Build message
             batch_list = '\n'.join([
                 f"• {b.variant.product.name} - Batch {b.batch_number}\n"
                 f"  Expires: {b.expiry_date} ({b.days_to_expiry} days), "
                 f"Stock: {b.available} units"
-                for b in batches[:10]
+                for b in batches
             ])
             
             message = f"""
 ⚠️ Expiry Warning for {warehouse.name}
 
-{len(batches)} batch(es) expiring within {days_threshold} days:
+{batches[0].warehouse_total} batch(es) expiring within {days_threshold} days:
 
 {batch_list}
 
 Please take action to avoid waste.
             """.strip()
             
-            recipients = [m.customer for m in managers if m.customer]
-            
-            if recipients:
-                message_service.send_message(
-                    recipients=recipients,
-                    subject=f"⚠️ Expiry Warning - {warehouse.name}",
-                    message=message,
-                    message_type='notification',
-                    send_email=True,
-                )
-                notifications_sent += 1
+            message_service.send_message(
+                recipients=recipients,
+                subject=f"⚠️ Expiry Warning - {warehouse.name}",
+                message=message,
+                message_type='notification',
+                send_email=True,
+            )
+            notifications_sent += 1
         
         return notifications_sent
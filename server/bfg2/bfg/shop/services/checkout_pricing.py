@@ -0,0 +1,80 @@
+"""
+BFG Shop Module Services
+
+Checkout pricing pipeline data: a cart snapshot loaded once per pricing run and
+the structured totals breakdown returned by OrderService.price_cart
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ZERO = Decimal('0.00')
+
+
+def get_item_unit_weight(item) -> Decimal:
+    """Unit weight of a cart/order item: variant weight if set, otherwise product weight"""
+    if item.variant and item.variant.weight:
+        return item.variant.weight
+    if item.product.weight:
+        return item.product.weight
+    return Decimal('0')
+
+
+def get_item_unit_dimensions(item) -> Optional[Tuple[Decimal, Decimal, Decimal]]:
+    """
+    Unit (length, width, height) in cm of a cart/order item: variant dimensions if
+    all set, otherwise product dimensions; None when neither is complete
+    """
+    for source in (item.variant, item.product):
+        if source is not None and source.length and source.width and source.height:
+            return source.length, source.width, source.height
+    return None
+
+
+@dataclass
+class CartSnapshot:
+    """Cart items (with product and variant) plus the aggregates every pricing step needs"""
+    items: List[Any] = field(default_factory=list)
+    subtotal: Decimal = ZERO
+    weight: Decimal = Decimal('0')
+
+    @classmethod
+    def load(cls, cart) -> 'CartSnapshot':
+        """Load a cart in a single query"""
+        items = list(cart.items.select_related('product', 'variant').all())
+        return cls(
+            items=items,
+            subtotal=sum((item.subtotal for item in items), ZERO),
+            weight=sum((get_item_unit_weight(item) * item.quantity for item in items), Decimal('0')),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.items
+
+
+@dataclass
+class PricingBreakdown:
+    """Checkout totals; as_dict() is the calculate_order_totals result"""
+    subtotal: Decimal = ZERO
+    discount: Decimal = ZERO
+    shipping_cost: Decimal = ZERO
+    tax: Decimal = ZERO
+    total: Decimal = ZERO
+    shipping_discount: Decimal = ZERO
+    coupon_discount: Decimal = ZERO
+    gift_card_amount: Decimal = ZERO
+    weight: Decimal = Decimal('0')
+
+    def as_dict(self) -> Dict[str, Decimal]:
+        return {
+            'subtotal': self.subtotal,
+            'discount': self.discount,
+            'shipping_cost': self.shipping_cost,
+            'tax': self.tax,
+            'total': self.total,
+            'shipping_discount': self.shipping_discount,
+            'coupon_discount': self.coupon_discount,
+        }
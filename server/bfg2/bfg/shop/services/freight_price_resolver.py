@@ -2,28 +2,57 @@
 """Resolve freight rule price from product_id or direct price (for bfg.delivery calculator)."""
 
 from decimal import Decimal
-from typing import Any, Callable
+from typing import Any, Callable, Iterable, Optional, Set
 
 from bfg.shop.models import Product
 from bfg.shop.services.product_price_service import ProductPriceService
 
 
-def get_freight_price_value(workspace) -> Callable[[Any], Decimal]:
+def collect_price_product_ids(config: Any) -> Set[int]:
+    """Product ids referenced by price configs ({'product_id': ...}) anywhere in a freight config."""
+    product_ids = set()
+    stack = [config]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('product_id'):
+                product_ids.add(int(node['product_id']))
+            stack.extend(node.values())
+        elif isinstance(node, (list, tuple)):
+            stack.extend(node)
+    return product_ids
+
+
+def get_freight_price_value(
+    workspace,
+    product_ids: Optional[Iterable[int]] = None
+) -> Callable[[Any], Decimal]:
     """
     Return a callable(price_config) -> Decimal for use as get_price_value in
     bfg.delivery.services.freight_calculator. Resolves product_id via ProductPriceService.
+
+    Prices are memoized per product; product_ids (e.g. from collect_price_product_ids)
+    are loaded up front in two queries instead of one lookup per rule.
     """
     price_service = ProductPriceService()
+    prices = {}
+    if product_ids:
+        prices.update(price_service.get_effective_prices(
+            Product.objects.filter(id__in=list(product_ids), is_active=True)
+        ))
 
     def _resolve(price_config: Any) -> Decimal:
         if isinstance(price_config, dict):
             product_id = price_config.get('product_id')
             if product_id:
-                try:
-                    product = Product.objects.get(id=product_id, is_active=True)
-                    return price_service.get_effective_price(product)
-                except Product.DoesNotExist:
-                    raise ValueError(f"Product {product_id} not found or inactive")
+                product_id = int(product_id)
+                if product_id not in prices:
+                    try:
+                        product = Product.objects.get(id=product_id, is_active=True)
+                    except Product.DoesNotExist:
+                        raise ValueError(f"Product {product_id} not found or inactive")
+                    prices[product_id] = price_service.get_effective_price(product)
+                return prices[product_id]
             return Decimal(str(price_config.get('price', 0)))
         return Decimal(str(price_config))
 
@@ -4,13 +4,16 @@ BFG Shop Module Services
 Inventory management service
 """
 
-from typing import Any, Optional, List
+from typing import Any, Dict, Iterable, Optional, List, Tuple
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import F, QuerySet, Sum
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from bfg.core.services import BaseService
 from bfg.shop.exceptions import InsufficientStock
 from bfg.shop.models import Product, ProductVariant, VariantInventory
+from bfg.shop.services.product_listing_service import schedule_listing_refresh
 from bfg.delivery.models import Warehouse
 
 
@@ -67,19 +70,15 @@ class InventoryService(BaseService):
         inventory = self.get_variant_inventory(variant, warehouse)
         
         # Update quantity
-        inventory.quantity = F('quantity') + quantity_change
-        inventory.save()
-        inventory.refresh_from_db()
-        
-        # Also update variant's total stock_quantity
-        total_quantity = VariantInventory.objects.filter(
-            variant=variant
-        ).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
+        VariantInventory.objects.filter(pk=inventory.pk).update(
+            quantity=F('quantity') + quantity_change,
+            updated_at=timezone.now()
+        )
+        inventory.refresh_from_db(fields=['quantity', 'reserved'])
         
-        variant.stock_quantity = total_quantity
-        variant.save()
+        # Keep the variant's total stock_quantity in step
+        self._apply_variant_stock_changes({variant.id: quantity_change}, variants=[variant])
+        self._schedule_listing_refresh([variant])
         
         return inventory
     
@@ -104,20 +103,75 @@ class InventoryService(BaseService):
         Raises:
             InsufficientStock: If not enough available stock
         """
-        inventory = self.get_variant_inventory(variant, warehouse)
+        inventories = self.reserve_stock_many([(variant, warehouse, quantity)])
+        return inventories.get((variant.id, warehouse.id)) or self.get_variant_inventory(variant, warehouse)
+    
+    @transaction.atomic
+    def reserve_stock_many(
+        self,
+        lines: Iterable[Tuple[ProductVariant, Warehouse, int]]
+    ) -> Dict[Tuple[int, int], VariantInventory]:
+        """
+        Reserve stock for several lines (e.g. a whole order), all or nothing
         
-        # Check available quantity
-        if inventory.available < quantity:
-            raise InsufficientStock(
-                f"Only {inventory.available} units available in {warehouse.name}"
-            )
+        Inventory rows are locked in (warehouse, variant) order, so concurrent
+        multi-line reservations cannot deadlock, and then reserved with one
+        conditional UPDATE (quantity - reserved >= requested per row). If any
+        row lacks stock nothing is reserved.
         
-        # Reserve stock
-        inventory.reserved = F('reserved') + quantity
-        inventory.save()
-        inventory.refresh_from_db()
+        Args:
+            lines: (variant, warehouse, quantity) tuples; repeated pairs are summed
+            
+        Returns:
+            Dict mapping (variant_id, warehouse_id) to the updated inventory record
+            
+        Raises:
+            InsufficientStock: If any line lacks available stock
+        """
+        requested: Dict[Tuple[int, int], int] = {}
+        variants, warehouses = {}, {}
+        for variant, warehouse, quantity in lines:
+            if quantity <= 0:
+                continue
+            key = (variant.id, warehouse.id)
+            requested[key] = requested.get(key, 0) + quantity
+            variants[variant.id] = variant
+            warehouses[warehouse.id] = warehouse
+        if not requested:
+            return {}
         
-        return inventory
+        inventories = self._lock_inventories(requested)
+        for (variant_id, warehouse_id), quantity in sorted(requested.items()):
+            inventory = inventories.get((variant_id, warehouse_id))
+            available = inventory.available if inventory else 0
+            if available < quantity:
+                raise InsufficientStock(
+                    f"Only {available} units available in {warehouses[warehouse_id].name}"
+                )
+        
+        # Guarded update: also correct on backends without row locks
+        condition = Q()
+        for key, quantity in requested.items():
+            condition |= Q(pk=inventories[key].pk, quantity__gte=F('reserved') + quantity)
+        updated = VariantInventory.objects.filter(condition).update(
+            reserved=Case(
+                *[
+                    When(pk=inventories[key].pk, then=F('reserved') + Value(quantity))
+                    for key, quantity in requested.items()
+                ],
+                default=F('reserved'),
+                output_field=IntegerField()
+            ),
+            updated_at=timezone.now()
+        )
+        if updated != len(requested):
+            # A concurrent reservation won the race; the atomic block rolls back
+            raise InsufficientStock("Stock changed during reservation, please retry")
+        
+        for key, quantity in requested.items():
+            inventories[key].reserved += quantity
+        self._schedule_listing_refresh(variants.values())
+        return inventories
     
     @transaction.atomic
     def release_reservation(
@@ -139,10 +193,13 @@ class InventoryService(BaseService):
         """
         inventory = self.get_variant_inventory(variant, warehouse)
         
-        # Release reservation
-        new_reserved = max(0, inventory.reserved - quantity)
-        inventory.reserved = new_reserved
-        inventory.save()
+        # Release reservation (never below zero), in the database
+        VariantInventory.objects.filter(pk=inventory.pk).update(
+            reserved=Greatest(F('reserved') - quantity, Value(0)),
+            updated_at=timezone.now()
+        )
+        inventory.refresh_from_db(fields=['quantity', 'reserved'])
+        self._schedule_listing_refresh([variant])
         
         return inventory
     
@@ -167,24 +224,77 @@ class InventoryService(BaseService):
         inventory = self.get_variant_inventory(variant, warehouse)
         
         # Deduct from both quantity and reserved
-        inventory.quantity = F('quantity') - quantity
-        inventory.reserved = F('reserved') - quantity
-        inventory.save()
-        inventory.refresh_from_db()
-        
-        # Update variant's total stock_quantity
-        from django.db.models import Sum
-        total_quantity = VariantInventory.objects.filter(
-            variant=variant
-        ).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
+        VariantInventory.objects.filter(pk=inventory.pk).update(
+            quantity=F('quantity') - quantity,
+            reserved=F('reserved') - quantity,
+            updated_at=timezone.now()
+        )
+        inventory.refresh_from_db(fields=['quantity', 'reserved'])
         
-        variant.stock_quantity = total_quantity
-        variant.save()
+        # Keep the variant's total stock_quantity in step
+        self._apply_variant_stock_changes({variant.id: -quantity}, variants=[variant])
+        self._schedule_listing_refresh([variant])
         
         return inventory
     
+    def recalculate_variant_stock(self, variants: Iterable[ProductVariant]) -> None:
+        """
+        Rebuild ProductVariant.stock_quantity from warehouse inventory
+        
+        Stock totals are maintained incrementally; use this to repair totals
+        after inventory rows were edited outside InventoryService.
+        
+        Args:
+            variants: ProductVariant instances
+        """
+        variants = list(variants)
+        totals = dict(
+            VariantInventory.objects.filter(
+                variant__in=variants
+            ).values('variant').annotate(total=Sum('quantity')).values_list('variant', 'total')
+        )
+        for variant in variants:
+            variant.stock_quantity = totals.get(variant.id) or 0
+        ProductVariant.objects.bulk_update(variants, ['stock_quantity'])
+    
+    def _lock_inventories(
+        self,
+        requested: Dict[Tuple[int, int], int]
+    ) -> Dict[Tuple[int, int], VariantInventory]:
+        """Load (and on supporting backends lock) inventory rows in a deterministic order"""
+        variant_ids = {variant_id for variant_id, _warehouse_id in requested}
+        warehouse_ids = {warehouse_id for _variant_id, warehouse_id in requested}
+        rows = VariantInventory.objects.filter(
+            variant_id__in=variant_ids,
+            warehouse_id__in=warehouse_ids
+        ).order_by('warehouse_id', 'variant_id')
+        if connection.features.has_select_for_update:
+            rows = rows.select_for_update()
+        return {
+            (row.variant_id, row.warehouse_id): row
+            for row in rows
+            if (row.variant_id, row.warehouse_id) in requested
+        }
+    
+    def _apply_variant_stock_changes(
+        self,
+        changes: Dict[int, int],
+        variants: Iterable[ProductVariant] = ()
+    ) -> None:
+        """Apply stock_quantity deltas in the database and mirror them on given instances"""
+        for variant_id, delta in changes.items():
+            if delta:
+                ProductVariant.objects.filter(pk=variant_id).update(
+                    stock_quantity=F('stock_quantity') + delta
+                )
+        for variant in variants:
+            if changes.get(variant.id):
+                variant.stock_quantity += changes[variant.id]
+    
+    def _schedule_listing_refresh(self, variants: Iterable[ProductVariant]) -> None:
+        # Queryset updates skip post_save; listing stock reads quantity - reserved
+        schedule_listing_refresh({variant.product_id for variant in variants})
+    
     def get_available_warehouses(
         self,
         variant: ProductVariant,
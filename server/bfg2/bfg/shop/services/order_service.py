@@ -4,13 +4,14 @@ BFG Shop Module Services
 Order management service
 """
 
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, List
 from decimal import Decimal
 from datetime import datetime
 from django.db import transaction
 from django.db.models import F
 from django.utils import timezone
 from bfg.core.services import BaseService
+from bfg.core.numbering import next_number_after, number_allocator
 from rest_framework.exceptions import ValidationError as APIValidationError
 
 from bfg.shop.exceptions import EmptyCart, InvalidOrderStatus
@@ -23,6 +24,8 @@ if TYPE_CHECKING:
 from bfg.common.models import Customer, Address
 from bfg.common.services import AuditService
 from bfg.delivery.models import FreightService
+from bfg.shop.services.checkout_pricing import CartSnapshot, PricingBreakdown
+from bfg.shop.services.product_listing_service import schedule_listing_refresh
 
 
 class OrderService(BaseService):
@@ -40,7 +43,8 @@ class OrderService(BaseService):
         coupon_code: Optional[str] = None,
         gift_card_code: Optional[str] = None,
         user: Optional[Any] = None,
-        shipping_address: Optional[Address] = None
+        shipping_address: Optional[Address] = None,
+        snapshot: Optional[CartSnapshot] = None
     ) -> Dict[str, Decimal]:
         """
         Calculate order totals (unified calculation for preview and order creation)
@@ -53,6 +57,7 @@ class OrderService(BaseService):
             gift_card_code: Optional gift card code
             user: User instance (for discount calculation)
             shipping_address: Optional shipping address for location-based tax calculation
+            snapshot: Already loaded CartSnapshot of the cart (optional)
             
         Returns:
             Dict with:
@@ -62,21 +67,47 @@ class OrderService(BaseService):
                 - tax: Tax amount (calculated from TaxRate model)
                 - total: Final total
                 - shipping_discount: Free shipping indicator
-        """        
-        cart_items = cart.items.select_related('product', 'variant').all()
+        """
+        return self.price_cart(
+            cart,
+            shipping_method=shipping_method,
+            freight_service_id=freight_service_id,
+            coupon_code=coupon_code,
+            gift_card_code=gift_card_code,
+            user=user,
+            shipping_address=shipping_address,
+            snapshot=snapshot
+        ).as_dict()
+    
+    def price_cart(
+        self,
+        cart: Cart,
+        shipping_method: Optional[str] = None,
+        freight_service_id: Optional[int] = None,
+        coupon_code: Optional[str] = None,
+        gift_card_code: Optional[str] = None,
+        user: Optional[Any] = None,
+        shipping_address: Optional[Address] = None,
+        snapshot: Optional[CartSnapshot] = None
+    ) -> PricingBreakdown:
+        """
+        Checkout pricing pipeline
         
-        if not cart_items:
-            return {
-                'subtotal': Decimal('0.00'),
-                'discount': Decimal('0.00'),
-                'shipping_cost': Decimal('0.00'),
-                'tax': Decimal('0.00'),
-                'total': Decimal('0.00'),
-                'shipping_discount': Decimal('0.00')
-            }
-        
-        # Calculate subtotal
-        subtotal = sum(item.subtotal for item in cart_items)
+        Loads the cart once, then feeds the same snapshot (items, subtotal, weight)
+        to discount, freight and tax resolution, each of which resolves its inputs
+        in bulk. The number of queries does not grow with the number of cart items.
+        
+        Args:
+            See calculate_order_totals
+            
+        Returns:
+            PricingBreakdown: Structured totals
+        """
+        snapshot = snapshot or CartSnapshot.load(cart)
+        if snapshot.is_empty:
+            return PricingBreakdown()
+        
+        subtotal = snapshot.subtotal
         
         # Calculate discounts using discount service
         from bfg.marketing.services.discount_service import DiscountCalculationService
@@ -87,7 +118,7 @@ class OrderService(BaseService):
         
         # Convert cart items to order items format for discount calculation
         temp_order_items = []
-        for cart_item in cart_items:
+        for cart_item in snapshot.items:
             temp_item = OrderItem(
                 product=cart_item.product,
                 variant=cart_item.variant,
@@ -108,14 +139,13 @@ class OrderService(BaseService):
         discount = discount_result.get('discount', Decimal('0.00'))
         shipping_discount = discount_result.get('shipping_discount', Decimal('0.00'))
         
-        # Calculate cart weight for shipping calculation
-        weight = self._calculate_cart_weight(cart)
-        
         # Calculate shipping cost using FreightService or legacy method
         shipping_cost = self._calculate_shipping_cost(
             shipping_method=shipping_method,
             freight_service_id=freight_service_id,
-            weight=weight
+            weight=snapshot.weight,
+            order_amount=subtotal,
+            lines=snapshot.items
         )
         
         # Apply free shipping discount if applicable
@@ -130,45 +160,25 @@ class OrderService(BaseService):
         if gift_card_amount > 0:
             discount += gift_card_amount
         
-        # Calculate total
-        total = subtotal + shipping_cost + tax - discount
-        
-        return {
-            'subtotal': subtotal,
-            'discount': discount,
-            'shipping_cost': shipping_cost,
-            'tax': tax,
-            'total': total,
-            'shipping_discount': shipping_discount,
-            'coupon_discount': discount_result.get('coupon_discount', Decimal('0.00')),
-        }
-    
-    def _calculate_cart_weight(self, cart: Cart) -> Decimal:
-        """
-        Calculate total weight from cart items.
-        
-        Args:
-            cart: Cart instance
-            
-        Returns:
-            Decimal: Total weight in kg
-        """
-        total_weight = Decimal('0')
-        for item in cart.items.select_related('product', 'variant').all():
-            # Use variant weight if available, otherwise product weight
-            weight = Decimal('0')
-            if item.variant and item.variant.weight:
-                weight = item.variant.weight
-            elif item.product.weight:
-                weight = item.product.weight
-            total_weight += weight * item.quantity
-        return total_weight
+        return PricingBreakdown(
+            subtotal=subtotal,
+            discount=discount,
+            shipping_cost=shipping_cost,
+            tax=tax,
+            total=subtotal + shipping_cost + tax - discount,
+            shipping_discount=shipping_discount,
+            coupon_discount=discount_result.get('coupon_discount', Decimal('0.00')),
+            gift_card_amount=gift_card_amount,
+            weight=snapshot.weight,
+        )
     
     def _calculate_shipping_cost(
         self, 
         shipping_method: Optional[str] = None,
         freight_service_id: Optional[int] = None,
-        weight: Decimal = Decimal('0')
+        weight: Decimal = Decimal('0'),
+        order_amount: Optional[Decimal] = None,
+        lines: Optional[List[Any]] = None
     ) -> Decimal:
         """
         Calculate shipping cost using FreightService or fallback to legacy method.
@@ -177,6 +187,8 @@ class OrderService(BaseService):
             shipping_method: Legacy shipping method ('standard' or 'express')
             freight_service_id: FreightService ID for dynamic pricing
             weight: Total weight in kg for calculation
+            order_amount: Order subtotal for conditional freight rules (optional)
+            lines: Cart items, packed into boxes for volumetric pricing (optional)
             
         Returns:
             Decimal: Shipping cost
@@ -189,7 +201,7 @@ class OrderService(BaseService):
                     workspace=self.workspace,
                     is_active=True
                 )
-                return self._calculate_freight_service_cost(freight_service, weight)
+                return self._calculate_freight_service_cost(freight_service, weight, order_amount, lines)
             except FreightService.DoesNotExist:
                 pass  # Fall back to legacy method
         
@@ -201,7 +213,7 @@ class OrderService(BaseService):
                 is_active=True
             ).first()
             if freight_service:
-                return self._calculate_freight_service_cost(freight_service, weight)
+                return self._calculate_freight_service_cost(freight_service, weight, order_amount, lines)
         
         # Priority 3: Legacy fallback for backward compatibility
         if shipping_method == 'express':
@@ -214,14 +226,23 @@ class OrderService(BaseService):
     def _calculate_freight_service_cost(
         self, 
         freight_service: FreightService, 
-        weight: Decimal
+        weight: Decimal,
+        order_amount: Optional[Decimal] = None,
+        lines: Optional[List[Any]] = None
     ) -> Decimal:
         """
         Calculate shipping cost using FreightService config (bfg.delivery freight_calculator).
 
+        When the config opts in with cartonize (plus a volumetric_weight_factor, and
+        a weight-based unit) and cart lines are given, the lines are packed into the
+        workspace's package templates and the higher of the packages' billing
+        weight and the actual weight is charged.
+
         Args:
             freight_service: FreightService instance
             weight: Total weight in kg
+            order_amount: Order subtotal for conditional rules (optional)
+            lines: Cart items (optional)
             
         Returns:
             Decimal: Calculated shipping cost
@@ -235,11 +256,23 @@ class OrderService(BaseService):
             return base + (weight * per_kg)
         
         from bfg.delivery.services.freight_calculator import calculate_shipping_cost
-        from bfg.shop.services.freight_price_resolver import get_freight_price_value
+        from bfg.shop.services.freight_price_resolver import (
+            collect_price_product_ids, get_freight_price_value
+        )
+        if (
+            lines and config.get('cartonize') and config.get('volumetric_weight_factor')
+            and config.get('unit') != 'cbm'
+        ):
+            from bfg.delivery.services.cartonization import CartonizationService
+            packed = CartonizationService(workspace=self.workspace, user=self.user).billing_weight(
+                lines, config['volumetric_weight_factor']
+            )
+            weight = max(weight, packed)
         context = None
         if config.get('mode') == 'conditional':
-            context = {'freight': {'weight': weight, 'order_amount': None}, 'weight': weight}
-        get_price = get_freight_price_value(self.workspace)
+            context = {'freight': {'weight': weight, 'order_amount': order_amount}, 'weight': weight}
+        # Products referenced by price rules are loaded together, not per rule
+        get_price = get_freight_price_value(self.workspace, collect_price_product_ids(config))
         return calculate_shipping_cost(weight, config, context=context, get_price_value=get_price)
     
     def _calculate_tax(self, subtotal: Decimal, address: Optional[Address] = None) -> Decimal:
@@ -253,47 +286,13 @@ class OrderService(BaseService):
         Returns:
             Decimal: Tax amount
         """
-        from decimal import Decimal
-        from bfg.finance.models import TaxRate
+        from bfg.finance.services.tax_rate_resolver import get_tax_rate_table
         
-        # Try to find applicable tax rate
-        tax_rate = None
-        
-        if address and address.country:
-            # Try state-specific rate first
-            if address.state:
-                tax_rate = TaxRate.objects.filter(
-                    workspace=self.workspace,
-                    country=address.country,
-                    state=address.state,
-                    is_active=True
-                ).first()
-            
-            # Fall back to country-level rate
-            if not tax_rate:
-                tax_rate = TaxRate.objects.filter(
-                    workspace=self.workspace,
-                    country=address.country,
-                    state='',
-                    is_active=True
-                ).first()
-        
-        # If no address or no country-specific rate found, use default rate
-        # (first active rate with empty country, or first active rate)
-        if not tax_rate:
-            tax_rate = TaxRate.objects.filter(
-                workspace=self.workspace,
-                country='',
-                state='',
-                is_active=True
-            ).first()
-        
-        if not tax_rate:
-            # Fallback: try any active rate for this workspace
-            tax_rate = TaxRate.objects.filter(
-                workspace=self.workspace,
-                is_active=True
-            ).first()
+        # Most specific match wins: country + state > country > default (no country) > any active rate
+        tax_rate = get_tax_rate_table(self.workspace.id).get(
+            address.country if address else None,
+            address.state if address else None
+        )
         
         if tax_rate:
             # Rate is stored as percentage (e.g., 10 for 10%), convert to decimal
@@ -315,6 +314,10 @@ class OrderService(BaseService):
         """
         Create order from shopping cart
         
+        Order items are inserted in one statement and stock for all lines is
+        reserved together. The invoice, pending payment, audit log and the
+        order.created event follow once the order is committed.
+        
         Args:
             cart: Cart instance
             store: Store instance
@@ -331,8 +334,9 @@ class OrderService(BaseService):
         self.validate_workspace_access(cart)
         self.validate_workspace_access(store)
         
-        # Check cart has items
-        cart_items = cart.items.select_related('product', 'variant').all()
+        # Check cart has items (the snapshot is reused for pricing and order items)
+        snapshot = CartSnapshot.load(cart)
+        cart_items = snapshot.items
         if not cart_items:
             raise EmptyCart("Cannot create order from empty cart")
         
@@ -356,7 +360,8 @@ class OrderService(BaseService):
                 coupon_code=coupon_code,
                 gift_card_code=gift_card_code,
                 user=kwargs.get('user'),
-                shipping_address=shipping_address
+                shipping_address=shipping_address,
+                snapshot=snapshot
             )
             subtotal = totals['subtotal']
             discount = totals['discount']
@@ -373,7 +378,8 @@ class OrderService(BaseService):
                 coupon_code=coupon_code,
                 gift_card_code=gift_card_code,
                 user=kwargs.get('user'),
-                shipping_address=shipping_address
+                shipping_address=shipping_address,
+                snapshot=snapshot
             )
             subtotal = totals['subtotal']
             discount = totals['discount']
@@ -467,15 +473,9 @@ class OrderService(BaseService):
             is_active=True
         ).order_by('-is_default', 'name').first()
         
-        # Create order items from cart items and handle inventory
-        from bfg.shop.services.inventory_service import InventoryService
-        inventory_service = InventoryService(
-            workspace=self.workspace,
-            user=self.user
-        )
-        
-        for cart_item in cart_items:
-            OrderItem.objects.create(
+        # Create order items from cart items in one insert
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
                 product=cart_item.product,
                 variant=cart_item.variant,
@@ -486,30 +486,23 @@ class OrderService(BaseService):
                 price=cart_item.price,
                 subtotal=cart_item.subtotal,
             )
-            
-            # Reserve stock if inventory tracking is enabled
-            # Note: For products with variants, we reserve stock (will be fulfilled on payment)
-            # For products without variants, we check stock availability but don't reserve
-            # (will be deducted directly on payment completion)
-            if cart_item.product.track_inventory and default_warehouse:
-                try:
-                    if cart_item.variant:
-                        # Product with variant: reserve stock using VariantInventory
-                        inventory_service.reserve_stock(
-                            variant=cart_item.variant,
-                            warehouse=default_warehouse,
-                            quantity=cart_item.quantity
-                        )
-                    # For products without variants, stock will be deducted on payment completion
-                except Exception as e:
-                    # Log error but don't fail order creation
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.warning(
-                        f"Failed to reserve stock for product {cart_item.product.id} "
-                        f"(variant: {cart_item.variant.id if cart_item.variant else 'None'}) "
-                        f"in order {order.order_number}: {e}"
-                    )
+            for cart_item in cart_items
+        ])
+        # bulk_create skips post_save: refresh sold counts like saved items do
+        schedule_listing_refresh({cart_item.product.id for cart_item in cart_items})
+        
+        # Reserve stock if inventory tracking is enabled
+        # Note: For products with variants, we reserve stock (will be fulfilled on payment)
+        # For products without variants, stock will be deducted on payment completion
+        if default_warehouse:
+            self._reserve_order_stock(
+                order,
+                [
+                    cart_item for cart_item in cart_items
+                    if cart_item.product.track_inventory and cart_item.variant
+                ],
+                default_warehouse
+            )
         
         # Clear cart after order creation
         cart.items.all().delete()
@@ -522,6 +515,58 @@ class OrderService(BaseService):
                 times_used=F('times_used') + 1
             )
         
+        # Invoice, payment, audit log and order.created listeners run once the
+        # order is committed, outside the checkout transaction
+        transaction.on_commit(lambda: self._complete_created_order(order))
+        
+        return order
+    
+    def _reserve_order_stock(self, order: Order, cart_items: list, warehouse) -> None:
+        """
+        Reserve stock for the order lines with one set-based reservation
+        
+        If some line lacks stock, each line is reserved on its own instead, so the
+        lines with stock are still reserved (a failed line is logged, not raised).
+        """
+        if not cart_items:
+            return
+        from bfg.shop.services.inventory_service import InventoryService
+        inventory_service = InventoryService(
+            workspace=self.workspace,
+            user=self.user
+        )
+        try:
+            inventory_service.reserve_stock_many(
+                [(cart_item.variant, warehouse, cart_item.quantity) for cart_item in cart_items]
+            )
+            return
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.info(f"Reserving order {order.order_number} line by line: {e}")
+        
+        for cart_item in cart_items:
+            try:
+                inventory_service.reserve_stock(
+                    variant=cart_item.variant,
+                    warehouse=warehouse,
+                    quantity=cart_item.quantity
+                )
+            except Exception as e:
+                # Log error but don't fail order creation
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.warning(
+                    f"Failed to reserve stock for product {cart_item.product.id} "
+                    f"(variant: {cart_item.variant.id}) "
+                    f"in order {order.order_number}: {e}"
+                )
+    
+    def _complete_created_order(self, order: Order) -> None:
+        """
+        Post-commit work for a new order: invoice, pending payment, audit log
+        and the order.created event
+        """
         # Auto-create Invoice
         invoice = self._create_invoice_for_order(order)
         
@@ -529,16 +574,19 @@ class OrderService(BaseService):
         self._create_payment_for_order(order, invoice)
         
         # Log order creation
-        audit = AuditService(workspace=self.workspace, user=self.user)
-        audit.log_create(
-            order,
-            description=f"Order {order.order_number} was placed - Total: {order.total}",
-        )
+        try:
+            audit = AuditService(workspace=self.workspace, user=self.user)
+            audit.log_create(
+                order,
+                description=f"Order {order.order_number} was placed - Total: {order.total}",
+            )
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.warning(f"Failed to log creation of order {order.order_number}: {e}")
         
         # Emit order created event
         self.emit_event('order.created', {'order': order})
-        
-        return order
     
     @transaction.atomic
     def create_order(
@@ -640,24 +688,17 @@ class OrderService(BaseService):
         """
         Generate unique order number
         
+        Format: ORD-YYYYMMDD-XXXXX, numbered per day from a sequence shared by
+        all workspaces (order_number is globally unique)
+        
         Returns:
             str: Order number
         """
-        import random
-        import string
-        
-        # Format: ORD-YYYYMMDD-XXXXX
-        date_str = timezone.now().strftime('%Y%m%d')
-        random_str = ''.join(random.choices(string.digits, k=5))
-        
-        order_number = f"ORD-{date_str}-{random_str}"
-        
-        # Ensure uniqueness
-        while Order.objects.filter(order_number=order_number).exists():
-            random_str = ''.join(random.choices(string.digits, k=5))
-            order_number = f"ORD-{date_str}-{random_str}"
-        
-        return order_number
+        prefix = f"ORD-{timezone.now().strftime('%Y%m%d')}-"
+        number = number_allocator.allocate(
+            prefix, seed=lambda: next_number_after(Order.objects.all(), 'order_number', prefix)
+        )
+        return f"{prefix}{number:05d}"
     
     def _create_invoice_for_order(self, order: Order) -> Optional['Invoice']:
         """
@@ -0,0 +1,229 @@
+"""
+BFG Shop Module Services
+
+Storefront product listing read model maintenance
+"""
+
+from decimal import Decimal
+from typing import Iterable, List, Optional
+from django.db import transaction
+from django.db.models import Avg, Count, F, IntegerField, OuterRef, Prefetch, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from bfg.core.services import BaseService
+from bfg.core.transactions import OnCommitBatch
+from bfg.common.models import MediaLink, Workspace
+from bfg.common.serializers import media_file_url_for_serializer
+from bfg.shop.models import (
+    Product, ProductListing, ProductReview, OrderItem, VariantInventory
+)
+
+
+# Listing fields rewritten on every refresh (everything except identity columns)
+LISTING_UPDATE_FIELDS = [
+    'workspace', 'language', 'name', 'slug', 'price', 'compare_price', 'condition',
+    'is_active', 'is_featured', 'product_created_at', 'sold_count', 'rating',
+    'reviews_count', 'stock_available', 'primary_image_url', 'category_ids',
+    'tag_ids', 'category_slugs', 'tag_slugs',
+]
+
+
+# Workspace.settings key recording the listing version a full rebuild produced.
+# Storefront browsing uses the read model only once a workspace has been rebuilt
+# at the current version; bump it when listing rows gain data that needs a rebuild.
+LISTINGS_VERSION_SETTING = 'product_listings_version'
+LISTINGS_VERSION = 1
+
+
+def listings_ready(workspace) -> bool:
+    """Whether the workspace's listing rows are complete (no query: reads workspace.settings)"""
+    return workspace is not None and (workspace.settings or {}).get(LISTINGS_VERSION_SETTING) == LISTINGS_VERSION
+
+
+def _refresh_listings(product_ids: List[int]) -> None:
+    ProductListingService().refresh_products(product_ids)
+
+
+_listing_batch = OnCommitBatch(_refresh_listings)
+
+
+def schedule_listing_refresh(product_ids: Iterable[Optional[int]]) -> None:
+    """
+    Queue products for a listing refresh after the current transaction commits.
+
+    Several changes to the same product in one transaction (e.g. an order with many
+    lines) collapse into a single batched refresh.
+    """
+    _listing_batch.add(product_ids)
+
+
+def _delimited(slugs: List[str]) -> str:
+    """Join slugs as '|a|b|' so a single slug can be matched with __contains."""
+    return f"|{'|'.join(slugs)}|" if slugs else ''
+
+
+class ProductListingService(BaseService):
+    """
+    Product listing read model service
+
+    Projects products (price, sales, rating, image, categories, tags, stock) into
+    ProductListing rows used by storefront browsing
+    """
+
+    batch_size = 500
+
+    def _products_with_aggregates(self, product_ids: List[int]) -> QuerySet:
+        """Products with every listing aggregate attached in one query (plus prefetches)"""
+        approved_reviews = ProductReview.objects.filter(
+            product=OuterRef('pk'), is_approved=True
+        ).order_by().values('product')
+        sold = OrderItem.objects.filter(
+            product=OuterRef('pk')
+        ).order_by().values('product').annotate(total=Sum('quantity')).values('total')[:1]
+        stock = VariantInventory.objects.filter(
+            variant__product=OuterRef('pk')
+        ).order_by().values('variant__product').annotate(
+            total=Sum(F('quantity') - F('reserved'))
+        ).values('total')[:1]
+
+        return Product.objects.filter(id__in=product_ids).annotate(
+            listing_sold=Coalesce(Subquery(sold), Value(0), output_field=IntegerField()),
+            listing_rating=Subquery(approved_reviews.annotate(avg=Avg('rating')).values('avg')[:1]),
+            listing_reviews=Coalesce(
+                Subquery(approved_reviews.annotate(cnt=Count('id')).values('cnt')[:1]),
+                Value(0),
+                output_field=IntegerField()
+            ),
+            listing_stock=Subquery(stock),
+        ).prefetch_related(
+            'categories',
+            'tags',
+            Prefetch(
+                'media_links',
+                queryset=MediaLink.objects.filter(media__media_type='image').select_related('media')
+            ),
+        )
+
+    def build_listing(self, product: Product, listing: Optional[ProductListing] = None) -> ProductListing:
+        """
+        Fill a ProductListing from a product loaded by _products_with_aggregates
+
+        Args:
+            product: Product with listing_* annotations and prefetches
+            listing: Existing listing row to update in place (optional)
+
+        Returns:
+            ProductListing: Unsaved listing instance
+        """
+        listing = listing or ProductListing(product=product)
+        categories = list(product.categories.all())
+        # Ids (facets, clients) list active categories; slugs keep every category so
+        # ?category= matches as Product.categories__slug does
+        active_categories = [c for c in categories if c.is_active]
+        tags = list(product.tags.all())
+        image_links = sorted(product.media_links.all(), key=lambda ml: ml.position)
+
+        primary_image_url = ''
+        if image_links:
+            media = image_links[0].media
+            primary_image_url = media.external_url or media_file_url_for_serializer(media) or ''
+
+        if product.listing_stock is not None:
+            stock_available = max(0, product.listing_stock)
+        else:
+            stock_available = max(0, product.stock_quantity)
+
+        listing.workspace_id = product.workspace_id
+        listing.language = product.language
+        listing.name = product.name
+        listing.slug = product.slug
+        listing.price = product.price
+        listing.compare_price = product.compare_price
+        listing.condition = product.condition
+        listing.is_active = product.is_active
+        listing.is_featured = product.is_featured
+        listing.product_created_at = product.created_at
+        listing.sold_count = product.listing_sold
+        listing.rating = (
+            Decimal(str(round(float(product.listing_rating), 2)))
+            if product.listing_rating is not None else None
+        )
+        listing.reviews_count = product.listing_reviews
+        listing.stock_available = stock_available
+        listing.primary_image_url = primary_image_url[:500]
+        listing.category_ids = [c.id for c in active_categories]
+        listing.tag_ids = [t.id for t in tags]
+        listing.category_slugs = _delimited([c.slug for c in categories])
+        listing.tag_slugs = _delimited([t.slug for t in tags])
+        return listing
+
+    def refresh_products(self, product_ids: Iterable[int]) -> int:
+        """
+        Recompute listing rows for the given products (create, update or drop)
+
+        Args:
+            product_ids: Product IDs to refresh
+
+        Returns:
+            int: Number of listing rows written
+        """
+        product_ids = list({pid for pid in product_ids if pid})
+        written = 0
+        for start in range(0, len(product_ids), self.batch_size):
+            written += self._refresh_batch(product_ids[start:start + self.batch_size])
+        return written
+
+    @transaction.atomic
+    def _refresh_batch(self, product_ids: List[int]) -> int:
+        products = list(self._products_with_aggregates(product_ids))
+        existing = {
+            listing.product_id: listing
+            for listing in ProductListing.objects.filter(product_id__in=product_ids)
+        }
+
+        to_create, to_update = [], []
+        for product in products:
+            listing = existing.get(product.id)
+            if listing is None:
+                to_create.append(self.build_listing(product))
+            else:
+                to_update.append(self.build_listing(product, listing))
+
+        if to_create:
+            ProductListing.objects.bulk_create(to_create)
+        if to_update:
+            ProductListing.objects.bulk_update(to_update, LISTING_UPDATE_FIELDS)
+
+        # Listings whose product disappeared (deleted in the same transaction)
+        missing = set(product_ids) - {p.id for p in products}
+        if missing:
+            ProductListing.objects.filter(product_id__in=missing).delete()
+
+        return len(to_create) + len(to_update)
+
+    def rebuild_workspace(self, workspace=None) -> int:
+        """
+        Rebuild all listing rows for a workspace (or every workspace) and mark the
+        rebuilt workspaces as ready for listing-based browsing
+
+        Args:
+            workspace: Workspace instance, defaults to the service workspace; None rebuilds all
+
+        Returns:
+            int: Number of listing rows written
+        """
+        workspace = workspace or self.workspace
+        products = Product.objects.all()
+        listings = ProductListing.objects.all()
+        if workspace is not None:
+            products = products.filter(workspace=workspace)
+            listings = listings.filter(workspace=workspace)
+
+        product_ids = list(products.values_list('id', flat=True))
+        listings.exclude(product_id__in=product_ids).delete()
+        written = self.refresh_products(product_ids)
+
+        for rebuilt in [workspace] if workspace is not None else Workspace.objects.all():
+            if not listings_ready(rebuilt):
+                rebuilt.settings = {**(rebuilt.settings or {}), LISTINGS_VERSION_SETTING: LISTINGS_VERSION}
+                rebuilt.save(update_fields=['settings'])
+        return written
@@ -5,7 +5,7 @@ Handles product pricing logic including effective price calculation and price sc
 """
 
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Optional
 from django.utils import timezone
 from bfg.core.services import BaseService
 
@@ -49,6 +49,37 @@ class ProductPriceService(BaseService):
         
         # No price history, use current price
         return product.price
+
+    def get_effective_prices(self, products, at_time: Optional[timezone.datetime] = None) -> Dict[int, Decimal]:
+        """
+        Effective prices for several active products in one price-history query.
+        
+        Args:
+            products: Iterable of active Product instances
+            at_time: Datetime to check prices at. Defaults to now.
+        
+        Returns:
+            Dict[int, Decimal]: Effective price by product id
+        """
+        prices = {product.id: product.price for product in products}
+        if not prices:
+            return prices
+        if at_time is None:
+            at_time = timezone.now()
+        
+        from bfg.shop.models import ProductPriceHistory
+        
+        seen = set()
+        for product_id, new_price in ProductPriceHistory.objects.filter(
+            product_id__in=list(prices),
+            effective_at__lte=at_time,
+            status='active'
+        ).order_by('product_id', '-effective_at').values_list('product_id', 'new_price'):
+            # Most recent change per product comes first
+            if product_id not in seen:
+                seen.add(product_id)
+                prices[product_id] = new_price
+        return prices
     
     def schedule_price_change(
         self,
@@ -0,0 +1,312 @@
+"""
+BFG Shop Module Services
+
+Product full-text search: index maintenance, ranked queries and facet counts
+"""
+
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from bfg.core.services import BaseService
+from bfg.core.transactions import OnCommitBatch
+from bfg.common.models import Workspace
+from bfg.shop.models import (
+    Product, ProductCategory, ProductListing, ProductSearchDocument, ProductTag, ProductVariant
+)
+from bfg.shop.search import SearchHit, SearchResult, get_search_backend
+
+
+# Default price facet bucket edges; override with BFG2_SETTINGS['PRODUCT_SEARCH_PRICE_BUCKETS']
+DEFAULT_PRICE_BUCKETS = [0, 25, 50, 100, 250, 500]
+
+# Upper bound of full-text hits considered for filtering, facets and paging
+DEFAULT_MAX_CANDIDATES = 5000
+
+
+# Workspace.settings key recording the index version a full rebuild produced;
+# until it matches, storefront ?q= filtering falls back to name__icontains
+SEARCH_INDEX_VERSION_SETTING = 'product_search_version'
+SEARCH_INDEX_VERSION = 1
+
+
+def search_index_ready(workspace) -> bool:
+    """Whether every product of the workspace is indexed (no query: reads workspace.settings)"""
+    return workspace is not None and (workspace.settings or {}).get(SEARCH_INDEX_VERSION_SETTING) == SEARCH_INDEX_VERSION
+
+
+def _index_products(product_ids: List[int]) -> None:
+    ProductSearchService().index_products(product_ids)
+
+
+_index_batch = OnCommitBatch(_index_products)
+
+
+def schedule_search_index(product_ids: Iterable[Optional[int]]) -> None:
+    """Queue products for re-indexing after the current transaction commits."""
+    _index_batch.add(product_ids)
+
+
+def get_price_buckets() -> List[Decimal]:
+    edges = getattr(settings, 'BFG2_SETTINGS', {}).get('PRODUCT_SEARCH_PRICE_BUCKETS') or DEFAULT_PRICE_BUCKETS
+    return [Decimal(str(edge)) for edge in sorted(edges)]
+
+
+def price_bucket_key(price: Decimal, edges: List[Decimal]) -> str:
+    """Bucket label for a price, e.g. '25-50' or '500+'"""
+    for low, high in zip(edges, edges[1:]):
+        if low <= price < high:
+            return f'{low:g}-{high:g}'
+    if price >= edges[-1]:
+        return f'{edges[-1]:g}+'
+    return f'<{edges[0]:g}'
+
+
+class ProductSearchService(BaseService):
+    """
+    Product search service
+
+    Keeps ProductSearchDocument rows and the backend index in sync, and answers
+    storefront searches with relevance ranking and facet counts in one call
+    """
+
+    batch_size = 500
+
+    def __init__(self, workspace=None, user=None, backend=None):
+        super().__init__(workspace=workspace, user=user)
+        self.backend = backend or get_search_backend()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def build_document(self, product: Product, document: Optional[ProductSearchDocument] = None) -> ProductSearchDocument:
+        """
+        Flatten a product (with prefetched categories, tags, variants) into a search document
+
+        Args:
+            product: Product instance
+            document: Existing document to update in place (optional)
+
+        Returns:
+            ProductSearchDocument: Unsaved document
+        """
+        document = document or ProductSearchDocument(product=product)
+        keywords = [product.sku, product.barcode]
+        keywords += [variant.sku for variant in product.variants.all()]
+        keywords += [tag.name for tag in product.tags.all()]
+        keywords += [category.name for category in product.categories.all() if category.is_active]
+
+        document.workspace_id = product.workspace_id
+        document.language = product.language
+        document.title = product.name
+        document.body = '\n'.join(part for part in (product.short_description, product.description) if part)
+        document.keywords = ' '.join(k for k in keywords if k)
+        return document
+
+    def index_products(self, product_ids: Iterable[int]) -> int:
+        """
+        (Re)index products; products that no longer exist are dropped from the index
+
+        Args:
+            product_ids: Product IDs
+
+        Returns:
+            int: Number of documents written
+        """
+        self.backend.ensure_schema()
+        product_ids = list({pid for pid in product_ids if pid})
+        written = 0
+        for start in range(0, len(product_ids), self.batch_size):
+            written += self._index_batch(product_ids[start:start + self.batch_size])
+        return written
+
+    @transaction.atomic
+    def _index_batch(self, product_ids: List[int]) -> int:
+        products = Product.objects.filter(id__in=product_ids).prefetch_related(
+            'categories',
+            'tags',
+            Prefetch('variants', queryset=ProductVariant.objects.only('id', 'product_id', 'sku')),
+        )
+        existing = {
+            doc.product_id: doc
+            for doc in ProductSearchDocument.objects.filter(product_id__in=product_ids)
+        }
+
+        to_create, to_update = [], []
+        for product in products:
+            document = existing.pop(product.id, None)
+            if document is None:
+                to_create.append(self.build_document(product))
+            else:
+                to_update.append(self.build_document(product, document))
+
+        if to_create:
+            ProductSearchDocument.objects.bulk_create(to_create)
+            if not all(doc.pk for doc in to_create):
+                # Backends without RETURNING: reload ids for the index mirror
+                to_create = list(ProductSearchDocument.objects.filter(
+                    product_id__in=[doc.product_id for doc in to_create]
+                ))
+        if to_update:
+            ProductSearchDocument.objects.bulk_update(to_update, ['workspace', 'language', 'title', 'body', 'keywords'])
+        self.backend.index_documents(to_create + to_update)
+
+        # Remaining documents belong to products deleted in the meantime
+        # (the post_delete signal drops their backend index entries)
+        if existing:
+            ProductSearchDocument.objects.filter(id__in=[doc.id for doc in existing.values()]).delete()
+
+        return len(to_create) + len(to_update)
+
+    def rebuild_workspace(self, workspace=None) -> int:
+        """
+        Rebuild the search index for a workspace (or every workspace) and mark the
+        rebuilt workspaces as ready for index-based storefront filtering
+
+        Args:
+            workspace: Workspace instance, defaults to the service workspace; None rebuilds all
+
+        Returns:
+            int: Number of documents written
+        """
+        workspace = workspace or self.workspace
+        products = Product.objects.all()
+        if workspace is not None:
+            products = products.filter(workspace=workspace)
+        written = self.index_products(products.values_list('id', flat=True))
+
+        for rebuilt in [workspace] if workspace is not None else Workspace.objects.all():
+            if not search_index_ready(rebuilt):
+                rebuilt.settings = {**(rebuilt.settings or {}), SEARCH_INDEX_VERSION_SETTING: SEARCH_INDEX_VERSION}
+                rebuilt.save(update_fields=['settings'])
+        return written
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def match(self, query: str, language: Optional[str] = None, limit: int = None) -> List[SearchHit]:
+        """
+        Relevance-ranked full-text hits for the service workspace
+
+        Args:
+            query: Raw user query
+            language: Restrict to one language (optional)
+            limit: Maximum hits (defaults to PRODUCT_SEARCH_MAX_CANDIDATES)
+
+        Returns:
+            List[SearchHit]: Hits ordered by descending score
+        """
+        if limit is None:
+            limit = getattr(settings, 'BFG2_SETTINGS', {}).get(
+                'PRODUCT_SEARCH_MAX_CANDIDATES', DEFAULT_MAX_CANDIDATES
+            )
+        return self.backend.match(self.workspace.id, query, language=language, limit=limit)
+
+    def search(
+        self,
+        query: str,
+        language: Optional[str] = None,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        min_price: Optional[Any] = None,
+        max_price: Optional[Any] = None,
+        condition: Optional[str] = None,
+        limit: int = 24,
+        offset: int = 0
+    ) -> SearchResult:
+        """
+        Ranked search with filters and facet counts
+
+        Facets (category, tag, price bucket, condition) are counted over every
+        product matching the query and filters, not just the returned page.
+
+        Args:
+            query: Raw user query
+            language: Language code (optional)
+            category: Category slug filter (optional)
+            tag: Tag slug filter (optional)
+            min_price: Minimum price (optional)
+            max_price: Maximum price (optional)
+            condition: Product condition filter (optional)
+            limit: Page size
+            offset: Page offset
+
+        Returns:
+            SearchResult: Page of product ids, scores, total and facets
+        """
+        hits = self.match(query, language=language)
+        result = SearchResult(query=query)
+        if not hits:
+            result.facets = self._empty_facets()
+            return result
+
+        scores = {hit.product_id: hit.score for hit in hits}
+        listings = ProductListing.objects.filter(
+            workspace=self.workspace,
+            is_active=True,
+            product_id__in=list(scores)
+        )
+        if category:
+            listings = listings.filter(category_slugs__contains=ProductListing.slug_key(category))
+        if tag:
+            listings = listings.filter(tag_slugs__contains=ProductListing.slug_key(tag))
+        if condition:
+            listings = listings.filter(condition=condition)
+        for value, lookup in ((min_price, 'price__gte'), (max_price, 'price__lte')):
+            if value not in (None, ''):
+                try:
+                    listings = listings.filter(**{lookup: Decimal(str(value))})
+                except (InvalidOperation, ValueError, TypeError):
+                    pass
+
+        rows = list(listings.values_list('product_id', 'category_ids', 'tag_ids', 'price', 'condition'))
+        matched_ids = sorted((row[0] for row in rows), key=lambda pid: (-scores[pid], pid))
+
+        result.total = len(matched_ids)
+        result.product_ids = matched_ids[offset:offset + limit]
+        result.scores = {pid: scores[pid] for pid in result.product_ids}
+        result.facets = self._build_facets(rows)
+        return result
+
+    def _empty_facets(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {'categories': [], 'tags': [], 'price': [], 'condition': []}
+
+    def _build_facets(self, rows: List[tuple]) -> Dict[str, List[Dict[str, Any]]]:
+        category_counts, tag_counts, price_counts, condition_counts = Counter(), Counter(), Counter(), Counter()
+        edges = get_price_buckets()
+        for _product_id, category_ids, tag_ids, price, condition in rows:
+            category_counts.update(category_ids or [])
+            tag_counts.update(tag_ids or [])
+            price_counts[price_bucket_key(price, edges)] += 1
+            if condition:
+                condition_counts[condition] += 1
+
+        categories = ProductCategory.objects.filter(id__in=list(category_counts)).values('id', 'name', 'slug')
+        tags = ProductTag.objects.filter(id__in=list(tag_counts)).values('id', 'name', 'slug')
+
+        def _term_facet(terms, counts):
+            facet = [{**term, 'count': counts[term['id']]} for term in terms]
+            return sorted(facet, key=lambda item: (-item['count'], item['name']))
+
+        return {
+            'categories': _term_facet(categories, category_counts),
+            'tags': _term_facet(tags, tag_counts),
+            'price': [
+                {'bucket': bucket, 'count': count}
+                for bucket, count in sorted(price_counts.items(), key=lambda item: self._bucket_order(item[0]))
+            ],
+            'condition': [
+                {'value': value, 'count': count}
+                for value, count in condition_counts.most_common()
+            ],
+        }
+
+    @staticmethod
+    def _bucket_order(bucket: str) -> Decimal:
+        """Sort key for bucket labels ('<0', '0-25', '500+')"""
+        head = bucket.lstrip('<').split('-')[0].rstrip('+')
+        return Decimal(head) - (1 if bucket.startswith('<') else 0)
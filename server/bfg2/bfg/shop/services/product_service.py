@@ -80,6 +80,9 @@ class ProductService(BaseService):
             'low_stock_threshold': kwargs.get('low_stock_threshold', 10),
             'requires_shipping': kwargs.get('requires_shipping', True),
             'weight': kwargs.get('weight'),
+            'length': kwargs.get('length'),
+            'width': kwargs.get('width'),
+            'height': kwargs.get('height'),
             'meta_title': kwargs.get('meta_title', name),
             'meta_description': kwargs.get('meta_description', ''),
             'is_active': kwargs.get('is_active', True),
@@ -190,6 +193,9 @@ class ProductService(BaseService):
             compare_price=kwargs.get('compare_price'),
             stock_quantity=kwargs.get('stock_quantity', 0),
             weight=kwargs.get('weight'),
+            length=kwargs.get('length'),
+            width=kwargs.get('width'),
+            height=kwargs.get('height'),
             is_active=kwargs.get('is_active', True),
             order=kwargs.get('order', 100),
         )
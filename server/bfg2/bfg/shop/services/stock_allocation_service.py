@@ -0,0 +1,312 @@
+"""
+BFG Shop Module Services
+
+Multi-warehouse stock allocation: plan which warehouses (and batches) ship a
+whole order, in memory, then apply the plan with bulk reservations
+"""
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bfg.core.services import BaseService
+from bfg.delivery.models import Warehouse
+from bfg.shop.exceptions import InsufficientStock
+from bfg.shop.models import ProductBatch, ProductVariant, VariantInventory
+from bfg.shop.services.batch_service import BatchService, is_batch_management_enabled
+from bfg.shop.services.inventory_service import InventoryService
+
+# Up to this many candidate warehouses every combination is tried; above it a
+# greedy set cover is used
+EXACT_SEARCH_LIMIT = 10
+
+# Approximate distances (km) when warehouse or destination has no coordinates
+SAME_CITY_KM = 50.0
+SAME_STATE_KM = 300.0
+SAME_COUNTRY_KM = 1000.0
+OTHER_COUNTRY_KM = 10000.0
+
+
+def estimate_distance(warehouse, address) -> float:
+    """
+    Distance in km from a warehouse to a shipping address
+
+    Great-circle distance when both have coordinates, otherwise an estimate from
+    the matching address parts. Without an address every warehouse is 0 km away.
+    """
+    if address is None:
+        return 0.0
+    if None not in (warehouse.latitude, warehouse.longitude, address.latitude, address.longitude):
+        lat1, lon1 = math.radians(float(warehouse.latitude)), math.radians(float(warehouse.longitude))
+        lat2, lon2 = math.radians(float(address.latitude)), math.radians(float(address.longitude))
+        h = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        )
+        return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+    def same(attr):
+        value = (getattr(address, attr, '') or '').strip().lower()
+        return bool(value) and value == (getattr(warehouse, attr, '') or '').strip().lower()
+
+    if not same('country'):
+        return OTHER_COUNTRY_KM
+    if not same('state'):
+        return SAME_COUNTRY_KM
+    if not same('city'):
+        return SAME_STATE_KM
+    return SAME_CITY_KM
+
+
+@dataclass
+class ShipmentPlan:
+    """Everything one warehouse ships for the order"""
+    warehouse: Warehouse
+    distance: float = 0.0
+    lines: List[Tuple[ProductVariant, int]] = field(default_factory=list)
+    batches: List[Tuple[ProductBatch, int]] = field(default_factory=list)
+
+    @property
+    def quantity(self) -> int:
+        return sum(quantity for _variant, quantity in self.lines)
+
+
+@dataclass
+class AllocationPlan:
+    """Allocation of an order across warehouses, nearest shipment first"""
+    shipments: List[ShipmentPlan] = field(default_factory=list)
+
+    @property
+    def shipment_count(self) -> int:
+        return len(self.shipments)
+
+    @property
+    def warehouses(self) -> List[Warehouse]:
+        return [shipment.warehouse for shipment in self.shipments]
+
+    def stock_lines(self) -> List[Tuple[ProductVariant, Warehouse, int]]:
+        """(variant, warehouse, quantity) lines for InventoryService.reserve_stock_many"""
+        return [
+            (variant, shipment.warehouse, quantity)
+            for shipment in self.shipments
+            for variant, quantity in shipment.lines
+        ]
+
+    def batch_allocations(self) -> List[Tuple[ProductBatch, int]]:
+        """(batch, quantity) allocations for BatchService.reserve_batches"""
+        return [allocation for shipment in self.shipments for allocation in shipment.batches]
+
+
+class StockAllocationService(BaseService):
+    """
+    Cost-aware stock allocation across warehouses
+
+    Candidate inventory and batch rows for the whole order are loaded in two
+    queries. The plan then minimises, in order:
+    1. The number of shipments (warehouses used)
+    2. The total distance from the used warehouses to the destination
+    Within each warehouse batch-tracked variants are taken FIFO by expiry date.
+    """
+
+    def plan_allocation(
+        self,
+        lines: Iterable[Tuple[ProductVariant, int]],
+        shipping_address=None,
+        use_batches: Optional[bool] = None
+    ) -> AllocationPlan:
+        """
+        Plan stock allocation for an order
+
+        Args:
+            lines: (variant, quantity) tuples; repeated variants are summed
+            shipping_address: Destination Address (optional)
+            use_batches: Allocate batches too (default: if batch management is enabled)
+
+        Returns:
+            AllocationPlan: Shipments with their lines and batches
+
+        Raises:
+            InsufficientStock: If a variant lacks stock across all warehouses
+        """
+        demand: Dict[int, int] = defaultdict(int)
+        variants: Dict[int, ProductVariant] = {}
+        for variant, quantity in lines:
+            if quantity > 0:
+                demand[variant.id] += quantity
+                variants[variant.id] = variant
+        if not demand:
+            return AllocationPlan()
+
+        if use_batches is None:
+            use_batches = is_batch_management_enabled(self.workspace)
+
+        warehouses, available = self._load_inventory(demand)
+        batches = self._load_batches(demand, warehouses) if use_batches else {}
+        for key, candidates in batches.items():
+            # Batch-tracked stock is limited by sellable (unexpired, normal) batches
+            if key in available:
+                available[key] = min(available[key], sum(batch.available for batch in candidates))
+
+        for variant_id, quantity in demand.items():
+            total = sum(available.get((variant_id, warehouse_id), 0) for warehouse_id in warehouses)
+            if total < quantity:
+                raise InsufficientStock(
+                    f"Only {total} units of {variants[variant_id]} available across all warehouses"
+                )
+
+        distances = {
+            warehouse_id: estimate_distance(warehouse, shipping_address)
+            for warehouse_id, warehouse in warehouses.items()
+        }
+        # Nearest first; ties go to the default warehouse, then the oldest
+        ranked = sorted(
+            (warehouse_id for warehouse_id in warehouses if any(
+                available.get((variant_id, warehouse_id), 0) for variant_id in demand
+            )),
+            key=lambda warehouse_id: (
+                distances[warehouse_id], not warehouses[warehouse_id].is_default, warehouse_id
+            )
+        )
+        chosen = self._choose_warehouses(demand, ranked, available, distances)
+
+        shipments = {
+            warehouse_id: ShipmentPlan(warehouses[warehouse_id], distances[warehouse_id])
+            for warehouse_id in chosen
+        }
+        for variant_id, quantity in demand.items():
+            remaining = quantity
+            for warehouse_id in chosen:
+                take = min(remaining, available.get((variant_id, warehouse_id), 0))
+                if take <= 0:
+                    continue
+                shipment = shipments[warehouse_id]
+                shipment.lines.append((variants[variant_id], take))
+                shipment.batches.extend(self._take_batches(batches.get((variant_id, warehouse_id), []), take))
+                remaining -= take
+                if not remaining:
+                    break
+
+        return AllocationPlan([shipments[warehouse_id] for warehouse_id in chosen if shipments[warehouse_id].lines])
+
+    def plan_order_allocation(self, order, use_batches: Optional[bool] = None) -> AllocationPlan:
+        """Plan allocation for an order's variant lines, shipping to its address"""
+        items = order.items.select_related('variant').filter(variant__isnull=False)
+        return self.plan_allocation(
+            [(item.variant, item.quantity) for item in items],
+            shipping_address=order.shipping_address,
+            use_batches=use_batches,
+        )
+
+    @transaction.atomic
+    def apply_plan(self, plan: AllocationPlan, order=None) -> None:
+        """
+        Reserve the planned stock (and batches, given an order) all or nothing
+
+        Args:
+            plan: AllocationPlan from plan_allocation
+            order: Order the batch reservations are recorded against
+        """
+        InventoryService(workspace=self.workspace, user=self.user).reserve_stock_many(plan.stock_lines())
+        batch_allocations = plan.batch_allocations()
+        if batch_allocations and order is not None:
+            BatchService(workspace=self.workspace, user=self.user).reserve_batches(batch_allocations, order)
+
+    def _load_inventory(
+        self,
+        demand: Dict[int, int]
+    ) -> Tuple[Dict[int, Warehouse], Dict[Tuple[int, int], int]]:
+        """Active warehouses holding any demanded variant, and available units per (variant, warehouse)"""
+        rows = VariantInventory.objects.filter(
+            variant_id__in=demand,
+            warehouse__workspace=self.workspace,
+            warehouse__is_active=True,
+            quantity__gt=F('reserved'),
+        ).select_related('warehouse')
+        warehouses: Dict[int, Warehouse] = {}
+        available: Dict[Tuple[int, int], int] = {}
+        for row in rows:
+            warehouses[row.warehouse_id] = row.warehouse
+            available[(row.variant_id, row.warehouse_id)] = row.available
+        return warehouses, available
+
+    def _load_batches(
+        self,
+        demand: Dict[int, int],
+        warehouses: Dict[int, Warehouse]
+    ) -> Dict[Tuple[int, int], List[ProductBatch]]:
+        """Sellable batches per (variant, warehouse), FIFO by expiry then manufacture date"""
+        today = timezone.now().date()
+        rows = ProductBatch.objects.filter(
+            workspace=self.workspace,
+            variant_id__in=demand,
+            warehouse_id__in=warehouses,
+            quantity__gt=0,
+        )
+        batches: Dict[Tuple[int, int], List[ProductBatch]] = defaultdict(list)
+        for batch in rows:
+            # Registered even without a sellable batch: the pair then has no capacity
+            candidates = batches[(batch.variant_id, batch.warehouse_id)]
+            if batch.quality_status == 'normal' and not (batch.expiry_date and batch.expiry_date < today):
+                candidates.append(batch)
+        for candidates in batches.values():
+            candidates.sort(key=lambda batch: (batch.expiry_date or date.max, batch.manufactured_date, batch.id))
+        return dict(batches)
+
+    def _choose_warehouses(
+        self,
+        demand: Dict[int, int],
+        ranked: List[int],
+        available: Dict[Tuple[int, int], int],
+        distances: Dict[int, float]
+    ) -> List[int]:
+        """Fewest warehouses covering the demand, nearest set among equals"""
+        def covers(warehouse_ids):
+            return all(
+                sum(available.get((variant_id, warehouse_id), 0) for warehouse_id in warehouse_ids) >= quantity
+                for variant_id, quantity in demand.items()
+            )
+
+        if len(ranked) <= EXACT_SEARCH_LIMIT:
+            for size in range(1, len(ranked) + 1):
+                # combinations() keeps ranked order, so ties resolve to nearer warehouses
+                feasible = [combo for combo in combinations(ranked, size) if covers(combo)]
+                if feasible:
+                    return list(min(feasible, key=lambda combo: sum(distances[w] for w in combo)))
+
+        # Greedy set cover: repeatedly add the warehouse covering most outstanding units
+        remaining = dict(demand)
+        chosen: List[int] = []
+        candidates = list(ranked)
+        while any(remaining.values()):
+            best = max(
+                candidates,
+                key=lambda warehouse_id: (
+                    sum(min(quantity, available.get((variant_id, warehouse_id), 0))
+                        for variant_id, quantity in remaining.items()),
+                    -ranked.index(warehouse_id),
+                )
+            )
+            candidates.remove(best)
+            chosen.append(best)
+            for variant_id, quantity in remaining.items():
+                remaining[variant_id] = max(0, quantity - available.get((variant_id, best), 0))
+        return sorted(chosen, key=ranked.index)
+
+    @staticmethod
+    def _take_batches(batches: List[ProductBatch], quantity: int) -> List[Tuple[ProductBatch, int]]:
+        allocations = []
+        for batch in batches:
+            if quantity <= 0:
+                break
+            take = min(batch.available, quantity)
+            if take > 0:
+                allocations.append((batch, take))
+                quantity -= take
+        return allocations
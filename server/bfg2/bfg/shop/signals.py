@@ -2,9 +2,20 @@
 """
 BFG Shop Module Signal Handlers
 Initialize shop-related data structures when workspace is created
+and keep the storefront listing read model / search index / caches in sync with catalog changes
 """
 
 from typing import Any, Dict
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from bfg.common.models import MediaLink
+from bfg.shop.models import (
+    Product, ProductCategory, ProductTag, ProductVariant, OrderItem, ProductReview,
+    VariantInventory, ProductSearchDocument
+)
+from bfg.shop.services.product_listing_service import schedule_listing_refresh
+from bfg.shop.services.product_search_service import schedule_search_index
 from bfg.core.events import global_dispatcher
 
 import logging
@@ -73,3 +84,104 @@ def on_workspace_created(event_data: Dict[str, Any]):
 
 # Register event listener
 global_dispatcher.listen('workspace.created', on_workspace_created)
+
+
+# ---------------------------------------------------------------------------
+# Storefront listing read model and search index maintenance
+# ---------------------------------------------------------------------------
+
+
+@receiver(post_save, sender=Product)
+def refresh_listing_on_product_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_listing_refresh([instance.pk])
+        schedule_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, raw=False, **kwargs):
+    """Drop cached copies of the product and the workspace product lists."""
+    if raw:
+        return
+    from bfg.shop.cache import ProductCacheService, ProductListCacheService
+    workspace_id, product_id = instance.workspace_id, instance.pk
+    transaction.on_commit(lambda: (
+        ProductCacheService.invalidate_product(product_id, workspace_id),
+        ProductListCacheService.invalidate_workspace_lists(workspace_id),
+    ))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def refresh_listing_on_product_child_change(sender, instance, raw=False, **kwargs):
+    """Sold count and rating aggregates change with order items and reviews."""
+    if not raw:
+        schedule_listing_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=VariantInventory)
+@receiver(post_delete, sender=VariantInventory)
+def refresh_listing_on_inventory_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        schedule_listing_refresh([instance.variant.product_id])
+    except Exception:
+        # Variant already gone (cascade delete); product delete drops the listing
+        pass
+
+
+@receiver(post_save, sender=MediaLink)
+@receiver(post_delete, sender=MediaLink)
+def refresh_listing_on_media_change(sender, instance, raw=False, **kwargs):
+    """Primary image URL comes from the product's first image link."""
+    if raw:
+        return
+    from django.contrib.contenttypes.models import ContentType
+    if instance.content_type_id == ContentType.objects.get_for_model(Product).id:
+        schedule_listing_refresh([instance.object_id])
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+@receiver(m2m_changed, sender=Product.tags.through)
+def refresh_listing_on_product_terms_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        product_ids = [instance.pk]
+    elif action in ('post_add', 'post_remove'):
+        product_ids = list(pk_set or [])
+    elif action == 'pre_clear':
+        # Reverse clear: pk_set is not provided, capture linked products before they go
+        product_ids = list(instance.products.values_list('id', flat=True))
+    else:
+        return
+    schedule_listing_refresh(product_ids)
+    schedule_search_index(product_ids)
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_save, sender=ProductTag)
+def refresh_listing_on_term_save(sender, instance, created, raw=False, **kwargs):
+    """Slug / is_active changes alter the denormalized category and tag columns."""
+    if not raw and not created:
+        product_ids = list(instance.products.values_list('id', flat=True))
+        schedule_listing_refresh(product_ids)
+        schedule_search_index(product_ids)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def reindex_on_variant_change(sender, instance, raw=False, **kwargs):
+    """Variant SKUs are searchable keywords."""
+    if not raw:
+        schedule_search_index([instance.product_id])
+
+
+@receiver(post_delete, sender=ProductSearchDocument)
+def drop_search_index_entry(sender, instance, **kwargs):
+    from bfg.shop.search import get_search_backend
+    get_search_backend().delete_documents([instance.pk])
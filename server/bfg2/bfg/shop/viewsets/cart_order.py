@@ -358,8 +358,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         """Get orders based on permissions"""
         workspace = getattr(self.request, 'workspace', None)
         if not workspace:
-            from bfg.common.models import Workspace
-            workspace = Workspace.objects.filter(is_active=True).first()
+            from bfg.common.middleware import get_first_active_workspace
+            workspace = get_first_active_workspace()
             if not workspace:
                 from rest_framework.exceptions import NotFound
                 raise NotFound("No workspace available. Please ensure a workspace exists and is active.")
@@ -447,8 +447,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         from bfg.common.models import StaffMember
         workspace = getattr(request, 'workspace', None)
         if not workspace:
-            from bfg.common.models import Workspace
-            workspace = Workspace.objects.filter(is_active=True).first()
+            from bfg.common.middleware import get_first_active_workspace
+            workspace = get_first_active_workspace()
             if not workspace:
                 from rest_framework.exceptions import NotFound
                 raise NotFound("No workspace available.")
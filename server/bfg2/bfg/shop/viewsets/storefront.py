@@ -20,9 +20,10 @@ import uuid
 from bfg.common.models import Customer, Address
 from bfg.shop.models import (
     Product, ProductVariant, ProductCategory, ProductTag,
-    Cart, CartItem, Order, Store, ProductReview
+    Cart, CartItem, Order, Store, ProductReview, ProductListing
 )
 from bfg.shop.serializers.storefront import (
+    with_storefront_data,
     StorefrontProductSerializer, StorefrontCategorySerializer,
     StorefrontCartSerializer, StorefrontCartItemSerializer,
     StorefrontOrderSerializer,
@@ -35,6 +36,8 @@ from bfg.common.services import CustomerService
 from bfg.common.utils import get_required_workspace
 from django.contrib.contenttypes.models import ContentType
 from bfg.shop.services import CartService, OrderService
+from bfg.shop.services.product_listing_service import listings_ready
+from bfg.shop.services.product_search_service import ProductSearchService, search_index_ready
 from bfg.shop.exceptions import InsufficientStock
 from bfg.finance.models import Payment, PaymentGateway, Currency
 from bfg.finance.services import PaymentService
@@ -49,19 +52,145 @@ class StorefrontProductViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'
     lookup_url_kwarg = 'id_or_slug'
     
+    # Listing sort options -> ProductListing ordering
+    LISTING_SORTS = {
+        'price_asc': ('price',),
+        'price_desc': ('-price',),
+        'name': ('name',),
+        'sales': ('-sold_count', '-product_created_at'),
+    }
+
+    # Product ids of a ?q= listing in relevance order (set by _get_listing_queryset)
+    _ranked_ids = None
+
     def get_queryset(self):
         """Get active products with filtering"""
+        workspace = self.request.workspace
+        self._ranked_ids = None
+        if listings_ready(workspace):
+            queryset = self._get_listing_queryset(workspace)
+        else:
+            # Read model not (fully) built for this workspace yet (see rebuild_product_listings)
+            queryset = self._get_product_queryset(workspace)
+        
+        # Limit results if specified (must be after distinct)
+        limit = self.request.query_params.get('limit')
+        if limit:
+            try:
+                limit = int(limit)
+                if self._ranked_ids is not None:
+                    self._ranked_ids = self._ranked_ids[:limit]
+                else:
+                    queryset = queryset[:limit]
+            except (ValueError, TypeError):
+                pass
+        
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """List products; relevance-ranked ?q= listings are paged by id, then one page is loaded"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self._ranked_ids is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        page_ids = self.paginate_queryset(self._ranked_ids)
+        ids = self._ranked_ids if page_ids is None else page_ids
+        products = {product.id: product for product in queryset.filter(id__in=ids)}
+        data = self.get_serializer([products[pid] for pid in ids if pid in products], many=True).data
+        return self.get_paginated_response(data) if page_ids is not None else Response(data)
+
+    def _filter_language(self, queryset):
+        """
+        ?lang= restricts listings to one language, falling back to en when it has none
+        (as categories do); the legacy Product path does not filter by language
+        """
+        language = self.request.query_params.get('lang')
+        if not language:
+            return queryset
+        localized = queryset.filter(language=language)
+        if language != 'en' and not localized.exists():
+            return queryset.filter(language='en')
+        return localized
+
+    def _get_listing_queryset(self, workspace):
+        """Filter and sort on the denormalized ProductListing table, then load matching products"""
+        from django.utils import timezone
+        from datetime import timedelta
+
+        params = self.request.query_params
+        listings = self._filter_language(ProductListing.objects.filter(workspace=workspace, is_active=True))
+
+        # Full-text match: relevance rank is the default order for ?q= searches.
+        # Until the workspace's index is rebuilt, match names as the legacy path does.
+        q = params.get('q')
+        ranked_ids = None
+        if q and search_index_ready(workspace):
+            ranked_ids = [hit.product_id for hit in ProductSearchService(workspace=workspace).match(q)]
+            listings = listings.filter(product_id__in=ranked_ids)
+        elif q:
+            listings = listings.filter(name__icontains=q)
+
+        category = params.get('category')
+        if category:
+            listings = listings.filter(category_slugs__contains=ProductListing.slug_key(category))
+
+        tag = params.get('tag')
+        if tag:
+            listings = listings.filter(tag_slugs__contains=ProductListing.slug_key(tag))
+
+        featured = params.get('featured')
+        if featured and featured.lower() == 'true':
+            listings = listings.filter(is_featured=True)
+
+        is_new = params.get('is_new')
+        if is_new and is_new.lower() == 'true':
+            listings = listings.filter(product_created_at__gte=timezone.now() - timedelta(days=30))
+
+        condition = params.get('condition')
+        if condition:
+            listings = listings.filter(condition=condition)
+
+        for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+            value = params.get(param)
+            if value:
+                try:
+                    listings = listings.filter(**{lookup: Decimal(value)})
+                except (ValueError, TypeError, ArithmeticError):
+                    pass
+
+        bestseller = params.get('bestseller')
+        if bestseller and bestseller.lower() == 'true':
+            ordering = self.LISTING_SORTS['sales']
+        elif ranked_ids is not None and 'sort' not in params:
+            # Rank order is applied in list() over the matching ids, not in SQL
+            matched = set(listings.values_list('product_id', flat=True))
+            self._ranked_ids = [product_id for product_id in ranked_ids if product_id in matched]
+            return with_storefront_data(Product.objects.filter(id__in=matched))
+        else:
+            ordering = self.LISTING_SORTS.get(params.get('sort', 'created_at'), ('-product_created_at',))
+
+        # Products are hydrated through the one-to-one listing row: no fan-out joins, no distinct()
+        return with_storefront_data(
+            Product.objects.filter(id__in=listings.values('product_id'))
+        ).order_by(*[
+            f"-storefront_listing__{field[1:]}" if field.startswith('-') else f"storefront_listing__{field}"
+            for field in ordering
+        ])
+
+    def _get_product_queryset(self, workspace):
+        """Filter and sort directly on Product (fallback when the listing read model is empty)"""
         from django.utils import timezone
         from datetime import timedelta
         from django.db.models import Sum
         
-        workspace = self.request.workspace
-        queryset = Product.objects.filter(
+        # Review stats and inventory are preloaded so serialization cost is constant per page
+        queryset = with_storefront_data(Product.objects.filter(
             workspace=workspace,
             is_active=True
-        ).prefetch_related(
-            'media_links__media', 'variants', 'categories', 'tags'
-        )
+        ))
         
         # Filtering
         q = self.request.query_params.get('q')
@@ -131,19 +260,60 @@ class StorefrontProductViewSet(viewsets.ReadOnlyModelViewSet):
                 queryset = queryset.order_by('-created_at')
         
         # Apply distinct before any slicing
-        queryset = queryset.distinct()
-        
-        # Limit results if specified (must be after distinct)
-        limit = self.request.query_params.get('limit')
-        if limit:
-            try:
-                limit = int(limit)
-                queryset = queryset[:limit]
-            except (ValueError, TypeError):
-                pass
-        
-        return queryset
+        return queryset.distinct()
     
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Ranked full-text product search with facet counts
+
+        Query params: q, lang, category, tag, min_price, max_price, condition, limit, offset
+
+        Needs the workspace's listings and search index (rebuild_product_listings,
+        rebuild_product_search); until both are built it answers 503, while the
+        list endpoint's ?q= keeps matching product names.
+        """
+        params = request.query_params
+        q = params.get('q', '').strip()
+        if not q:
+            raise ValidationError({'q': 'This parameter is required.'})
+        if not (listings_ready(request.workspace) and search_index_ready(request.workspace)):
+            return Response(
+                {'detail': 'Product search is not available yet: the search index has not been built.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        try:
+            limit = max(1, min(int(params.get('limit', 24)), 100))
+            offset = max(0, int(params.get('offset', 0)))
+        except (ValueError, TypeError):
+            raise ValidationError({'detail': 'limit and offset must be integers.'})
+
+        result = ProductSearchService(workspace=request.workspace).search(
+            q,
+            language=params.get('lang') or None,
+            category=params.get('category') or None,
+            tag=params.get('tag') or None,
+            min_price=params.get('min_price'),
+            max_price=params.get('max_price'),
+            condition=params.get('condition') or None,
+            limit=limit,
+            offset=offset,
+        )
+
+        products = {
+            product.id: product
+            for product in with_storefront_data(Product.objects.filter(id__in=result.product_ids))
+        }
+        ordered = [products[pid] for pid in result.product_ids if pid in products]
+        serializer = self.get_serializer(ordered, many=True)
+        return Response({
+            'query': result.query,
+            'total': result.total,
+            'results': serializer.data,
+            'facets': result.facets,
+        })
+
     def retrieve(self, request, *args, **kwargs):
         """Retrieve product by ID or slug"""
         lookup_value = kwargs.get(self.lookup_url_kwarg)
@@ -411,23 +581,18 @@ class StorefrontCartViewSet(viewsets.GenericViewSet):
         Returns:
             Workspace instance or None
         """
+        from bfg.common.middleware import get_first_active_workspace, get_workspace_by_site_domain
+
         workspace = getattr(request, 'workspace', None)
         
-        # If workspace not set by middleware, try to get from Site by domain
+        # If workspace not set by middleware, try to get from Site by domain (cached)
         if not workspace:
             hostname = request.get_host().split(':')[0]  # Remove port if present
-            try:
-                from bfg.web.models import Site
-                site = Site.objects.filter(domain=hostname, is_active=True).first()
-                if site:
-                    workspace = site.workspace
-            except (ImportError, AttributeError):
-                pass
+            workspace = get_workspace_by_site_domain(hostname)
         
-        # Last resort: get first active workspace
+        # Last resort: get first active workspace (cached)
         if not workspace:
-            from bfg.common.models import Workspace
-            workspace = Workspace.objects.filter(is_active=True).first()
+            workspace = get_first_active_workspace()
         
         return workspace
     
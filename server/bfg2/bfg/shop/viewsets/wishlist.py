@@ -53,14 +53,15 @@ class StorefrontWishlistViewSet(viewsets.GenericViewSet):
 
     def list(self, request):
         """List current user's wishlist (product details)."""
-        from bfg.shop.serializers.storefront import StorefrontProductSerializer
+        from django.db.models import Prefetch
+        from bfg.shop.serializers.storefront import StorefrontProductSerializer, with_storefront_data
 
         workspace, customer = self._get_customer(request)
         entries = Wishlist.objects.filter(
             workspace=workspace,
             customer=customer
-        ).select_related('product').prefetch_related(
-            'product__media_links__media', 'product__variants', 'product__categories', 'product__tags'
+        ).prefetch_related(
+            Prefetch('product', queryset=with_storefront_data(Product.objects.all()))
         ).order_by('-created_at')
         products = [e.product for e in entries]
         serializer = StorefrontProductSerializer(
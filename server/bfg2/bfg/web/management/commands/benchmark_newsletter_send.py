@@ -0,0 +1,150 @@
+"""
+Benchmark Newsletter Send
+
+Django management command: Time newsletter delivery to many subscribers against a
+local SMTP stand-in (uses a throwaway workspace; chunk tasks run in-process)
+"""
+
+import socketserver
+import threading
+import time
+import uuid
+
+from celery import current_app
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from bfg.common.email_backends.smtp import smtp_pool
+from bfg.common.models import EmailConfig, Workspace
+from bfg.common.services import EmailService
+from bfg.web.models import NewsletterSubscription
+from bfg.web.services import NewsletterService
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Accepts every command and message; counts connections and messages."""
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self.wfile.write(b'220 localhost ESMTP benchmark sink\r\n')
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line.rstrip(b'\r\n') == b'.':
+                    in_data = False
+                    with sink.lock:
+                        sink.messages += 1
+                    self.wfile.write(b'250 OK\r\n')
+                continue
+            command = line[:4].upper()
+            if command == b'DATA':
+                in_data = True
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in on 127.0.0.1 (random port)."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPSinkHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = self.messages = 0
+
+
+class Command(BaseCommand):
+    help = 'Benchmark newsletter delivery against a local SMTP stand-in (uses a throwaway workspace)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=100000, help='Subscribers to send to')
+        parser.add_argument('--baseline', type=int, default=2000, help='Recipients for the per-message baseline')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark workspace')
+
+    def handle(self, *args, **options):
+        sink = SMTPSink()
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        suffix = uuid.uuid4().hex[:8]
+        workspace = Workspace.objects.create(name=f'Newsletter benchmark {suffix}', slug=f'newsletter-bench-{suffix}')
+        always_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        try:
+            EmailConfig.objects.create(
+                workspace=workspace, name='Benchmark sink', backend_type='smtp', is_default=True,
+                config={'host': '127.0.0.1', 'port': sink.server_address[1], 'from_email': 'bench@example.com'},
+            )
+            started = time.perf_counter()
+            NewsletterSubscription.objects.bulk_create(
+                (
+                    NewsletterSubscription(
+                        workspace=workspace, email=f'reader{i}@example.com', unsubscribe_token=f'{suffix}-{i}',
+                    )
+                    for i in range(options['recipients'])
+                ),
+                batch_size=1000,
+            )
+            self.stdout.write(f"Created {options['recipients']} subscriptions in {time.perf_counter() - started:.2f}s")
+
+            service = NewsletterService(workspace=workspace, user=None)
+            baseline = min(options['baseline'], options['recipients'])
+            if baseline:
+                send = service.create_send(subject='Baseline', content='<p>Hello</p>')
+                subs = list(NewsletterSubscription.objects.filter(workspace=workspace).order_by('id')[:baseline])
+                self._time(
+                    sink, f'per-message send, {baseline} recipients',
+                    lambda: self._send_one_by_one(service, send, subs),
+                )
+
+            send = service.create_send(subject='Bulk', content='<p>Hello</p>')
+            self._time(sink, f"chunked send, {options['recipients']} recipients", lambda: service.execute_send(send))
+            send.refresh_from_db()
+            self.stdout.write(f"  status={send.status} sent={send.sent_count} failed={send.failed_count}")
+        finally:
+            current_app.conf.task_always_eager = always_eager
+            smtp_pool.clear()
+            sink.shutdown()
+            sink.server_close()
+            if not options['keep']:
+                workspace.delete()
+
+    def _send_one_by_one(self, service, send, subs):
+        # The loop NewsletterService.execute_send used to run
+        for sub in subs:
+            if not service.can_send_to(sub, send):
+                continue
+            try:
+                EmailService.send_email(
+                    service.workspace, to_list=[sub.email], subject=send.subject,
+                    body_plain='Hello', body_html=send.content,
+                )
+                result = ('success', '')
+            except Exception as e:
+                result = ('failed', str(e))
+            service.record_send_result(send, sub, status=result[0], error_message=result[1])
+
+    def _time(self, sink, label, func):
+        # Start each run without pooled SMTP connections
+        smtp_pool.clear()
+        sink.reset()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        rate = sink.messages / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{label}: {elapsed:.3f}s, {rate:.0f} msg/s, {sink.messages} messages, "
+            f"{sink.connections} SMTP connections, {len(ctx.captured_queries)} queries"
+        )
+        return elapsed
@@ -69,9 +69,8 @@ class Command(BaseCommand):
         service = SiteConfigService(workspace=workspace, user=user)
         try:
             result = service.load_from_config(config, created_by_user=user, mode=mode)
-            from django.core.cache import cache
-            for lang in ("en", "zh-hans"):
-                cache.delete(f"storefront_config:{workspace.id}:{lang}")
+            from bfg.common.services.settings_service import invalidate_storefront_config_cache
+            invalidate_storefront_config_cache(workspace.id)
             self.stdout.write(self.style.SUCCESS(f"Loaded site: {result.get('site')}"))
             self.stdout.write(self.style.SUCCESS(f"Pages: {len(result.get('pages', []))}"))
             self.stdout.write(self.style.SUCCESS(f"Menus: {result.get('menus_count', 0)}"))
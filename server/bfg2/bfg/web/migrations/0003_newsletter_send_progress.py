@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0002_alter_booking_status_alter_inquiry_inquiry_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newslettersend',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Failed Count'),
+        ),
+        migrations.AddField(
+            model_name='newslettersend',
+            name='last_subscription_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Last Subscription ID'),
+        ),
+        migrations.AddField(
+            model_name='newslettersend',
+            name='recipient_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Recipient Count'),
+        ),
+        migrations.AddField(
+            model_name='newslettersend',
+            name='sent_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Sent Count'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0003_newsletter_send_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterSendChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_subscription_id', models.PositiveBigIntegerField(verbose_name='First Subscription ID')),
+                ('last_subscription_id', models.PositiveBigIntegerField(verbose_name='Last Subscription ID')),
+                ('heartbeat_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Heartbeat At')),
+                ('released_at', models.DateTimeField(blank=True, null=True, verbose_name='Released At')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Created At')),
+                ('newsletter_send', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='web.newslettersend')),
+            ],
+            options={
+                'verbose_name': 'Newsletter Send Chunk',
+                'verbose_name_plural': 'Newsletter Send Chunks',
+                'ordering': ['first_subscription_id'],
+                'indexes': [models.Index(fields=['newsletter_send', 'released_at'], name='web_newslet_newslet_8a9d1c_idx')],
+            },
+        ),
+    ]
@@ -767,6 +767,11 @@ class NewsletterSend(models.Model):
     scheduled_at = models.DateTimeField(_("Scheduled At"), null=True, blank=True)
     status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='draft')
     sent_at = models.DateTimeField(_("Sent At"), null=True, blank=True)
+    # Delivery progress: subscriptions up to last_subscription_id (at dispatch) are recipients
+    last_subscription_id = models.PositiveBigIntegerField(_("Last Subscription ID"), null=True, blank=True)
+    recipient_count = models.PositiveIntegerField(_("Recipient Count"), default=0)
+    sent_count = models.PositiveIntegerField(_("Sent Count"), default=0)
+    failed_count = models.PositiveIntegerField(_("Failed Count"), default=0)
     created_at = models.DateTimeField(_("Created At"), default=timezone.now)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
     created_by = models.ForeignKey(
@@ -817,3 +822,29 @@ class NewsletterSendLog(models.Model):
 
     def __str__(self):
         return f"{self.newsletter_send_id} -> {self.subscription.email} ({self.status})"
+
+
+class NewsletterSendChunk(models.Model):
+    """
+    Lease on a subscription id range of a NewsletterSend, held by the task delivering it.
+    heartbeat_at is refreshed on every email sent; a range whose lease is unreleased and
+    fresh is in flight (queued, throttled or sending) and is not dispatched again.
+    """
+    newsletter_send = models.ForeignKey(NewsletterSend, on_delete=models.CASCADE, related_name='chunks')
+    first_subscription_id = models.PositiveBigIntegerField(_("First Subscription ID"))
+    last_subscription_id = models.PositiveBigIntegerField(_("Last Subscription ID"))
+    heartbeat_at = models.DateTimeField(_("Heartbeat At"), default=timezone.now)
+    # Set when the chunk finished or its stale lease was taken over by a resume
+    released_at = models.DateTimeField(_("Released At"), null=True, blank=True)
+    created_at = models.DateTimeField(_("Created At"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Newsletter Send Chunk")
+        verbose_name_plural = _("Newsletter Send Chunks")
+        ordering = ['first_subscription_id']
+        indexes = [
+            models.Index(fields=['newsletter_send', 'released_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.newsletter_send_id} [{self.first_subscription_id}-{self.last_subscription_id}]"
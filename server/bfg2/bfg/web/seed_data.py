@@ -4,18 +4,20 @@ Seed data functions for bfg.web module.
 """
 
 from django.utils import timezone
-from django.core.cache import cache
 from .models import Site, Theme, Language, Page, Media, Category, Tag, Menu, MenuItem, Post
-from .services.page_service import get_page_rendered_cache_key, HOME_SLUG
+from .services.page_service import (
+    HOME_SLUG,
+    invalidate_home_page_cache_for_workspace,
+    invalidate_workspace_page_cache,
+)
 
 
 def clear_data():
-    """Clear web module data. Process: (1) collect cache keys if any, (2) delete in dependency order, (3) invalidate caches if any."""
-    # 1. Collect page cache keys before deleting Page (same key format as page_service)
-    page_cache_keys = []
+    """Clear web module data. Process: (1) collect cached workspaces if any, (2) delete in dependency order, (3) invalidate caches if any."""
+    # 1. Collect workspaces with pages before deleting Page
+    page_workspace_ids = []
     try:
-        for row in Page.objects.values_list("workspace_id", "slug", "language").distinct():
-            page_cache_keys.append(get_page_rendered_cache_key(row[0], row[1], row[2]))
+        page_workspace_ids = list(Page.objects.values_list("workspace_id", flat=True).distinct())
     except Exception:
         pass
 
@@ -32,13 +34,11 @@ def clear_data():
     Language.objects.all().delete()
 
     # 3. Invalidate caches so cleared pages do not serve stale content
-    for key in page_cache_keys:
-        cache.delete(key)
     try:
         from bfg.common.models import Workspace
-        for ws in Workspace.objects.only("id").all():
-            for lang in ("en", "zh", "zh-hans"):
-                cache.delete(get_page_rendered_cache_key(ws.id, HOME_SLUG, lang))
+        workspace_ids = set(page_workspace_ids) | set(Workspace.objects.values_list("id", flat=True))
+        for workspace_id in workspace_ids:
+            invalidate_workspace_page_cache(workspace_id)
     except Exception:
         pass
 
@@ -367,7 +367,7 @@ def create_pages(workspace, admin_user, stdout=None, style=None):
         if page_data["slug"] == HOME_SLUG and blocks:
             page.blocks = blocks
             page.save(update_fields=["blocks", "updated_at"])
-            cache.delete(get_page_rendered_cache_key(workspace.id, HOME_SLUG, "en"))
+            invalidate_home_page_cache_for_workspace(workspace.id)
         if created and stdout:
             stdout.write(style.SUCCESS(f'✓ Created page: {page.title}'))
         pages.append(page)
@@ -456,8 +456,12 @@ class NewsletterSendSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'subject', 'content', 'template', 'scheduled_at', 'status',
             'sent_at', 'created_at', 'updated_at', 'created_by',
+            'recipient_count', 'sent_count', 'failed_count',
+        ]
+        read_only_fields = [
+            'id', 'status', 'sent_at', 'created_at', 'updated_at',
+            'recipient_count', 'sent_count', 'failed_count',
         ]
-        read_only_fields = ['id', 'status', 'sent_at', 'created_at', 'updated_at']
 
 
 class NewsletterSendLogSerializer(serializers.ModelSerializer):
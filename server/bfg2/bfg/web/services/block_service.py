@@ -4,8 +4,18 @@ BFG Web Module Services
 Block validation and data resolution service for Page Builder
 """
 
-from typing import Any, Dict, List, Optional
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from django.db.models import QuerySet
+from bfg.core.cache import (
+    TaggedValue,
+    get_many_tagged,
+    get_tag_generations,
+    invalidate_tags,
+    set_many_tagged,
+    workspace_tag,
+)
 from bfg.core.services import BaseService
 from bfg.web.models import Post, Category
 
@@ -164,6 +174,95 @@ DYNAMIC_BLOCK_TYPES = {
 }
 
 
+# Resolved block data is cached per block query (shared by every page showing it)
+BLOCK_FRAGMENT_CACHE_PREFIX = "block_fragment"
+BLOCK_FRAGMENT_TTL = 60 * 60  # 1 hour
+
+
+def get_post_list_scope_tag(workspace_id: int, content_type: str = '', category_slug: str = '') -> str:
+    """Tag of the non-manual post lists a published post can appear in"""
+    if category_slug:
+        return workspace_tag(workspace_id, f'posts:category:{category_slug}')
+    if content_type:
+        return workspace_tag(workspace_id, f'posts:type:{content_type}')
+    return workspace_tag(workspace_id, 'posts:latest')
+
+
+def get_post_change_tags(post: Post) -> List[str]:
+    """
+    Fragment tags to invalidate when a post changes
+
+    Lists showing the post carry its own tag. A published post may also enter
+    lists it is not shown in yet: the latest list, and the lists of its content
+    type and category.
+    """
+    tags = [workspace_tag(post.workspace_id, f'post:{post.id}')]
+    if post.status == 'published':
+        try:
+            category = post.category
+        except Category.DoesNotExist:
+            # Already deleted (cascade); lists of a deleted category are gone too
+            category = None
+        tags.append(get_post_list_scope_tag(post.workspace_id))
+        if category is not None:
+            if category.content_type_name:
+                tags.append(get_post_list_scope_tag(post.workspace_id, content_type=category.content_type_name))
+            tags.append(get_post_list_scope_tag(post.workspace_id, category_slug=category.slug))
+    return tags
+
+
+def invalidate_block_fragments(workspace_id: int) -> None:
+    """Invalidate every resolved block fragment of a workspace"""
+    invalidate_tags(workspace_tag(workspace_id, 'blocks'))
+
+
+class BlockQuery(NamedTuple):
+    """Normalized data needs of a dynamic block; equal queries share one fragment"""
+    kind: str  # 'posts' | 'categories'
+    content_type: str = ''
+    category_slug: str = ''
+    post_ids: Tuple[int, ...] = ()
+    category_ids: Tuple[int, ...] = ()
+    order_by: str = '-published_at'
+    limit: int = 6
+    
+    @classmethod
+    def from_block(cls, block: Dict[str, Any]) -> Optional['BlockQuery']:
+        block_type = block.get('type', '')
+        if block_type not in DYNAMIC_BLOCK_TYPES:
+            return None
+        data = block.get('data') or {}
+        source = data.get('source')
+        content_type = data.get('contentType') or ''
+        if block_type == 'category_grid_v1':
+            category_ids = data.get('categoryIds') or [] if source == 'selected' else []
+            return cls(
+                kind='categories',
+                content_type=content_type,
+                category_ids=tuple(sorted({int(category_id) for category_id in category_ids})),
+                order_by='',
+                limit=0,
+            )
+        # All post-based blocks use the same resolver
+        post_ids = data.get('postIds') or [] if source == 'manual' else []
+        return cls(
+            kind='posts',
+            content_type=content_type,
+            category_slug=(data.get('categorySlug') or '') if source == 'category' else '',
+            post_ids=tuple(sorted({int(post_id) for post_id in post_ids})),
+            order_by=data.get('orderBy', '-published_at'),
+            limit=data.get('limit', 6),
+        )
+
+
+@dataclass
+class ResolvedBlocks:
+    """Resolved blocks plus the fragment tags (and generations) they depend on"""
+    blocks: List[Dict[str, Any]]
+    tags: List[str] = field(default_factory=list)
+    generations: Dict[str, int] = field(default_factory=dict)
+
+
 class BlockService(BaseService):
     """
     Block management service
@@ -234,24 +333,7 @@ class BlockService(BaseService):
         Returns:
             Block with resolved data added
         """
-        block_type = block.get('type', '')
-
-        if block_type == 'section_v1':
-            data = block.get('data') or {}
-            children = data.get('children') or []
-            block = dict(block)
-            block['data'] = dict(data)
-            block['data']['children'] = self.resolve_all_blocks(children)
-            return block
-
-        if block_type in DYNAMIC_BLOCK_TYPES:
-            if block_type == 'category_grid_v1':
-                return self._resolve_category_grid(block)
-            else:
-                # All post-based blocks use the same resolver
-                return self._resolve_post_list(block)
-        
-        return block
+        return self.resolve_blocks([block]).blocks[0]
     
     def resolve_all_blocks(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -263,78 +345,186 @@ class BlockService(BaseService):
         Returns:
             List of blocks with resolved data
         """
-        resolved = []
-        for block in blocks:
-            resolved.append(self.resolve_block_data(block))
-        return resolved
+        return self.resolve_blocks(blocks).blocks
     
-    def _resolve_post_list(self, block: Dict[str, Any]) -> Dict[str, Any]:
+    def resolve_blocks(self, blocks: List[Dict[str, Any]], use_cache: bool = False) -> ResolvedBlocks:
         """
-        Generic resolver for post-based blocks (case_list, project_grid, post_list, faq_list)
-        """
-        from bfg.web.serializers import PostListSerializer
-        
-        data = block.get('data', {})
-        source = data.get('source', 'latest')
+        Resolve dynamic data for all blocks in a page, nested sections included
         
-        queryset = Post.objects.filter(
-            workspace=self.workspace,
-            status='published'
-        ).select_related('category', 'author')
+        Every dynamic block is reduced to a BlockQuery; identical queries are
+        resolved once. Cached fragments are fetched in one round trip, and the
+        missing ones are loaded together: manual post lists in one query per
+        ordering, other post lists in one query each, category grids in one
+        query, each post/category serialized once.
         
-        # Filter by content type if specified (not hardcoded - from config)
-        content_type = data.get('contentType')
-        if content_type:
-            queryset = queryset.filter(category__content_type_name=content_type)
+        Args:
+            blocks: List of block configurations
+            use_cache: Read and store resolved fragments in the cache
+            
+        Returns:
+            ResolvedBlocks: Blocks plus the tags and tag generations of the
+            fragments they were built from
+        """
+        queries = {}
+        self._collect_queries(blocks, queries)
         
-        # Filter by data source
-        if source == 'category':
-            category_slug = data.get('categorySlug')
-            if category_slug:
-                queryset = queryset.filter(category__slug=category_slug)
-        elif source == 'manual':
-            post_ids = data.get('postIds', [])
-            if post_ids:
-                queryset = queryset.filter(id__in=post_ids)
+        fragments: Dict[BlockQuery, TaggedValue] = {}
+        if use_cache and queries:
+            keys = {self._fragment_key(query): query for query in queries}
+            for key, entry in get_many_tagged(keys).items():
+                fragments[keys[key]] = entry
         
-        # Order and limit
-        order_by = data.get('orderBy', '-published_at')
-        limit = data.get('limit', 6)
-        queryset = queryset.order_by(order_by)[:limit]
+        missing = [query for query in queries if query not in fragments]
+        if missing:
+            # Read before loading: an invalidation meanwhile leaves the new fragments stale
+            generations = get_tag_generations(
+                tag for query in missing for tag in self._fragment_tags(query)
+            ) if use_cache else {}
+            loaded = self._load_fragments(missing)
+            if use_cache:
+                stored = set_many_tagged(
+                    {
+                        self._fragment_key(query): (data, self._fragment_tags(query, data))
+                        for query, data in loaded.items()
+                    },
+                    BLOCK_FRAGMENT_TTL,
+                    generations=generations
+                )
+                for query in loaded:
+                    fragments[query] = stored[self._fragment_key(query)]
+            else:
+                for query, data in loaded.items():
+                    fragments[query] = TaggedValue((), data)
         
-        # Add resolved data to block
-        block['resolvedData'] = PostListSerializer(queryset, many=True).data
-        return block
+        resolution = ResolvedBlocks(blocks=self._assemble(blocks, fragments))
+        for entry in fragments.values():
+            for tag, generation in entry.generations:
+                resolution.generations[tag] = generation
+        resolution.tags = list(resolution.generations)
+        return resolution
     
-    def _resolve_category_grid(self, block: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Resolver for category grid blocks
-        """
-        from bfg.web.serializers import CategorySerializer
+    def _collect_queries(self, blocks: List[Dict[str, Any]], queries: Dict['BlockQuery', None]) -> None:
+        for block in blocks:
+            if block.get('type') == 'section_v1':
+                self._collect_queries((block.get('data') or {}).get('children') or [], queries)
+                continue
+            query = BlockQuery.from_block(block)
+            if query is not None:
+                queries.setdefault(query, None)
+    
+    def _assemble(
+        self,
+        blocks: List[Dict[str, Any]],
+        fragments: Dict['BlockQuery', TaggedValue]
+    ) -> List[Dict[str, Any]]:
+        resolved = []
+        for block in blocks:
+            if block.get('type') == 'section_v1':
+                data = block.get('data') or {}
+                block = dict(block)
+                block['data'] = dict(data)
+                block['data']['children'] = self._assemble(data.get('children') or [], fragments)
+            else:
+                query = BlockQuery.from_block(block)
+                if query is not None:
+                    block = dict(block)
+                    block['resolvedData'] = list(fragments[query].value)
+            resolved.append(block)
+        return resolved
+    
+    def _fragment_key(self, query: 'BlockQuery') -> str:
+        digest = hashlib.md5(repr(query).encode()).hexdigest()
+        return f"{BLOCK_FRAGMENT_CACHE_PREFIX}:{self.workspace.id}:{digest}"
+    
+    def _fragment_tags(self, query: 'BlockQuery', data: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """Tags of a fragment; with data, also the posts it shows"""
+        workspace_id = self.workspace.id
+        tags = [workspace_tag(workspace_id, 'blocks'), workspace_tag(workspace_id, 'web_categories')]
+        if query.kind != 'posts':
+            return tags
+        if query.post_ids:
+            # Manual lists depend on exactly these posts (shown or not yet published)
+            post_ids = list(query.post_ids)
+        else:
+            tags.append(get_post_list_scope_tag(workspace_id, query.content_type, query.category_slug))
+            post_ids = [item['id'] for item in data or []]
+        tags.extend(workspace_tag(workspace_id, f'post:{post_id}') for post_id in post_ids)
+        return tags
+    
+    def _load_fragments(self, queries: List['BlockQuery']) -> Dict['BlockQuery', List[Dict[str, Any]]]:
+        """Resolve block queries with as few database queries as possible"""
+        from bfg.web.serializers import CategorySerializer, PostListSerializer
         
-        data = block.get('data', {})
-        source = data.get('source', 'all')
+        post_results: Dict[BlockQuery, List[Post]] = {}
+        manual_by_order: Dict[str, List[BlockQuery]] = {}
+        for query in queries:
+            if query.kind != 'posts':
+                continue
+            if query.post_ids:
+                manual_by_order.setdefault(query.order_by, []).append(query)
+            else:
+                post_results[query] = list(self._post_queryset(query)[:query.limit])
         
-        queryset = Category.objects.filter(
-            workspace=self.workspace,
-            is_active=True
-        )
+        # Manual lists sharing an ordering: one query for all their posts, then
+        # each list keeps its own posts (in database order) up to its limit
+        for order_by, manual_queries in manual_by_order.items():
+            post_ids = {post_id for query in manual_queries for post_id in query.post_ids}
+            posts = list(self._post_queryset().filter(id__in=post_ids).order_by(order_by))
+            for query in manual_queries:
+                wanted = set(query.post_ids)
+                matching = [
+                    post for post in posts
+                    if post.id in wanted and (
+                        not query.content_type
+                        or (post.category is not None and post.category.content_type_name == query.content_type)
+                    )
+                ]
+                post_results[query] = matching[:query.limit]
+        
+        unique_posts = {post.id: post for posts in post_results.values() for post in posts}
+        serialized_posts = {
+            item['id']: item
+            for item in PostListSerializer(list(unique_posts.values()), many=True).data
+        }
         
-        # Filter by content type if specified
-        content_type = data.get('contentType')
-        if content_type:
-            queryset = queryset.filter(content_type_name=content_type)
+        fragments: Dict[BlockQuery, List[Dict[str, Any]]] = {
+            query: [serialized_posts[post.id] for post in posts]
+            for query, posts in post_results.items()
+        }
         
-        # Filter by selected IDs if manual selection
-        if source == 'selected':
-            category_ids = data.get('categoryIds', [])
-            if category_ids:
-                queryset = queryset.filter(id__in=category_ids)
+        category_queries = [query for query in queries if query.kind == 'categories']
+        if category_queries:
+            categories = list(
+                Category.objects.filter(workspace=self.workspace, is_active=True)
+                .select_related('parent')
+                .order_by('order', 'name')
+            )
+            serialized_categories = CategorySerializer(categories, many=True).data
+            for query in category_queries:
+                wanted = set(query.category_ids)
+                fragments[query] = [
+                    item
+                    for category, item in zip(categories, serialized_categories)
+                    if (not query.content_type or category.content_type_name == query.content_type)
+                    and (not wanted or category.id in wanted)
+                ]
         
-        queryset = queryset.order_by('order', 'name')
+        return fragments
+    
+    def _post_queryset(self, query: Optional['BlockQuery'] = None) -> QuerySet:
+        queryset = Post.objects.filter(
+            workspace=self.workspace,
+            status='published'
+        ).select_related('category', 'author')
+        if query is None:
+            return queryset
         
-        block['resolvedData'] = CategorySerializer(queryset, many=True).data
-        return block
+        # Filter by content type if specified (not hardcoded - from config)
+        if query.content_type:
+            queryset = queryset.filter(category__content_type_name=query.content_type)
+        if query.category_slug:
+            queryset = queryset.filter(category__slug=query.category_slug)
+        return queryset.order_by(query.order_by)
     
     def get_available_block_types(self) -> List[Dict[str, Any]]:
         """
@@ -3,18 +3,22 @@ Newsletter subscription and send management service.
 """
 
 import logging
+import time
 import uuid
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import QuerySet
+from django.db.models import Exists, F, Max, OuterRef, QuerySet
 from django.utils import timezone
 from django.utils.html import strip_tags
 
 from bfg.core.services import BaseService
 from bfg.web.models import (
     NewsletterSend,
+    NewsletterSendChunk,
     NewsletterSendLog,
     NewsletterSubscription,
     NewsletterTemplate,
@@ -23,6 +27,29 @@ from bfg.web.models import (
 
 logger = logging.getLogger(__name__)
 
+# Recipients per send_newsletter_chunk task (BFG2_SETTINGS['NEWSLETTER_CHUNK_SIZE'])
+NEWSLETTER_CHUNK_SIZE = 500
+
+# Emails per send_many batch and SendLog bulk insert; at most this many are re-sent after a crash
+SEND_LOG_FLUSH_SIZE = 100
+
+# Seconds without a heartbeat before a chunk lease (and its send) counts as stalled
+# (BFG2_SETTINGS['NEWSLETTER_STALL_TIMEOUT'])
+NEWSLETTER_STALL_TIMEOUT = 900
+
+
+def get_stall_timeout() -> int:
+    return getattr(settings, "BFG2_SETTINGS", {}).get("NEWSLETTER_STALL_TIMEOUT", NEWSLETTER_STALL_TIMEOUT)
+
+
+def live_chunks(newsletter_send_id) -> QuerySet[NewsletterSendChunk]:
+    """Unreleased chunk leases with a heartbeat within the stall timeout."""
+    return NewsletterSendChunk.objects.filter(
+        newsletter_send_id=newsletter_send_id,
+        released_at__isnull=True,
+        heartbeat_at__gt=timezone.now() - timedelta(seconds=get_stall_timeout()),
+    )
+
 
 class NewsletterService(BaseService):
     """
@@ -162,36 +189,55 @@ class NewsletterService(BaseService):
         newsletter_send.save(update_fields=["scheduled_at", "status", "updated_at"])
         return newsletter_send
 
-    def _send_one_newsletter_email(
-        self,
-        newsletter_send: NewsletterSend,
-        to_email: str,
-    ) -> tuple[bool, str]:
+    def get_send_rate(self) -> float:
         """
-        Send one newsletter email. Uses send.subject and send.content (no template required).
+        Max newsletter emails per second for the workspace (0 = unlimited):
+        workspace.settings['newsletter']['send_rate'], else BFG2_SETTINGS['NEWSLETTER_SEND_RATE'].
+        """
+        workspace_settings = getattr(self.workspace, "settings", None) or {}
+        rate = (workspace_settings.get("newsletter") or {}).get("send_rate")
+        if rate is None:
+            rate = getattr(settings, "BFG2_SETTINGS", {}).get("NEWSLETTER_SEND_RATE", 0)
+        return float(rate or 0)
+
+    def pending_subscriptions(self, newsletter_send: NewsletterSend) -> QuerySet[NewsletterSubscription]:
+        """Subscribed recipients of the send without a SendLog yet, by id."""
+        qs = NewsletterSubscription.objects.filter(
+            workspace=self.workspace,
+            status="subscribed",
+        ).exclude(
+            Exists(NewsletterSendLog.objects.filter(newsletter_send=newsletter_send, subscription=OuterRef("pk")))
+        ).order_by("id")
+        if newsletter_send.last_subscription_id is not None:
+            qs = qs.filter(id__lte=newsletter_send.last_subscription_id)
+        return qs
+
+    def _newsletter_message(self, newsletter_send: NewsletterSend) -> Tuple[str, str, Optional[str]]:
+        """
+        (subject, plain body, html body) from send.subject and send.content (no template required).
         Plain text when content has no HTML; otherwise HTML with plain fallback.
-        Returns (success, error_message).
         """
         subject = (newsletter_send.subject or "").strip() or "(No subject)"
         body = (newsletter_send.content or "").strip() or "(No content)"
+        if "<" in body and ">" in body:
+            return subject, strip_tags(body) or body[:2000], body
+        return subject, body, None
+
+    def _send_one_newsletter_email(self, newsletter_send: NewsletterSend, to_email: str) -> tuple[bool, str]:
+        """
+        Send one newsletter email (see _newsletter_message).
+        Returns (success, error_message).
+        """
+        subject, body_plain, body_html = self._newsletter_message(newsletter_send)
         try:
             from bfg.common.services import EmailService
-            if "<" in body and ">" in body:
-                plain_fallback = strip_tags(body) or body[:2000]
-                EmailService.send_email(
-                    self.workspace,
-                    to_list=[to_email],
-                    subject=subject,
-                    body_plain=plain_fallback,
-                    body_html=body,
-                )
-            else:
-                EmailService.send_email(
-                    self.workspace,
-                    to_list=[to_email],
-                    subject=subject,
-                    body_plain=body,
-                )
+            EmailService.send_email(
+                self.workspace,
+                to_list=[to_email],
+                subject=subject,
+                body_plain=body_plain,
+                body_html=body_html,
+            )
             return True, ""
         except ValueError as e:
             logger.warning("Newsletter skip (no workspace email config): %s", e)
@@ -200,34 +246,280 @@ class NewsletterService(BaseService):
             logger.exception("Newsletter send failed to %s: %s", to_email, e)
             return False, str(e)
 
-    @transaction.atomic
     def execute_send(self, newsletter_send: NewsletterSend) -> NewsletterSend:
         """
-        For each subscribed subscription without a SendLog, send email (subject + content,
-        no template required) and record result. Plain text when content has no HTML.
+        Start delivering a draft or scheduled send to every subscribed subscription.
+
+        Recipients are fixed at dispatch (subscriptions up to last_subscription_id) and
+        split into chunks of BFG2_SETTINGS['NEWSLETTER_CHUNK_SIZE'], each delivered by a
+        send_newsletter_chunk task over one email connection. There is no enclosing
+        transaction: SendLogs are written as chunks progress, so an interrupted send
+        resumes where it stopped (resume_send), re-sending at most SEND_LOG_FLUSH_SIZE
+        recipients of each crashed chunk (those of its unlogged batch).
         """
         self.validate_workspace_access(newsletter_send)
         if newsletter_send.status not in ("draft", "scheduled"):
             return newsletter_send
-        newsletter_send.status = "sending"
-        newsletter_send.save(update_fields=["status", "updated_at"])
-        try:
-            subs = self.get_subscriptions(status="subscribed")
-            for sub in subs:
-                if not self.can_send_to(sub, newsletter_send):
-                    continue
-                success, err_msg = self._send_one_newsletter_email(newsletter_send, sub.email)
-                self.record_send_result(
-                    newsletter_send,
-                    sub,
-                    status="success" if success else "failed",
-                    error_message=err_msg,
-                )
-            newsletter_send.status = "sent"
-            newsletter_send.sent_at = timezone.now()
-            newsletter_send.save(update_fields=["status", "sent_at", "updated_at"])
-        except Exception:
-            newsletter_send.status = "draft"
-            newsletter_send.save(update_fields=["status", "updated_at"])
-            raise
+        last_subscription_id = NewsletterSubscription.objects.filter(
+            workspace=self.workspace
+        ).aggregate(last=Max("id"))["last"]
+        # Conditional update, so concurrent callers cannot start the same send twice
+        started = NewsletterSend.objects.filter(
+            pk=newsletter_send.pk, status__in=("draft", "scheduled")
+        ).update(
+            status="sending",
+            last_subscription_id=last_subscription_id or 0,
+            recipient_count=0,
+            sent_count=0,
+            failed_count=0,
+            updated_at=timezone.now(),
+        )
+        if not started:
+            newsletter_send.refresh_from_db()
+            return newsletter_send
+        newsletter_send.refresh_from_db()
+        newsletter_send.recipient_count = self.pending_subscriptions(newsletter_send).count()
+        newsletter_send.save(update_fields=["recipient_count", "updated_at"])
+
+        self._dispatch_chunks(newsletter_send)
+        newsletter_send.refresh_from_db()
         return newsletter_send
+
+    def resume_send(self, newsletter_send: NewsletterSend) -> NewsletterSend:
+        """
+        Re-dispatch the recipients a 'sending' send has not reached yet (e.g. after a worker crash).
+
+        Stale chunk leases are released first, so their tasks stop if they ever run or
+        wake up again; ranges under a live lease are still in flight and are skipped.
+        """
+        self.validate_workspace_access(newsletter_send)
+        if newsletter_send.status != "sending":
+            return newsletter_send
+        now = timezone.now()
+        NewsletterSendChunk.objects.filter(
+            newsletter_send=newsletter_send,
+            released_at__isnull=True,
+            heartbeat_at__lte=now - timedelta(seconds=get_stall_timeout()),
+        ).update(released_at=now)
+        NewsletterSend.objects.filter(pk=newsletter_send.pk).update(updated_at=now)
+        self._dispatch_chunks(newsletter_send)
+        newsletter_send.refresh_from_db()
+        return newsletter_send
+
+    def _dispatch_chunks(self, newsletter_send: NewsletterSend) -> None:
+        from bfg.web.tasks import send_newsletter_chunk
+
+        chunk_size = getattr(settings, "BFG2_SETTINGS", {}).get("NEWSLETTER_CHUNK_SIZE", NEWSLETTER_CHUNK_SIZE)
+        leased = list(live_chunks(newsletter_send.id).values_list("first_subscription_id", "last_subscription_id"))
+        ids = [
+            pk for pk in self.pending_subscriptions(newsletter_send).values_list("id", flat=True)
+            if not any(first <= pk <= last for first, last in leased)
+        ]
+        for start in range(0, len(ids), chunk_size):
+            ids_in_chunk = ids[start:start + chunk_size]
+            # Leased at dispatch, so a chunk still waiting in the queue is not dispatched twice
+            chunk = NewsletterSendChunk.objects.create(
+                newsletter_send=newsletter_send,
+                first_subscription_id=ids_in_chunk[0],
+                last_subscription_id=ids_in_chunk[-1],
+            )
+            try:
+                send_newsletter_chunk.delay(newsletter_send.id, chunk.first_subscription_id,
+                                            chunk.last_subscription_id, chunk.id)
+            except Exception:
+                # No broker: do not deliver in the caller's request. The lease goes stale
+                # and process_scheduled_newsletter_sends re-dispatches the rest later.
+                logger.exception("Could not queue newsletter chunks for send %s", newsletter_send.id)
+                return
+        self.complete_send_if_done(newsletter_send)
+
+    def send_chunk(
+        self,
+        newsletter_send: NewsletterSend,
+        first_id: int,
+        last_id: int,
+        chunk: Optional[NewsletterSendChunk] = None,
+    ) -> Tuple[int, int]:
+        """
+        Deliver to the pending recipients with first_id <= id <= last_id over one
+        email connection, logging results in bulk. Returns (sent, failed).
+
+        With a chunk, its lease is heartbeaten on every email and delivery stops as
+        soon as the lease has been released (taken over by resume_send).
+        """
+        if newsletter_send.status != "sending":
+            return 0, 0
+        lease = ChunkLease(chunk) if chunk is not None else None
+        if lease is not None and not lease.heartbeat():
+            logger.info("Newsletter send %s chunk %s was taken over; skipping", newsletter_send.id, chunk.id)
+            return 0, 0
+        result = self._send_chunk(newsletter_send, first_id, last_id, lease)
+        # Not released on errors: a task retry picks the lease up again, else it goes stale
+        if lease is not None:
+            lease.release()
+        return result
+
+    def _send_chunk(
+        self,
+        newsletter_send: NewsletterSend,
+        first_id: int,
+        last_id: int,
+        lease: Optional["ChunkLease"],
+    ) -> Tuple[int, int]:
+        from bfg.common.services import EmailService
+
+        recipients = list(
+            self.pending_subscriptions(newsletter_send)
+            .filter(id__gte=first_id, id__lte=last_id)
+            .only("id", "email")
+        )
+        if not recipients:
+            self.complete_send_if_done(newsletter_send)
+            return 0, 0
+
+        throttle = SendRateLimiter(self.workspace.id, self.get_send_rate())
+        subject, body_plain, body_html = self._newsletter_message(newsletter_send)
+        sent = failed = 0
+        try:
+            session = EmailService.open_session(self.workspace)
+        except ValueError as e:
+            logger.warning("Newsletter skip (no workspace email config): %s", e)
+            session, config_error = None, str(e)
+        else:
+            config_error = ""
+        try:
+            # One batch per log flush: the backend may send it as a single request (Mailgun)
+            for start in range(0, len(recipients), SEND_LOG_FLUSH_SIZE):
+                batch = recipients[start:start + SEND_LOG_FLUSH_SIZE]
+                if session is None:
+                    errors = [config_error] * len(batch)
+                else:
+                    for _ in batch:
+                        throttle.wait()
+                        if lease is not None and not lease.heartbeat():
+                            logger.warning("Newsletter send %s lost its chunk lease; stopping", newsletter_send.id)
+                            return sent, failed
+                    errors = self._send_newsletter_batch(session, batch, subject, body_plain, body_html)
+                logs = [
+                    NewsletterSendLog(
+                        workspace=self.workspace,
+                        newsletter_send=newsletter_send,
+                        subscription=sub,
+                        status="failed" if err_msg else "success",
+                        error_message=err_msg,
+                    )
+                    for sub, err_msg in zip(batch, errors)
+                ]
+                self._flush_send_logs(newsletter_send, logs)
+                batch_failed = sum(1 for err_msg in errors if err_msg)
+                sent += len(batch) - batch_failed
+                failed += batch_failed
+        finally:
+            if session is not None:
+                session.close()
+        self.complete_send_if_done(newsletter_send)
+        return sent, failed
+
+    def _send_newsletter_batch(
+        self,
+        session,
+        recipients: List[NewsletterSubscription],
+        subject: str,
+        body_plain: str,
+        body_html: Optional[str],
+    ) -> List[str]:
+        """Send the newsletter to recipients over session; error message per recipient ('' = sent)."""
+        from bfg.common.email_backends import OutgoingEmail
+
+        messages = [OutgoingEmail([sub.email], subject, body_plain, body_html) for sub in recipients]
+        try:
+            results = session.send_many(messages)
+        except Exception as e:
+            logger.exception("Newsletter batch send failed: %s", e)
+            results = [e] * len(messages)
+        errors = []
+        for sub, error in zip(recipients, results):
+            if error is None:
+                errors.append("")
+            else:
+                logger.error("Newsletter send failed to %s: %s", sub.email, error)
+                errors.append(str(error) or error.__class__.__name__)
+        return errors
+
+    def _flush_send_logs(self, newsletter_send: NewsletterSend, logs: List[NewsletterSendLog]) -> None:
+        """Save a batch of results and the send's progress counters."""
+        if not logs:
+            return
+        NewsletterSendLog.objects.bulk_create(logs, ignore_conflicts=True)
+        sent = sum(1 for log in logs if log.status == "success")
+        NewsletterSend.objects.filter(pk=newsletter_send.pk).update(
+            sent_count=F("sent_count") + sent,
+            failed_count=F("failed_count") + len(logs) - sent,
+            updated_at=timezone.now(),
+        )
+
+    def complete_send_if_done(self, newsletter_send: NewsletterSend) -> bool:
+        """Mark the send sent once no recipient is pending; True if this call completed it."""
+        if self.pending_subscriptions(newsletter_send).exists():
+            return False
+        now = timezone.now()
+        return bool(NewsletterSend.objects.filter(pk=newsletter_send.pk, status="sending").update(
+            status="sent", sent_at=now, updated_at=now,
+        ))
+
+
+class ChunkLease:
+    """
+    A send_newsletter_chunk task's hold on its NewsletterSendChunk. heartbeat() is
+    called per email; the row is written at most every HEARTBEAT_INTERVAL seconds.
+    """
+
+    HEARTBEAT_INTERVAL = 1.0
+
+    def __init__(self, chunk: NewsletterSendChunk):
+        self.chunk = chunk
+        self._last_beat = None
+
+    def heartbeat(self) -> bool:
+        """Refresh the lease; False once it has been released (the range is someone else's)."""
+        now = time.monotonic()
+        if self._last_beat is not None and now - self._last_beat < self.HEARTBEAT_INTERVAL:
+            return True
+        held = NewsletterSendChunk.objects.filter(pk=self.chunk.pk, released_at__isnull=True).update(
+            heartbeat_at=timezone.now()
+        )
+        self._last_beat = now
+        return bool(held)
+
+    def release(self) -> None:
+        NewsletterSendChunk.objects.filter(pk=self.chunk.pk, released_at__isnull=True).update(
+            released_at=timezone.now()
+        )
+
+
+class SendRateLimiter:
+    """
+    Per-workspace send rate limit shared by all workers: a per-second counter in the
+    shared cache; callers over the limit sleep until the next second.
+    """
+
+    def __init__(self, workspace_id: int, rate: float):
+        self.workspace_id = workspace_id
+        self.rate = rate
+
+    def wait(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.time()
+            second = int(now)
+            key = f"newsletter_rate:{self.workspace_id}:{second}"
+            cache.add(key, 0, 2)
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                # Expired between add and incr: retry in the same second
+                continue
+            if count <= self.rate:
+                return
+            time.sleep(second + 1 - now)
@@ -2,35 +2,66 @@
 BFG Web Module Services
 
 Page management service with caching support.
-Cache policy: disabled in DEBUG; home and category pages cacheable with per-type TTL.
+Cache policy: disabled in DEBUG; per-slug TTL (home and category pages by default),
+stale-while-revalidate past the TTL.
 """
 
-from typing import Any, Dict, List, Optional
+import hashlib
+from fnmatch import fnmatchcase
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
 from django.db import transaction
 from django.db.models import QuerySet
 from django.utils.text import slugify
 from django.utils import timezone
-from django.core.cache import cache
+from bfg.core.cache import (
+    TaggedValue,
+    get_or_refresh_tagged,
+    get_or_set_tagged,
+    invalidate_tags,
+    workspace_tag,
+)
 from bfg.core.services import BaseService
 from bfg.web.exceptions import PageNotFound
 from bfg.web.models import Page
 
+if TYPE_CHECKING:
+    from bfg.web.services.block_service import ResolvedBlocks
+
 # Cache key prefix; single place for key format
 PAGE_RENDERED_CACHE_PREFIX = "page_rendered"
 
-# TTL per page type (seconds). Only home and category are cacheable.
+# Default TTL per page type (seconds)
 PAGE_CACHE_TTL_HOME = 60 * 60  # 1 hour
 PAGE_CACHE_TTL_CATEGORY = 60 * 30  # 30 min
 PAGE_CACHE_CATEGORY_SLUG_PREFIX = "category"
 
 HOME_SLUG = "home"
 
+# Rendered page TTL by slug (fnmatch patterns allowed; an exact slug wins, then
+# the longest matching pattern). Extend or override with BFG2_SETTINGS['PAGE_CACHE_TTLS'],
+# e.g. {'*': 300} to cache every page; 0 disables caching for a slug.
+DEFAULT_PAGE_CACHE_TTLS = {
+    HOME_SLUG: PAGE_CACHE_TTL_HOME,
+    PAGE_CACHE_CATEGORY_SLUG_PREFIX: PAGE_CACHE_TTL_CATEGORY,
+    f"{PAGE_CACHE_CATEGORY_SLUG_PREFIX}-*": PAGE_CACHE_TTL_CATEGORY,
+}
+
+# Promo data (CampaignDisplay slides/categories) used by home page blocks
+PROMO_CACHE_PREFIX = "page_promo"
+PROMO_CACHE_TTL = 60 * 5  # 5 min; campaigns start and end without a data change
+
 
 def get_page_rendered_cache_key(workspace_id: int, slug: str, language: str) -> str:
     """Generate cache key for rendered page. Use this everywhere to avoid key drift."""
     return f"{PAGE_RENDERED_CACHE_PREFIX}:{workspace_id}:{slug}:{language}"
 
 
+def get_page_cache_tags(workspace_id: int, slug: str) -> List[str]:
+    """Cache tags for a rendered page: all pages of the workspace, and this slug in every language."""
+    return [workspace_tag(workspace_id, "pages"), workspace_tag(workspace_id, f"page:{slug}")]
+
+
 def is_cache_enabled() -> bool:
     """Cache is disabled in development (DEBUG)."""
     from django.conf import settings
@@ -42,30 +73,58 @@ def is_home_slug(slug: str) -> bool:
     return slug == HOME_SLUG
 
 
+def get_page_cache_ttls() -> Dict[str, int]:
+    """Configured TTL per slug pattern (defaults merged with BFG2_SETTINGS['PAGE_CACHE_TTLS'])."""
+    from django.conf import settings
+    return {**DEFAULT_PAGE_CACHE_TTLS, **getattr(settings, "BFG2_SETTINGS", {}).get("PAGE_CACHE_TTLS", {})}
+
+
+def _configured_page_ttl(slug: str) -> int:
+    ttls = get_page_cache_ttls()
+    if slug in ttls:
+        return ttls[slug]
+    matches = [pattern for pattern in ttls if fnmatchcase(slug, pattern)]
+    return ttls[max(matches, key=len)] if matches else 0
+
+
 def is_page_cacheable(slug: str) -> bool:
-    """True if this slug is allowed to be cached (home or category-type)."""
+    """True if this slug is allowed to be cached (has a TTL configured)."""
     if not slug:
         return False
-    if slug == HOME_SLUG:
-        return True
-    if slug == PAGE_CACHE_CATEGORY_SLUG_PREFIX or slug.startswith(
-        f"{PAGE_CACHE_CATEGORY_SLUG_PREFIX}-"
-    ):
-        return True
-    return False
+    return _configured_page_ttl(slug) > 0
 
 
 def get_page_cache_ttl(slug: str) -> int:
     """TTL in seconds for the given slug. 0 means do not cache."""
     if not is_cache_enabled() or not is_page_cacheable(slug):
         return 0
-    if slug == HOME_SLUG:
-        return PAGE_CACHE_TTL_HOME
-    if slug == PAGE_CACHE_CATEGORY_SLUG_PREFIX or slug.startswith(
-        f"{PAGE_CACHE_CATEGORY_SLUG_PREFIX}-"
-    ):
-        return PAGE_CACHE_TTL_CATEGORY
-    return 0
+    return _configured_page_ttl(slug)
+
+
+def render_page(
+    workspace_id: int, slug: str, language: str, base_url: Optional[str] = None
+) -> TaggedValue:
+    """
+    Cache builder for rendered pages (also run by the background refresh task).
+    Returns the page with the block fragment tags it was built from.
+    """
+    from bfg.common.models import Workspace
+
+    service = PageService(workspace=Workspace.objects.get(id=workspace_id), user=None)
+    rendered_data, resolution = service._render_page(
+        slug, language, _SiteUrl(base_url) if base_url else None
+    )
+    return TaggedValue(tuple(resolution.generations.items()), rendered_data)
+
+
+class _SiteUrl:
+    """Stands in for the request when a page is rendered outside one (promo image URLs)."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def build_absolute_uri(self, location: str = "/") -> str:
+        return urljoin(self.base_url, location)
 
 
 def invalidate_home_page_cache_for_workspace(
@@ -74,21 +133,31 @@ def invalidate_home_page_cache_for_workspace(
     """
     Invalidate rendered cache for the home page of a workspace.
     Call this when promo/CampaignDisplay/Campaign data changes so storefront gets fresh data.
+    Every language is invalidated; `languages` is accepted for backward compatibility.
     """
-    if languages is None:
-        languages = ["en", "zh"]
-    for lang in languages:
-        cache.delete(get_page_rendered_cache_key(workspace_id, HOME_SLUG, lang))
+    invalidate_tags(workspace_tag(workspace_id, f"page:{HOME_SLUG}"), workspace_tag(workspace_id, "promo"))
 
 
 def invalidate_page_rendered_cache(
     workspace_id: int, slug: str, languages: Optional[List[str]] = None
 ) -> None:
-    """Invalidate rendered cache for a specific page slug and languages."""
-    if languages is None:
-        languages = ["en", "zh"]
-    for lang in languages:
-        cache.delete(get_page_rendered_cache_key(workspace_id, slug, lang))
+    """Invalidate rendered cache for a page slug (all languages; `languages` kept for compatibility)."""
+    invalidate_tags(workspace_tag(workspace_id, f"page:{slug}"))
+
+
+def invalidate_workspace_page_cache(workspace_id: int) -> None:
+    """Invalidate rendered cache for every page of a workspace."""
+    invalidate_tags(workspace_tag(workspace_id, "pages"))
+
+
+def _has_promo_block(blocks: List[Dict[str, Any]]) -> bool:
+    for block in blocks:
+        data = block.get("data") or {}
+        if data.get("source") == "promo":
+            return True
+        if block.get("type") == "section_v1" and _has_promo_block(data.get("children") or []):
+            return True
+    return False
 
 
 class PageService(BaseService):
@@ -254,16 +323,29 @@ class PageService(BaseService):
 
         When slug is home and request is provided, blocks with data.source='promo'
         are filled from marketing CampaignDisplay (slides, category_entry, featured).
-        Cache is disabled in DEBUG; only home and category-type slugs are cached.
+        Cache is disabled in DEBUG; slugs are cached per PAGE_CACHE_TTLS, served
+        stale past their TTL while a background task re-renders them.
         """
-        cache_key = self._get_cache_key(slug, language)
-        use_cache = is_cache_enabled() and is_page_cacheable(slug)
-
-        if use_cache:
-            cached_data = cache.get(cache_key)
-            if cached_data is not None:
-                return cached_data
+        ttl = get_page_cache_ttl(slug)
+        if ttl <= 0:
+            return self._render_page(slug, language, request)[0]
+
+        cache_tags = get_page_cache_tags(self.workspace.id, slug)
+        if is_home_slug(slug):
+            cache_tags.append(workspace_tag(self.workspace.id, "promo"))
+        # Expired pages are served stale while one worker re-renders them
+        return get_or_refresh_tagged(
+            self._get_cache_key(slug, language),
+            "bfg.web.services.page_service.render_page",
+            [self.workspace.id, slug, language, request.build_absolute_uri("/") if request else None],
+            cache_tags,
+            ttl,
+        )
 
+    def _render_page(
+        self, slug: str, language: str, request: Optional[Any] = None
+    ) -> Tuple[Dict[str, Any], "ResolvedBlocks"]:
+        """Render a page without the page-level cache; also returns its block resolution."""
         # Fetch page; fallback to en, then to any language for this slug (e.g. home only in zh-hans)
         try:
             page = self.get_page_by_slug(slug, language)
@@ -309,7 +391,10 @@ class PageService(BaseService):
                     "data": {"content": {"en": page.content}},
                 }
             ]
-        resolved_blocks = block_service.resolve_all_blocks(blocks)
+        # Dynamic blocks come from cached fragments, so a changed post only
+        # re-queries the fragments showing it
+        resolution = block_service.resolve_blocks(blocks, use_cache=is_cache_enabled())
+        resolved_blocks = resolution.blocks
 
         # Resolve promo data for home page blocks (source='promo')
         if is_home_slug(slug) and request:
@@ -329,21 +414,43 @@ class PageService(BaseService):
             "published_at": page.published_at.isoformat() if page.published_at else None,
         }
 
-        ttl = get_page_cache_ttl(slug)
-        if use_cache and ttl > 0:
-            cache.set(cache_key, rendered_data, ttl)
-
-        return rendered_data
+        return rendered_data, resolution
 
     def _resolve_home_promo_blocks(
         self, blocks: List[Dict[str, Any]], request: Any
     ) -> List[Dict[str, Any]]:
         """Fill blocks with data.source='promo' using marketing CampaignDisplay data."""
+        if not _has_promo_block(blocks):
+            return blocks
+        promo = self._get_promo(request)
+        if promo is None:
+            return blocks
+        return self._fill_promo_blocks(blocks, promo)
+
+    def _get_promo(self, request: Any) -> Optional[Dict[str, Any]]:
+        """Promo slides and featured categories, cached per workspace and host"""
         try:
             from bfg.marketing.promo_views import get_promo_available
         except ImportError:
-            return blocks
-        promo = get_promo_available(self.workspace, request)
+            return None
+
+        def build():
+            return get_promo_available(self.workspace, request, include=('slides', 'featured_categories'))
+
+        if not is_cache_enabled():
+            return build()
+        # Image URLs are absolute, so the entry depends on the requested host
+        host = hashlib.md5(request.build_absolute_uri("/").encode()).hexdigest()
+        return get_or_set_tagged(
+            f"{PROMO_CACHE_PREFIX}:{self.workspace.id}:{host}",
+            build,
+            [workspace_tag(self.workspace.id, "promo")],
+            PROMO_CACHE_TTL,
+        )
+
+    def _fill_promo_blocks(
+        self, blocks: List[Dict[str, Any]], promo: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         slides = promo.get('slides') or []
         featured_categories = promo.get('featured_categories') or []
 
@@ -355,7 +462,7 @@ class PageService(BaseService):
             if block_type == 'section_v1':
                 children = (block.get('data') or {}).get('children') or []
                 block['data'] = dict(block.get('data') or {})
-                block['data']['children'] = self._resolve_home_promo_blocks(children, request)
+                block['data']['children'] = self._fill_promo_blocks(children, promo)
                 continue
             data = block.get('data') or {}
             if data.get('source') != 'promo':
@@ -412,8 +519,7 @@ class PageService(BaseService):
         Args:
             page: Page instance
         """
-        cache_key = self._get_cache_key(page.slug, page.language)
-        cache.delete(cache_key)
+        invalidate_page_rendered_cache(page.workspace_id, page.slug)
     
     @transaction.atomic
     def update_page_blocks(self, page: Page, blocks: List[Dict[str, Any]]) -> Page:
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Signals for web app. Invalidate rendered page, block fragment, storefront config
+and workspace lookup caches when pages, posts, categories, menus or sites change.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from bfg.common.middleware import invalidate_workspace_cache
+from bfg.common.services.settings_service import invalidate_storefront_config_cache
+from bfg.core.cache import invalidate_tags, workspace_tag
+from bfg.web.models import Category, Menu, MenuItem, Page, Post, Site
+from bfg.web.services.block_service import get_post_change_tags
+from bfg.web.services.page_service import invalidate_page_rendered_cache
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_page_cache_on_change(sender, instance, **kwargs):
+    invalidate_page_rendered_cache(instance.workspace_id, instance.slug)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_block_fragments_on_post_change(sender, instance, **kwargs):
+    """Only the post/category list fragments the post is (or may now be) shown in."""
+    invalidate_tags(*get_post_change_tags(instance))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_block_fragments_on_category_change(sender, instance, **kwargs):
+    """Category grids, and post lists showing category names."""
+    invalidate_tags(workspace_tag(instance.workspace_id, "web_categories"))
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def invalidate_storefront_config_on_change(sender, instance, **kwargs):
+    """Header/footer menus and site name/theme are part of the storefront config."""
+    invalidate_storefront_config_cache(instance.workspace_id)
+    if sender is Site:
+        # Site domains are used to resolve the workspace of guest storefront requests
+        invalidate_workspace_cache()
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_storefront_config_on_menu_item_change(sender, instance, **kwargs):
+    try:
+        workspace_id = instance.menu.workspace_id
+    except Menu.DoesNotExist:
+        # Menu already gone (cascade delete); the menu delete invalidated the config
+        return
+    invalidate_storefront_config_cache(workspace_id)
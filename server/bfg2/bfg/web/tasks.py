@@ -8,6 +8,7 @@ import logging
 import json
 import hashlib
 import hmac
+from typing import Optional
 import requests
 from celery import shared_task
 from django.conf import settings
@@ -201,13 +202,12 @@ def invalidate_page_cache(page_id: int):
     Args:
         page_id: ID of the page to invalidate
     """
-    from django.core.cache import cache
     from bfg.web.models import Page
+    from bfg.web.services.page_service import invalidate_page_rendered_cache
 
     try:
         page = Page.objects.get(id=page_id)
-        cache_key = f"page_rendered:{page.workspace_id}:{page.slug}:{page.language}"
-        cache.delete(cache_key)
+        invalidate_page_rendered_cache(page.workspace_id, page.slug)
         logger.info(f"Cache invalidated for page {page_id}")
     except Page.DoesNotExist:
         logger.warning(f"Page {page_id} not found for cache invalidation")
@@ -444,14 +444,23 @@ Cancelled at: {timezone.now()}
 def process_scheduled_newsletter_sends():
     """
     Find NewsletterSend with status=scheduled and scheduled_at <= now, execute send for each.
+    Also resumes sends in 'sending' with a chunk lease that has had no heartbeat for
+    BFG2_SETTINGS['NEWSLETTER_STALL_TIMEOUT'] seconds (default 900), or with no progress
+    and no live lease for that long, e.g. after a worker crash. Queued or throttled
+    chunks keep their lease alive and are not dispatched again.
     Register in Celery beat, e.g. run every minute:
         'process_scheduled_newsletter_sends': {
             'task': 'bfg.web.tasks.process_scheduled_newsletter_sends',
             'schedule': crontab(minute='*'),
         }
     """
-    from bfg.web.models import NewsletterSend
+    from datetime import timedelta
+
+    from django.db.models import Exists, OuterRef, Q
+
+    from bfg.web.models import NewsletterSend, NewsletterSendChunk
     from bfg.web.services import NewsletterService
+    from bfg.web.services.newsletter_service import get_stall_timeout, live_chunks
 
     now = timezone.now()
     due = NewsletterSend.objects.filter(
@@ -465,3 +474,55 @@ def process_scheduled_newsletter_sends():
             logger.info("Newsletter send %s executed (scheduled)", send.id)
         except Exception as e:
             logger.exception("Newsletter send %s failed: %s", send.id, e)
+
+    stalled_before = now - timedelta(seconds=get_stall_timeout())
+    stale_chunks = NewsletterSendChunk.objects.filter(
+        newsletter_send=OuterRef('pk'), released_at__isnull=True, heartbeat_at__lte=stalled_before,
+    )
+    stalled = NewsletterSend.objects.filter(status='sending').filter(
+        Q(Exists(stale_chunks))
+        | Q(updated_at__lte=stalled_before) & ~Q(Exists(live_chunks(OuterRef('pk'))))
+    ).select_related('workspace')
+    for send in stalled:
+        try:
+            NewsletterService(workspace=send.workspace, user=None).resume_send(send)
+            logger.info("Newsletter send %s resumed", send.id)
+        except Exception as e:
+            logger.exception("Newsletter send %s resume failed: %s", send.id, e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_newsletter_chunk(
+    self,
+    newsletter_send_id: int,
+    first_subscription_id: int,
+    last_subscription_id: int,
+    chunk_id: Optional[int] = None,
+):
+    """
+    Deliver one chunk of a newsletter send (pending recipients with ids in the range)
+    over a single email connection. Already-logged recipients are skipped, and the
+    chunk's lease stops a range taken over by a resumed send, so a retry or resume
+    re-sends at most SEND_LOG_FLUSH_SIZE recipients per crashed chunk.
+    """
+    from bfg.web.models import NewsletterSend, NewsletterSendChunk
+    from bfg.web.services import NewsletterService
+
+    try:
+        send = NewsletterSend.objects.select_related('workspace').get(id=newsletter_send_id)
+    except NewsletterSend.DoesNotExist:
+        logger.error("Newsletter send %s not found", newsletter_send_id)
+        return
+    chunk = NewsletterSendChunk.objects.filter(id=chunk_id).first() if chunk_id else None
+
+    try:
+        sent, failed = NewsletterService(workspace=send.workspace, user=None).send_chunk(
+            send, first_subscription_id, last_subscription_id, chunk
+        )
+        logger.info(
+            "Newsletter send %s chunk %s-%s: %s sent, %s failed",
+            newsletter_send_id, first_subscription_id, last_subscription_id, sent, failed,
+        )
+    except Exception as exc:
+        logger.error("Newsletter send %s chunk failed: %s", newsletter_send_id, exc)
+        raise self.retry(exc=exc)
@@ -1576,13 +1576,13 @@ class NewsletterSendViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], url_path='send-now')
     def send_now(self, request, pk=None):
-        """Trigger immediate send (sync or async)."""
+        """Start the send; delivery runs in chunk tasks (status stays 'sending' until done)."""
         send = self.get_object()
         if send.status not in ('draft', 'scheduled'):
             return Response({'detail': 'Send already completed or cancelled.'}, status=status.HTTP_400_BAD_REQUEST)
         workspace = get_workspace(request)
         service = NewsletterService(workspace=workspace, user=request.user)
-        service.execute_send(send)
+        send = service.execute_send(send)
         return Response(NewsletterSendSerializer(send).data)
 
 
@@ -1,8 +1,14 @@
+import json
+import threading
 from types import SimpleNamespace
 
 import pytest
 
-from bfg.common.services.email_service import EmailService
+from bfg.common.email_backends import OutgoingEmail
+from bfg.common.email_backends.mailgun import MailgunBackend
+from bfg.common.email_backends.smtp import SMTPBackend, smtp_pool
+from bfg.common.services.email_service import EmailOutbox, EmailService
+from bfg.web.management.commands.benchmark_newsletter_send import SMTPSink
 
 
 def test_send_email_raises_without_active_config(monkeypatch):
@@ -10,3 +16,97 @@ def test_send_email_raises_without_active_config(monkeypatch):
     monkeypatch.setattr(EmailService, "get_active_config", staticmethod(lambda _workspace: None))
     with pytest.raises(ValueError, match="No active email config"):
         EmailService.send_email(workspace, ["u@example.com"], "s", "body", config=None)
+
+
+class FakeResponse:
+    def __init__(self, status=200):
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+
+class FakeHTTP:
+    def __init__(self, fail_subjects=()):
+        self.fail_subjects = set(fail_subjects)
+        self.posts = []
+
+    def post(self, url, auth, data, timeout):
+        self.posts.append(data)
+        return FakeResponse(500 if data["subject"] in self.fail_subjects else 200)
+
+
+MAILGUN_CONFIG = {"api_key": "key", "domain": "mg.example.com", "from_email": "shop@example.com"}
+
+
+def test_mailgun_send_many_batches_identical_messages():
+    http = FakeHTTP(fail_subjects={"Broken"})
+    messages = [OutgoingEmail([f"u{i}@example.com"], "News", "Hello") for i in range(3)]
+    messages += [
+        OutgoingEmail(["a@example.com", "b@example.com"], "News", "Hello"),
+        OutgoingEmail(["c@example.com"], "Broken", "Hello"),
+        OutgoingEmail(["d@example.com"], "Broken", "Hello"),
+    ]
+
+    results = MailgunBackend().send_many(messages, config=MAILGUN_CONFIG, connection=http)
+
+    assert [r is None for r in results] == [True, True, True, True, False, False]
+    batch = http.posts[0]
+    assert batch["to"] == ["u0@example.com", "u1@example.com", "u2@example.com"]
+    assert json.loads(batch["recipient-variables"]) == {f"u{i}@example.com": {} for i in range(3)}
+    # Failed batch, then the multi-recipient message sent on its own
+    assert [post["to"] for post in http.posts[1:]] == [["c@example.com", "d@example.com"], ["a@example.com", "b@example.com"]]
+    assert "recipient-variables" not in http.posts[2]
+
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    yield sink
+    smtp_pool.clear()
+    sink.shutdown()
+    sink.server_close()
+
+
+def test_smtp_backend_reuses_pooled_connection_and_reconnects(smtp_sink):
+    config = {"host": "127.0.0.1", "port": smtp_sink.server_address[1], "from_email": "shop@example.com"}
+    backend = SMTPBackend()
+    backend.send(["a@example.com"], "One", "Hello", config=config)
+    results = backend.send_many(
+        [OutgoingEmail([f"u{i}@example.com"], "Two", "Hello") for i in range(3)], config=config
+    )
+    assert results == [None] * 3
+    assert (smtp_sink.connections, smtp_sink.messages) == (1, 4)
+
+    # Server dropped the idle connection: the next send reconnects once
+    connection = smtp_pool.acquire(config)
+    connection.server.close()
+    smtp_pool.release(connection)
+    backend.send(["b@example.com"], "Three", "Hello", config=config)
+    assert (smtp_sink.connections, smtp_sink.messages) == (2, 5)
+
+
+class FakeSession:
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def send_many(self, messages):
+        self.batches.append([m.to_list[0] for m in messages])
+        return [ValueError("bad address") if m.to_list[0] == "bad@example.com" else None for m in messages]
+
+    def close(self):
+        self.closed = True
+
+
+def test_outbox_sends_in_batches_and_collects_failures():
+    session = FakeSession()
+    with EmailOutbox(session, batch_size=2) as outbox:
+        for to in ("a@example.com", "bad@example.com", "c@example.com"):
+            outbox.add([to], "Hi", "Hello")
+
+    assert session.batches == [["a@example.com", "bad@example.com"], ["c@example.com"]]
+    assert session.closed and outbox.sent_count == 2
+    assert [(m.to_list, str(e)) for m, e in outbox.failed] == [(["bad@example.com"], "bad address")]
@@ -1,4 +1,9 @@
-from bfg.common.services.settings_service import SettingsService
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.services.settings_service import SettingsService, get_cached_storefront_config
 
 
 def test_is_feature_enabled_reads_feature_map():
@@ -7,3 +12,23 @@ def test_is_feature_enabled_reads_feature_map():
 
     assert service.is_feature_enabled(settings, "shop") is True
     assert service.is_feature_enabled(settings, "blog") is False
+
+
+@pytest.mark.django_db
+def test_storefront_config_is_cached_until_menus_change():
+    from bfg.common.models import Workspace
+    from bfg.web.models import Menu, MenuItem
+
+    cache.clear()
+    workspace = Workspace.objects.create(name="Shop", slug="shop", is_active=True)
+    menu = Menu.objects.create(workspace=workspace, name="Main", slug="main", location="header", language="en")
+    MenuItem.objects.create(menu=menu, title="Home", url="/", order=1)
+
+    assert [item["title"] for item in get_cached_storefront_config(workspace, "en")["header_menus"]] == ["Home"]
+    with CaptureQueriesContext(connection) as ctx:
+        get_cached_storefront_config(workspace, "en")
+    assert len(ctx.captured_queries) == 0
+
+    MenuItem.objects.create(menu=menu, title="Shop", url="/shop", order=2)
+    assert [item["title"] for item in get_cached_storefront_config(workspace, "en")["header_menus"]] == ["Home", "Shop"]
+    cache.clear()
@@ -0,0 +1,91 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.middleware import (
+    _get_workspace_by_domain,
+    _get_workspace_by_id,
+    workspace_cache,
+)
+from bfg.common.models import Workspace
+from bfg.core.cache import TwoTierCache
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    cache.clear()
+    workspace_cache.clear_local()
+    yield
+    cache.clear()
+    workspace_cache.clear_local()
+
+
+def test_local_hits_skip_the_shared_cache():
+    tier = TwoTierCache("t", version_check_interval=60)
+    loader = mock.Mock(return_value="value")
+
+    assert tier.get_or_set("k", loader) == "value"
+    with mock.patch.object(cache, "get_many") as get_many, mock.patch.object(cache, "get") as get:
+        for _ in range(5):
+            assert tier.get_or_set("k", loader) == "value"
+    assert get_many.call_count == 0 and get.call_count == 0
+    assert loader.call_count == 1
+
+
+def test_invalidation_reaches_other_processes():
+    # Two instances with the same namespace stand in for two worker processes
+    process_a = TwoTierCache("t", version_check_interval=0)
+    process_b = TwoTierCache("t", version_check_interval=0)
+    process_a.get_or_set("k", lambda: "old")
+    assert process_b.get_or_set("k", lambda: "unused") == "old"
+
+    process_a.invalidate()
+
+    assert process_b.get_or_set("k", lambda: "new") == "new"
+    assert process_a.get_or_set("k", lambda: "unused") == "new"
+
+
+def test_lru_is_bounded():
+    tier = TwoTierCache("t", maxsize=2)
+    for key in ("a", "b", "c"):
+        tier.get_or_set(key, lambda: key)
+    assert list(tier._local) == ["b", "c"]
+
+
+@pytest.mark.django_db
+def test_workspace_lookups_are_cached_and_invalidated_on_save():
+    workspace = Workspace.objects.create(name="Shop", slug="shop", domain="shop.test", is_active=True)
+
+    assert _get_workspace_by_domain("shop.test").id == workspace.id
+    assert _get_workspace_by_domain("unknown.test") is None
+    with CaptureQueriesContext(connection) as ctx:
+        assert _get_workspace_by_domain("shop.test").id == workspace.id
+        assert _get_workspace_by_domain("unknown.test") is None
+        assert _get_workspace_by_id(workspace.id).id == workspace.id
+        assert _get_workspace_by_id(workspace.id).id == workspace.id
+    assert len(ctx.captured_queries) == 1
+
+    workspace.domain = "new.test"
+    workspace.save()
+
+    assert _get_workspace_by_domain("shop.test") is None
+    assert _get_workspace_by_domain("new.test").id == workspace.id
+
+    workspace.is_active = False
+    workspace.save()
+    assert _get_workspace_by_id(workspace.id) is None
+
+
+@pytest.mark.django_db
+def test_each_lookup_gets_its_own_workspace():
+    workspace = Workspace.objects.create(name="Shop", slug="shop", domain="shop.test", is_active=True)
+    first = _get_workspace_by_domain("shop.test")
+    first.name = "Changed by one request"
+    first.settings["flag"] = True
+
+    second = _get_workspace_by_domain("shop.test")
+    assert second is not first and second.id == workspace.id
+    assert second.name == "Shop" and "flag" not in second.settings
@@ -0,0 +1,188 @@
+import pytest
+from django.core.cache import cache
+
+from bfg.core import api_tool_catalog
+from bfg.core.api_tool_catalog import (
+    clear_api_tool_catalog,
+    filter_tools_by_categories,
+    get_api_tool_catalog,
+    get_api_tools,
+)
+
+SCHEMA = {
+    "paths": {
+        "/api/v1/orders/": {"get": {"operationId": "orders_list", "summary": "List orders"}},
+        "/api/v1/customers/{id}/": {"get": {
+            "operationId": "customers_retrieve", "summary": "Get a customer",
+            "parameters": [{"name": "id", "in": "path", "required": True}],
+        }},
+        "/api/v1/invoices/": {"post": {"operationId": "invoices_create", "summary": "Create an invoice for an order"}},
+        "/api/v1/web/pages/": {"get": {"operationId": "pages_list"}},
+    }
+}
+
+
+@pytest.fixture
+def schema_calls(monkeypatch):
+    calls = []
+
+    def get_schema(request=None):
+        calls.append(request)
+        return SCHEMA
+
+    monkeypatch.setattr(api_tool_catalog, "_get_schema", get_schema)
+    cache.clear()
+    clear_api_tool_catalog()
+    yield calls
+    cache.clear()
+    clear_api_tool_catalog()
+
+
+def test_catalog_is_built_once_per_version(schema_calls, settings):
+    tools, specs = get_api_tools()
+    assert [tool["function"]["name"] for tool in tools] == ["orders_list", "customers_retrieve", "invoices_create"]
+    assert specs["customers_retrieve"]["path_params"] == ["id"]
+    assert get_api_tools()[0] is tools
+
+    # Another process finds it in the shared cache
+    clear_api_tool_catalog()
+    assert get_api_tool_catalog().tool_specs == specs
+    assert len(schema_calls) == 1
+
+    # A new deploy version builds its own
+    settings.BFG2_SETTINGS = {"AGENT_TOOL_CATALOG_VERSION": "release-2"}
+    get_api_tool_catalog()
+    assert len(schema_calls) == 2
+
+
+def test_failed_build_is_retried(schema_calls, monkeypatch):
+    monkeypatch.setattr(api_tool_catalog, "_get_schema", lambda request=None: {})
+    assert get_api_tool_catalog().tools == []
+    monkeypatch.setattr(api_tool_catalog, "_get_schema", lambda request=None: SCHEMA)
+    assert len(get_api_tool_catalog().tools) == 3
+
+
+def test_tools_are_filtered_through_the_category_index(schema_calls):
+    catalog = get_api_tool_catalog()
+    assert catalog.category_index["order"] == [0, 2]
+    manual = {"type": "function", "function": {"name": "delivery_ship_order", "description": "Ship"}}
+    tools = catalog.tools + [manual]
+    mapping = {"delivery_ship_order": "delivery.ship_order"}
+
+    names = lambda selected: [tool["function"]["name"] for tool in selected]
+    assert names(filter_tools_by_categories(tools, mapping, ["customer", "order"], 128, catalog=catalog)) == [
+        "delivery_ship_order", "orders_list", "customers_retrieve", "invoices_create",
+    ]
+    assert names(filter_tools_by_categories(tools, mapping, ["order"], 2, catalog=catalog)) == [
+        "delivery_ship_order", "orders_list",
+    ]
+    # Without a catalog the index is built from the tools passed
+    assert names(filter_tools_by_categories(tools, mapping, ["invoice"], 128)) == [
+        "delivery_ship_order", "invoices_create",
+    ]
+
+
+CARRIER_SPECS = {
+    "carriers_list": {
+        "path": "/api/v1/delivery/carriers/", "method": "GET",
+        "path_params": [], "query_params": ["search"], "body_keys": [],
+    },
+    "carriers_retrieve": {
+        "path": "/api/v1/delivery/carriers/{id}/", "method": "GET",
+        "path_params": ["id"], "query_params": [], "body_keys": [],
+    },
+    "carriers_create": {
+        "path": "/api/v1/delivery/carriers/", "method": "POST",
+        "path_params": [], "query_params": [], "body_keys": ["name", "code"],
+    },
+}
+
+
+@pytest.fixture
+def staff_request(db):
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+
+    from bfg.common.models import StaffMember, StaffRole, Workspace
+
+    workspace = Workspace.objects.create(name="Shop", slug="shop", is_active=True)
+    user = get_user_model().objects.create_user(username="staff", email="staff@test.com", password="x")
+    role = StaffRole.objects.create(workspace=workspace, name="Staff", code="staff")
+    StaffMember.objects.create(workspace=workspace, user=user, role=role, is_active=True)
+    request = RequestFactory().post("/api/v1/agent/chat/")
+    request.user = user
+    request.workspace = workspace
+    return request
+
+
+@pytest.mark.django_db
+def test_dispatcher_reuses_the_turn_context(staff_request):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from bfg.core.api_tool_catalog import ApiToolDispatcher
+    from bfg.delivery.models import Carrier
+
+    carrier = Carrier.objects.create(workspace=staff_request.workspace, name="Post", code="post")
+    dispatcher = ApiToolDispatcher(staff_request, CARRIER_SPECS)
+
+    with CaptureQueriesContext(connection) as ctx:
+        calls = dispatcher.dispatch_many([
+            ("carriers_list", {}),
+            ("carriers_retrieve", {"id": carrier.id}),
+            ("carriers_create", {"name": "Courier", "code": "courier"}),
+            ("carriers_retrieve", {"id": "nope"}),
+            ("carriers_list", {}),
+        ])
+    assert not any("staffmember" in query["sql"].lower() for query in ctx.captured_queries)
+
+    results = [call.result for call in calls]
+    assert results[1]["data"]["code"] == "post"
+    assert results[2]["success"] and results[2]["data"]["code"] == "courier"
+    assert results[3]["success"] is False and results[3]["error"] == "Not found."
+    assert [c["code"] for c in results[4]["data"]] == ["courier", "post"]
+    assert all(call.elapsed_ms >= 0 for call in calls)
+
+
+@pytest.mark.django_db
+def test_dispatcher_runs_other_tools_in_order(staff_request):
+    from bfg.core.api_tool_catalog import ApiToolDispatcher
+
+    dispatcher = ApiToolDispatcher(staff_request, CARRIER_SPECS)
+    seen = []
+    calls = dispatcher.dispatch_many(
+        [("carriers_list", {}), ("ship_order", {"order_id": 1}), ("unknown", {})],
+        lambda tool_name, args: seen.append(tool_name) or {"success": True, "data": args},
+    )
+    assert [call.tool_name for call in calls] == ["carriers_list", "ship_order", "unknown"]
+    assert calls[1].result == {"success": True, "data": {"order_id": 1}}
+    assert seen == ["ship_order", "unknown"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dispatcher_fans_reads_out_to_worker_threads(staff_request, monkeypatch):
+    import threading
+
+    from bfg.core.api_tool_catalog import ApiToolDispatcher
+    from bfg.delivery.models import Carrier
+
+    carrier = Carrier.objects.create(workspace=staff_request.workspace, name="Post", code="post")
+    dispatcher = ApiToolDispatcher(staff_request, CARRIER_SPECS, max_workers=3)
+    threads = []
+    dispatch = ApiToolDispatcher.dispatch
+    monkeypatch.setattr(
+        ApiToolDispatcher, "dispatch",
+        lambda self, *args: threads.append(threading.current_thread()) or dispatch(self, *args),
+    )
+
+    calls = dispatcher.dispatch_many([
+        ("carriers_list", {"search": "post"}),
+        ("carriers_retrieve", {"id": carrier.id}),
+        ("carriers_retrieve", {"id": 0}),
+    ])
+
+    assert threading.main_thread() not in threads and len(threads) == 3
+    results = [call.result for call in calls]
+    assert [c["code"] for c in results[0]["data"]] == ["post"]
+    assert results[1]["success"] and results[1]["data"]["code"] == "post"
+    assert results[2]["success"] is False
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from bfg.core import cache as core_cache
+from bfg.core.cache import TaggedValue, get_or_refresh_tagged, get_tag_generations, invalidate_tags
+from bfg.core.tasks import refresh_cache_entry
+
+BUILDER = f"{__name__}.build"
+calls = []
+
+
+def build(value, extra_tag=None):
+    calls.append(value)
+    if extra_tag:
+        return TaggedValue(tuple(get_tag_generations([extra_tag]).items()), value)
+    return value
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    calls.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    """Refresh tasks, run when the test says so (no broker here)"""
+    tasks = []
+    monkeypatch.setattr(refresh_cache_entry, "delay", lambda *args: tasks.append(args))
+    return tasks
+
+
+def test_fresh_entries_are_built_once(scheduled):
+    assert get_or_refresh_tagged("k", BUILDER, ["v1"], ["t"], 60) == "v1"
+    assert get_or_refresh_tagged("k", BUILDER, ["v2"], ["t"], 60) == "v1"
+    assert calls == ["v1"]
+    assert scheduled == []
+
+    invalidate_tags("t")
+    assert get_or_refresh_tagged("k", BUILDER, ["v2"], ["t"], 60) == "v2"
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(scheduled):
+    get_or_refresh_tagged("k", BUILDER, ["v1"], ["t"], 0)
+
+    # Every caller gets the stale value; only the first schedules a refresh
+    assert get_or_refresh_tagged("k", BUILDER, ["v2"], ["t"], 0) == "v1"
+    assert get_or_refresh_tagged("k", BUILDER, ["v3"], ["t"], 0) == "v1"
+    assert calls == ["v1"]
+    assert len(scheduled) == 1
+
+    refresh_cache_entry(*scheduled[0])
+    assert calls == ["v1", "v2"]
+    assert get_or_refresh_tagged("k", BUILDER, ["v3"], ["t"], 60) == "v2"
+    # The refresh released the lock: the next stale read schedules again
+    assert len(scheduled) == 2
+
+
+def test_failed_scheduling_keeps_serving_stale(monkeypatch):
+    def broker_down(*args):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(refresh_cache_entry, "delay", broker_down)
+    get_or_refresh_tagged("k", BUILDER, ["v1"], ["t"], 0)
+    assert get_or_refresh_tagged("k", BUILDER, ["v2"], ["t"], 0) == "v1"
+    assert cache.get("k:refresh_lock") is None
+
+
+def test_builder_tags_invalidate_the_entry(scheduled):
+    get_or_refresh_tagged("k", BUILDER, ["v1", "fragment"], ["page"], 60)
+    assert get_or_refresh_tagged("k", BUILDER, ["v2", "fragment"], ["page"], 60) == "v1"
+    invalidate_tags("fragment")
+    assert get_or_refresh_tagged("k", BUILDER, ["v2", "fragment"], ["page"], 60) == "v2"
+
+
+def test_miss_waits_for_the_rebuild_in_progress(monkeypatch):
+    monkeypatch.setattr(core_cache, "REFRESH_WAIT_INTERVAL", 0.01)
+    cache.add("k:refresh_lock", 1)
+    timer = threading.Timer(0.05, lambda: core_cache.refresh_tagged("k", BUILDER, ["v1"], ["t"], 60))
+    timer.start()
+    try:
+        assert get_or_refresh_tagged("k", BUILDER, ["v2"], ["t"], 60) == "v1"
+    finally:
+        timer.join()
+    assert calls == ["v1"]
+
+    # Nobody finishes the rebuild: build after the wait, leaving the lock alone
+    monkeypatch.setattr(core_cache, "REFRESH_WAIT_TIMEOUT", 0.05)
+    cache.add("other:refresh_lock", 1)
+    assert get_or_refresh_tagged("other", BUILDER, ["v3"], ["t"], 60) == "v3"
+    assert cache.get("other:refresh_lock") == 1
+
+
+def test_waiters_take_over_a_failed_rebuild(monkeypatch):
+    monkeypatch.setattr(core_cache, "REFRESH_WAIT_INTERVAL", 0.01)
+    monkeypatch.setattr(core_cache, "REFRESH_WAIT_TIMEOUT", 30)
+    cache.add("k:refresh_lock", 1)
+
+    def failing_rebuild():
+        with pytest.raises(ValueError):
+            core_cache.refresh_tagged("k", f"{__name__}.explode", [], ["t"], 60)
+
+    timer = threading.Timer(0.05, failing_rebuild)
+    timer.start()
+    started = time.monotonic()
+    try:
+        assert get_or_refresh_tagged("k", BUILDER, ["v1"], ["t"], 60) == "v1"
+    finally:
+        timer.join()
+
+    # Released by the failed builder: the waiter rebuilt without sitting out the wait
+    assert time.monotonic() - started < 5
+    assert calls == ["v1"] and cache.get("k:refresh_lock") is None
+
+
+def explode():
+    raise ValueError("builder failed")
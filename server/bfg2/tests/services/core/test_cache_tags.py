@@ -0,0 +1,115 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from bfg.core.cache import (
+    get_many_tagged,
+    get_or_set_tagged,
+    get_tag_generations,
+    get_tagged,
+    invalidate_tags,
+    set_many_tagged,
+    set_tagged,
+    workspace_tag,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_invalidating_a_tag_drops_every_entry_under_it():
+    products = workspace_tag(1, "products")
+    set_tagged("a", "A", [products])
+    set_tagged("b", "B", [products, workspace_tag(1, "product:2")])
+    set_tagged("c", "C", [workspace_tag(2, "products")])
+
+    invalidate_tags(workspace_tag(1, "product:2"))
+    assert get_tagged("a", [products]) == "A"
+    assert get_tagged("b", [products]) is None
+
+    invalidate_tags(products)
+    assert get_tagged("a", [products]) is None
+    assert get_tagged("c") == "C"
+
+
+def test_entry_checks_tags_the_reader_did_not_pass():
+    set_tagged("slug-key", "P", ["t1", "t2"])
+    invalidate_tags("t2")
+    assert get_tagged("slug-key", ["t1"]) is None
+
+
+def test_lost_tag_generation_invalidates_entries():
+    set_tagged("a", "A", ["t"])
+    cache.delete("cache_tag:t")
+    assert get_tagged("a", ["t"]) is None
+
+
+def test_invalidation_during_compute_leaves_entry_stale():
+    def compute():
+        invalidate_tags("t")
+        return "old"
+
+    assert get_or_set_tagged("k", compute, ["t"]) == "old"
+    assert get_tagged("k", ["t"]) is None
+    assert get_or_set_tagged("k", lambda: "new", ["t"]) == "new"
+    assert get_tagged("k", ["t"]) == "new"
+
+
+def test_generations_are_stable_until_invalidated():
+    first = get_tag_generations(["t"])
+    assert get_tag_generations(["t"]) == first
+    invalidate_tags("t")
+    assert get_tag_generations(["t"])["t"] != first["t"]
+
+
+def test_many_tagged_entries_are_validated_per_entry():
+    generations = get_tag_generations(["shared"])
+    stored = set_many_tagged(
+        {"a": ("A", ["shared", "a"]), "b": ("B", ["shared", "b"])}, generations=generations
+    )
+    assert dict(stored["a"].generations)["shared"] == generations["shared"]
+    set_tagged("plain", "P", [])
+
+    assert {key: entry.value for key, entry in get_many_tagged(["a", "b", "plain", "none"]).items()} == {
+        "a": "A", "b": "B", "plain": "P",
+    }
+    invalidate_tags("b")
+    assert set(get_many_tagged(["a", "b"])) == {"a"}
+    invalidate_tags("shared")
+    assert get_many_tagged(["a", "b"]) == {}
+
+
+@pytest.mark.django_db
+def test_product_caches_invalidate_on_product_change(django_capture_on_commit_callbacks):
+    from bfg.common.models import Workspace
+    from bfg.shop.cache import ProductCacheService, ProductListCacheService
+    from bfg.shop.models import Product
+
+    workspace = Workspace.objects.create(name="Store", slug="store", is_active=True)
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(
+            workspace=workspace, name="Boot", slug="boot", price=Decimal("10"),
+            language="en", is_featured=True,
+        )
+
+    assert ProductCacheService.get_product(product.id, workspace.id).name == "Boot"
+    assert ProductCacheService.get_product_by_slug("boot", workspace.id).name == "Boot"
+    assert [p.name for p in ProductListCacheService.get_featured_products(workspace.id)] == ["Boot"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.filter(pk=product.pk).update(name="Boot v2")
+        # queryset update skips signals: nothing invalidated yet
+    assert ProductCacheService.get_product(product.id, workspace.id).name == "Boot"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.refresh_from_db()
+        product.save()
+
+    assert ProductCacheService.get_product(product.id, workspace.id).name == "Boot v2"
+    assert ProductCacheService.get_product_by_slug("boot", workspace.id).name == "Boot v2"
+    assert [p.name for p in ProductListCacheService.get_featured_products(workspace.id)] == ["Boot v2"]
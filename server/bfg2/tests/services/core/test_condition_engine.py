@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+import pytest
+
+from bfg.core.condition_engine import ConditionEngine, FieldProvider, condition_fingerprint
+
+
+class TierProvider(FieldProvider):
+    def __init__(self):
+        self.calls = 0
+
+    def get_available_fields(self):
+        return {"tier": "Customer tier"}
+
+    def get_field_value(self, field_name, context):
+        self.calls += 1
+        return context.get("tier")
+
+
+def test_leaf_rules_are_evaluated_not_treated_as_groups():
+    engine = ConditionEngine()
+    config = {"operator": "AND", "rules": [{"field": "freight.weight", "operator": ">=", "value": 10}]}
+
+    assert engine.evaluate(config, {"freight": {"weight": Decimal("15")}}) is True
+    assert engine.evaluate(config, {"freight": {"weight": Decimal("5")}}) is False
+    assert engine.evaluate(config, {"freight": {}}) is False
+
+
+def test_nested_groups_providers_and_operators():
+    engine = ConditionEngine()
+    provider = TierProvider()
+    engine.register_provider("customer", provider)
+    config = {
+        "operator": "OR",
+        "rules": [
+            {"field": "customer.tier", "operator": "in", "value": ["gold", "vip"]},
+            {
+                "operator": "AND",
+                "rules": [
+                    {"field": "amount", "operator": ">", "value": Decimal("99.5")},
+                    {"field": "tags", "operator": "contains", "value": "sale"},
+                ],
+            },
+        ],
+    }
+
+    assert engine.evaluate_many(config, [
+        {"tier": "vip"},
+        {"tier": "standard", "amount": 100, "tags": ["sale"]},
+        {"tier": "standard", "amount": 99.5, "tags": ["sale"]},
+    ]) == [True, True, False]
+    assert provider.calls == 3
+
+
+def test_compiled_conditions_are_cached_by_content():
+    engine = ConditionEngine()
+    a = {"operator": "AND", "rules": [{"field": "x", "operator": "==", "value": 1}]}
+    b = {"rules": [{"value": 1, "operator": "==", "field": "x"}], "operator": "AND"}
+
+    compiled = engine.compile(a)
+    assert engine.compile(b) is compiled
+    assert condition_fingerprint({"v": Decimal("1")}) != condition_fingerprint({"v": "1"})
+
+    # Registering a provider drops plans that captured the previous providers
+    engine.register_provider("customer", TierProvider())
+    assert engine.compile(a) is not compiled
+
+
+def test_invalid_operators_fail_at_compile_time():
+    engine = ConditionEngine()
+    with pytest.raises(ValueError):
+        engine.compile({"operator": "OR", "rules": [
+            {"field": "x", "operator": "==", "value": 1},
+            {"field": "y", "operator": "~", "value": 1},
+        ]})
+    with pytest.raises(ValueError):
+        engine.compile({"operator": "XOR", "rules": [{"field": "x", "operator": "==", "value": 1}]})
@@ -0,0 +1,158 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from bfg.core.http import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PluginHTTPClient,
+    RetryPolicy,
+    close_http_sessions,
+    get_http_client,
+    http_client_stats,
+    reset_http_clients,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _respond(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.requests += 1
+            status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """Keep-alive HTTP server on 127.0.0.1; answers with queued statuses, then 200."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.statuses = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@pytest.fixture
+def server():
+    server = FakeAPIServer()
+    yield server
+    close_http_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    return PluginHTTPClient("test", retry_policy=RetryPolicy(attempts=3, backoff=0.01), failure_threshold=3,
+                            reset_timeout=0.2)
+
+
+def _unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_requests_reuse_one_keep_alive_connection(server, client):
+    for _ in range(5):
+        assert client.request("GET", f"{server.url}/ping").status_code == 200
+
+    assert server.requests == 5
+    assert server.connections == 1
+    stats = client.stats.snapshot()
+    assert stats["requests"] == 5 and stats["errors"] == 0
+    assert stats["p50_ms"] > 0
+
+
+def test_idempotent_calls_are_retried_on_retryable_status(server, client):
+    server.statuses = [503, 502]
+
+    assert client.request("GET", f"{server.url}/ping").status_code == 200
+    assert server.requests == 3
+    assert client.stats.retries == 2
+
+
+def test_non_idempotent_calls_are_not_retried_once_sent(server, client):
+    server.statuses = [503]
+    assert client.request("POST", f"{server.url}/orders").status_code == 503
+
+    server.statuses = [503]
+    assert client.request("POST", f"{server.url}/rates", idempotent=True).status_code == 200
+    assert server.requests == 3
+
+
+def test_connection_refused_is_retried_for_any_method(client):
+    url = f"http://127.0.0.1:{_unused_port()}/orders"
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.request("POST", url)
+    assert client.stats.requests == 3
+
+
+def test_circuit_opens_after_consecutive_failures_and_recovers(server):
+    client = PluginHTTPClient("test", retry_policy=RetryPolicy(attempts=1), failure_threshold=2, reset_timeout=0.2)
+    server.statuses = [500, 500]
+    url = f"{server.url}/ping"
+
+    assert client.request("GET", url).status_code == 500
+    assert client.request("GET", url).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.request("GET", url)
+    assert server.requests == 2
+    assert client.breaker(url).state == CircuitBreaker.OPEN
+
+    time.sleep(0.25)
+    assert client.breaker(url).state == CircuitBreaker.HALF_OPEN
+    assert client.request("GET", url).status_code == 200
+    assert client.breaker(url).state == CircuitBreaker.CLOSED
+    assert client.stats.rejected == 1
+
+
+def test_half_open_circuit_allows_one_trial_call():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_http_client_stats_lists_clients_and_circuits(server):
+    reset_http_clients()
+    try:
+        get_http_client("carrier:fake").request("GET", f"{server.url}/ping")
+
+        stats = http_client_stats()
+        assert stats["carrier:fake"]["requests"] == 1
+        assert stats["carrier:fake"]["circuits"] == {server.url: CircuitBreaker.CLOSED}
+    finally:
+        reset_http_clients()
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from bfg.core.models import NumberSequence
+from bfg.core import numbering
+from bfg.core.numbering import NumberAllocator, next_number_after
+
+
+@pytest.mark.django_db
+def test_numbers_come_from_memory_once_a_block_is_reserved(django_capture_on_commit_callbacks):
+    allocator = NumberAllocator(block_size=10)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert allocator.allocate("ORD-") == 1
+
+    with CaptureQueriesContext(connection) as ctx:
+        numbers = [allocator.allocate("ORD-") for _ in range(9)]
+
+    assert numbers == list(range(2, 11))
+    assert len(ctx.captured_queries) == 0
+    assert allocator.allocate("ORD-") == 11
+    assert NumberSequence.objects.get(scope=0, name="ORD-").next_value == 21
+
+
+@pytest.mark.django_db
+def test_sequences_are_scoped_and_seeded(django_capture_on_commit_callbacks):
+    NumberSequence.objects.create(name="INV-0041")
+    NumberSequence.objects.create(name="INV-0007")
+    NumberSequence.objects.create(name="INV-manual")
+    allocator = NumberAllocator(block_size=5)
+    seed = lambda: next_number_after(NumberSequence.objects.all(), "name", "INV-")  # noqa: E731
+
+    assert allocator.allocate("INV-", workspace_id=1, seed=seed) == 42
+    with django_capture_on_commit_callbacks(execute=True):
+        assert allocator.allocate("INV-", workspace_id=2) == 1
+    assert allocator.allocate_many("INV-", 3, workspace_id=2) == [2, 3, 4]
+
+
+@pytest.mark.django_db
+def test_block_reserved_in_a_rolled_back_transaction_is_not_cached():
+    allocator = NumberAllocator(block_size=10)
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            assert allocator.allocate("PAY-") == 1
+            raise RuntimeError("rollback")
+
+    # The sequence row was rewound, so the block must not be served from memory
+    assert allocator._pool == {}
+    assert allocator.allocate("PAY-") == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_blocks_are_reserved_outside_the_callers_transaction(monkeypatch):
+    monkeypatch.setattr(numbering, "_shares_writer_lock", lambda db: False)
+    allocator = NumberAllocator(block_size=10)
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            assert allocator.allocate("PAY-") == 1
+            raise RuntimeError("rollback")
+
+    # Committed by the worker thread's connection, so the row was not locked until our commit
+    assert NumberSequence.objects.get(scope=0, name="PAY-").next_value == 11
+    # The block survived the rollback, so its remainder is still served from memory
+    assert allocator.allocate("PAY-") == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_allocators_never_hand_out_the_same_number():
+    first, second = NumberAllocator(block_size=4), NumberAllocator(block_size=4)
+    numbers = []
+    for i in range(30):
+        numbers.append((first if i % 3 else second).allocate("CON-"))
+    numbers.extend(second.allocate_many("CON-", 7))
+
+    assert len(numbers) == len(set(numbers))
+
+    shared = NumberAllocator(block_size=500)
+    shared.allocate("MAN-")
+    results, lock = [], threading.Lock()
+
+    def worker():
+        values = [shared.allocate("MAN-") for _ in range(50)]
+        with lock:
+            results.extend(values)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == list(range(2, 402))
@@ -0,0 +1,172 @@
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from bfg.common.models import Workspace
+from bfg.delivery.models import PackageTemplate
+from bfg.delivery.services import cartonization
+from bfg.delivery.services.cartonization import (
+    BoxSpec,
+    CartonizationService,
+    PackItem,
+    candidate_fits,
+    clear_packing_cache,
+    pack_items,
+)
+
+SMALL = BoxSpec(20, 15, 10, tare_weight=0.1, max_weight=5, template_id=1, code="S", name="Small")
+MEDIUM = BoxSpec(30, 25, 20, tare_weight=0.2, max_weight=15, template_id=2, code="M", name="Medium")
+LARGE = BoxSpec(50, 40, 40, tare_weight=0.4, max_weight=25, template_id=3, code="L", name="Large")
+TUBE = BoxSpec(100, 10, 10, tare_weight=0.3, max_weight=10, template_id=4, code="T", name="Tube")
+BOXES = [SMALL, MEDIUM, LARGE, TUBE]
+
+
+@pytest.fixture(autouse=True)
+def _clear_packing_cache():
+    clear_packing_cache()
+    yield
+    clear_packing_cache()
+
+
+def _assert_contents_fit(packages, items):
+    """Every unit is packed once and no box holds more volume or weight than it allows."""
+    volume = {item.ref: item.length * item.width * item.height for item in items}
+    weight = {item.ref: item.weight for item in items}
+    packed = [ref for package in packages for ref in package.items]
+    assert sorted(packed) == sorted(item.ref for item in items for _ in range(item.quantity))
+    for package in packages:
+        if package.box is None:
+            continue
+        assert sum(volume[ref] for ref in package.items) <= package.box.volume + 1e-6
+        assert sum(weight[ref] for ref in package.items) + package.box.tare_weight == pytest.approx(package.weight)
+        assert package.weight <= package.box.max_weight + 1e-6
+
+
+def test_items_go_into_the_smallest_box_that_holds_them():
+    packages = pack_items([PackItem(10, 10, 10, weight=0.3, quantity=8, ref="cube")], [SMALL, MEDIUM, LARGE])
+
+    assert [p.box.code for p in packages] == ["M"]
+    assert packages[0].weight == pytest.approx(8 * 0.3 + 0.2)
+    assert packages[0].to_package_dict() == {
+        "weight": 2.6, "length": 30, "width": 25, "height": 20, "description": "Medium",
+    }
+
+
+def test_long_items_are_rotated_into_a_fitting_box():
+    packages = pack_items([PackItem(5, 90, 5, weight=0.5, quantity=2, ref="rod")], BOXES)
+
+    assert [p.box.code for p in packages] == ["T"]
+
+
+def test_weight_limit_opens_further_boxes():
+    items = [PackItem(10, 10, 10, weight=4, quantity=10, ref="brick")]
+    packages = pack_items(items, BOXES)
+
+    # 40 kg of bricks, 24.6 kg per large box
+    assert len(packages) == 2
+    _assert_contents_fit(packages, items)
+
+
+def test_units_that_fit_no_box_ship_on_their_own():
+    items = [PackItem(120, 10, 10, weight=2, quantity=2, ref="ladder"), PackItem(10, 10, 10, weight=1, ref="cube")]
+    packages = pack_items(items, BOXES)
+
+    oversize = [p for p in packages if p.box is None]
+    assert [(p.length, p.width, p.height, p.weight, p.items) for p in oversize] == [(120, 10, 10, 2, ("ladder",))] * 2
+    assert [p.box.code for p in packages if p.box] == ["S"]
+
+
+def test_few_hundred_units_pack_quickly_into_few_boxes():
+    items = [
+        PackItem(10, 10, 10, weight=0.3, quantity=120, ref="cube"),
+        PackItem(25, 12, 5, weight=0.8, quantity=60, ref="book"),
+        PackItem(90, 5, 5, weight=0.5, quantity=20, ref="rod"),
+        PackItem(6, 4, 3, weight=0.05, quantity=100, ref="card"),
+    ]
+    started = time.monotonic()
+    packages = pack_items(items, BOXES)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    _assert_contents_fit(packages, items)
+    # Optimal: rods fit only tubes (4 each), the remaining ~88 kg needs 4 large boxes
+    assert sorted(p.box.code for p in packages) == ["L"] * 4 + ["T"] * 5
+
+
+def test_packings_are_cached_per_cart_fingerprint(monkeypatch):
+    items = [PackItem(10, 10, 10, weight=0.3, quantity=8, ref="cube"), PackItem(20, 5, 5, weight=0.1, ref="pen")]
+    first = pack_items(items, BOXES)
+
+    monkeypatch.setattr(cartonization, "_pack", lambda *_: pytest.fail("packed again"))
+    reordered = [PackItem(5, 20, 5, weight=0.1, ref="pen"), PackItem(10, 10, 10, weight=0.3, quantity=8, ref="cube")]
+    assert pack_items(reordered, BOXES) == first
+
+
+def test_candidate_fits_numpy_and_python_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    kinds = [PackItem(10, 10, 10, weight=1), PackItem(90, 5, 5, weight=0.5), PackItem(10, 10, 10, weight=12)]
+    vectorized = candidate_fits(kinds, BOXES)
+    monkeypatch.setattr(cartonization, "np", None)
+    assert candidate_fits(kinds, BOXES) == vectorized
+
+
+def test_candidate_fits_checks_sorted_dimensions_and_capacity():
+    kinds = [PackItem(10, 10, 10, weight=1), PackItem(5, 90, 5, weight=0.5), PackItem(10, 10, 10, weight=12)]
+
+    assert candidate_fits(kinds, BOXES) == [
+        [True, True, True, True],
+        [False, False, False, True],
+        [False, True, True, False],
+    ]
+
+
+@pytest.mark.django_db
+def test_service_packs_cart_lines_into_workspace_templates():
+    workspace = Workspace.objects.create(name="Boxes", slug="boxes")
+    PackageTemplate.objects.create(
+        workspace=workspace, code="M", name="Medium", length=Decimal("30"), width=Decimal("25"),
+        height=Decimal("20"), tare_weight=Decimal("0.2"), max_weight=Decimal("15"),
+    )
+    PackageTemplate.objects.create(
+        workspace=workspace, code="X", name="Retired", length=Decimal("60"), width=Decimal("60"),
+        height=Decimal("60"), is_active=False,
+    )
+
+    def line(quantity, weight, dims=None, requires_shipping=True, variant=None):
+        length, width, height = dims or (None, None, None)
+        product = SimpleNamespace(
+            weight=Decimal(weight), length=length, width=width, height=height, requires_shipping=requires_shipping,
+        )
+        return SimpleNamespace(product=product, product_id=id(product), variant=variant, variant_id=None,
+                               quantity=quantity)
+
+    lines = [
+        line(4, "0.5", (Decimal("10"), Decimal("10"), Decimal("10"))),
+        line(2, "0.25"),
+        line(1, "0", (Decimal("1"), Decimal("1"), Decimal("1")), requires_shipping=False),
+    ]
+    service = CartonizationService(workspace=workspace, user=None)
+
+    assert service.packages_for_lines(lines) == [
+        {"weight": 2.7, "length": 30.0, "width": 25.0, "height": 20.0, "description": "Medium"},
+    ]
+    # 30x25x20 / 5000 = 3.0 kg volumetric against 2.7 kg actual
+    assert service.billing_weight(lines, 5000) == Decimal("3.00")
+
+
+def test_loose_weight_stays_within_box_weight_limits():
+    def line(quantity, weight, dims=(None, None, None)):
+        product = SimpleNamespace(weight=Decimal(weight), length=dims[0], width=dims[1], height=dims[2],
+                                  requires_shipping=True)
+        return SimpleNamespace(product=product, product_id=id(product), variant=None, variant_id=None,
+                               quantity=quantity)
+
+    box = BoxSpec(30, 25, 20, tare_weight=0.2, max_weight=6, code="M")
+    lines = [line(4, "0.5", (Decimal("10"), Decimal("10"), Decimal("10"))), line(2, "3")]
+
+    packages = CartonizationService(workspace=None, user=None).pack_lines(lines, boxes=[box])
+
+    # The 2.2 kg box takes one 3 kg unit within its 6 kg limit; the other ships without a box
+    assert [(p.box and p.box.code, p.weight) for p in packages] == [("M", pytest.approx(5.2)), (None, 3.0)]
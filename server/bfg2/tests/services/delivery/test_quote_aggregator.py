@@ -0,0 +1,229 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.core.cache import cache
+
+from bfg.common.models import Workspace
+from bfg.delivery.carriers import CarrierLoader, get_carrier_plugin
+from bfg.delivery.carriers.parcelport.plugin import ParcelPortCarrier
+from bfg.delivery.carriers.starshipit.plugin import StarshipitCarrier
+from bfg.delivery.models import Carrier
+from bfg.delivery.services.quote_aggregator import QuoteAggregator, quote_fingerprint
+
+
+class _CarrierHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/token":
+            with server.lock:
+                server.token_requests += 1
+            body = {"access_token": "token", "client_id": "client", "expires_in": 1799}
+        else:
+            with server.lock:
+                server.quote_requests += 1
+            time.sleep(server.delay)
+            body = server.quote_body
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeCarrierServer(ThreadingHTTPServer):
+    """Local carrier API on 127.0.0.1 answering quote requests after `delay` seconds."""
+    daemon_threads = True
+
+    def __init__(self, quote_body, delay=0.0):
+        super().__init__(("127.0.0.1", 0), _CarrierHandler)
+        self.quote_body = quote_body
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.quote_requests = 0
+        self.token_requests = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+PARCELPORT_QUOTES = {
+    "quoteRequestID": "q1",
+    "quotes": [{"quoteType": {}, "quoteDetails": [{"quote": {
+        "carrier_method_code": "OVN", "carrier_method_name": "Overnight", "carrier_name": "PBT",
+        "packageDetails": {"total_price": 12.5},
+    }}]}],
+}
+STARSHIPIT_RATES = {"rates": [{"service_code": "STD", "service_name": "Standard", "price": 9.0}]}
+
+SENDER = {"name": "Shop", "line1": "1 Queen St", "city": "Auckland", "postal_code": "1010", "country": "NZ"}
+RECIPIENT = {"name": "Ann", "line1": "2 Main Rd", "city": "Wellington", "postal_code": "6011", "country": "NZ"}
+PACKAGES = [
+    {"weight": 1.2, "length": 30, "width": 20, "height": 10},
+    {"weight": 0.5, "length": 10, "width": 10, "height": 10},
+]
+
+
+@pytest.fixture(autouse=True)
+def _clear_quote_cache():
+    cache.clear()
+    CarrierLoader.clear_plugin_cache()
+    yield
+    cache.clear()
+    CarrierLoader.clear_plugin_cache()
+
+
+@pytest.fixture
+def carriers(db, monkeypatch):
+    """A ParcelPort and a Starshipit carrier, each backed by its own local fake API."""
+    parcelport = FakeCarrierServer(PARCELPORT_QUOTES)
+    starshipit = FakeCarrierServer(STARSHIPIT_RATES)
+    monkeypatch.setattr(ParcelPortCarrier, "LIVE_URL", parcelport.url)
+    monkeypatch.setattr(StarshipitCarrier, "API_BASE_URL", starshipit.url)
+    workspace = Workspace.objects.create(name="Quotes", slug="quotes")
+    pp = Carrier.objects.create(
+        workspace=workspace, name="ParcelPort", code="PP", carrier_type="parcelport",
+        config={"username": "u", "password": "p"},
+    )
+    ssi = Carrier.objects.create(
+        workspace=workspace, name="Starshipit", code="SSI", carrier_type="starshipit",
+        config={"api_key": "k", "subscription_key": "s"},
+    )
+    yield {"parcelport": (pp, parcelport), "starshipit": (ssi, starshipit)}
+    parcelport.stop()
+    starshipit.stop()
+
+
+def test_quote_fingerprint_ignores_names_streets_and_package_order():
+    moved = dict(RECIPIENT, name="Bob", line1="9 Other St", postal_code="60 11")
+    rotated = [
+        {"weight": 0.5, "length": 10, "width": 10, "height": 10, "description": "Small"},
+        {"weight": 1.2, "length": 10, "width": 30, "height": 20},
+    ]
+    assert quote_fingerprint(SENDER, moved, rotated) == quote_fingerprint(SENDER, RECIPIENT, PACKAGES)
+    assert quote_fingerprint(SENDER, dict(RECIPIENT, postal_code="6012"), PACKAGES) != \
+        quote_fingerprint(SENDER, RECIPIENT, PACKAGES)
+    heavier = [dict(PACKAGES[0], weight=1.3), PACKAGES[1]]
+    assert quote_fingerprint(SENDER, RECIPIENT, heavier) != quote_fingerprint(SENDER, RECIPIENT, PACKAGES)
+
+
+def test_carriers_are_quoted_in_parallel(carriers):
+    pp, pp_server = carriers["parcelport"]
+    ssi, ssi_server = carriers["starshipit"]
+    pp_server.delay = ssi_server.delay = 0.4
+
+    started = time.monotonic()
+    results = QuoteAggregator(timeout=5).get_quotes([pp, ssi], SENDER, RECIPIENT, PACKAGES)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.75
+    assert [r.carrier for r in results] == [pp, ssi]
+    assert results[0].options == [{
+        "service_code": "OVN", "service_name": "Overnight", "price": "12.5", "currency": "NZD",
+        "estimated_days_min": 1, "estimated_days_max": 7, "carrier_name": "PBT",
+    }]
+    assert [o["service_code"] for o in results[1].options] == ["STD"]
+    assert not any(r.error or r.timed_out or r.cached for r in results)
+
+
+def test_slow_carrier_times_out_and_its_late_answer_is_cached(carriers):
+    pp, _ = carriers["parcelport"]
+    ssi, ssi_server = carriers["starshipit"]
+    ssi_server.delay = 0.6
+
+    results = QuoteAggregator(timeout=0.2).get_quotes([pp, ssi], SENDER, RECIPIENT, PACKAGES)
+
+    assert results[0].options and not results[0].timed_out
+    assert results[1].timed_out and results[1].options == []
+
+    time.sleep(0.8)
+    results = QuoteAggregator(timeout=0.2).get_quotes([pp, ssi], SENDER, RECIPIENT, PACKAGES)
+    assert all(r.cached for r in results)
+    assert [o["service_code"] for o in results[1].options] == ["STD"]
+    assert ssi_server.quote_requests == 1
+
+
+def test_quotes_are_cached_per_shipment(carriers):
+    pp, pp_server = carriers["parcelport"]
+    aggregator = QuoteAggregator(timeout=5)
+
+    aggregator.get_quotes([pp], SENDER, RECIPIENT, PACKAGES)
+    same = aggregator.get_quotes([pp], SENDER, dict(RECIPIENT, name="Bob"), PACKAGES[::-1])
+    other = aggregator.get_quotes([pp], SENDER, dict(RECIPIENT, postal_code="6012"), PACKAGES)
+
+    assert same[0].cached and not other[0].cached
+    assert pp_server.quote_requests == 2
+
+
+def test_identical_in_flight_requests_are_coalesced(carriers):
+    pp, pp_server = carriers["parcelport"]
+    pp_server.delay = 0.3
+    results = []
+
+    def quote():
+        results.append(QuoteAggregator(timeout=5).get_quotes([pp], SENDER, RECIPIENT, PACKAGES)[0])
+
+    threads = [threading.Thread(target=quote) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pp_server.quote_requests == 1
+    assert len(results) == 4
+    assert all(r.options and not r.error for r in results)
+
+
+def test_plugin_instances_are_reused_per_config_version(carriers):
+    pp, pp_server = carriers["parcelport"]
+    first = get_carrier_plugin(pp)
+
+    assert get_carrier_plugin(pp) is first
+    first.get_shipping_options(SENDER, RECIPIENT, PACKAGES)
+    get_carrier_plugin(pp).get_shipping_options(SENDER, RECIPIENT, PACKAGES)
+    assert pp_server.token_requests == 1
+    assert first.http_stats()["requests"] >= 3
+
+    pp.config = {"username": "u2", "password": "p"}
+    pp.save()
+    assert get_carrier_plugin(pp) is not first
+
+
+def test_cached_plugins_bind_each_lookups_carrier_per_thread(carriers):
+    pp, _ = carriers["parcelport"]
+    plugin = get_carrier_plugin(pp)
+    reloaded = Carrier.objects.get(pk=pp.pk)
+
+    assert get_carrier_plugin(reloaded) is plugin and plugin.carrier is reloaded
+
+    other, seen = Carrier.objects.get(pk=pp.pk), []
+    thread = threading.Thread(target=lambda: seen.append(get_carrier_plugin(other).carrier))
+    thread.start()
+    thread.join()
+
+    # Another request's thread binds its own instance without replacing this thread's
+    assert len(seen) == 1 and seen[0] is other and plugin.carrier is reloaded
+
+
+def test_carrier_error_is_reported_with_partial_results(carriers):
+    pp, pp_server = carriers["parcelport"]
+    ssi, _ = carriers["starshipit"]
+    pp_server.stop()
+
+    results = QuoteAggregator(timeout=5).get_quotes([pp, ssi], SENDER, RECIPIENT, PACKAGES)
+
+    assert results[0].error and not results[0].timed_out
+    assert results[1].options
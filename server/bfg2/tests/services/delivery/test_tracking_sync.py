@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bfg.common.models import Address, Workspace
+from bfg.delivery import carriers as carriers_module
+from bfg.delivery.carriers.base import TrackingEventData, TrackingResult
+from bfg.delivery.models import Carrier, Consignment, FreightService, FreightState, FreightStatus, TrackingEvent
+from bfg.delivery.services import TrackingSyncService, due_for_tracking
+from bfg.delivery.tasks import TRACKING_SYNC_LOCK_KEY, sync_consignment_tracking
+
+
+class FakeTrackingPlugin:
+    """Answers every tracking number with two events; numbers in `delivered` are delivered."""
+    supports_tracking = True
+    tracking_batch_size = 10
+
+    def __init__(self):
+        self.batches = []
+        self.delivered = set()
+
+    def get_tracking_many(self, tracking_numbers):
+        self.batches.append(list(tracking_numbers))
+        return {
+            number: TrackingResult(
+                success=True,
+                tracking_number=number,
+                events=[
+                    TrackingEventData("2026-03-01T09:00:00", "picked_up", "Picked up", "Auckland"),
+                    TrackingEventData("2026-03-02T15:30:00", "in_transit", "In transit", "Hamilton"),
+                ],
+                is_delivered=number in self.delivered,
+            )
+            for number in tracking_numbers
+        }
+
+
+@pytest.fixture
+def plugin(monkeypatch):
+    plugin = FakeTrackingPlugin()
+    monkeypatch.setattr(carriers_module, "get_carrier_plugin", lambda carrier: plugin)
+    return plugin
+
+
+@pytest.fixture
+def shipment(db):
+    workspace = Workspace.objects.create(name="Tracking", slug="tracking")
+    carrier = Carrier.objects.create(workspace=workspace, name="Fake", code="FAKE")
+    service = FreightService.objects.create(
+        workspace=workspace, carrier=carrier, name="Standard", code="STD", base_price=Decimal("5.00"),
+    )
+    address = Address.objects.create(
+        workspace=workspace, full_name="A", phone="0", address_line1="-", city="-", postal_code="-", country="NZ",
+    )
+    shipped = FreightStatus.objects.create(
+        workspace=workspace, code="shipped", name="Shipped", type="consignment", state=FreightState.SHIPPED.value,
+    )
+    delivered = FreightStatus.objects.create(
+        workspace=workspace, code="delivered", name="Delivered", type="consignment", state=FreightState.DELIVERED.value,
+    )
+
+    def create(count, state=FreightState.SHIPPED.value, **fields):
+        start = Consignment.objects.count()
+        Consignment.objects.bulk_create([
+            Consignment(**{
+                "workspace": workspace, "consignment_number": f"C{start + i}", "tracking_number": f"T{start + i}",
+                "service": service, "sender_address": address, "recipient_address": address,
+                "state": state, "status": shipped, **fields,
+            })
+            for i in range(count)
+        ])
+        return list(Consignment.objects.filter(workspace=workspace).order_by("-id")[:count])[::-1]
+
+    return {"workspace": workspace, "create": create, "delivered": delivered}
+
+
+def test_sync_due_stores_new_events_and_delivered_states_in_bulk(shipment, plugin, django_capture_on_commit_callbacks):
+    consignments = shipment["create"](25)
+    first = consignments[0]
+    TrackingEvent.objects.create(
+        workspace=shipment["workspace"], target=first, event_type="picked_up", description="Picked up",
+        event_time=timezone.make_aware(datetime(2026, 3, 1, 9, 0)),
+    )
+    plugin.delivered = {first.tracking_number}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        stats = TrackingSyncService(workspace=None, user=None).sync_due()
+
+    assert stats == {"consignments": 25, "failed": 0, "events": 49, "delivered": 1}
+    assert [len(batch) for batch in plugin.batches] == [10, 10, 5]
+    assert TrackingEvent.objects.filter(object_id=first.id).count() == 2
+    first.refresh_from_db()
+    assert first.state == FreightState.DELIVERED.value
+    assert first.status == shipment["delivered"]
+    assert first.actual_delivery is not None
+    assert not Consignment.objects.filter(tracking_synced_at__isnull=True).exists()
+
+    # Nothing is due again until the state's interval has passed
+    assert TrackingSyncService(workspace=None, user=None).sync_due() == {}
+
+
+def test_sync_queries_do_not_grow_with_consignments(shipment, plugin):
+    def queries_for(count):
+        consignments = shipment["create"](count)
+        with CaptureQueriesContext(connection) as ctx:
+            TrackingSyncService(workspace=None, user=None).sync_consignments(consignments)
+        return len(ctx.captured_queries)
+
+    assert queries_for(40) == queries_for(4)
+
+
+def test_due_for_tracking_uses_state_intervals_and_age(shipment):
+    now = timezone.now()
+    create = shipment["create"]
+    never = create(1)[0]
+    stale = create(1, tracking_synced_at=now - timedelta(hours=2))[0]
+    create(1, tracking_synced_at=now - timedelta(minutes=10))
+    ready_recent = create(1, state=FreightState.READY.value, tracking_synced_at=now - timedelta(hours=2))[0]
+    create(1, state=FreightState.DELIVERED.value)
+    create(1, created_at=now - timedelta(days=90))
+    create(1, tracking_number="")
+
+    due = list(due_for_tracking(now))
+
+    assert due == [never, stale]
+    assert ready_recent not in due
+    assert ready_recent in due_for_tracking(now + timedelta(hours=5))
+
+
+def test_sync_task_skips_while_another_run_holds_the_lock(shipment, plugin):
+    shipment["create"](3)
+    cache.add(TRACKING_SYNC_LOCK_KEY, 1, 60)
+    try:
+        assert sync_consignment_tracking() is None
+        assert plugin.batches == []
+    finally:
+        cache.delete(TRACKING_SYNC_LOCK_KEY)
+
+    assert sync_consignment_tracking()["consignments"] == 3
@@ -1,26 +1,45 @@
-from types import SimpleNamespace
+from datetime import date
+from decimal import Decimal
 
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.models import Customer, User, Workspace
+from bfg.core.numbering import number_allocator
+from bfg.finance.models import Currency, Invoice
 from bfg.finance.services.invoice_service import InvoiceService
 
 
-def test_generate_invoice_number_increments_last_sequence(monkeypatch):
-    service = InvoiceService(workspace=SimpleNamespace(id=1), user=None)
-    last_invoice = SimpleNamespace(invoice_number="INV-0009")
-    
-    class _FilterResult:
-        def __init__(self, kwargs):
-            self.kwargs = kwargs
+@pytest.fixture(autouse=True)
+def _clear_numbers():
+    number_allocator.clear()
+    yield
+    number_allocator.clear()
+
 
-        def order_by(self, *_args):
-            return SimpleNamespace(first=lambda: last_invoice)
+def _invoice(workspace, customer, currency, number):
+    return Invoice.objects.create(
+        workspace=workspace, customer=customer, currency=currency, invoice_number=number,
+        subtotal=Decimal("10"), total=Decimal("10"), issue_date=date.today(), due_date=date.today(),
+    )
 
-        def exists(self):
-            return False
 
-    monkeypatch.setattr(
-        "bfg.finance.services.invoice_service.Invoice.objects",
-        SimpleNamespace(filter=lambda **kwargs: _FilterResult(kwargs)),
+@pytest.mark.django_db
+def test_generate_invoice_number_continues_existing_numbers(django_capture_on_commit_callbacks):
+    workspace = Workspace.objects.create(name="Store", slug="store", is_active=True)
+    other = Workspace.objects.create(name="Other", slug="other", is_active=True)
+    customer = Customer.objects.create(
+        workspace=workspace, user=User.objects.create_user(username="buyer", password="x")
     )
+    currency = Currency.objects.create(code="NZD", name="NZ Dollar", symbol="$")
+    _invoice(workspace, customer, currency, "INV-0009")
+    _invoice(workspace, customer, currency, "INV-0011")  # typed in by hand
 
-    number = service._generate_invoice_number()
-    assert number == "INV-0010"
+    service = InvoiceService(workspace=workspace, user=None)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert service._generate_invoice_number() == "INV-0012"
+    with CaptureQueriesContext(connection) as ctx:
+        assert service._generate_invoice_number() == "INV-0013"
+    assert len(ctx.captured_queries) == 0
+    assert InvoiceService(workspace=other, user=None)._generate_invoice_number() == "INV-0001"
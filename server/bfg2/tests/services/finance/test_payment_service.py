@@ -1,25 +1,16 @@
-from types import SimpleNamespace
+import pytest
+from django.utils import timezone
 
+from bfg.core.numbering import number_allocator
 from bfg.finance.services.payment_service import PaymentService
 
 
-def test_generate_payment_number_retries_until_unique(monkeypatch):
+@pytest.mark.django_db
+def test_generate_payment_number_is_sequential_per_day(django_capture_on_commit_callbacks):
+    number_allocator.clear()
     service = PaymentService(workspace=None, user=None)
-    seq = iter(["11111", "22222"])
-    monkeypatch.setattr("random.choices", lambda *_a, **_k: list(next(seq)))
+    prefix = f"PAY-{timezone.now().strftime('%Y%m%d')}-"
 
-    class _Exists:
-        def __init__(self):
-            self.calls = 0
-
-        def exists(self):
-            self.calls += 1
-            return self.calls == 1
-
-    exists = _Exists()
-    monkeypatch.setattr(
-        "bfg.finance.services.payment_service.Payment.objects",
-        SimpleNamespace(filter=lambda **_kwargs: exists),
-    )
-    number = service._generate_payment_number()
-    assert number.startswith("PAY-")
+    with django_capture_on_commit_callbacks(execute=True):
+        assert service._generate_payment_number() == f"{prefix}00001"
+    assert service._generate_payment_number() == f"{prefix}00002"
@@ -0,0 +1,91 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.models import Workspace
+from bfg.finance.models import TaxRate
+from bfg.finance.services import TaxService
+from bfg.finance.services.invoice_service import InvoiceService
+from bfg.finance.services.tax_rate_resolver import get_tax_rate_table, tax_rate_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    tax_rate_cache.clear_local()
+    yield
+    cache.clear()
+    tax_rate_cache.clear_local()
+
+
+@pytest.fixture
+def workspace(db):
+    return Workspace.objects.create(name="Tax", slug="tax", is_active=True)
+
+
+def _rate(workspace, name, rate, country="", state="", **kwargs):
+    return TaxRate.objects.create(
+        workspace=workspace, name=name, rate=Decimal(rate), country=country, state=state, **kwargs
+    )
+
+
+@pytest.mark.django_db
+def test_table_precedence_and_fallbacks(workspace):
+    _rate(workspace, "Default", "5")
+    _rate(workspace, "NZ", "15", country="NZ")
+    _rate(workspace, "US-CA", "7.25", country="US", state="CA")
+    _rate(workspace, "Old", "99", country="AU", is_active=False)
+
+    table = get_tax_rate_table(workspace.id)
+
+    assert table.get("US", "CA").name == "US-CA"
+    assert table.get("NZ", "AUK").name == "NZ"
+    assert table.get("US", "NY").name == "Default"
+    assert table.get("AU").name == "Default"
+    assert table.get(None).name == "Default"
+    assert table.get("US", "NY", default=False) is None
+
+    service = TaxService(workspace=workspace, user=None)
+    assert service.get_applicable_tax_rate("US", "CA").name == "US-CA"
+    assert service.calculate_tax(Decimal("100.00"), "NZ", "AUK") == Decimal("15.00")
+    assert service.calculate_tax(Decimal("100.00"), "AU") == Decimal("0")
+
+
+@pytest.mark.django_db
+def test_invoice_tax_falls_back_to_any_rate_of_the_country(workspace):
+    _rate(workspace, "US-CA", "7.25", country="US", state="CA")
+    _rate(workspace, "US-NY", "8", country="US", state="NY")
+    service = InvoiceService(workspace=workspace, user=None)
+
+    # Only state rows: an address without (or with another) state still pays the country's first rate
+    assert service._calculate_tax(Decimal("100.00"), SimpleNamespace(country="US", state="")) == Decimal("7.25")
+    assert service._calculate_tax(Decimal("100.00"), SimpleNamespace(country="US", state="TX")) == Decimal("7.25")
+    assert service._calculate_tax(Decimal("100.00"), SimpleNamespace(country="US", state="NY")) == Decimal("8.00")
+    assert service._calculate_tax(Decimal("100.00"), SimpleNamespace(country="NZ", state="")) == Decimal("0")
+    assert get_tax_rate_table(workspace.id).get("US", "", default=False) is None
+
+
+@pytest.mark.django_db
+def test_table_is_cached_and_invalidated_on_change(workspace, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        nz = _rate(workspace, "NZ", "15", country="NZ")
+    service = TaxService(workspace=workspace, user=None)
+    service.get_applicable_tax_rate("NZ")
+
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(5):
+            assert service.get_applicable_tax_rate("NZ").rate == Decimal("15")
+    assert len(ctx.captured_queries) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        nz.rate = Decimal("12.5")
+        nz.save()
+    assert service.get_applicable_tax_rate("NZ").rate == Decimal("12.5")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        nz.delete()
+    assert service.get_applicable_tax_rate("NZ") is None
@@ -1,3 +1,11 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+
+import pytest
+
+from bfg.common.models import Customer, User, UserPreferences, Workspace
+from bfg.inbox.models import MessageRecipient, MessageTemplate
+from bfg.inbox.services import template_cache
 from bfg.inbox.services.message_service import MessageService
 
 
@@ -5,3 +13,66 @@ def test_render_template_replaces_context():
     service = MessageService(workspace=None, user=None)
     rendered = service._render_template("Hello {{ name }}", {"name": "BFG"})
     assert rendered == "Hello BFG"
+
+
+def _template_row(**fields):
+    row = dict.fromkeys(template_cache.TEMPLATE_FIELDS, "")
+    row.update(workspace_id=1, code="order_created", language="en", updated_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+    row.update(fields)
+    return SimpleNamespace(**row)
+
+
+def test_compiled_template_cache_is_keyed_by_updated_at_and_bounded(monkeypatch):
+    template_cache.clear_template_cache()
+    monkeypatch.setattr(template_cache, "TEMPLATE_CACHE_SIZE", 2)
+    template = _template_row(app_message_title="Order {{ number }}")
+
+    compiled = template_cache.get_compiled_template(template)
+    assert template_cache.get_compiled_template(template) is compiled
+    assert compiled.render("app_message_title", {"number": 7}) == "Order 7"
+    assert compiled.render("sms_body", {}) == ""
+
+    edited = _template_row(app_message_title="Order #{{ number }}", updated_at=template.updated_at + timedelta(seconds=1))
+    assert template_cache.get_compiled_template(edited).render("app_message_title", {"number": 7}) == "Order #7"
+    template_cache.get_compiled_template(_template_row(code="order_shipped"))
+    # Least recently used (the first version) was evicted
+    assert template_cache.get_compiled_template(template) is not compiled
+    template_cache.clear_template_cache()
+
+
+@pytest.mark.django_db
+def test_send_from_template_many_renders_each_recipient(monkeypatch):
+    workspace = Workspace.objects.create(name="Inbox", slug="inbox", is_active=True)
+    MessageTemplate.objects.create(
+        workspace=workspace, name="Shipped", code="order_shipped", event="order.shipped", language="en",
+        app_message_enabled=True, app_message_title="Order {{ number }} shipped", app_message_body="Hi {{ name }}",
+        email_enabled=True, email_body="Tracking {{ tracking }}",
+    )
+    customers = []
+    for i, email_on in enumerate((True, False, True)):
+        user = User.objects.create_user(username=f"c{i}", email=f"c{i}@example.com", password="x")
+        prefs, _ = UserPreferences.objects.get_or_create(user=user)
+        prefs.email_notifications = email_on
+        prefs.save()
+        customers.append(Customer.objects.create(workspace=workspace, user=user))
+    sent = []
+    monkeypatch.setattr(MessageService, "_send_emails", lambda self, emails: sent.append(emails))
+
+    messages = MessageService(workspace=workspace, user=None).send_from_template_many(
+        customers,
+        "order_shipped",
+        [{"number": i, "name": f"c{i}", "tracking": f"T{i}"} for i in range(3)],
+    )
+
+    assert [(m.subject, m.message, m.send_email) for m in messages] == [
+        ("Order 0 shipped", "Hi c0", True), ("Order 1 shipped", "Hi c1", False), ("Order 2 shipped", "Hi c2", True),
+    ]
+    assert list(
+        MessageRecipient.objects.filter(message__in=messages).order_by("message_id").values_list("recipient_id", flat=True)
+    ) == [c.id for c in customers]
+    # One batch holding the emails of the recipients who accept them
+    assert len(sent) == 1
+    assert [(e.to_list, e.subject, e.body_plain) for e in sent[0]] == [
+        (["c0@example.com"], "Order 0 shipped", "Tracking T0"),
+        (["c2@example.com"], "Order 2 shipped", "Tracking T2"),
+    ]
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bfg.common.models import Workspace
+from bfg.marketing.models import DiscountRule
+from bfg.marketing.services.discount_rule_index import get_discount_rule_index
+from bfg.marketing.services.discount_service import DiscountCalculationService
+from bfg.shop.models import OrderItem, Product, ProductCategory
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def workspace(db):
+    return Workspace.objects.create(name="Store", slug="store", is_active=True)
+
+
+@pytest.fixture
+def catalog(workspace):
+    shoes = ProductCategory.objects.create(workspace=workspace, name="Shoes", slug="shoes", language="en")
+    boot = Product.objects.create(
+        workspace=workspace, name="Boot", slug="boot", sku="B-1", price=Decimal("80.00"), language="en"
+    )
+    boot.categories.add(shoes)
+    sock = Product.objects.create(
+        workspace=workspace, name="Sock", slug="sock", sku="S-1", price=Decimal("20.00"), language="en"
+    )
+    return {"shoes": shoes, "boot": boot, "sock": sock}
+
+
+def _items(catalog):
+    return [
+        OrderItem(product=catalog["boot"], quantity=1, price=Decimal("80.00"), subtotal=Decimal("80.00")),
+        OrderItem(product=catalog["sock"], quantity=1, price=Decimal("20.00"), subtotal=Decimal("20.00")),
+    ]
+
+
+def _rule(workspace, name, **kwargs):
+    defaults = {"discount_type": "percentage", "discount_value": Decimal("10"), "apply_to": "order"}
+    defaults.update(kwargs)
+    return DiscountRule.objects.create(workspace=workspace, name=name, **defaults)
+
+
+@pytest.mark.django_db
+def test_auto_discount_query_count_does_not_grow_with_rules(workspace, catalog, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        for i in range(10):
+            _rule(workspace, f"Order {i}", discount_value=Decimal(i))
+        product_rule = _rule(workspace, "Boots 25%", apply_to="products", discount_value=Decimal("25"))
+        product_rule.products.add(catalog["boot"])
+        category_rule = _rule(workspace, "Shoes 30%", apply_to="categories", discount_value=Decimal("30"))
+        category_rule.categories.add(catalog["shoes"])
+    service = DiscountCalculationService(workspace=workspace, user=None)
+
+    result = service._calculate_auto_discount(order_items=_items(catalog), subtotal=Decimal("100.00"))
+    assert result["discount"] == Decimal("24.00")  # 30% of the 80.00 boot
+
+    # Warm index: only the cache lookups and one product-category query
+    with CaptureQueriesContext(connection) as ctx:
+        service._calculate_auto_discount(order_items=_items(catalog), subtotal=Decimal("100.00"))
+    assert len(ctx.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_index_invalidated_on_rule_and_scope_change(workspace, catalog, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        rule = _rule(workspace, "Socks", apply_to="products", discount_type="fixed_amount", discount_value=Decimal("5"))
+    assert get_discount_rule_index(workspace.id)[0].product_ids == frozenset()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rule.products.add(catalog["sock"])
+    assert get_discount_rule_index(workspace.id)[0].product_ids == {catalog["sock"].id}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rule.is_active = False
+        rule.save()
+    assert get_discount_rule_index(workspace.id) == ()
+
+
+@pytest.mark.django_db
+def test_auto_discount_skips_rules_outside_validity_window(workspace, catalog, django_capture_on_commit_callbacks):
+    now = timezone.now()
+    with django_capture_on_commit_callbacks(execute=True):
+        _rule(workspace, "Expired", discount_value=Decimal("50"), valid_until=now - timedelta(days=1))
+        _rule(workspace, "Upcoming", discount_value=Decimal("40"), valid_from=now + timedelta(days=1))
+        _rule(workspace, "Current", discount_value=Decimal("10"), valid_from=now - timedelta(days=1))
+    service = DiscountCalculationService(workspace=workspace, user=None)
+
+    result = service._calculate_auto_discount(order_items=_items(catalog), subtotal=Decimal("100.00"))
+
+    assert result["discount"] == Decimal("10.00")
@@ -3,6 +3,7 @@ from types import SimpleNamespace
 
 import pytest
 
+from bfg.marketing.services.discount_rule_index import IndexedDiscountRule
 from bfg.marketing.services.discount_service import DiscountCalculationService
 
 
@@ -67,6 +68,23 @@ def _make_discount_rule(
     )
 
 
+def _make_indexed_rule(
+    discount_type="percentage",
+    discount_value="10",
+    apply_to="order",
+    minimum_purchase=None,
+    maximum_discount=None,
+):
+    return IndexedDiscountRule(
+        id=1,
+        discount_type=discount_type,
+        discount_value=Decimal(discount_value),
+        apply_to=apply_to,
+        minimum_purchase=Decimal(str(minimum_purchase)) if minimum_purchase is not None else None,
+        maximum_discount=Decimal(str(maximum_discount)) if maximum_discount is not None else None,
+    )
+
+
 def _now_minus(days=0):
     from django.utils import timezone
     from datetime import timedelta
@@ -590,17 +608,12 @@ def test_calculate_gift_card_amount_invalid_code_returns_zero(monkeypatch):
 def test_calculate_auto_discount_matches_best_percentage_rule(monkeypatch):
     service = DiscountCalculationService(workspace=SimpleNamespace(id=1), user=None)
 
-    rule_low = _make_discount_rule(discount_type="percentage", discount_value="5", apply_to="order", minimum_purchase=None)
-    rule_high = _make_discount_rule(discount_type="percentage", discount_value="20", apply_to="order", minimum_purchase=None)
-
-    class _RuleObjects:
-        @staticmethod
-        def filter(**_kwargs):
-            return SimpleNamespace(order_by=lambda *_: [rule_low, rule_high])
+    rule_low = _make_indexed_rule(discount_type="percentage", discount_value="5", apply_to="order", minimum_purchase=None)
+    rule_high = _make_indexed_rule(discount_type="percentage", discount_value="20", apply_to="order", minimum_purchase=None)
 
     monkeypatch.setattr(
-        "bfg.marketing.services.discount_service.DiscountRule.objects",
-        _RuleObjects(),
+        "bfg.marketing.services.discount_service.get_discount_rule_index",
+        lambda _workspace_id: (rule_low, rule_high),
     )
 
     result = service._calculate_auto_discount(
@@ -615,16 +628,11 @@ def test_calculate_auto_discount_matches_best_percentage_rule(monkeypatch):
 def test_calculate_auto_discount_free_shipping_rule_applied(monkeypatch):
     service = DiscountCalculationService(workspace=SimpleNamespace(id=1), user=None)
 
-    rule = _make_discount_rule(discount_type="free_shipping", discount_value="0", apply_to="order", minimum_purchase=None)
-
-    class _RuleObjects:
-        @staticmethod
-        def filter(**_kwargs):
-            return SimpleNamespace(order_by=lambda *_: [rule])
+    rule = _make_indexed_rule(discount_type="free_shipping", discount_value="0", apply_to="order", minimum_purchase=None)
 
     monkeypatch.setattr(
-        "bfg.marketing.services.discount_service.DiscountRule.objects",
-        _RuleObjects(),
+        "bfg.marketing.services.discount_service.get_discount_rule_index",
+        lambda _workspace_id: (rule,),
     )
 
     result = service._calculate_auto_discount(
@@ -639,16 +647,11 @@ def test_calculate_auto_discount_minimum_purchase_filter(monkeypatch):
     service = DiscountCalculationService(workspace=SimpleNamespace(id=1), user=None)
 
     # Rule requires min purchase 200 but subtotal is 50
-    rule = _make_discount_rule(discount_type="percentage", discount_value="20", apply_to="order", minimum_purchase="200")
-
-    class _RuleObjects:
-        @staticmethod
-        def filter(**_kwargs):
-            return SimpleNamespace(order_by=lambda *_: [rule])
+    rule = _make_indexed_rule(discount_type="percentage", discount_value="20", apply_to="order", minimum_purchase="200")
 
     monkeypatch.setattr(
-        "bfg.marketing.services.discount_service.DiscountRule.objects",
-        _RuleObjects(),
+        "bfg.marketing.services.discount_service.get_discount_rule_index",
+        lambda _workspace_id: (rule,),
     )
 
     result = service._calculate_auto_discount(
@@ -1,6 +1,18 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 from types import SimpleNamespace
 
-from bfg.shop.services.batch_service import is_batch_management_enabled
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.models import Address, Customer, StaffMember, StaffRole, User, Workspace
+from bfg.delivery.models import Warehouse
+from bfg.shop.exceptions import InsufficientStock
+from bfg.shop.models import BatchMovement, Order, Product, ProductBatch, ProductVariant, Store
+from bfg.shop.services.batch_service import BatchService, ExpiryNotificationService, is_batch_management_enabled
 
 
 def test_is_batch_management_enabled_by_workspace_flag(monkeypatch):
@@ -16,3 +28,94 @@ def test_is_batch_management_enabled_by_global_setting(monkeypatch):
         raising=False,
     )
     assert is_batch_management_enabled(None) is True
+
+
+# ---------------------------------------------------------------------------
+# Bulk operations (database)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def batch_setup(db):
+    workspace = Workspace.objects.create(
+        name="Pharmacy", slug="pharmacy", is_active=True, settings={"features": {"batch_management": True}}
+    )
+    warehouse = Warehouse.objects.create(
+        workspace=workspace, name="Main", code="MAIN", address_line1="-", city="-", postal_code="-", country="NZ",
+    )
+    product = Product.objects.create(
+        workspace=workspace, name="Aspirin", slug="aspirin", sku="ASP", price=Decimal("5.00"), language="en",
+    )
+    variant = ProductVariant.objects.create(product=product, sku="ASP-100", name="100 tablets")
+    user = User.objects.create_user(username="pharmacist", password="x")
+    customer = Customer.objects.create(workspace=workspace, user=user)
+    address = Address.objects.create(
+        workspace=workspace, full_name="Buyer", phone="1", address_line1="1 St", city="Auckland",
+        postal_code="1010", country="NZ",
+    )
+    order = Order.objects.create(
+        workspace=workspace, customer=customer, order_number="ORD-1", subtotal=Decimal("0"), total=Decimal("0"),
+        store=Store.objects.create(workspace=workspace, code="main", name="Main"),
+        shipping_address=address, billing_address=address,
+    )
+    return SimpleNamespace(workspace=workspace, warehouse=warehouse, variant=variant, user=user, order=order)
+
+
+def _batches(setup, count, expiry_days=365):
+    today = date.today()
+    return [
+        ProductBatch.objects.create(
+            workspace=setup.workspace, variant=setup.variant, warehouse=setup.warehouse,
+            batch_number=f"LOT-{expiry_days}-{i}", quantity=10, manufactured_date=today - timedelta(days=30),
+            expiry_date=today + timedelta(days=expiry_days + i),
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_reserve_batches_is_bulk_and_all_or_nothing(batch_setup):
+    service = BatchService(workspace=batch_setup.workspace)
+    batches = _batches(batch_setup, 20)
+    allocations = [(batch, 3) for batch in batches] + [(batches[0], 2)]
+
+    with CaptureQueriesContext(connection) as ctx:
+        service.reserve_batches(allocations, batch_setup.order)
+    assert len(ctx.captured_queries) <= 5  # savepoint, UPDATE per distinct quantity (2), INSERT, release
+    assert batches[0].reserved == 5
+    assert dict(ProductBatch.objects.values_list("pk", "reserved"))[batches[1].pk] == 3
+    assert BatchMovement.objects.filter(order=batch_setup.order).count() == 21
+
+    with pytest.raises(InsufficientStock):
+        service.reserve_batches([(batches[1], 1), (batches[0], 6)], batch_setup.order)
+    assert ProductBatch.objects.get(pk=batches[1].pk).reserved == 3
+
+
+@pytest.mark.django_db
+def test_expiry_warnings_list_first_batches_per_warehouse(batch_setup, monkeypatch):
+    role = StaffRole.objects.create(workspace=batch_setup.workspace, name="Staff", code="staff")
+    StaffMember.objects.create(workspace=batch_setup.workspace, user=batch_setup.user, role=role)
+    _batches(batch_setup, 12, expiry_days=3)
+    _batches(batch_setup, 3, expiry_days=90)
+    sent = []
+    monkeypatch.setattr(
+        "bfg.inbox.services.MessageService.send_message",
+        lambda self, recipients, subject, message, **kwargs: sent.append((recipients, message)),
+    )
+
+    assert ExpiryNotificationService(workspace=batch_setup.workspace).send_expiry_warnings(30) == 1
+    recipients, message = sent[0]
+    assert [customer.user for customer in recipients] == [batch_setup.user]
+    assert "12 batch(es) expiring within 30 days" in message
+    assert message.count("Batch LOT-3-") == 10
+
+
+@pytest.mark.slow
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_batch_operations_command():
+    out = StringIO()
+    call_command(
+        "benchmark_batch_operations", batches=300, variants=5, warehouses=2, reservations=50, seed=3, stdout=out,
+    )
+    output = out.getvalue()
+    assert "reserve_batches, bulk" in output
+    assert "send_expiry_warnings" in output
@@ -0,0 +1,117 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.models import Workspace
+from bfg.delivery.models import Carrier, FreightService
+from bfg.finance.models import TaxRate
+from bfg.finance.services.tax_rate_resolver import tax_rate_cache
+from bfg.marketing.models import DiscountRule
+from bfg.shop.models import Cart, CartItem, Product, ProductCategory, ProductVariant
+from bfg.shop.services.order_service import OrderService
+
+# Queries allowed for a warm preview, whatever the cart size
+QUERY_BUDGET = 8
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    tax_rate_cache.clear_local()
+    yield
+    cache.clear()
+    tax_rate_cache.clear_local()
+
+
+@pytest.fixture
+def setup(db, django_capture_on_commit_callbacks):
+    workspace = Workspace.objects.create(name="Store", slug="store", is_active=True)
+    shoes = ProductCategory.objects.create(workspace=workspace, name="Shoes", slug="shoes", language="en")
+    first_kg = Product.objects.create(
+        workspace=workspace, name="Freight first kg", slug="freight-first", sku="F-1",
+        price=Decimal("6.00"), language="en",
+    )
+    extra_kg = Product.objects.create(
+        workspace=workspace, name="Freight extra kg", slug="freight-extra", sku="F-2",
+        price=Decimal("2.00"), language="en",
+    )
+    carrier = Carrier.objects.create(workspace=workspace, name="Post", code="post")
+    freight = FreightService.objects.create(
+        workspace=workspace, carrier=carrier, name="Standard", code="standard", base_price=Decimal("0"),
+        config={
+            "mode": "step",
+            "rules": {
+                "first_weight": 1,
+                "first_price": {"product_id": first_kg.id},
+                "additional_weight": 1,
+                "additional_price": {"product_id": extra_kg.id},
+            },
+        },
+    )
+    TaxRate.objects.create(workspace=workspace, name="GST", rate=Decimal("15"), country="NZ")
+    with django_capture_on_commit_callbacks(execute=True):
+        rule = DiscountRule.objects.create(
+            workspace=workspace, name="Shoes 10%", discount_type="percentage",
+            discount_value=Decimal("10"), apply_to="categories",
+        )
+        rule.categories.add(shoes)
+        DiscountRule.objects.create(
+            workspace=workspace, name="Big orders", discount_type="fixed_amount",
+            discount_value=Decimal("5"), apply_to="order", minimum_purchase=Decimal("500"),
+        )
+    return SimpleNamespace(workspace=workspace, shoes=shoes, freight=freight)
+
+
+def _make_cart(setup, size):
+    cart = Cart.objects.create(workspace=setup.workspace, session_key=f"cart-{size}")
+    for i in range(size):
+        product = Product.objects.create(
+            workspace=setup.workspace, name=f"Shoe {size}-{i}", slug=f"shoe-{size}-{i}",
+            sku=f"S-{size}-{i}", price=Decimal("50.00"), weight=Decimal("1.00"), language="en",
+        )
+        product.categories.add(setup.shoes)
+        variant = ProductVariant.objects.create(
+            product=product, sku=f"S-{size}-{i}-L", name="Large", weight=Decimal("0.50"),
+        )
+        CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=2, price=Decimal("50.00"))
+    return cart
+
+
+@pytest.mark.django_db
+def test_price_cart_breakdown(setup):
+    service = OrderService(workspace=setup.workspace, user=None)
+    cart = _make_cart(setup, 3)
+
+    breakdown = service.price_cart(
+        cart, freight_service_id=setup.freight.id, shipping_address=SimpleNamespace(country="NZ", state="AUK")
+    )
+
+    assert breakdown.subtotal == Decimal("300.00")
+    assert breakdown.weight == Decimal("3.00")  # variant weight wins
+    assert breakdown.discount == Decimal("30.00")
+    assert breakdown.shipping_cost == Decimal("10.00")  # 6 + 2 * 2
+    assert breakdown.tax == Decimal("45.00")
+    assert breakdown.total == Decimal("325.00")
+    assert service.calculate_order_totals(
+        cart, freight_service_id=setup.freight.id, shipping_address=SimpleNamespace(country="NZ", state="AUK")
+    ) == breakdown.as_dict()
+
+
+@pytest.mark.django_db
+def test_price_cart_query_budget_is_flat(setup):
+    service = OrderService(workspace=setup.workspace, user=None)
+    address = SimpleNamespace(country="NZ", state="AUK")
+    counts = {}
+    for size in (1, 25):
+        cart = _make_cart(setup, size)
+        service.price_cart(cart, freight_service_id=setup.freight.id, shipping_address=address)
+        with CaptureQueriesContext(connection) as ctx:
+            service.price_cart(cart, freight_service_id=setup.freight.id, shipping_address=address)
+        counts[size] = len(ctx.captured_queries)
+
+    assert counts[1] == counts[25]
+    assert counts[25] <= QUERY_BUDGET
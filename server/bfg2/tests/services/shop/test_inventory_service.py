@@ -117,3 +117,90 @@ def test_allocate_stock_empty_warehouse_list_raises_insufficient(monkeypatch):
 
     with pytest.raises(InsufficientStock):
         service.allocate_stock(variant=object(), required_quantity=1)
+
+
+# ---------------------------------------------------------------------------
+# Reservation engine (database)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def stock(db):
+    from decimal import Decimal
+    from bfg.common.models import Workspace
+    from bfg.delivery.models import Warehouse
+    from bfg.shop.models import Product, ProductVariant, VariantInventory
+
+    workspace = Workspace.objects.create(name="Stock", slug="stock", is_active=True)
+    warehouse = Warehouse.objects.create(
+        workspace=workspace, name="Main", code="MAIN", address_line1="1 St",
+        city="Auckland", postal_code="1010", country="NZ",
+    )
+    product = Product.objects.create(
+        workspace=workspace, name="Tee", slug="tee", sku="TEE", price=Decimal("10.00"), language="en"
+    )
+    small = ProductVariant.objects.create(product=product, sku="TEE-S", name="S", stock_quantity=5)
+    large = ProductVariant.objects.create(product=product, sku="TEE-L", name="L", stock_quantity=2)
+    VariantInventory.objects.create(variant=small, warehouse=warehouse, quantity=5)
+    VariantInventory.objects.create(variant=large, warehouse=warehouse, quantity=2)
+    service = InventoryService(workspace=workspace, user=None)
+    return SimpleNamespace(service=service, warehouse=warehouse, small=small, large=large)
+
+
+def _inventory(variant, warehouse):
+    from bfg.shop.models import VariantInventory
+    return VariantInventory.objects.get(variant=variant, warehouse=warehouse)
+
+
+@pytest.mark.django_db
+def test_reserve_stock_many_is_all_or_nothing(stock):
+    with pytest.raises(InsufficientStock, match="Only 2 units"):
+        stock.service.reserve_stock_many([
+            (stock.small, stock.warehouse, 3),
+            (stock.large, stock.warehouse, 2),
+            (stock.large, stock.warehouse, 1),  # same row: summed to 3
+        ])
+    assert _inventory(stock.small, stock.warehouse).reserved == 0
+    assert _inventory(stock.large, stock.warehouse).reserved == 0
+
+    reserved = stock.service.reserve_stock_many([
+        (stock.small, stock.warehouse, 3),
+        (stock.large, stock.warehouse, 2),
+    ])
+    assert reserved[(stock.small.id, stock.warehouse.id)].reserved == 3
+    assert _inventory(stock.large, stock.warehouse).available == 0
+
+    with pytest.raises(InsufficientStock):
+        stock.service.reserve_stock(stock.small, stock.warehouse, 3)
+
+
+@pytest.mark.django_db
+def test_release_and_fulfill_update_rows_and_variant_totals(stock):
+    from bfg.shop.models import ProductVariant
+
+    stock.service.reserve_stock(stock.small, stock.warehouse, 4)
+    inventory = stock.service.release_reservation(stock.small, stock.warehouse, 10)
+    assert inventory.reserved == 0  # never below zero
+
+    stock.service.reserve_stock(stock.small, stock.warehouse, 2)
+    inventory = stock.service.fulfill_reservation(stock.small, stock.warehouse, 2)
+    assert (inventory.quantity, inventory.reserved) == (3, 0)
+    assert ProductVariant.objects.get(pk=stock.small.pk).stock_quantity == 3
+
+    stock.service.adjust_stock(stock.small, stock.warehouse, 7)
+    assert stock.small.stock_quantity == 10
+    assert ProductVariant.objects.get(pk=stock.small.pk).stock_quantity == 10
+    assert ProductVariant.objects.get(pk=stock.large.pk).stock_quantity == 2
+
+
+@pytest.mark.slow
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_parallel_checkouts_never_oversell():
+    from io import StringIO
+    from django.core.management import call_command
+
+    out = StringIO()
+    call_command(
+        "benchmark_stock_reservation",
+        workers=6, orders=15, variants=3, stock=20, seed=7, stdout=out,
+    )
+    assert "No oversells" in out.getvalue()
@@ -1,99 +1,32 @@
+from dataclasses import replace
 from decimal import Decimal
 from types import SimpleNamespace
 
 import pytest
+from django.utils import timezone
 
+from bfg.core.numbering import number_allocator
+from bfg.shop.services.checkout_pricing import CartSnapshot
 from bfg.shop.services.order_service import OrderService
 
 
 # ---------------------------------------------------------------------------
-# Existing test
+# _generate_order_number
 # ---------------------------------------------------------------------------
 
-def test_generate_order_number_retries_until_unique(monkeypatch):
-    service = OrderService(workspace=None, user=None)
-
-    seq = iter(["11111", "22222"])
-    monkeypatch.setattr(
-        "random.choices",
-        lambda *_args, **_kwargs: list(next(seq)),
-    )
-
-    class _Exists:
-        def __init__(self):
-            self.calls = 0
-
-        def exists(self):
-            self.calls += 1
-            return self.calls == 1
-
-    exists = _Exists()
-    monkeypatch.setattr(
-        "bfg.shop.services.order_service.Order.objects",
-        SimpleNamespace(filter=lambda **_kwargs: exists),
-    )
-
-    order_no = service._generate_order_number()
-    assert order_no.startswith("ORD-")
-    assert order_no.endswith("22222")
-
-
-# ---------------------------------------------------------------------------
-# _calculate_cart_weight
-# ---------------------------------------------------------------------------
-
-def test_calculate_cart_weight_uses_variant_weight_when_available():
-    service = OrderService(workspace=None, user=None)
-
-    item = SimpleNamespace(
-        variant=SimpleNamespace(weight=Decimal("0.5")),
-        product=SimpleNamespace(weight=Decimal("1.0")),
-        quantity=2,
-    )
-    cart = SimpleNamespace(
-        items=SimpleNamespace(
-            select_related=lambda *_: SimpleNamespace(all=lambda: [item])
-        )
-    )
-
-    weight = service._calculate_cart_weight(cart)
-    assert weight == Decimal("1.0")
-
-
-def test_calculate_cart_weight_falls_back_to_product_weight():
-    service = OrderService(workspace=None, user=None)
-
-    item = SimpleNamespace(
-        variant=SimpleNamespace(weight=None),
-        product=SimpleNamespace(weight=Decimal("2.0")),
-        quantity=3,
-    )
-    cart = SimpleNamespace(
-        items=SimpleNamespace(
-            select_related=lambda *_: SimpleNamespace(all=lambda: [item])
-        )
-    )
-
-    weight = service._calculate_cart_weight(cart)
-    assert weight == Decimal("6.0")
-
-
-def test_calculate_cart_weight_no_variant():
+@pytest.mark.django_db
+def test_generate_order_number_is_sequential_per_day(django_capture_on_commit_callbacks):
+    number_allocator.clear()
     service = OrderService(workspace=None, user=None)
+    prefix = f"ORD-{timezone.now().strftime('%Y%m%d')}-"
 
-    item = SimpleNamespace(
-        variant=None,
-        product=SimpleNamespace(weight=Decimal("1.5")),
-        quantity=2,
-    )
-    cart = SimpleNamespace(
-        items=SimpleNamespace(
-            select_related=lambda *_: SimpleNamespace(all=lambda: [item])
-        )
-    )
+    numbers = []
+    for _ in range(3):
+        # Each checkout commits before the next, publishing the rest of the block
+        with django_capture_on_commit_callbacks(execute=True):
+            numbers.append(service._generate_order_number())
 
-    weight = service._calculate_cart_weight(cart)
-    assert weight == Decimal("3.0")
+    assert numbers == [f"{prefix}00001", f"{prefix}00002", f"{prefix}00003"]
 
 
 # ---------------------------------------------------------------------------
@@ -117,6 +50,37 @@ def test_calculate_shipping_cost_freight_service_id_uses_base_plus_per_kg(monkey
     assert cost == Decimal("11.00")
 
 
+def test_calculate_shipping_cost_charges_packed_volumetric_weight(monkeypatch):
+    from bfg.delivery.services.cartonization import BoxSpec, CartonizationService, clear_packing_cache
+
+    clear_packing_cache()
+    service = OrderService(workspace=SimpleNamespace(id=1), user=None)
+    freight = SimpleNamespace(config={
+        "mode": "linear", "rules": {"base": 0, "per_kg": 2}, "volumetric_weight_factor": 5000, "cartonize": True,
+    })
+    monkeypatch.setattr(
+        "bfg.shop.services.order_service.FreightService.objects",
+        SimpleNamespace(get=lambda **_: freight),
+    )
+    monkeypatch.setattr(CartonizationService, "get_boxes", lambda self: [BoxSpec(50, 40, 30)])
+    product = SimpleNamespace(
+        weight=Decimal("1.0"), length=Decimal("40"), width=Decimal("25"), height=Decimal("20"), requires_shipping=True,
+    )
+    lines = [SimpleNamespace(product=product, product_id=1, variant=None, variant_id=None, quantity=2)]
+
+    # One 50x40x30 box: 12 kg volumetric against 2 kg actual
+    cost = service._calculate_shipping_cost(freight_service_id=99, weight=Decimal("2.0"), lines=lines)
+    assert cost == Decimal("24.00")
+    assert service._calculate_shipping_cost(freight_service_id=99, weight=Decimal("2.0")) == Decimal("4.00")
+
+    # Configs that only carry a volumetric factor (e.g. per-cbm templates) keep pricing on actual weight
+    freight.config = {**freight.config, "cartonize": False}
+    assert service._calculate_shipping_cost(freight_service_id=99, weight=Decimal("2.0"), lines=lines) == Decimal("4.00")
+    freight.config = {**freight.config, "cartonize": True, "unit": "cbm"}
+    monkeypatch.setattr(CartonizationService, "billing_weight", lambda *_: pytest.fail("packed a cbm config"))
+    service._calculate_shipping_cost(freight_service_id=99, weight=Decimal("2.0"), lines=lines)
+
+
 def _make_freight_service_mock_no_match():
     """Create a FreightService mock that raises DoesNotExist for get() and returns None for filter().first()."""
 
@@ -167,66 +131,64 @@ def test_calculate_shipping_cost_no_method_returns_default(monkeypatch):
 # _calculate_tax
 # ---------------------------------------------------------------------------
 
-@pytest.mark.django_db
-def test_calculate_tax_with_matching_state_rate(monkeypatch):
-    service = OrderService(workspace=SimpleNamespace(id=1), user=None)
-
-    tax_rate = SimpleNamespace(rate=Decimal("10"))
-    address = SimpleNamespace(country="NZ", state="AUK")
+@pytest.fixture
+def tax_workspace(db):
+    from django.core.cache import cache
+    from bfg.common.models import Workspace
+    from bfg.finance.services.tax_rate_resolver import tax_rate_cache
+    cache.clear()
+    tax_rate_cache.clear_local()
+    yield Workspace.objects.create(name="Tax", slug="tax", is_active=True)
+    tax_rate_cache.clear_local()
+
+
+def _tax_rate(workspace, rate, country="", state="", name=None):
+    from bfg.finance.models import TaxRate
+    return TaxRate.objects.create(
+        workspace=workspace, name=name or f"{country}-{state}-{rate}", rate=Decimal(rate),
+        country=country, state=state,
+    )
 
-    class _TaxRateObjects:
-        @staticmethod
-        def filter(**_kwargs):
-            return SimpleNamespace(first=lambda: tax_rate)
 
-    monkeypatch.setattr(
-        "bfg.finance.models.TaxRate.objects",
-        _TaxRateObjects(),
-    )
+@pytest.mark.django_db
+def test_calculate_tax_with_matching_state_rate(tax_workspace):
+    service = OrderService(workspace=tax_workspace, user=None)
+    _tax_rate(tax_workspace, "15", country="NZ")
+    _tax_rate(tax_workspace, "10", country="NZ", state="AUK")
+    address = SimpleNamespace(country="NZ", state="AUK")
 
     tax = service._calculate_tax(Decimal("100.00"), address)
     assert tax == Decimal("10.00")
 
 
 @pytest.mark.django_db
-def test_calculate_tax_country_fallback(monkeypatch):
-    service = OrderService(workspace=SimpleNamespace(id=1), user=None)
-
+def test_calculate_tax_country_fallback(tax_workspace):
+    service = OrderService(workspace=tax_workspace, user=None)
+    _tax_rate(tax_workspace, "5")
+    _tax_rate(tax_workspace, "15", country="NZ")
+    _tax_rate(tax_workspace, "8", country="NZ", state="WLG")
     address = SimpleNamespace(country="NZ", state="AUK")
-    tax_rate = SimpleNamespace(rate=Decimal("15"))
-
-    call_count = {"n": 0}
-
-    class _TaxRateObjects:
-        @staticmethod
-        def filter(**kwargs):
-            call_count["n"] += 1
-            if call_count["n"] == 1:
-                return SimpleNamespace(first=lambda: None)
-            return SimpleNamespace(first=lambda: tax_rate)
-
-    monkeypatch.setattr(
-        "bfg.finance.models.TaxRate.objects",
-        _TaxRateObjects(),
-    )
 
     tax = service._calculate_tax(Decimal("200.00"), address)
     assert tax == Decimal("30.00")
 
 
 @pytest.mark.django_db
-def test_calculate_tax_no_rate_returns_zero(monkeypatch):
-    service = OrderService(workspace=SimpleNamespace(id=1), user=None)
+def test_calculate_tax_default_and_any_rate_fallback(tax_workspace, django_capture_on_commit_callbacks):
+    service = OrderService(workspace=tax_workspace, user=None)
+    _tax_rate(tax_workspace, "20", country="AU", name="a-au")
 
-    class _TaxRateObjects:
-        @staticmethod
-        def filter(**_kwargs):
-            return SimpleNamespace(first=lambda: None)
+    # No default (country-less) rate: first active rate by name
+    assert service._calculate_tax(Decimal("100.00"), None) == Decimal("20.00")
 
-    monkeypatch.setattr(
-        "bfg.finance.models.TaxRate.objects",
-        _TaxRateObjects(),
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        _tax_rate(tax_workspace, "5", name="z-default")
+    assert service._calculate_tax(Decimal("100.00"), SimpleNamespace(country="NZ", state="")) == Decimal("5.00")
+
+
+@pytest.mark.django_db
+def test_calculate_tax_no_rate_returns_zero(tax_workspace):
+    service = OrderService(workspace=tax_workspace, user=None)
 
     tax = service._calculate_tax(Decimal("100.00"), None)
     assert tax == Decimal("0.00")
@@ -264,7 +226,7 @@ def _make_cart_items(*subtotals):
                 subtotal=Decimal(str(st)),
                 price=Decimal(str(st)),
                 quantity=1,
-                product=SimpleNamespace(id=1, name="P", track_inventory=False),
+                product=SimpleNamespace(id=1, name="P", track_inventory=False, weight=None),
                 variant=None,
             )
         )
@@ -280,7 +242,9 @@ def _patch_service_helpers(monkeypatch, service, discount_result=None, shipping=
             "coupon_discount": Decimal("0.00"),
             "gift_card_amount": Decimal("0.00"),
         }
-    monkeypatch.setattr(service, "_calculate_cart_weight", lambda _cart: weight)
+    # Pricing charges freight on the cart snapshot's weight
+    load = CartSnapshot.load
+    monkeypatch.setattr(CartSnapshot, "load", classmethod(lambda cls, cart: replace(load(cart), weight=weight)))
     monkeypatch.setattr(service, "_calculate_shipping_cost", lambda **_kw: shipping)
     monkeypatch.setattr(service, "_calculate_tax", lambda *_a, **_kw: tax)
 
@@ -330,6 +294,26 @@ def test_calculate_order_totals_normal_cart_no_coupon(monkeypatch):
     assert result["total"] == Decimal("60.00")
 
 
+def test_price_cart_charges_freight_on_the_snapshot_weight(monkeypatch):
+    service = OrderService(workspace=SimpleNamespace(id=1), user=None)
+
+    items = _make_cart_items("30.00")
+    cart = SimpleNamespace(
+        customer=None,
+        items=SimpleNamespace(
+            select_related=lambda *_: SimpleNamespace(all=lambda: items)
+        ),
+    )
+    _patch_service_helpers(monkeypatch, service, weight=Decimal("4.5"))
+    charged = []
+    monkeypatch.setattr(service, "_calculate_shipping_cost", lambda **kw: charged.append(kw["weight"]) or Decimal("7.00"))
+
+    breakdown = service.price_cart(cart, freight_service_id=1)
+
+    assert charged == [Decimal("4.5")]
+    assert breakdown.weight == Decimal("4.5") and breakdown.shipping_cost == Decimal("7.00")
+
+
 def test_calculate_order_totals_with_coupon_applies_discount(monkeypatch):
     service = OrderService(workspace=SimpleNamespace(id=1), user=None)
 
@@ -568,3 +552,104 @@ def test_update_order_status_delivered_sets_delivered_at(monkeypatch):
     assert result.status == "delivered"
     assert result.delivered_at is not None
     assert events["name"] == "order.delivered"
+
+
+# ---------------------------------------------------------------------------
+# create_order_from_cart
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def checkout(db):
+    from bfg.common.models import Address, Customer, User, Workspace
+    from bfg.delivery.models import Warehouse
+    from bfg.shop.models import Cart, CartItem, Product, ProductVariant, Store, VariantInventory
+
+    workspace = Workspace.objects.create(name="Checkout", slug="checkout", is_active=True)
+    warehouse = Warehouse.objects.create(
+        workspace=workspace, name="Main", code="MAIN", address_line1="1 St",
+        city="Auckland", postal_code="1010", country="NZ", is_default=True,
+    )
+    store = Store.objects.create(workspace=workspace, name="Shop", code="SHOP")
+    customer = Customer.objects.create(
+        workspace=workspace, user=User.objects.create_user(username="buyer", password="x")
+    )
+    address = Address.objects.create(
+        workspace=workspace, full_name="Buyer", phone="1", address_line1="1 St",
+        city="Auckland", postal_code="1010", country="NZ",
+    )
+    product = Product.objects.create(
+        workspace=workspace, name="Tee", slug="tee", sku="TEE", price=Decimal("10.00"), language="en"
+    )
+    variants = []
+    for size, stock in (("S", 5), ("M", 5), ("L", 1)):
+        variant = ProductVariant.objects.create(
+            product=product, sku=f"TEE-{size}", name=size, price=Decimal("10.00"), stock_quantity=stock
+        )
+        VariantInventory.objects.create(variant=variant, warehouse=warehouse, quantity=stock)
+        variants.append(variant)
+    cart = Cart.objects.create(workspace=workspace, customer=customer)
+
+    def fill(quantities):
+        for variant, quantity in zip(variants, quantities):
+            CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=quantity, price=Decimal("10.00"))
+
+    return SimpleNamespace(
+        service=OrderService(workspace=workspace, user=None), cart=cart, store=store,
+        address=address, variants=variants, fill=fill,
+    )
+
+
+def _reserved(variants):
+    from bfg.shop.models import VariantInventory
+
+    return list(
+        VariantInventory.objects.filter(variant__in=variants).order_by("variant_id").values_list("reserved", flat=True)
+    )
+
+
+def test_create_order_from_cart_defers_post_commit_work(checkout, django_capture_on_commit_callbacks, monkeypatch):
+    from bfg.finance.models import Invoice
+
+    events = []
+    monkeypatch.setattr(OrderService, "emit_event", lambda self, name, data: events.append((name, data["order"])))
+    checkout.fill([2, 3, 1])
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        order = checkout.service.create_order_from_cart(
+            checkout.cart, checkout.store, checkout.address, shipping_cost="0", tax="0"
+        )
+        # Items and reservations are part of the checkout transaction
+        assert sorted(order.items.values_list("sku", "quantity")) == [("TEE-L", 1), ("TEE-M", 3), ("TEE-S", 2)]
+        assert _reserved(checkout.variants) == [2, 3, 1]
+        assert not checkout.cart.items.exists()
+        assert events == [] and not Invoice.objects.filter(order=order).exists()
+
+    for callback in callbacks:
+        callback()
+    assert events == [("order.created", order)]
+    assert Invoice.objects.filter(order=order).exists()
+
+
+def test_create_order_from_cart_reserves_available_lines_when_one_is_short(checkout):
+    checkout.fill([2, 3, 4])
+
+    order = checkout.service.create_order_from_cart(
+        checkout.cart, checkout.store, checkout.address, shipping_cost="0", tax="0"
+    )
+
+    assert order.items.count() == 3
+    # L has 1 unit: its line is not reserved, the others still are
+    assert _reserved(checkout.variants) == [2, 3, 0]
+
+
+@pytest.mark.slow
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_checkout_command():
+    from io import StringIO
+    from django.core.management import call_command
+
+    out = StringIO()
+    call_command("benchmark_checkout", lines=[1, 5], orders=3, stdout=out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("  1-line cart, 3 checkouts: transaction p50=")
+    assert lines[1].startswith("  5-line cart, 3 checkouts:") and "queries/checkout" in lines[1]
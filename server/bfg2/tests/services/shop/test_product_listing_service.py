@@ -0,0 +1,179 @@
+from decimal import Decimal
+
+import pytest
+
+from bfg.common.models import Address, Customer, User, Workspace
+from bfg.delivery.models import Warehouse
+from bfg.shop.models import (
+    Order, OrderItem, Product, ProductCategory, ProductListing, ProductReview,
+    ProductTag, ProductVariant, Store, VariantInventory,
+)
+from bfg.shop.services.product_listing_service import ProductListingService, listings_ready
+
+
+@pytest.fixture
+def workspace(db):
+    return Workspace.objects.create(name="Store", slug="store", is_active=True)
+
+
+@pytest.fixture
+def customer(workspace):
+    user = User.objects.create_user(username="buyer", password="x")
+    return Customer.objects.create(workspace=workspace, user=user)
+
+
+def _order(workspace, customer, number):
+    address = Address.objects.create(
+        workspace=workspace, full_name="Buyer", phone="1", address_line1="1 St",
+        city="Auckland", postal_code="1010", country="NZ",
+    )
+    store = Store.objects.get_or_create(workspace=workspace, code="main", defaults={"name": "Main"})[0]
+    return Order.objects.create(
+        workspace=workspace, customer=customer, store=store, order_number=number,
+        subtotal=Decimal("0"), total=Decimal("0"),
+        shipping_address=address, billing_address=address,
+    )
+
+
+@pytest.mark.django_db
+def test_signals_keep_listing_in_sync(workspace, customer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        category = ProductCategory.objects.create(workspace=workspace, name="Shoes", slug="shoes", language="en")
+        tag = ProductTag.objects.create(workspace=workspace, name="Sale", slug="sale", language="en")
+        product = Product.objects.create(
+            workspace=workspace, name="Boot", slug="boot", price=Decimal("50.00"), language="en",
+        )
+        product.categories.add(category)
+        product.tags.add(tag)
+
+    listing = ProductListing.objects.get(product=product)
+    assert listing.price == Decimal("50.00")
+    assert listing.category_ids == [category.id]
+    assert listing.category_slugs == "|shoes|"
+    assert listing.tag_slugs == "|sale|"
+    assert listing.sold_count == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order = _order(workspace, customer, "ORD-1")
+        for qty in (2, 3):
+            OrderItem.objects.create(
+                order=order, product=product, product_name="Boot", quantity=qty,
+                price=Decimal("50.00"), subtotal=Decimal("50.00") * qty,
+            )
+        ProductReview.objects.create(
+            workspace=workspace, product=product, customer=customer, rating=4, is_approved=True
+        )
+        warehouse = Warehouse.objects.create(
+            workspace=workspace, name="WH", code="WH", address_line1="1 St",
+            city="Auckland", postal_code="1010", country="NZ",
+        )
+        variant = ProductVariant.objects.create(product=product, sku="B-1", name="Boot 42")
+        VariantInventory.objects.create(variant=variant, warehouse=warehouse, quantity=7, reserved=2)
+
+    listing.refresh_from_db()
+    assert listing.sold_count == 5
+    assert listing.rating == Decimal("4.00")
+    assert listing.reviews_count == 1
+    assert listing.stock_available == 5
+
+    with django_capture_on_commit_callbacks(execute=True):
+        category.is_active = False
+        category.save()
+
+    # Inactive categories leave the ids but still match ?category= as Product.categories__slug does
+    listing.refresh_from_db()
+    assert listing.category_ids == []
+    assert listing.category_slugs == "|shoes|"
+
+
+@pytest.mark.django_db
+def test_many_changes_in_one_transaction_refresh_once(workspace, monkeypatch, django_capture_on_commit_callbacks):
+    refreshed = []
+    original = ProductListingService.refresh_products
+
+    def _spy(self, product_ids):
+        refreshed.append(sorted(product_ids))
+        return original(self, product_ids)
+
+    monkeypatch.setattr(ProductListingService, "refresh_products", _spy)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for i in range(3):
+            product = Product.objects.create(
+                workspace=workspace, name=f"P{i}", slug=f"p{i}", price=Decimal("1.00"), language="en",
+            )
+            product.is_featured = True
+            product.save()
+
+    assert len(refreshed) == 1
+    assert len(refreshed[0]) == 3
+    assert ProductListing.objects.filter(workspace=workspace, is_featured=True).count() == 3
+
+
+@pytest.mark.django_db
+def test_rebuild_workspace_creates_and_prunes_rows(workspace):
+    kept = Product.objects.create(workspace=workspace, name="Kept", slug="kept", price=Decimal("3.00"), language="en")
+    stale = Product.objects.create(workspace=workspace, name="Gone", slug="gone", price=Decimal("3.00"), language="en")
+    ProductListingService().refresh_products([stale.id])
+    Product.objects.filter(id=stale.id).delete()
+
+    written = ProductListingService(workspace=workspace).rebuild_workspace()
+
+    assert written == 1
+    assert list(ProductListing.objects.values_list("product_id", flat=True)) == [kept.id]
+    assert ProductListing.objects.filter(
+        workspace=workspace, category_slugs__contains=ProductListing.slug_key("shoes")
+    ).count() == 0
+
+
+@pytest.mark.django_db
+def test_workspace_is_listing_ready_only_after_a_rebuild(workspace, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(workspace=workspace, name="A", slug="a", price=Decimal("1.00"), language="en")
+
+    # Signal-maintained rows alone do not make the read model complete
+    assert ProductListing.objects.filter(workspace=workspace).exists()
+    assert not listings_ready(workspace)
+
+    ProductListingService(workspace=workspace).rebuild_workspace()
+
+    workspace.refresh_from_db()
+    assert listings_ready(workspace)
+
+
+def _storefront_slugs(workspace, **params):
+    from rest_framework.test import APIRequestFactory
+    from bfg.shop.viewsets.storefront import StorefrontProductViewSet
+
+    request = APIRequestFactory().get("/api/v1/store/products/", params)
+    request.workspace = workspace
+    response = StorefrontProductViewSet.as_view({"get": "list"})(request)
+    data = response.data["results"] if isinstance(response.data, dict) else response.data
+    return sorted(item["slug"] for item in data)
+
+
+@pytest.mark.django_db
+def test_storefront_browses_listings_once_ready_with_legacy_semantics(workspace, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        old = ProductCategory.objects.create(
+            workspace=workspace, name="Old", slug="old", language="en", is_active=False,
+        )
+        for slug, language in (("boot", "en"), ("botte", "fr")):
+            product = Product.objects.create(
+                workspace=workspace, name=slug, slug=slug, price=Decimal("5.00"), language=language,
+            )
+            product.categories.add(old)
+    # Only one product has a listing row: browsing stays on the Product queries
+    ProductListing.objects.filter(product__slug="botte").delete()
+    assert _storefront_slugs(workspace) == ["boot", "botte"]
+    # The legacy path has never filtered by language
+    assert _storefront_slugs(workspace, lang="fr") == ["boot", "botte"]
+
+    ProductListingService(workspace=workspace).rebuild_workspace()
+    workspace.refresh_from_db()
+
+    assert _storefront_slugs(workspace) == ["boot", "botte"]
+    assert _storefront_slugs(workspace, category="old") == ["boot", "botte"]
+    assert _storefront_slugs(workspace, lang="fr") == ["botte"]
+    # No products in the language: fall back to en, as categories do
+    assert _storefront_slugs(workspace, lang="de") == ["boot"]
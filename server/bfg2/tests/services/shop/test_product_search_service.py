@@ -0,0 +1,163 @@
+from decimal import Decimal
+
+import pytest
+
+from bfg.common.models import Workspace
+from bfg.shop.models import Product, ProductCategory, ProductSearchDocument, ProductTag, ProductVariant
+from bfg.shop.search.simple import SimpleSearchBackend
+from bfg.shop.services.product_search_service import ProductSearchService
+
+
+@pytest.fixture
+def workspace(db):
+    return Workspace.objects.create(name="Store", slug="store", is_active=True)
+
+
+@pytest.fixture
+def catalog(workspace, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        boots = ProductCategory.objects.create(workspace=workspace, name="Boots", slug="boots", language="en")
+        sale = ProductTag.objects.create(workspace=workspace, name="Clearance", slug="clearance", language="en")
+        hiking = Product.objects.create(
+            workspace=workspace, name="Leather Hiking Boot", slug="hiking-boot", sku="HB-100",
+            price=Decimal("120.00"), condition="new", language="en",
+            description="Waterproof leather upper.",
+        )
+        hiking.categories.add(boots)
+        sock = Product.objects.create(
+            workspace=workspace, name="Wool Sock", slug="wool-sock", sku="WS-1",
+            price=Decimal("12.00"), condition="new", language="en",
+            description="Pairs well with any hiking boot.",
+        )
+        sock.tags.add(sale)
+        rain = Product.objects.create(
+            workspace=workspace, name="Rain Boot", slug="rain-boot", sku="RB-7",
+            price=Decimal("45.00"), condition="good", language="en",
+        )
+        rain.categories.add(boots)
+        rain.tags.add(sale)
+    return {"hiking": hiking, "sock": sock, "rain": rain, "boots": boots, "sale": sale}
+
+
+@pytest.mark.django_db
+def test_title_matches_rank_above_body_matches(workspace, catalog):
+    service = ProductSearchService(workspace=workspace)
+
+    ids = [hit.product_id for hit in service.match("hiking boot")]
+
+    assert ids == [catalog["hiking"].id, catalog["sock"].id]
+    # Prefix match on the last token and keyword (SKU / tag) fields
+    assert [hit.product_id for hit in service.match("leath")] == [catalog["hiking"].id]
+    assert [hit.product_id for hit in service.match("rb-7")] == [catalog["rain"].id]
+    assert {hit.product_id for hit in service.match("clearance")} == {catalog["sock"].id, catalog["rain"].id}
+
+
+@pytest.mark.django_db
+def test_search_filters_and_facets(workspace, catalog):
+    service = ProductSearchService(workspace=workspace)
+
+    result = service.search("boot")
+
+    assert result.total == 3
+    assert result.product_ids[0] in {catalog["hiking"].id, catalog["rain"].id}
+    assert result.facets["categories"] == [
+        {"id": catalog["boots"].id, "name": "Boots", "slug": "boots", "count": 2}
+    ]
+    assert result.facets["tags"][0]["count"] == 2
+    assert result.facets["price"] == [
+        {"bucket": "0-25", "count": 1},
+        {"bucket": "25-50", "count": 1},
+        {"bucket": "100-250", "count": 1},
+    ]
+    assert {"value": "new", "count": 2} in result.facets["condition"]
+
+    filtered = service.search("boot", category="boots", max_price="50")
+    assert filtered.product_ids == [catalog["rain"].id]
+    assert filtered.facets["price"] == [{"bucket": "25-50", "count": 1}]
+
+    paged = service.search("boot", limit=1, offset=1)
+    assert paged.total == 3
+    assert len(paged.product_ids) == 1
+
+
+@pytest.mark.django_db
+def test_index_follows_product_changes(workspace, catalog, django_capture_on_commit_callbacks):
+    service = ProductSearchService(workspace=workspace)
+    rain = catalog["rain"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rain.name = "Gumboot"
+        rain.save()
+        ProductVariant.objects.create(product=rain, sku="GUM-42", name="Size 42")
+
+    assert [hit.product_id for hit in service.match("gumboot")] == [rain.id]
+    assert [hit.product_id for hit in service.match("gum-42")] == [rain.id]
+    assert rain.id not in [hit.product_id for hit in service.match("rain")]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rain.delete()
+
+    assert not ProductSearchDocument.objects.filter(product_id=rain.id).exists()
+    assert service.match("gumboot") == []
+
+
+@pytest.mark.django_db
+def test_simple_backend_matches_same_products(workspace, catalog):
+    fts = ProductSearchService(workspace=workspace)
+    simple = ProductSearchService(workspace=workspace, backend=SimpleSearchBackend())
+
+    for query in ("boot", "hiking boot", "clearance", "hb-100"):
+        assert (
+            {hit.product_id for hit in simple.match(query)}
+            == {hit.product_id for hit in fts.match(query)}
+        )
+    assert simple.match("hiking boot")[0].product_id == catalog["hiking"].id
+
+
+def test_mysql_expressions_skip_tokens_the_index_cannot_hold():
+    from bfg.shop.search.mysql_fulltext import MySQLFullTextBackend
+
+    assert MySQLFullTextBackend.match_expressions(["hiking", "boot"]) == ("+hiking +boot*", "hiking boot")
+    # Stopwords and short tokens are dropped instead of required; a dropped last token loses the prefix
+    assert MySQLFullTextBackend.match_expressions(["the", "boot", "of", "xl"]) == ("+boot", "boot")
+    assert MySQLFullTextBackend.match_expressions(["tv", "to"]) is None
+
+
+def _storefront_names(workspace, **params):
+    from rest_framework.test import APIRequestFactory
+    from bfg.shop.viewsets.storefront import StorefrontProductViewSet
+
+    request = APIRequestFactory().get("/api/v1/store/products/", params)
+    request.workspace = workspace
+    response = StorefrontProductViewSet.as_view({"get": "list"})(request)
+    data = response.data["results"] if isinstance(response.data, dict) else response.data
+    return [item["name"] for item in data]
+
+
+@pytest.mark.django_db
+def test_storefront_q_uses_the_index_only_once_rebuilt(workspace, catalog):
+    from rest_framework.test import APIRequestFactory
+    from bfg.shop.services.product_listing_service import ProductListingService
+    from bfg.shop.viewsets.storefront import StorefrontProductViewSet
+
+    def search_status():
+        request = APIRequestFactory().get("/api/v1/store/products/search/", {"q": "boot"})
+        request.workspace = workspace
+        return StorefrontProductViewSet.as_view({"get": "search"})(request).status_code
+
+    ProductListingService(workspace=workspace).rebuild_workspace()
+    workspace.refresh_from_db()
+
+    # Index not rebuilt yet: names are matched as before, ranked search is unavailable
+    assert _storefront_names(workspace, q="waterproof") == []
+    assert _storefront_names(workspace, q="Hiking") == ["Leather Hiking Boot"]
+    assert search_status() == 503
+
+    ProductSearchService(workspace=workspace).rebuild_workspace()
+    workspace.refresh_from_db()
+    assert search_status() == 200
+
+    assert _storefront_names(workspace, q="waterproof") == ["Leather Hiking Boot"]
+    assert _storefront_names(workspace, q="hiking boot") == ["Leather Hiking Boot", "Wool Sock"]
+    assert _storefront_names(workspace, q="hiking boot", limit=1) == ["Leather Hiking Boot"]
+    assert _storefront_names(workspace, q="hiking boot", sort="price_asc") == ["Wool Sock", "Leather Hiking Boot"]
@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.models import Address, Customer, User, Workspace
+from bfg.delivery.models import Warehouse
+from bfg.shop.exceptions import InsufficientStock
+from bfg.shop.models import (
+    BatchMovement, Order, Product, ProductBatch, ProductVariant, Store, VariantInventory,
+)
+from bfg.shop.services.stock_allocation_service import StockAllocationService
+
+
+@pytest.fixture
+def workspace(db):
+    return Workspace.objects.create(
+        name="Store", slug="store", is_active=True, settings={"features": {"batch_management": True}}
+    )
+
+
+def _warehouse(workspace, code, city, state, country="NZ", **kwargs):
+    return Warehouse.objects.create(
+        workspace=workspace, name=code, code=code, address_line1="-", city=city, state=state,
+        postal_code="-", country=country, **kwargs
+    )
+
+
+def _variants(workspace, count):
+    product = Product.objects.create(
+        workspace=workspace, name="Tea", slug="tea", sku="TEA", price=Decimal("5.00"), language="en",
+    )
+    return [ProductVariant.objects.create(product=product, sku=f"TEA-{i}", name=f"T{i}") for i in range(count)]
+
+
+def _stock(variant, warehouse, quantity, reserved=0):
+    VariantInventory.objects.create(variant=variant, warehouse=warehouse, quantity=quantity, reserved=reserved)
+
+
+@pytest.mark.django_db
+def test_plan_prefers_fewest_shipments_then_nearest_warehouse(workspace):
+    near = _warehouse(workspace, "AKL", "Auckland", "AUK")
+    far = _warehouse(workspace, "CHC", "Christchurch", "CAN")
+    farther = _warehouse(workspace, "SYD", "Sydney", "NSW", country="AU")
+    tea, mug = _variants(workspace, 2)
+    _stock(tea, near, 10)
+    _stock(tea, far, 10)
+    _stock(mug, far, 10)
+    _stock(tea, farther, 10)
+    _stock(mug, farther, 10, reserved=8)
+    address = SimpleNamespace(country="NZ", state="AUK", city="Auckland", latitude=None, longitude=None)
+    service = StockAllocationService(workspace=workspace, user=None)
+
+    plan = service.plan_allocation([(tea, 4), (mug, 2)], shipping_address=address, use_batches=False)
+    assert plan.warehouses == [far]
+    assert plan.stock_lines() == [(tea, far, 4), (mug, far, 2)]
+
+    # Tea alone ships from the nearest warehouse
+    plan = service.plan_allocation([(tea, 4)], shipping_address=address, use_batches=False)
+    assert plan.warehouses == [near]
+
+    # No single warehouse has 15 teas: split, nearest first
+    plan = service.plan_allocation([(tea, 15), (tea, 0)], shipping_address=address, use_batches=False)
+    assert plan.stock_lines() == [(tea, near, 10), (tea, far, 5)]
+
+    with pytest.raises(InsufficientStock, match="Only 12 units"):
+        service.plan_allocation([(mug, 13)], shipping_address=address)
+
+
+@pytest.mark.django_db
+def test_plan_takes_batches_fifo_and_applies_in_bulk(workspace):
+    warehouse = _warehouse(workspace, "AKL", "Auckland", "AUK")
+    (tea,) = _variants(workspace, 1)
+    _stock(tea, warehouse, 30)
+    today = date.today()
+    batch = dict(workspace=workspace, variant=tea, warehouse=warehouse, manufactured_date=today - timedelta(days=90))
+    late = ProductBatch.objects.create(batch_number="B-LATE", quantity=10, expiry_date=today + timedelta(days=60), **batch)
+    soon = ProductBatch.objects.create(batch_number="B-SOON", quantity=5, expiry_date=today + timedelta(days=5), **batch)
+    ProductBatch.objects.create(batch_number="B-OLD", quantity=10, expiry_date=today - timedelta(days=1), **batch)
+    ProductBatch.objects.create(batch_number="B-NONE", quantity=5, expiry_date=None, **batch)
+    service = StockAllocationService(workspace=workspace, user=None)
+
+    with CaptureQueriesContext(connection) as ctx:
+        plan = service.plan_allocation([(tea, 12)])
+    assert len(ctx.captured_queries) == 2
+    assert plan.batch_allocations() == [(soon, 5), (late, 7)]
+
+    # Expired batches are not sellable even though the inventory row has stock
+    with pytest.raises(InsufficientStock, match="Only 20 units"):
+        service.plan_allocation([(tea, 21)])
+
+    customer = Customer.objects.create(workspace=workspace, user=User.objects.create_user(username="b", password="x"))
+    address = Address.objects.create(
+        workspace=workspace, full_name="Buyer", phone="1", address_line1="1 St", city="Auckland",
+        postal_code="1010", country="NZ",
+    )
+    order = Order.objects.create(
+        workspace=workspace, customer=customer, order_number="ORD-1", subtotal=Decimal("0"), total=Decimal("0"),
+        store=Store.objects.create(workspace=workspace, code="main", name="Main"),
+        shipping_address=address, billing_address=address,
+    )
+    service.apply_plan(plan, order=order)
+
+    assert VariantInventory.objects.get(variant=tea, warehouse=warehouse).reserved == 12
+    assert ProductBatch.objects.get(pk=soon.pk).reserved == 5
+    assert ProductBatch.objects.get(pk=late.pk).reserved == 7
+    assert BatchMovement.objects.filter(order=order).count() == 2
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bfg.common.models import Customer, Media, MediaLink, User, Workspace
+from bfg.delivery.models import Warehouse
+from bfg.shop.models import (
+    Product, ProductCategory, ProductReview, ProductVariant, VariantInventory,
+)
+from bfg.shop.serializers.storefront import StorefrontProductSerializer, with_storefront_data
+
+
+@pytest.fixture
+def workspace(db):
+    return Workspace.objects.create(name="Store", slug="store", is_active=True)
+
+
+@pytest.fixture
+def warehouses(workspace):
+    return [
+        Warehouse.objects.create(
+            workspace=workspace, name=f"WH {i}", code=f"WH{i}",
+            address_line1="1 Main St", city="Auckland", postal_code="1010", country="NZ",
+        )
+        for i in range(2)
+    ]
+
+
+def _make_products(workspace, warehouses, count, start=0):
+    category, _ = ProductCategory.objects.get_or_create(
+        workspace=workspace, slug="shoes", language="en", defaults={"name": "Shoes"}
+    )
+    hidden, _ = ProductCategory.objects.get_or_create(
+        workspace=workspace, slug="hidden", language="en", defaults={"name": "Hidden", "is_active": False}
+    )
+    product_ct = ContentType.objects.get_for_model(Product)
+    for i in range(start, start + count):
+        product = Product.objects.create(
+            workspace=workspace, name=f"P{i}", slug=f"p{i}", price=Decimal("10.00"), language="en",
+        )
+        product.categories.set([category, hidden])
+        media = Media.objects.create(workspace=workspace, external_url=f"https://cdn.test/p{i}.jpg")
+        MediaLink.objects.create(media=media, content_type=product_ct, object_id=product.id, position=1)
+        for j in range(3):
+            variant = ProductVariant.objects.create(product=product, sku=f"P{i}-V{j}", name=f"V{j}")
+            for wh in warehouses:
+                VariantInventory.objects.create(variant=variant, warehouse=wh, quantity=5, reserved=1)
+        for rating in (4, 5):
+            user = User.objects.create_user(username=f"u{i}-{rating}", password="x")
+            customer = Customer.objects.create(workspace=workspace, user=user)
+            ProductReview.objects.create(
+                workspace=workspace, product=product, customer=customer, rating=rating, is_approved=True
+            )
+
+
+def _serialize(workspace):
+    queryset = with_storefront_data(Product.objects.filter(workspace=workspace))
+    with CaptureQueriesContext(connection) as ctx:
+        data = StorefrontProductSerializer(queryset, many=True).data
+    return data, len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_preloaded_serialization_matches_fallback_values(workspace, warehouses):
+    _make_products(workspace, warehouses, 1)
+
+    preloaded = StorefrontProductSerializer(
+        with_storefront_data(Product.objects.filter(workspace=workspace)), many=True
+    ).data[0]
+    fallback = StorefrontProductSerializer(Product.objects.filter(workspace=workspace), many=True).data[0]
+
+    assert preloaded == fallback
+    assert preloaded["rating"] == 4.5
+    assert preloaded["reviews_count"] == 2
+    assert [c["slug"] for c in preloaded["categories"]] == ["shoes"]
+    assert preloaded["primary_image"] == "https://cdn.test/p0.jpg"
+    variant = preloaded["variants"][0]
+    assert variant["stock_available"] == 8
+    assert variant["stock_reserved"] == 2
+    assert len(variant["stock_by_warehouse"]) == 2
+
+
+@pytest.mark.django_db
+def test_query_count_does_not_grow_with_page_size(workspace, warehouses):
+    _make_products(workspace, warehouses, 2)
+    data, small_page_queries = _serialize(workspace)
+    assert len(data) == 2
+
+    _make_products(workspace, warehouses, 10, start=2)
+    data, large_page_queries = _serialize(workspace)
+    assert len(data) == 12
+
+    assert large_page_queries == small_page_queries
+    assert large_page_queries <= 8
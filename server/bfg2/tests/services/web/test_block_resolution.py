@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bfg.common.models import User, Workspace
+from bfg.web.models import Category, Post
+from bfg.web.services.block_service import BlockService
+
+
+@pytest.fixture
+def site(db):
+    cache.clear()
+    workspace = Workspace.objects.create(name="Site", slug="site", is_active=True)
+    author = User.objects.create_user(username="author", password="x")
+    news = Category.objects.create(workspace=workspace, name="News", slug="news", content_type_name="post", language="en")
+    faq = Category.objects.create(workspace=workspace, name="FAQ", slug="faq", content_type_name="faq", language="en")
+    now = timezone.now()
+
+    def post(title, category, days_ago, status="published"):
+        return Post.objects.create(
+            workspace=workspace, title=title, slug=title.lower(), content="-", category=category,
+            status=status, published_at=now - timedelta(days=days_ago), language="en", author=author,
+        )
+
+    posts = {
+        "a": post("A", news, 1),
+        "b": post("B", news, 2),
+        "c": post("C", faq, 3),
+        "draft": post("Draft", news, 0, status="draft"),
+    }
+    yield BlockService(workspace=workspace, user=None), {"news": news, "faq": faq}, posts
+    cache.clear()
+
+
+def _blocks(posts, categories):
+    return [
+        {"id": "latest", "type": "post_list_v1", "data": {"limit": 2}},
+        {"id": "faq", "type": "faq_list_v1", "data": {"contentType": "faq"}},
+        {"id": "picked", "type": "case_list_v1", "data": {
+            "source": "manual", "postIds": [posts["c"].id, posts["a"].id, posts["draft"].id],
+        }},
+        {"id": "picked-news", "type": "project_grid_v1", "data": {
+            "source": "manual", "postIds": [posts["b"].id, posts["c"].id], "contentType": "post",
+        }},
+        {"id": "grid", "type": "category_grid_v1", "data": {}},
+        {"id": "section", "type": "section_v1", "data": {"children": [
+            {"id": "latest-again", "type": "post_list_v1", "data": {"limit": 2}},
+            {"id": "picked-grid", "type": "category_grid_v1", "data": {
+                "source": "selected", "categoryIds": [categories["faq"].id],
+            }},
+            {"id": "text", "type": "text_block_v1", "data": {"content": {"en": "Hi"}}},
+        ]}},
+    ]
+
+
+def _titles(block):
+    return [item.get("title") or item.get("name") for item in block["resolvedData"]]
+
+
+@pytest.mark.django_db
+def test_blocks_resolve_with_one_query_per_distinct_need(site):
+    service, categories, posts = site
+    blocks = _blocks(posts, categories)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resolved = service.resolve_all_blocks(blocks)
+    # latest, faq, both manual lists together, all categories
+    assert len(ctx.captured_queries) == 4
+
+    latest, faq, picked, picked_news, grid, section = resolved
+    assert _titles(latest) == ["A", "B"]
+    assert _titles(faq) == ["C"]
+    assert _titles(picked) == ["A", "C"]
+    assert _titles(picked_news) == ["B"]
+    assert _titles(grid) == ["FAQ", "News"]
+    latest_again, picked_grid, text = section["data"]["children"]
+    assert _titles(latest_again) == ["A", "B"]
+    assert _titles(picked_grid) == ["FAQ"]
+    assert "resolvedData" not in text
+    assert "resolvedData" not in blocks[0]
+
+
+@pytest.mark.django_db
+def test_post_change_only_reloads_fragments_that_can_show_it(site):
+    service, categories, posts = site
+    blocks = _blocks(posts, categories)
+    first = service.resolve_blocks(blocks, use_cache=True)
+
+    with CaptureQueriesContext(connection) as ctx:
+        cached = service.resolve_blocks(blocks, use_cache=True)
+    assert len(ctx.captured_queries) == 0
+    assert cached.blocks == first.blocks
+    assert cached.generations == first.generations
+
+    # A draft is only referenced by the manual list asking for it
+    posts["draft"].title = "Draft2"
+    posts["draft"].save()
+    with CaptureQueriesContext(connection) as ctx:
+        resolved = service.resolve_blocks(blocks, use_cache=True)
+    assert len(ctx.captured_queries) == 1
+    assert resolved.blocks[0] == first.blocks[0]
+
+    # A published post may move within the latest list too; the category grids stay cached
+    posts["c"].title = "C2"
+    posts["c"].save()
+    with CaptureQueriesContext(connection) as ctx:
+        resolved = service.resolve_blocks(blocks, use_cache=True)
+    assert len(ctx.captured_queries) == 3
+    assert not any('FROM "web_category"' in query["sql"] for query in ctx.captured_queries)
+    assert _titles(resolved.blocks[1]) == ["C2"]
+    assert _titles(resolved.blocks[2]) == ["A", "C2"]
+
+    # Publishing a post reaches the lists it can enter, not only the ones showing it
+    posts["draft"].status = "published"
+    posts["draft"].save()
+    resolved = service.resolve_blocks(blocks, use_cache=True)
+    assert _titles(resolved.blocks[0]) == ["Draft2", "A"]
+    assert _titles(resolved.blocks[2]) == ["Draft2", "A", "C2"]
+
+    categories["faq"].name = "Questions"
+    categories["faq"].save()
+    resolved = service.resolve_blocks(blocks, use_cache=True)
+    assert _titles(resolved.blocks[4]) == ["News", "Questions"]
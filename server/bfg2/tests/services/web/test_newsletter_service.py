@@ -1,5 +1,16 @@
+from datetime import timedelta
+from io import StringIO
 from types import SimpleNamespace
 
+import pytest
+from celery import current_app
+from django.core.management import call_command
+from django.utils import timezone
+
+from bfg.common.models import Workspace
+from bfg.common.services import email_service
+from bfg.web import tasks
+from bfg.web.models import NewsletterSend, NewsletterSendChunk, NewsletterSendLog, NewsletterSubscription
 from bfg.web.services.newsletter_service import NewsletterService
 
 
@@ -9,3 +20,178 @@ def test_can_send_to_blocks_unsubscribed():
     newsletter_send = SimpleNamespace(id=1)
 
     assert service.can_send_to(sub, newsletter_send) is False
+
+
+class FakeSession:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+        self.closed = False
+
+    def send_many(self, messages):
+        results = []
+        for message in messages:
+            if message.to_list[0] in self.fail:
+                results.append(ConnectionError("refused"))
+            else:
+                self.sent.append((message.to_list[0], message.subject, message.body_plain, message.body_html))
+                results.append(None)
+        return results
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def eager_tasks():
+    """Run chunk tasks in-process (there is no broker here)"""
+    always_eager = current_app.conf.task_always_eager
+    current_app.conf.task_always_eager = True
+    yield
+    current_app.conf.task_always_eager = always_eager
+
+
+@pytest.fixture
+def newsletter_setup(db, settings, eager_tasks):
+    settings.BFG2_SETTINGS = {**settings.BFG2_SETTINGS, "NEWSLETTER_CHUNK_SIZE": 3}
+    workspace = Workspace.objects.create(name="News", slug="news", is_active=True)
+    subs = NewsletterSubscription.objects.bulk_create([
+        NewsletterSubscription(workspace=workspace, email=f"r{i}@example.com", unsubscribe_token=f"t{i}")
+        for i in range(7)
+    ])
+    subs[5].status = "unsubscribed"
+    subs[5].save()
+    return SimpleNamespace(workspace=workspace, service=NewsletterService(workspace=workspace, user=None))
+
+
+@pytest.mark.django_db
+def test_execute_send_delivers_in_chunks_over_shared_sessions(newsletter_setup, monkeypatch):
+    sessions = []
+
+    def open_session(workspace, config=None):
+        sessions.append(FakeSession(fail={"r2@example.com"}))
+        return sessions[-1]
+
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(open_session))
+    service = newsletter_setup.service
+    send = service.create_send(subject="Hi", content="<p>Hello</p>")
+
+    send = service.execute_send(send)
+
+    assert send.status == "sent" and send.sent_at is not None
+    assert (send.recipient_count, send.sent_count, send.failed_count) == (6, 5, 1)
+    assert len(sessions) == 2 and all(session.closed for session in sessions)
+    assert sessions[0].sent[0] == ("r0@example.com", "Hi", "Hello", "<p>Hello</p>")
+    logs = dict(NewsletterSendLog.objects.filter(newsletter_send=send).values_list("subscription__email", "status"))
+    assert len(logs) == 6 and logs["r2@example.com"] == "failed"
+
+
+@pytest.mark.django_db
+def test_interrupted_send_resumes_without_duplicates(newsletter_setup, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(lambda workspace, config=None: session))
+    service = newsletter_setup.service
+    send = service.create_send(subject="Hi", content="Hello")
+    # Chunk tasks never ran (e.g. workers died): the send stays 'sending'
+    monkeypatch.setattr(NewsletterService, "_dispatch_chunks", lambda self, newsletter_send: None)
+    send = service.execute_send(send)
+    assert send.status == "sending" and send.recipient_count == 6
+    first_ids = list(service.pending_subscriptions(send).values_list("id", flat=True))[:2]
+    service.send_chunk(send, first_ids[0], first_ids[1])
+    # Subscribed after dispatch: not part of this send
+    NewsletterSubscription.objects.create(workspace=newsletter_setup.workspace, email="late@example.com")
+
+    monkeypatch.undo()
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(lambda workspace, config=None: session))
+    send = service.resume_send(send)
+
+    assert send.status == "sent"
+    emails = [sent[0] for sent in session.sent]
+    assert len(emails) == len(set(emails)) == 6 and "late@example.com" not in emails
+    assert send.sent_count == 6
+
+
+@pytest.mark.django_db
+def test_stall_check_skips_chunks_with_a_live_lease(newsletter_setup, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(lambda workspace, config=None: session))
+    queued = []
+    monkeypatch.setattr(tasks.send_newsletter_chunk, "delay", lambda *args: queued.append(args))
+    service = newsletter_setup.service
+    send = service.execute_send(service.create_send(subject="Hi", content="Hello"))
+    assert send.status == "sending" and len(queued) == 2
+    long_ago = timezone.now() - timedelta(hours=1)
+    NewsletterSend.objects.filter(pk=send.pk).update(updated_at=long_ago)
+
+    # Chunks still queued (or throttled) within their lease: nothing is dispatched again
+    tasks.process_scheduled_newsletter_sends()
+    assert len(queued) == 2 and not session.sent
+
+    # The first chunk's worker died: only its range is taken over
+    NewsletterSendChunk.objects.filter(id=queued[0][3]).update(heartbeat_at=long_ago)
+    tasks.process_scheduled_newsletter_sends()
+    assert len(queued) == 3 and queued[2][1:3] == queued[0][1:3]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(lambda workspace, config=None: session))
+    for args in queued:
+        tasks.send_newsletter_chunk(*args)
+
+    # The stale chunk's task ran late but its lease had been released
+    emails = [sent[0] for sent in session.sent]
+    assert len(emails) == len(set(emails)) == 6
+    send.refresh_from_db()
+    assert send.status == "sent" and send.sent_count == 6
+    assert not NewsletterSendChunk.objects.filter(newsletter_send=send, released_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_broker_outage_leaves_chunks_for_the_stall_check(newsletter_setup, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(lambda workspace, config=None: session))
+
+    def broker_down(*args):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(tasks.send_newsletter_chunk, "delay", broker_down)
+    service = newsletter_setup.service
+    send = service.execute_send(service.create_send(subject="Hi", content="Hello"))
+
+    # Nothing is delivered inside the caller's request
+    assert send.status == "sending" and not session.sent
+    assert NewsletterSendChunk.objects.filter(newsletter_send=send).count() == 1
+
+    # Broker back: once the lease is stale the beat task dispatches every range
+    monkeypatch.undo()
+    monkeypatch.setattr(email_service.EmailService, "open_session", staticmethod(lambda workspace, config=None: session))
+    long_ago = timezone.now() - timedelta(hours=1)
+    NewsletterSendChunk.objects.filter(newsletter_send=send).update(heartbeat_at=long_ago)
+    tasks.process_scheduled_newsletter_sends()
+
+    send.refresh_from_db()
+    assert send.status == "sent" and len(session.sent) == 6
+
+
+@pytest.mark.django_db
+def test_missing_email_config_fails_every_recipient(newsletter_setup):
+    send = newsletter_setup.service.execute_send(newsletter_setup.service.create_send(subject="Hi"))
+    assert send.status == "sent" and send.failed_count == 6
+    assert not NewsletterSendLog.objects.filter(newsletter_send=send, status="success").exists()
+
+
+def test_send_rate_prefers_the_workspace_setting(settings):
+    settings.BFG2_SETTINGS = {"NEWSLETTER_SEND_RATE": 50}
+    assert NewsletterService(workspace=SimpleNamespace(id=1, settings={}), user=None).get_send_rate() == 50
+    workspace = SimpleNamespace(id=1, settings={"newsletter": {"send_rate": 5}})
+    assert NewsletterService(workspace=workspace, user=None).get_send_rate() == 5
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_benchmark_newsletter_send_reuses_one_smtp_connection():
+    out = StringIO()
+    call_command("benchmark_newsletter_send", recipients=40, baseline=10, stdout=out)
+    output = out.getvalue()
+    assert "per-message send, 10 recipients" in output and "10 messages, 1 SMTP connections" in output
+    assert "40 messages, 1 SMTP connections" in output
+    assert "status=sent sent=40 failed=0" in output
@@ -1,3 +1,8 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
 from bfg.web.services.page_service import (
     get_page_cache_ttl,
     get_page_rendered_cache_key,
@@ -14,3 +19,76 @@ def test_page_cache_key_and_home_helpers():
 
 def test_page_cache_ttl_non_cacheable_slug_is_zero():
     assert get_page_cache_ttl("product-detail") == 0
+
+
+def test_rendered_page_cache_invalidated_for_every_language(settings):
+    from django.core.cache import cache
+    from bfg.core.cache import get_tagged, set_tagged
+    from bfg.web.services.page_service import (
+        get_page_cache_tags,
+        invalidate_home_page_cache_for_workspace,
+        invalidate_workspace_page_cache,
+    )
+
+    tags = get_page_cache_tags(7, "home")
+    for lang in ("en", "zh-hans"):
+        set_tagged(get_page_rendered_cache_key(7, "home", lang), {"lang": lang}, tags)
+    category_tags = get_page_cache_tags(7, "category-news")
+    set_tagged(get_page_rendered_cache_key(7, "category-news", "en"), {}, category_tags)
+
+    invalidate_home_page_cache_for_workspace(7)
+    assert get_tagged(get_page_rendered_cache_key(7, "home", "zh-hans"), tags) is None
+    assert get_tagged(get_page_rendered_cache_key(7, "category-news", "en"), category_tags) == {}
+
+    invalidate_workspace_page_cache(7)
+    assert get_tagged(get_page_rendered_cache_key(7, "category-news", "en"), category_tags) is None
+    cache.clear()
+
+
+def test_page_cache_ttl_is_configured_per_slug(settings):
+    settings.BFG2_SETTINGS = {"PAGE_CACHE_TTLS": {"*": 300, "product-*": 0, "category-news": 60}}
+    assert get_page_cache_ttl("about") == 300
+    assert get_page_cache_ttl("product-detail") == 0
+    assert get_page_cache_ttl("category-news") == 60
+    assert get_page_cache_ttl("category-blog") == 60 * 30
+    assert get_page_cache_ttl("home") == 60 * 60
+
+
+@pytest.mark.django_db
+def test_rendered_page_is_served_stale_while_refreshed(settings, monkeypatch):
+    from django.core.cache import cache
+    from bfg.common.models import User, Workspace
+    from bfg.core import cache as core_cache
+    from bfg.core.tasks import refresh_cache_entry
+    from bfg.web.models import Page
+    from bfg.web.services.page_service import PageService
+
+    settings.BFG2_SETTINGS = {"PAGE_CACHE_TTLS": {"about": 300}}
+    cache.clear()
+    scheduled = []
+    monkeypatch.setattr(refresh_cache_entry, "delay", lambda *args: scheduled.append(args))
+    workspace = Workspace.objects.create(name="Site", slug="site", is_active=True)
+    page = Page.objects.create(
+        workspace=workspace, title="About", slug="about", content="-", status="published", language="en",
+        created_by=User.objects.create_user(username="editor", password="x"),
+    )
+    service = PageService(workspace=workspace, user=None)
+
+    assert service.get_rendered_page("about")["title"] == "About"
+    Page.objects.filter(pk=page.pk).update(title="About us")
+    assert service.get_rendered_page("about")["title"] == "About"
+
+    # Past its TTL the old page is served once more while the refresh task re-renders it
+    later = time.time() + 301
+    monkeypatch.setattr(core_cache, "time", SimpleNamespace(time=lambda: later, monotonic=time.monotonic, sleep=time.sleep))
+    assert service.get_rendered_page("about")["title"] == "About"
+    assert len(scheduled) == 1
+    refresh_cache_entry(*scheduled[0])
+    assert service.get_rendered_page("about")["title"] == "About us"
+
+    # Edits invalidate right away
+    page.refresh_from_db()
+    page.title = "About the team"
+    page.save()
+    assert service.get_rendered_page("about")["title"] == "About the team"
+    cache.clear()
@@ -26,7 +26,7 @@ from bfg.common.models import Workspace, User, APIKey, StaffRole, StaffMember
 # ---------------------------------------------------------------------------
 
 @pytest.fixture(autouse=True)
-def _enable_apikey_auth(settings):
+def _enable_apikey_auth(settings, monkeypatch):
     """Inject APIKeyAuthentication into DRF for every test in this module."""
     settings.REST_FRAMEWORK = {
         'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -39,6 +39,11 @@ def _enable_apikey_auth(settings):
         ),
         'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     }
+    # APIView reads the default authentication classes once, at import; views may
+    # already have been imported by earlier tests.
+    from rest_framework.settings import api_settings
+    from rest_framework.views import APIView
+    monkeypatch.setattr(APIView, 'authentication_classes', api_settings.DEFAULT_AUTHENTICATION_CLASSES)
 
 
 @pytest.fixture
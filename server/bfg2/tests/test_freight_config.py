@@ -10,6 +10,7 @@ from bfg.delivery.services.freight_calculator import (
     calculate_billing_weight,
     calculate_base_shipping_cost,
     find_matching_rule,
+    find_matching_rules,
     normalize_conditions,
 )
 
@@ -126,7 +127,8 @@ class TestConditionNormalizeAndMatch:
         rule_light = find_matching_rule(config, context_light)
         assert rule_heavy is not None and rule_heavy.get('pricing', {}).get('type') == 'free'
         assert rule_light is not None
-        assert rule_light.get('pricing', {}).get('type') in ('free', 'linear')
+        assert rule_light.get('pricing', {}).get('type') == 'linear'
+        assert find_matching_rules(config, [context_light, context_heavy]) == [rule_light, rule_heavy]
 
     def test_conditional_free_then_linear_via_direct_cost_call(self):
         rule_config_free = {'mode': 'linear', 'rules': {'fixed_price': 0}}